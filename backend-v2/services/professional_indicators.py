@@ -6,6 +6,8 @@ import pandas as pd
 import numpy as np
 from typing import Dict, List, Tuple, Optional
 
+from perfil_volume import calcular_perfil_volume
+
 def calculate_ichimoku(df: pd.DataFrame, tenkan_period: int = 9, kijun_period: int = 26, 
                       senkou_span_b_period: int = 52, displacement: int = 26) -> Dict[str, any]:
     """Calcula Ichimoku Cloud (Nuvem de Ichimoku)."""
@@ -255,50 +257,23 @@ def calculate_volume_profile(df: pd.DataFrame, bins: int = 20) -> Dict[str, any]
     if price_range == 0:
         return {"error": "Range de preços inválido"}
     
-    # Criar bins de preço
-    bin_size = price_range / bins
-    price_bins = [price_min + i * bin_size for i in range(bins + 1)]
-    
-    # Calcular volume por bin
-    volume_by_bin = {}
-    for i in range(len(price_bins) - 1):
-        bin_low = price_bins[i]
-        bin_high = price_bins[i + 1]
-        bin_volume = 0
-        
-        for idx, row in df.iterrows():
-            # Volume proporcional se a vela cruza múltiplos bins
-            if row['low'] < bin_high and row['high'] > bin_low:
-                overlap_low = max(row['low'], bin_low)
-                overlap_high = min(row['high'], bin_high)
-                overlap_ratio = (overlap_high - overlap_low) / (row['high'] - row['low'])
-                bin_volume += row['volume'] * overlap_ratio
-        
-        volume_by_bin[f"{bin_low:.2f}-{bin_high:.2f}"] = bin_volume
-    
-    # Encontrar POC (Point of Control) - bin com maior volume
-    poc_bin = max(volume_by_bin, key=volume_by_bin.get)
-    poc_volume = volume_by_bin[poc_bin]
-    
-    # Calcular VAH (Value Area High) e VAL (Value Area Low)
-    total_volume = sum(volume_by_bin.values())
-    value_area_volume = total_volume * 0.7  # 70% do volume total
-    
-    sorted_bins = sorted(volume_by_bin.items(), key=lambda x: x[1], reverse=True)
-    cumulative_volume = 0
-    value_area_bins = []
+    # Volume proporcional por bin (vela que cruza vários bins é rateada)
+    perfil = calcular_perfil_volume(high.values, low.values, volume.values, bins=bins)
+    labels = [f"{perfil.bordas[i]:.2f}-{perfil.bordas[i + 1]:.2f}" for i in range(bins)]
+    volume_by_bin = dict(zip(labels, perfil.volumes.tolist()))
     
-    for bin_name, vol in sorted_bins:
-        cumulative_volume += vol
-        value_area_bins.append(bin_name)
-        if cumulative_volume >= value_area_volume:
-            break
+    # POC (Point of Control) e Value Area (70% do volume)
+    poc_bin = labels[perfil.poc_indice]
+    value_area_bins = [labels[i] for i in perfil.area_indices]
     
     return {
         "poc": poc_bin,
-        "poc_volume": poc_volume,
+        "poc_price": perfil.poc,
+        "poc_volume": float(perfil.volumes[perfil.poc_indice]),
+        "vah": perfil.vah,
+        "val": perfil.val,
         "value_area_bins": value_area_bins,
-        "total_volume": total_volume,
+        "total_volume": perfil.total,
         "volume_by_bin": volume_by_bin,
         "price_range": {"min": price_min, "max": price_max}
     }
@@ -8,13 +8,25 @@ import sys
 import time
 import hmac
 import hashlib
+import json
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from functools import wraps
 
 # Flask e dependências
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 import requests
 
+from armazem_candles import ARMAZEM_ATIVO, obter_klines
+from http_upstream import (
+    PRIORIDADE_INTERATIVA, PRIORIDADE_LOTE, UpstreamIndisponivel, com_prioridade,
+    estatisticas_upstream, prioridade_upstream, upstream_get,
+)
+from ingestao_klines import INTERVALOS_INGESTAO, SIMBOLOS_INGESTAO, ler_klines_redis
+from cache_binance import VooUnico, calcular_ttl_ms, chave_cache, normalizar_params
+from klines import MIME_KLINES_BINARIO, buscar_klines_binance, codificar_klines_binario, decodificar_klines
+
 # Redis (Upstash - best effort)
 try:
     import redis
@@ -81,6 +93,7 @@ def verify_hmac_signature():
 
 def require_auth(f):
     """Decorator que aceita Bearer token OU HMAC"""
+    @wraps(f)
     def wrapper(*args, **kwargs):
         # Primeiro tenta Bearer token (mais simples)
         auth_header = request.headers.get('Authorization', '')
@@ -99,58 +112,254 @@ def require_auth(f):
         return f(*args, **kwargs)
     return wrapper
 
+def prioridade_do_pedido(f):
+    """Chamadas à Binance do pedido na prioridade de X-SNE-Priority (lote = scanner)"""
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        lote = request.headers.get('X-SNE-Priority', '').lower() == 'lote'
+        with prioridade_upstream(PRIORIDADE_LOTE if lote else PRIORIDADE_INTERATIVA):
+            return f(*args, **kwargs)
+    return wrapper
+
 # ================================
 # CACHE-FIRST BINANCE API
 # ================================
 
-def get_cached_binance_data(endpoint, params=None, cache_ttl=300):
-    """Cache-first: Redis → Binance → Redis (best effort)"""
-    if params is None:
-        params = {}
+class ErroUpstream(Exception):
+    """Falha da Binance já no formato de resposta do proxy"""
 
-    # Cache key
-    cache_key = f"binance:{endpoint}:{str(sorted(params.items()))}"
+    def __init__(self, erro, status):
+        super().__init__(erro)
+        self.resultado = {"error": erro, "status": status}
 
-    # 1. Try cache first (best effort)
-    if redis_available and redis_client:
-        try:
+
+def _buscar_klines_upstream(symbol, interval, limit, inicio):
+    try:
+        return buscar_klines_binance(symbol, interval, limit, inicio=inicio, timeout=5)
+    except requests.exceptions.Timeout:
+        raise ErroUpstream("Timeout", 408)
+    except requests.exceptions.HTTPError as e:
+        if e.response is not None and e.response.status_code == 451:
+            raise ErroUpstream("Location restricted", 451)
+        raise ErroUpstream(str(e), 500)
+    except UpstreamIndisponivel as e:
+        raise ErroUpstream(str(e), 503)
+    except (requests.exceptions.RequestException, ValueError) as e:
+        raise ErroUpstream(str(e), 500)
+
+
+def get_klines_armazem(params):
+    """Janela recente de klines: candles fechados do disco, da Binance só o que falta"""
+    try:
+        limit = min(int(params.get('limit') or 500), 1000)
+        klines = obter_klines(params['symbol'].upper(), params['interval'], limit,
+                              buscar=_buscar_klines_upstream)
+    except ErroUpstream as e:
+        return e.resultado
+    except ValueError as e:
+        return {"error": str(e), "status": 400}
+    return {"source": "store", "data": klines.para_linhas()}
+
+
+# Outro worker buscando a mesma chave: espera o cache dele até este limite
+ESPERA_OUTRO_WORKER_MS = 5000
+voo_unico = VooUnico()
+
+
+def _aguardar_outro_worker(cache_key):
+    """
+    Coalescência entre workers: quem pega a trava no Redis busca; os
+    demais esperam a entrada aparecer no cache (até ESPERA_OUTRO_WORKER_MS)
+
+    Returns:
+        Dados do cache escritos pelo outro worker, ou None para buscar
+    """
+    if not (redis_available and redis_client):
+        return None
+    try:
+        if redis_client.set(f"voo:{cache_key}", "1", nx=True, px=ESPERA_OUTRO_WORKER_MS):
+            return None
+        limite = time.time() + ESPERA_OUTRO_WORKER_MS / 1000
+        while time.time() < limite:
+            time.sleep(0.05)
             cached = redis_client.get(cache_key)
             if cached:
-                try:
-                    import json as json_lib
-                    return {"source": "cache", "data": json_lib.loads(cached)}
-                except:
-                    pass  # Cache corrupted, fetch fresh
-        except Exception:
-            pass  # Redis down, continue without cache
+                return json.loads(cached)
+            if not redis_client.exists(f"voo:{cache_key}"):
+                return None   # o outro falhou (não grava erro no cache)
+    except Exception:
+        pass  # Redis down, busca direto
+    return None
+
+
+def _klines_do_stream(endpoint, params):
+    """Janela recente publicada pelo worker de ingestão (None: seguir o caminho normal)"""
+    if endpoint != 'klines' or not (redis_available and redis_client) or {'startTime', 'endTime'} & params.keys():
+        return None
+    if params.get('symbol') not in SIMBOLOS_INGESTAO or params.get('interval') not in INTERVALOS_INGESTAO:
+        return None
+    try:
+        linhas = ler_klines_redis(redis_client, params['symbol'], params['interval'], int(params.get('limit', 500)))
+    except Exception:
+        return None  # Redis down, continue without stream
+    return None if linhas is None else {"source": "stream", "data": linhas}
+
+
+def _buscar_upstream(endpoint, params):
+    """Binance (ou armazém de candles para janelas recentes de klines)"""
+    # Janela recente (sem startTime/endTime): servida pelo armazém local
+    if endpoint == 'klines' and ARMAZEM_ATIVO and not ({'startTime', 'endTime'} & params.keys()):
+        return get_klines_armazem(params)
 
-    # 2. Fetch from Binance (with timeout)
     try:
         url = f"https://api.binance.com/api/v3/{endpoint}"
-        response = requests.get(url, params=params, timeout=5)  # 5s timeout
+        response = upstream_get(url, params=params, timeout=5)  # 5s timeout
 
         if response.status_code == 451:
-            # Circuit breaker for restricted location
+            # Restricted location (abre o disjuntor do host, ver http_upstream)
             return {"error": "Location restricted", "status": 451}
 
         response.raise_for_status()
-        data = response.json()
-
-        # 3. Cache result (best effort)
-        if redis_available and redis_client:
-            try:
-                import json as json_lib
-                redis_client.setex(cache_key, cache_ttl, json_lib.dumps(data))
-            except Exception:
-                pass  # Don't fail if cache write fails
-
-        return {"source": "fresh", "data": data}
+        return {"source": "fresh", "data": response.json()}
 
     except requests.exceptions.Timeout:
         return {"error": "Timeout", "status": 408}
+    except UpstreamIndisponivel as e:
+        # Disjuntor aberto ou orçamento de peso esgotado: nem saiu
+        return {"error": str(e), "status": 503}
     except requests.exceptions.RequestException as e:
         return {"error": str(e), "status": 500}
 
+
+def _buscar_e_guardar(endpoint, params, cache_key, cache_ttl):
+    data = _aguardar_outro_worker(cache_key)
+    if data is not None:
+        return {"source": "cache", "data": data}
+
+    result = _buscar_upstream(endpoint, params)
+
+    # Cache result (best effort); erros não vão para o cache
+    if redis_available and redis_client:
+        try:
+            if "error" not in result:
+                ttl_ms = cache_ttl * 1000 if cache_ttl else calcular_ttl_ms(endpoint, params, result["data"])
+                redis_client.psetex(cache_key, ttl_ms, json.dumps(result["data"]))
+            redis_client.delete(f"voo:{cache_key}")
+        except Exception:
+            pass  # Don't fail if cache write fails
+    return result
+
+
+def get_cached_binance_data(endpoint, params=None, cache_ttl=None):
+    """
+    Cache-first: Redis → Binance → Redis (best effort)
+
+    TTL pelo fechamento do candle (cache_ttl fixa em segundos); buscas
+    idênticas simultâneas viram uma só.
+
+    Raises:
+        ValueError: parâmetros numéricos inválidos
+    """
+    params = normalizar_params(endpoint, params)
+    cache_key = chave_cache(endpoint, params)
+
+    # 0. Klines empurrados pelo stream (worker de ingestão)
+    result = _klines_do_stream(endpoint, params)
+    if result is not None:
+        return result
+
+    # 1. Try cache first (best effort)
+    if redis_available and redis_client:
+        try:
+            cached = redis_client.get(cache_key)
+            if cached:
+                try:
+                    return {"source": "cache", "data": json.loads(cached)}
+                except ValueError:
+                    pass  # Cache corrupted, fetch fresh
+        except Exception:
+            pass  # Redis down, continue without cache
+
+    # 2. Fetch
+    return _buscar_coalescido(endpoint, params, cache_key, cache_ttl)
+
+
+def _buscar_coalescido(endpoint, params, cache_key, cache_ttl=None):
+    """Uma busca por chave em voo neste processo"""
+    return voo_unico.executar(cache_key, lambda: _buscar_e_guardar(endpoint, params, cache_key, cache_ttl))
+
+
+# Lote de klines: pedidos por chamada e buscas simultâneas no upstream
+MAX_LOTE_KLINES = 100
+WORKERS_LOTE_KLINES = 8
+_CAMPOS_PEDIDO = ('symbol', 'interval', 'limit', 'since')
+
+
+def _params_pedido(pedido):
+    """Pedido do lote ({symbol, interval, limit, since} ou lista nessa ordem) → params normalizados"""
+    if isinstance(pedido, (list, tuple)):
+        pedido = dict(zip(_CAMPOS_PEDIDO, pedido))
+    if not isinstance(pedido, dict) or not pedido.get('symbol') or not pedido.get('interval'):
+        raise ValueError("each request needs symbol and interval")
+    params = {'symbol': pedido['symbol'], 'interval': pedido['interval']}
+    if pedido.get('limit') is not None:
+        params['limit'] = pedido['limit']
+    if pedido.get('since') is not None:
+        params['startTime'] = pedido['since']
+    return normalizar_params('klines', params)
+
+
+def get_klines_lote(pedidos):
+    """
+    Vários klines numa chamada: o que o stream já tem sai direto, o que
+    está no cache sai de um MGET só, os faltantes vão ao upstream em
+    paralelo (coalescidos por chave)
+
+    Returns:
+        Lista na ordem dos pedidos: {symbol, interval, source, data} ou
+        {symbol, interval, error, status}
+
+    Raises:
+        ValueError: pedido sem symbol/interval ou com números inválidos
+    """
+    itens = []
+    for pedido in pedidos:
+        params = _params_pedido(pedido)
+        itens.append((params, chave_cache('klines', params)))
+
+    resultados = {}
+    for params, chave in itens:
+        if chave not in resultados:
+            do_stream = _klines_do_stream('klines', params)
+            if do_stream is not None:
+                resultados[chave] = do_stream
+    chaves = [chave for chave in dict.fromkeys(chave for _, chave in itens) if chave not in resultados]
+
+    # 1. Cache (best effort)
+    if redis_available and redis_client and chaves:
+        try:
+            for chave, cached in zip(chaves, redis_client.mget(chaves)):
+                if cached:
+                    try:
+                        resultados[chave] = {"source": "cache", "data": json.loads(cached)}
+                    except ValueError:
+                        pass  # Cache corrupted, fetch fresh
+        except Exception:
+            pass  # Redis down, continue without cache
+
+    # 2. Faltantes em paralelo
+    faltantes = {chave: params for params, chave in itens if chave not in resultados}
+    if faltantes:
+        with ThreadPoolExecutor(max_workers=min(WORKERS_LOTE_KLINES, len(faltantes))) as executor:
+            buscar = com_prioridade(_buscar_coalescido)
+            futuros = {chave: executor.submit(buscar, 'klines', params, chave)
+                       for chave, params in faltantes.items()}
+            for chave, futuro in futuros.items():
+                resultados[chave] = futuro.result()
+
+    return [{"symbol": params['symbol'], "interval": params['interval'], **resultados[chave]}
+            for params, chave in itens]
+
 # ================================
 # ENDPOINTS
 # ================================
@@ -173,7 +382,9 @@ def health_deps():
     return jsonify({
         "ok": True,
         "service": "sne-collector",
-        "redis": redis_ok
+        "redis": redis_ok,
+        "single_flight": voo_unico.estatisticas(),
+        "upstream": estatisticas_upstream()
     })
 
 @app.route('/debug/binance')
@@ -195,8 +406,32 @@ def debug_binance():
         "egress_ok": True
     })
 
+@app.route('/binance/klines/batch', methods=['POST'])
+@require_auth
+@prioridade_do_pedido
+def binance_klines_batch():
+    """
+    Lote de klines: {"requests": [{"symbol", "interval", "limit", "since"}, ...]}
+
+    Resposta 200 com um resultado por pedido, na mesma ordem; falha de um
+    pedido vem no próprio item (error/status) sem derrubar o lote.
+    """
+    corpo = request.get_json(silent=True)
+    pedidos = corpo.get('requests') if isinstance(corpo, dict) else corpo
+    if not isinstance(pedidos, list) or not pedidos:
+        return jsonify({"error": "Body must be {\"requests\": [...]}"}), 400
+    if len(pedidos) > MAX_LOTE_KLINES:
+        return jsonify({"error": f"Too many requests (max {MAX_LOTE_KLINES})"}), 400
+
+    try:
+        results = get_klines_lote(pedidos)
+    except ValueError as e:
+        return jsonify({"error": f"Invalid request: {e}"}), 400
+    return jsonify({"results": results})
+
 @app.route('/binance/<endpoint>', methods=['GET'])
 @require_auth
+@prioridade_do_pedido
 def binance_proxy(endpoint):
     """Cache-first Binance proxy"""
     # Validate endpoint
@@ -213,12 +448,36 @@ def binance_proxy(endpoint):
         if not all(k in params for k in required):
             return jsonify({"error": "Missing required params: symbol, interval"}), 400
 
-    result = get_cached_binance_data(endpoint, params)
+    try:
+        result = get_cached_binance_data(endpoint, params)
+    except ValueError as e:
+        return jsonify({"error": f"Invalid params: {e}"}), 400
 
     if "error" in result:
-        return jsonify({"error": result["error"]}), result.get("status", 500)
+        # Erro da Binance repassado (ou recusa do agendador, 503): marcado
+        # para o disjuntor de quem chama não contar contra o coletor
+        status = result.get("status", 500)
+        marca = "X-SNE-Upstream-Refused" if status == 503 else "X-SNE-Upstream-Error"
+        return jsonify({"error": result["error"]}), status, {marca: "1"}
+
+    if endpoint == 'klines' and _quer_klines_binario():
+        try:
+            corpo = codificar_klines_binario(decodificar_klines(result["data"]))
+        except ValueError as e:
+            print(f"⚠️ Klines binário indisponível, respondendo JSON: {e}")
+        else:
+            return Response(corpo, mimetype=MIME_KLINES_BINARIO,
+                            headers={"X-SNE-Source": result.get("source", ""), "Vary": "Accept"})
+
+    resposta = jsonify(result)
+    if endpoint == 'klines':
+        resposta.headers["Vary"] = "Accept"
+    return resposta
 
-    return jsonify(result)
+def _quer_klines_binario():
+    """Accept negociado: JSON continua o padrão (empate ou Accept ausente)"""
+    escolhido = request.accept_mimetypes.best_match(['application/json', MIME_KLINES_BINARIO])
+    return escolhido == MIME_KLINES_BINARIO
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", "8080"))
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARMAZÉM DE CANDLES
+Candles fechados em disco, um arquivo colunar por símbolo/intervalo
+
+Cada arquivo ({SYMBOL}_{interval}.bin) é uma sequência de registros de
+tamanho fixo (DTYPE_REGISTRO, os campos de klines.COLUNAS_KLINES) em ordem
+de abertura, lido por memmap: leitura por faixa de tempo é searchsorted
+no timestamp + fatia, sem carregar o arquivo.
+
+- Só candles fechados são gravados; candle que fecha vira append no fim
+- Buraco na janela pedida (primeira execução, processo parado, falha)
+  é detectado pela grade de aberturas do intervalo e preenchido do
+  upstream a partir do primeiro candle ausente
+- O candle em formação sempre vem do upstream: em regime, uma janela de
+  200 candles busca 1 candle (2 logo após um fechamento)
+
+Uso:
+    klines = obter_klines('BTCUSDT', '1h', 200, buscar=buscar_klines_binance)
+
+`buscar(symbol, interval, limit, inicio)` é quem fala com o upstream
+(Binance direto ou o coletor) e devolve klines.Klines.
+"""
+
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+from klines import COLUNAS_KLINES, NOMES_KLINES, Klines
+
+try:
+    import fcntl
+except ImportError:   # Windows: só a trava de thread
+    fcntl = None
+
+DIRETORIO_CANDLES = os.getenv('MOTOR_CANDLES_DIR', os.path.join(tempfile.gettempdir(), 'sne_candles'))
+ARMAZEM_ATIVO = os.getenv('MOTOR_CANDLES_ARMAZEM', '1') != '0'
+
+DTYPE_REGISTRO = np.dtype([(nome, dtype) for nome, dtype in COLUNAS_KLINES])
+
+# Intervalos com grade fixa (1M tem meses de tamanhos diferentes, 3d fica de fora)
+_MINUTO = 60_000
+INTERVALOS_MS = {
+    '1m': _MINUTO, '3m': 3 * _MINUTO, '5m': 5 * _MINUTO, '15m': 15 * _MINUTO, '30m': 30 * _MINUTO,
+    '1h': 60 * _MINUTO, '2h': 120 * _MINUTO, '4h': 240 * _MINUTO, '6h': 360 * _MINUTO,
+    '8h': 480 * _MINUTO, '12h': 720 * _MINUTO, '1d': 1440 * _MINUTO, '1w': 7 * 1440 * _MINUTO,
+}
+# Semana da Binance começa na segunda; o epoch caiu numa quinta
+DESLOCAMENTO_MS = {'1w': 4 * 1440 * _MINUTO}
+MAX_POR_BUSCA = 1000            # limite de /klines por requisição
+
+
+def abertura_atual(interval, agora_ms=None):
+    """Abertura (ms) do candle em formação, ou None se o intervalo não tem grade fixa"""
+    passo = INTERVALOS_MS.get(interval)
+    if passo is None:
+        return None
+    agora_ms = int(time.time() * 1000) if agora_ms is None else agora_ms
+    deslocamento = DESLOCAMENTO_MS.get(interval, 0)
+    return (agora_ms - deslocamento) // passo * passo + deslocamento
+
+
+def registros_de_klines(klines):
+    registros = np.empty(len(klines), dtype=DTYPE_REGISTRO)
+    for nome in NOMES_KLINES:
+        registros[nome] = klines[nome]
+    return registros
+
+
+def klines_de_registros(registros):
+    return Klines(**{nome: np.ascontiguousarray(registros[nome]) for nome in NOMES_KLINES})
+
+
+def _unir(*partes):
+    """Registros ordenados por abertura, sem repetição (a última ocorrência vence)"""
+    todos = np.concatenate(partes) if len(partes) > 1 else partes[0]
+    invertidos = todos[::-1]
+    _, indices = np.unique(invertidos['timestamp'], return_index=True)
+    return invertidos[indices]
+
+
+def _lacunas(aberturas, inicio, fim, passo):
+    """Faixas contínuas da grade [inicio, fim] que não estão em aberturas"""
+    if fim < inicio:
+        return []
+    grade = np.arange(inicio, fim + 1, passo, dtype=np.int64)
+    ausentes = np.setdiff1d(grade, aberturas, assume_unique=True)
+    if not len(ausentes):
+        return []
+    quebras = np.flatnonzero(np.diff(ausentes) != passo)
+    inicios = np.concatenate(([ausentes[0]], ausentes[quebras + 1]))
+    fins = np.concatenate((ausentes[quebras], [ausentes[-1]]))
+    return [(int(a), int(b)) for a, b in zip(inicios, fins)]
+
+
+class ArmazemCandles:
+    """Arquivos de candles fechados em um diretório"""
+
+    def __init__(self, diretorio=None):
+        self.diretorio = diretorio or DIRETORIO_CANDLES
+        self._travas = {}
+        self._trava_travas = threading.Lock()
+
+    def caminho(self, symbol, interval):
+        return os.path.join(self.diretorio, f"{symbol.upper()}_{interval}.bin")
+
+    def _trava(self, symbol, interval):
+        chave = (symbol.upper(), interval)
+        with self._trava_travas:
+            return self._travas.setdefault(chave, threading.RLock())
+
+    @contextmanager
+    def _exclusivo(self, symbol, interval):
+        """Trava de thread + flock no arquivo .lock (outros workers/processos)"""
+        with self._trava(symbol, interval):
+            if fcntl is None:
+                yield
+                return
+            os.makedirs(self.diretorio, exist_ok=True)
+            with open(self.caminho(symbol, interval) + '.lock', 'a') as trava:
+                fcntl.flock(trava, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(trava, fcntl.LOCK_UN)
+
+    # Leitura -----------------------------------------------------------------
+
+    def _mapear(self, symbol, interval):
+        caminho = self.caminho(symbol, interval)
+        try:
+            n = os.path.getsize(caminho) // DTYPE_REGISTRO.itemsize
+        except OSError:
+            return np.empty(0, dtype=DTYPE_REGISTRO)
+        if n == 0:
+            return np.empty(0, dtype=DTYPE_REGISTRO)
+        # Só registros completos (um append pode estar em andamento)
+        return np.memmap(caminho, dtype=DTYPE_REGISTRO, mode='r', shape=(n,))
+
+    def ler(self, symbol, interval, inicio=None, fim=None):
+        """Registros com inicio <= abertura <= fim (cópia em memória)"""
+        mapa = self._mapear(symbol, interval)
+        if not len(mapa):
+            return np.empty(0, dtype=DTYPE_REGISTRO)
+        aberturas = mapa['timestamp']
+        i = 0 if inicio is None else int(np.searchsorted(aberturas, inicio, side='left'))
+        j = len(mapa) if fim is None else int(np.searchsorted(aberturas, fim, side='right'))
+        return np.array(mapa[i:j])
+
+    def ultimo(self, symbol, interval):
+        """Abertura do último candle guardado, ou None"""
+        mapa = self._mapear(symbol, interval)
+        return int(mapa['timestamp'][-1]) if len(mapa) else None
+
+    def lacunas(self, symbol, interval, inicio, fim):
+        """Faixas [(de, até)] de aberturas ausentes entre inicio e fim (inclusive)"""
+        guardados = self.ler(symbol, interval, inicio, fim)
+        return _lacunas(guardados['timestamp'], inicio, fim, INTERVALOS_MS[interval])
+
+    # Escrita -----------------------------------------------------------------
+
+    def gravar(self, symbol, interval, registros):
+        """
+        Guarda registros de candles fechados
+
+        Depois do último guardado: append. Preenchendo buracos ou
+        sobrescrevendo: reescreve o arquivo (troca atômica).
+
+        Returns:
+            Quantidade de candles novos
+        """
+        if not len(registros):
+            return 0
+        registros = _unir(registros)
+        with self._exclusivo(symbol, interval):
+            os.makedirs(self.diretorio, exist_ok=True)
+            caminho = self.caminho(symbol, interval)
+            existentes = self._mapear(symbol, interval)
+
+            if not len(existentes) or registros['timestamp'][0] > existentes['timestamp'][-1]:
+                with open(caminho, 'ab') as arquivo:
+                    # Descarta um append anterior incompleto
+                    arquivo.truncate(len(existentes) * DTYPE_REGISTRO.itemsize)
+                    arquivo.write(registros.tobytes())
+                return len(registros)
+
+            unidos = _unir(np.array(existentes), registros)
+            novos = len(unidos) - len(existentes)
+            temporario = f"{caminho}.{os.getpid()}.tmp"
+            unidos.tofile(temporario)
+            os.replace(temporario, caminho)
+            return novos
+
+    # Janela ------------------------------------------------------------------
+
+    def obter(self, symbol, interval, limit, buscar, agora_ms=None):
+        """
+        Últimos `limit` candles (o último em formação), buscando no upstream
+        só o que falta
+
+        Returns:
+            Klines, ou None se a busca no upstream falhou
+        """
+        agora_ms = int(time.time() * 1000) if agora_ms is None else agora_ms
+        aberto = abertura_atual(interval, agora_ms)
+        if aberto is None or limit <= 0:
+            return buscar(symbol, interval, limit, None)
+
+        passo = INTERVALOS_MS[interval]
+        inicio = aberto - (limit - 1) * passo
+        with self._trava(symbol, interval):
+            guardados = self.ler(symbol, interval, inicio, aberto - passo)
+            lacunas = _lacunas(guardados['timestamp'], inicio, aberto - passo, passo)
+
+            partes = None
+            if not lacunas:
+                # Regime: só o candle em formação. Com o relógio local atrás
+                # da Binance na virada vem o candle seguinte; aí o que acabou
+                # de fechar falta, e segue pelo caminho das lacunas
+                parte = buscar(symbol, interval, 1, None)
+                if parte is None:
+                    return None
+                if len(parte) and int(parte.timestamp[-1]) == aberto:
+                    partes = [parte]
+            if partes is None:
+                partes = []
+                desde = lacunas[0][0] if lacunas else aberto
+                while True:
+                    # Um a mais que o esperado: página curta = chegou ao
+                    # candle em formação da Binance, seja qual for o relógio local
+                    quantidade = max(1, min((aberto - desde) // passo + 2, MAX_POR_BUSCA))
+                    parte = buscar(symbol, interval, quantidade, desde)
+                    partes.append(parte)
+                    if parte is None or len(parte) < quantidade:
+                        break
+                    proximo = int(parte.timestamp[-1]) + passo
+                    if proximo <= desde:
+                        break   # upstream não avançou (ignorou startTime?)
+                    desde = proximo
+
+            if any(parte is None for parte in partes):
+                return None
+            recebidos = _unir(*[registros_de_klines(p) for p in partes])
+            # Fechado é o que a Binance devolveu antes da última linha (a em
+            # formação), não o que o relógio local acha
+            fechados = recebidos[:-1] if len(recebidos) else recebidos
+            self.gravar(symbol, interval, fechados)
+
+        janela = _unir(guardados, recebidos)
+        return klines_de_registros(janela[-limit:])
+
+
+armazem_candles = ArmazemCandles()
+
+
+def obter_klines(symbol, interval, limit, buscar):
+    """Janela de klines via armazém local (ou direto do upstream, se desativado)"""
+    if not ARMAZEM_ATIVO:
+        return buscar(symbol, interval, limit, None)
+    return armazem_candles.obter(symbol, interval, limit, buscar)
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Cache do proxy Binance: chave normalizada, TTL pelo fechamento do candle
+e coalescência de buscas idênticas (single-flight)
+
+- Chave: mesmos parâmetros em qualquer ordem/caixa (e os defaults da
+  Binance explícitos ou omitidos) caem na mesma entrada
+- TTL de klines: resposta só com candles fechados não muda mais (TTL
+  longo); com o candle em formação, TTL curto e nunca além do fechamento
+- Single-flight: N pedidos simultâneos da mesma chave viram 1 busca no
+  upstream; os demais esperam e recebem o mesmo resultado
+"""
+
+import threading
+import time
+from urllib.parse import urlencode
+
+from armazem_candles import INTERVALOS_MS, abertura_atual
+
+# TTL (s) dos endpoints sem candle
+TTL_ENDPOINTS = {'time': 1, 'ticker/price': 2, 'ticker/24hr': 10}
+TTL_PADRAO = 5
+# Klines só com candles fechados (imutáveis)
+TTL_FECHADOS = 86400
+# Candle em formação: fração do intervalo, entre 1 s e 300 s (1m: 1 s, 1h:
+# 60 s, 4h: 240 s, 1d+: 300 s). O teto é o TTL fixo de antes: intervalos
+# longos não vão ao upstream mais do que iam; curtos ficam mais frescos
+FRACAO_ABERTO = 1 / 60
+TTL_ABERTO_MIN = 1
+TTL_ABERTO_MAX = 300
+MARGEM_FECHAMENTO_MS = 1000
+
+# Defaults da Binance: omitir ou mandar o default é o mesmo pedido
+_DEFAULTS = {'klines': {'limit': '500', 'timeZone': '0'}}
+_LIMITE_MAXIMO = {'klines': 1000}
+_INTEIROS = ('limit', 'startTime', 'endTime')
+
+
+def normalizar_params(endpoint, params):
+    """
+    Parâmetros canônicos do pedido
+
+    Raises:
+        ValueError: limit/startTime/endTime não numéricos
+    """
+    normalizados = {}
+    for nome, valor in (params or {}).items():
+        valor = str(valor).strip()
+        if not valor:
+            continue
+        if nome == 'symbol':
+            valor = valor.upper()
+        elif nome in _INTEIROS:
+            valor = str(int(valor))
+        normalizados[nome] = valor
+
+    if 'limit' in normalizados and endpoint in _LIMITE_MAXIMO:
+        normalizados['limit'] = str(min(int(normalizados['limit']), _LIMITE_MAXIMO[endpoint]))
+    for nome, padrao in _DEFAULTS.get(endpoint, {}).items():
+        if normalizados.get(nome) == padrao:
+            del normalizados[nome]
+    return normalizados
+
+
+def chave_cache(endpoint, params):
+    """Chave Redis de params já normalizados"""
+    return f"binance:{endpoint}:{urlencode(sorted(params.items()))}"
+
+
+def ttl_candle_aberto(interval, agora_ms):
+    """TTL (ms) de uma resposta que inclui o candle em formação"""
+    passo = INTERVALOS_MS.get(interval)
+    if passo is None:   # 3d/1M: sem grade, só o TTL curto máximo
+        return TTL_ABERTO_MAX * 1000
+    curto = min(max(passo * FRACAO_ABERTO, TTL_ABERTO_MIN * 1000), TTL_ABERTO_MAX * 1000)
+    ate_fechar = abertura_atual(interval, agora_ms) + passo - agora_ms + MARGEM_FECHAMENTO_MS
+    return int(min(curto, ate_fechar))
+
+
+def calcular_ttl_ms(endpoint, params, dados, agora_ms=None):
+    """TTL (ms) da resposta `dados` do endpoint"""
+    if endpoint != 'klines':
+        return TTL_ENDPOINTS.get(endpoint, TTL_PADRAO) * 1000
+    agora_ms = int(time.time() * 1000) if agora_ms is None else agora_ms
+    # Último candle já fechado (ou resposta vazia de janela passada): imutável
+    if dados and int(dados[-1][6]) < agora_ms:
+        return TTL_FECHADOS * 1000
+    if not dados and int(params.get('endTime', agora_ms)) < agora_ms:
+        return TTL_FECHADOS * 1000
+    return ttl_candle_aberto(params.get('interval'), agora_ms)
+
+
+class VooUnico:
+    """Coalescência de chamadas idênticas simultâneas (no processo)"""
+
+    def __init__(self):
+        self._trava = threading.Lock()
+        self._em_voo = {}
+        self.buscas = 0
+        self.coalescidas = 0
+
+    def executar(self, chave, funcao):
+        """
+        Executa funcao() uma vez por chave em voo; quem chega durante a
+        busca espera e recebe o mesmo resultado (ou a mesma exceção)
+        """
+        with self._trava:
+            voo = self._em_voo.get(chave)
+            lider = voo is None
+            if lider:
+                voo = self._em_voo[chave] = {'pronto': threading.Event()}
+                self.buscas += 1
+            else:
+                self.coalescidas += 1
+
+        if not lider:
+            voo['pronto'].wait()
+            if 'erro' in voo:
+                raise voo['erro']
+            return voo['resultado']
+
+        try:
+            voo['resultado'] = funcao()
+            return voo['resultado']
+        except Exception as e:
+            voo['erro'] = e
+            raise
+        finally:
+            with self._trava:
+                del self._em_voo[chave]
+            voo['pronto'].set()
+
+    def estatisticas(self):
+        with self._trava:
+            return {'buscas': self.buscas, 'coalescidas': self.coalescidas, 'em_voo': len(self._em_voo)}
@@ -0,0 +1,531 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTTP UPSTREAM
+Uma sessão keep-alive por host para todas as chamadas externas (Binance,
+coletor, CoinMarketCap, Telegram, Upstash)
+
+requests.get/post soltos abrem TCP + TLS a cada chamada (50-150 ms de
+handshake). Aqui cada host tem uma requests.Session com pool próprio: a
+conexão fica aberta e é reutilizada pela próxima chamada ao mesmo host.
+
+Por host (CONFIG_HOSTS, casando pelo sufixo do nome):
+- pool: conexões mantidas abertas (threads simultâneas no host)
+- timeout: (conexão, leitura) padrão quando a chamada não passa um
+- tentativas: retentativas em falha de conexão/5xx/429 (só GET), dentro
+  de um orçamento: cada requisição deposita ORCAMENTO_POR_REQUISICAO e
+  cada retentativa gasta 1, para um host fora do ar não virar 3x a carga
+- peso_minuto/pesar: orçamento de peso por minuto (Binance cobra cada
+  endpoint por peso: depth com limit 1000 vale 50 klines de 1)
+
+Cada host passa por um AgendadorHost antes de sair:
+- balde de fichas do peso por minuto, corrigido pelo peso que a própria
+  Binance informa (X-MBX-USED-WEIGHT-1M, inclui outros processos no IP)
+- fila por prioridade: análise interativa na frente do lote/scanner, e o
+  lote não usa a reserva (RESERVA_INTERATIVA) do orçamento
+- disjuntor: falhas seguidas abrem o host por um tempo; nos hosts com
+  orçamento de peso (Binance) 429/418 (Retry-After) e 451 também; depois
+  uma requisição de sonda decide se fecha. Erro que um host só repassa
+  (o coletor devolvendo a Binance, CABECALHOS_REPASSE) não conta
+Sem fichas no prazo (ESPERA_MAXIMA) ou com o disjuntor aberto a chamada
+falha na hora com UpstreamIndisponivel (um requests.RequestException).
+
+Uso:
+    response = upstream_get("https://api.binance.com/api/v3/depth", params=...)
+    with prioridade_upstream(PRIORIDADE_LOTE):   # scanner / lote
+        ...
+    estatisticas_upstream()   # requisições, reuso, peso e disjuntor por host
+"""
+
+import os
+import time
+import heapq
+import itertools
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class ConfigHost:
+    """Pool, timeout padrão, retentativas e orçamento de peso de um host"""
+
+    __slots__ = ('pool', 'timeout', 'tentativas', 'peso_minuto', 'pesar')
+
+    def __init__(self, pool=10, timeout=(3.05, 10), tentativas=1, peso_minuto=None, pesar=None):
+        self.pool = pool
+        self.timeout = timeout
+        self.tentativas = tentativas
+        self.peso_minuto = peso_minuto
+        self.pesar = pesar
+
+
+# Peso dos endpoints /api/v3 da Binance (os que dependem de parâmetro em peso_binance)
+PESOS_BINANCE = {
+    'klines': 2, 'uiKlines': 2, 'time': 1, 'ping': 1, 'avgPrice': 2,
+    'exchangeInfo': 20, 'aggTrades': 4, 'trades': 25, 'historicalTrades': 25,
+}
+
+
+def peso_binance(caminho, params=None):
+    """Peso de uma chamada à API spot da Binance"""
+    params = params or {}
+    endpoint = caminho.split('/api/v3/', 1)[-1].strip('/')
+    if endpoint == 'depth':
+        try:
+            limit = int(params.get('limit') or 100)
+        except (TypeError, ValueError):
+            limit = 100
+        return 5 if limit <= 100 else 25 if limit <= 500 else 50 if limit <= 1000 else 250
+    if endpoint == 'ticker/24hr':
+        return 2 if params.get('symbol') else 80
+    if endpoint == 'ticker/price':
+        return 2 if params.get('symbol') else 4
+    return PESOS_BINANCE.get(endpoint, 1)
+
+
+# Limite da Binance é 6000/min por IP; a margem fica para outros processos
+PESO_MINUTO_BINANCE = int(os.getenv('BINANCE_PESO_MINUTO', '4800'))
+
+CONFIG_HOSTS = {
+    'api.binance.com': ConfigHost(pool=32, timeout=(3.05, 10), tentativas=2,
+                                  peso_minuto=PESO_MINUTO_BINANCE, pesar=peso_binance),
+    'pro-api.coinmarketcap.com': ConfigHost(pool=4, timeout=(3.05, 10), tentativas=1),
+    'api.telegram.org': ConfigHost(pool=8, timeout=(3.05, 10), tentativas=2),
+    'upstash.io': ConfigHost(pool=16, timeout=(2, 5), tentativas=1),
+}
+CONFIG_PADRAO = ConfigHost()
+
+ORCAMENTO_POR_REQUISICAO = 0.1   # até ~10% de retentativas em regime
+ORCAMENTO_MAXIMO = 10.0          # rajada de retentativas permitida
+STATUS_RETENTATIVA = (429, 500, 502, 503, 504)
+
+PRIORIDADE_INTERATIVA = 0   # análise pedida por um usuário
+PRIORIDADE_LOTE = 1         # scanner / análise em lote
+ESPERA_MAXIMA = {PRIORIDADE_INTERATIVA: 5.0, PRIORIDADE_LOTE: 30.0}   # segundos na fila
+RESERVA_INTERATIVA = 0.25   # fração do orçamento de peso que o lote não usa
+
+FALHAS_DISJUNTOR = 5        # falhas seguidas que abrem o host
+ESPERA_DISJUNTOR = 30.0     # segundos aberto antes da sonda
+ESPERA_BANIMENTO = 60.0     # 429/418 sem Retry-After
+ESPERA_451 = 600.0          # bloqueio por região não passa em segundos
+
+# Resposta de erro que não é falha do host: o coletor marca assim o que
+# repassa da Binance e as recusas do agendador dele
+CABECALHOS_REPASSE = ('X-SNE-Upstream-Refused', 'X-SNE-Upstream-Error')
+
+
+def config_host(host):
+    for sufixo, config in CONFIG_HOSTS.items():
+        if host == sufixo or host.endswith('.' + sufixo):
+            return config
+    return CONFIG_PADRAO
+
+
+class OrcamentoRetentativas:
+    """Fichas de retentativa de um host (seguro entre threads)"""
+
+    def __init__(self):
+        self._fichas = ORCAMENTO_MAXIMO
+        self._trava = threading.Lock()
+        self.gastas = 0
+        self.negadas = 0
+
+    def depositar(self):
+        with self._trava:
+            self._fichas = min(self._fichas + ORCAMENTO_POR_REQUISICAO, ORCAMENTO_MAXIMO)
+
+    def sacar(self):
+        with self._trava:
+            if self._fichas < 1:
+                self.negadas += 1
+                return False
+            self._fichas -= 1
+            self.gastas += 1
+            return True
+
+
+class _RetryComOrcamento(Retry):
+    """Retry do urllib3 que só retenta com ficha no orçamento do host"""
+
+    def __init__(self, *args, orcamento=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.orcamento = orcamento
+
+    def new(self, **kwargs):
+        novo = super().new(**kwargs)
+        novo.orcamento = self.orcamento
+        return novo
+
+    def increment(self, *args, **kwargs):
+        # Só gasta ficha se ainda haveria retentativa; sem ficha, esgota
+        # agora e o erro (ou a resposta 5xx) da tentativa sobe como está
+        if self.total and self.orcamento is not None and not self.orcamento.sacar():
+            return self.new(total=0).increment(*args, **kwargs)
+        return super().increment(*args, **kwargs)
+
+
+class UpstreamIndisponivel(requests.RequestException):
+    """Chamada recusada localmente: disjuntor aberto ou orçamento de peso esgotado"""
+
+
+_contexto = threading.local()
+
+
+def prioridade_atual():
+    return getattr(_contexto, 'prioridade', PRIORIDADE_INTERATIVA)
+
+
+@contextmanager
+def prioridade_upstream(prioridade):
+    """Prioridade das chamadas upstream feitas nesta thread dentro do bloco"""
+    anterior = prioridade_atual()
+    _contexto.prioridade = prioridade
+    try:
+        yield
+    finally:
+        _contexto.prioridade = anterior
+
+
+def com_prioridade(func, prioridade=None):
+    """func que roda com a prioridade atual (ou a dada) em outra thread (pools)"""
+    prioridade = prioridade_atual() if prioridade is None else prioridade
+
+    def executar(*args, **kwargs):
+        with prioridade_upstream(prioridade):
+            return func(*args, **kwargs)
+    return executar
+
+
+class BaldeFichas:
+    """Fichas de peso repostas continuamente até peso_minuto por minuto"""
+
+    def __init__(self, capacidade, relogio=time.monotonic):
+        self.capacidade = capacidade
+        self.por_segundo = capacidade / 60.0
+        self.relogio = relogio
+        self.fichas = float(capacidade)
+        self._ultimo = relogio()
+
+    def _repor(self):
+        agora = self.relogio()
+        self.fichas = min(self.capacidade, self.fichas + (agora - self._ultimo) * self.por_segundo)
+        self._ultimo = agora
+
+    def espera(self, peso, reserva=0.0):
+        """Segundos até haver peso + reserva fichas (0 = pode sair já)"""
+        self._repor()
+        falta = min(peso + reserva, self.capacidade) - self.fichas
+        return max(0.0, falta / self.por_segundo)
+
+    def gastar(self, peso):
+        self.fichas -= peso
+
+    def devolver(self, peso):
+        self.fichas = min(self.capacidade, self.fichas + peso)
+
+    def sincronizar(self, usado):
+        """Peso já usado na janela segundo a Binance: nunca acima do que sobra"""
+        self._repor()
+        self.fichas = min(self.fichas, self.capacidade - usado)
+
+
+class Disjuntor:
+    """Fechado → aberto (falhas seguidas ou bloqueio) → meio aberto (uma sonda)"""
+
+    FECHADO, ABERTO, MEIO_ABERTO = 'fechado', 'aberto', 'meio_aberto'
+
+    def __init__(self, relogio=time.monotonic):
+        self.relogio = relogio
+        self.estado = self.FECHADO
+        self.falhas = 0
+        self.aberturas = 0
+        self.ate = 0.0
+        self._sondando = False
+
+    def aberto(self):
+        if self.estado == self.ABERTO and self.relogio() >= self.ate:
+            self.estado = self.MEIO_ABERTO
+            self._sondando = False
+        return self.estado == self.ABERTO or (self.estado == self.MEIO_ABERTO and self._sondando)
+
+    def liberar(self):
+        """Reserva a passagem (no meio aberto só a sonda passa)"""
+        if self.aberto():
+            return False
+        if self.estado == self.MEIO_ABERTO:
+            self._sondando = True
+        return True
+
+    def sucesso(self):
+        self.estado = self.FECHADO
+        self.falhas = 0
+        self._sondando = False
+
+    def falha(self):
+        self.falhas += 1
+        if self.estado == self.MEIO_ABERTO or self.falhas >= FALHAS_DISJUNTOR:
+            self.abrir(ESPERA_DISJUNTOR)
+
+    def abrir(self, segundos):
+        if self.estado != self.ABERTO:
+            self.aberturas += 1
+        self.estado = self.ABERTO
+        self.ate = max(self.ate, self.relogio() + segundos)
+        self._sondando = False
+
+
+def _cabecalho_numero(headers, *nomes):
+    for nome in nomes:
+        valor = headers.get(nome)
+        if valor is not None:
+            try:
+                return float(valor)
+            except (TypeError, ValueError):
+                pass
+    return None
+
+
+class AgendadorHost:
+    """Orçamento de peso, fila por prioridade e disjuntor de um host"""
+
+    def __init__(self, host, config, relogio=time.monotonic):
+        self.host = host
+        self.relogio = relogio
+        self.balde = BaldeFichas(config.peso_minuto, relogio) if config.peso_minuto else None
+        self.disjuntor = Disjuntor(relogio)
+        self._cond = threading.Condition()
+        self._fila = []
+        self._seq = itertools.count()
+        self.peso_gasto = 0
+        self.peso_usado = None        # último X-MBX-USED-WEIGHT-1M
+        self.esperas = 0
+        self.segundos_espera = 0.0
+        self.negadas_orcamento = 0
+        self.negadas_disjuntor = 0
+        self.por_prioridade = {}
+
+    def entrar(self, peso, prioridade=PRIORIDADE_INTERATIVA):
+        """
+        Espera a vez (prioridade, depois ordem de chegada) e as fichas do peso
+
+        Raises:
+            UpstreamIndisponivel: disjuntor aberto ou sem fichas em ESPERA_MAXIMA
+        """
+        with self._cond:
+            if self.disjuntor.aberto():
+                self.negadas_disjuntor += 1
+                raise UpstreamIndisponivel(f"{self.host}: disjuntor aberto")
+            if self.balde is not None:
+                self._aguardar_fichas(peso, prioridade)
+            if not self.disjuntor.liberar():
+                if self.balde is not None:
+                    self.balde.devolver(peso)
+                self.negadas_disjuntor += 1
+                raise UpstreamIndisponivel(f"{self.host}: disjuntor aberto")
+            self.peso_gasto += peso
+            self.por_prioridade[prioridade] = self.por_prioridade.get(prioridade, 0) + 1
+
+    def _aguardar_fichas(self, peso, prioridade):
+        inicio = self.relogio()
+        limite = inicio + ESPERA_MAXIMA.get(prioridade, ESPERA_MAXIMA[PRIORIDADE_LOTE])
+        reserva = 0.0 if prioridade <= PRIORIDADE_INTERATIVA else self.balde.capacidade * RESERVA_INTERATIVA
+        item = (prioridade, next(self._seq))
+        heapq.heappush(self._fila, item)
+        esperou = False
+        try:
+            while True:
+                espera = None
+                if self._fila[0] == item:
+                    espera = self.balde.espera(peso, reserva)
+                    if espera == 0:
+                        break
+                restante = limite - self.relogio()
+                if restante <= 0 or (espera is not None and espera > restante):
+                    self.negadas_orcamento += 1
+                    raise UpstreamIndisponivel(f"{self.host}: orçamento de peso esgotado")
+                esperou = True
+                self._cond.wait(restante if espera is None else espera)
+            self.balde.gastar(peso)
+        finally:
+            self._fila.remove(item)
+            heapq.heapify(self._fila)
+            self._cond.notify_all()
+            if esperou:
+                self.esperas += 1
+                self.segundos_espera += self.relogio() - inicio
+
+    def registrar(self, resposta=None):
+        """Resultado da chamada: resposta HTTP, ou None para erro de conexão/timeout"""
+        with self._cond:
+            if resposta is None:
+                self.disjuntor.falha()
+                return
+            usado = _cabecalho_numero(resposta.headers, 'X-MBX-USED-WEIGHT-1M', 'X-MBX-USED-WEIGHT')
+            if usado is not None:
+                self.peso_usado = int(usado)
+                if self.balde is not None:
+                    self.balde.sincronizar(usado)
+            status = resposta.status_code
+            if any(resposta.headers.get(nome) for nome in CABECALHOS_REPASSE):
+                # Host respondeu (o erro é de quem está atrás dele): está de
+                # pé, e a sonda do meio aberto precisa ser liberada
+                self.disjuntor.sucesso()
+            elif self.balde is not None and status in (418, 429):
+                self.disjuntor.abrir(_cabecalho_numero(resposta.headers, 'Retry-After') or ESPERA_BANIMENTO)
+            elif self.balde is not None and status == 451:
+                self.disjuntor.abrir(ESPERA_451)
+            elif status >= 500:
+                self.disjuntor.falha()
+            else:
+                self.disjuntor.sucesso()
+            self._cond.notify_all()
+
+    def estatisticas(self):
+        with self._cond:
+            aberto = self.disjuntor.aberto()
+            return {
+                'disjuntor': self.disjuntor.estado,
+                'aberto': aberto,
+                'aberturas': self.disjuntor.aberturas,
+                'reabre_em': round(max(0.0, self.disjuntor.ate - self.relogio()), 1) if aberto else 0.0,
+                'peso_minuto': self.balde.capacidade if self.balde is not None else None,
+                'fichas': round(self.balde.fichas, 1) if self.balde is not None else None,
+                'peso_gasto': self.peso_gasto,
+                'peso_usado': self.peso_usado,
+                'fila': len(self._fila),
+                'esperas': self.esperas,
+                'segundos_espera': round(self.segundos_espera, 3),
+                'negadas_orcamento': self.negadas_orcamento,
+                'negadas_disjuntor': self.negadas_disjuntor,
+                'por_prioridade': {('lote' if p else 'interativa'): n for p, n in self.por_prioridade.items()},
+            }
+
+
+class ClienteHost:
+    """Sessão keep-alive de um host (host:porta) + contadores"""
+
+    def __init__(self, host, config):
+        self.host = host
+        self.config = config
+        self.orcamento = OrcamentoRetentativas()
+        self.agendador = AgendadorHost(host, config)
+        self.requisicoes = 0
+        self.erros = 0
+
+        # Host com orçamento de peso: 429 é aviso de banimento, não se retenta
+        status = STATUS_RETENTATIVA if config.peso_minuto is None else tuple(
+            s for s in STATUS_RETENTATIVA if s != 429)
+        retry = _RetryComOrcamento(
+            total=config.tentativas,
+            backoff_factor=0.2,
+            status_forcelist=status,
+            allowed_methods=frozenset({'GET', 'HEAD'}),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+            orcamento=self.orcamento,
+        )
+        self.adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=config.pool, max_retries=retry)
+        self.sessao = requests.Session()
+        self.sessao.mount('https://', self.adaptador)
+        self.sessao.mount('http://', self.adaptador)
+
+    def request(self, metodo, url, **kwargs):
+        kwargs.setdefault('timeout', self.config.timeout)
+        peso = self.config.pesar(urlsplit(url).path, kwargs.get('params')) if self.config.pesar else 1
+        self.agendador.entrar(peso, prioridade_atual())
+        self.requisicoes += 1
+        self.orcamento.depositar()
+        try:
+            resposta = self.sessao.request(metodo, url, **kwargs)
+        except requests.RequestException:
+            self.erros += 1
+            self.agendador.registrar(None)
+            raise
+        self.agendador.registrar(resposta)
+        return resposta
+
+    def estatisticas(self):
+        conexoes = requisicoes_pool = 0
+        pools = self.adaptador.poolmanager.pools
+        for chave in list(pools.keys()):
+            pool = pools.get(chave)
+            if pool is not None:
+                conexoes += pool.num_connections
+                requisicoes_pool += pool.num_requests
+        return {
+            'requisicoes': self.requisicoes,
+            'erros': self.erros,
+            'conexoes_novas': conexoes,
+            'reuso': round(1 - conexoes / requisicoes_pool, 3) if requisicoes_pool else 0.0,
+            'retentativas': self.orcamento.gastas,
+            'retentativas_negadas': self.orcamento.negadas,
+            'pool': self.config.pool,
+            'agendador': self.agendador.estatisticas(),
+        }
+
+
+_clientes = {}
+_trava_clientes = threading.Lock()
+
+
+def cliente_host(url):
+    """ClienteHost do host:porta da url (criado na primeira chamada)"""
+    partes = urlsplit(url)
+    cliente = _clientes.get(partes.netloc)
+    if cliente is None:
+        with _trava_clientes:
+            cliente = _clientes.get(partes.netloc)
+            if cliente is None:
+                config = config_host(partes.hostname or '')
+                cliente = _clientes[partes.netloc] = ClienteHost(partes.netloc, config)
+    return cliente
+
+
+def upstream_request(metodo, url, **kwargs):
+    """requests.request pela sessão do host da url (timeout padrão do host)"""
+    return cliente_host(url).request(metodo, url, **kwargs)
+
+
+def upstream_get(url, **kwargs):
+    return upstream_request('GET', url, **kwargs)
+
+
+def upstream_post(url, **kwargs):
+    return upstream_request('POST', url, **kwargs)
+
+
+def estatisticas_upstream():
+    """Contadores por host"""
+    with _trava_clientes:
+        clientes = list(_clientes.values())
+    return {cliente.host: cliente.estatisticas() for cliente in clientes}
+
+
+def resumo_upstream(sufixo):
+    """
+    Hosts que terminam em sufixo (ex.: 'binance.com') somados, no formato
+    de /api/v1/system/status: disjuntor aberto, peso usado e chamadas
+    """
+    with _trava_clientes:
+        clientes = [c for c in _clientes.values()
+                    if c.host.split(':')[0] == sufixo or c.host.split(':')[0].endswith('.' + sufixo)]
+    resumo = {'aberto': False, 'peso_usado': 0, 'requisicoes': 0}
+    for cliente in clientes:
+        agendador = cliente.agendador.estatisticas()
+        resumo['aberto'] = resumo['aberto'] or agendador['aberto']
+        resumo['peso_usado'] += agendador['peso_usado'] or 0
+        resumo['requisicoes'] += cliente.requisicoes
+    return resumo
+
+
+def fechar_sessoes():
+    """Fecha todas as sessões (ex.: depois de um fork)"""
+    with _trava_clientes:
+        clientes = list(_clientes.values())
+        _clientes.clear()
+    for cliente in clientes:
+        cliente.sessao.close()
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+Ingestão de klines por stream (worker opcional do coletor)
+
+Assina <symbol>@kline_<interval> da Binance para os símbolos/intervalos
+configurados e mantém, por par, o candle em formação e os últimos N
+fechados:
+- no Redis, para qualquer worker web responder /binance/klines sem REST
+  (aberto: chave com PX curto, renovada a cada evento; fechados: lista
+  com RPUSH + LTRIM)
+- no armazém local de candles (fechados, append)
+
+- Semeadura: na primeira mensagem de cada par após (re)conectar, a janela
+  vem do armazém (que busca no REST só o que falta)
+- Lacuna: candle novo que não emenda no último fechado (evento de
+  fechamento perdido) ressemeia o par
+- Heartbeat: ping/pong do WebSocket + silêncio máximo; stream mudo por
+  SILENCIO_MAXIMO reconecta, e o aberto expira no Redis (leitores voltam
+  ao REST)
+
+Uso (processo separado):
+    REDIS_URL=redis://... COLLECTOR_INGEST_SYMBOLS=BTCUSDT,ETHUSDT python ingestao_klines.py
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+
+from armazem_candles import INTERVALOS_MS, armazem_candles, registros_de_klines
+from klines import buscar_klines_binance, decodificar_klines
+
+try:
+    from websockets.sync.client import connect as _ws_connect
+    WEBSOCKETS_DISPONIVEL = True
+except ImportError:
+    _ws_connect = None
+    WEBSOCKETS_DISPONIVEL = False
+
+STREAM_URL = "wss://stream.binance.com:9443/stream"
+
+SIMBOLOS_INGESTAO = [s.strip().upper() for s in os.getenv('COLLECTOR_INGEST_SYMBOLS', '').split(',') if s.strip()]
+INTERVALOS_INGESTAO = [i.strip() for i in os.getenv('COLLECTOR_INGEST_INTERVALS', '1m,5m,15m,1h,4h,1d').split(',')
+                       if i.strip() in INTERVALOS_MS]
+FECHADOS_INGESTAO = int(os.getenv('COLLECTOR_INGEST_FECHADOS', 500))
+
+SILENCIO_MAXIMO = 30            # segundos sem mensagem: reconecta
+TTL_ABERTO_MS = SILENCIO_MAXIMO * 1000
+ESPERA_RECONEXAO = (1, 2, 5, 10, 30)
+
+
+def chave_aberto(symbol, interval):
+    return f"ingest:klines:{symbol}:{interval}:aberto"
+
+
+def chave_fechados(symbol, interval):
+    return f"ingest:klines:{symbol}:{interval}:fechados"
+
+
+def linha_de_evento(k):
+    """Payload 'k' do evento de kline → linha no formato de /api/v3/klines"""
+    return [k['t'], k['o'], k['h'], k['l'], k['c'], k['v'], k['T'], k['q'], k['n'], k['V'], k['Q'], "0"]
+
+
+class JanelaKlines:
+    """Candle em formação + últimos fechados de um par (symbol, interval)"""
+
+    def __init__(self, symbol, interval, fechados=FECHADOS_INGESTAO):
+        self.symbol = symbol
+        self.interval = interval
+        self.passo = INTERVALOS_MS[interval]
+        self.fechados = deque(maxlen=fechados)
+        self.aberto = None
+        self.semeada = False
+        self.ultimo_evento = 0.0
+        self._trava = threading.Lock()
+
+    def semear(self, linhas, agora_ms):
+        with self._trava:
+            self.fechados.clear()
+            self.aberto = None
+            for linha in linhas:
+                if int(linha[6]) < agora_ms:
+                    self.fechados.append(linha)
+                else:
+                    self.aberto = linha
+            self.semeada = True
+
+    def aplicar(self, k):
+        """
+        Atualiza com o payload do evento
+
+        Returns:
+            'fechou', 'aberto', 'lacuna' (não emenda: ressemear) ou
+            'velho' (candle anterior ao último fechado, ignorado)
+        """
+        linha = linha_de_evento(k)
+        with self._trava:
+            self.ultimo_evento = time.monotonic()
+            ultimo = self.fechados[-1][0] if self.fechados else None
+            if ultimo is not None and linha[0] <= ultimo:
+                return 'velho'
+            if ultimo is not None and linha[0] > ultimo + self.passo:
+                return 'lacuna'
+            if k['x']:
+                self.fechados.append(linha)
+                self.aberto = None
+                return 'fechou'
+            self.aberto = linha
+            return 'aberto'
+
+    def linhas(self, limit, agora_ms=None):
+        """Últimos `limit` candles (o último em formação), ou None se incompleto"""
+        agora_ms = int(time.time() * 1000) if agora_ms is None else agora_ms
+        with self._trava:
+            if not self.semeada or self.aberto is None or len(self.fechados) < limit - 1:
+                return None
+            if time.monotonic() - self.ultimo_evento > SILENCIO_MAXIMO or self.aberto[6] < agora_ms:
+                return None
+            fechados = list(self.fechados)[len(self.fechados) - (limit - 1):] if limit > 1 else []
+            return fechados + [self.aberto]
+
+
+class IngestorKlines:
+    """
+    Mantém JanelaKlines de vários pares a partir de um stream combinado
+
+    Args:
+        fonte: callable(ingestor) -> iterável de eventos de kline; por padrão
+               o stream combinado da Binance (requer websockets)
+        buscar: buscar(symbol, interval, limit, inicio) -> Klines (REST),
+                usado na semeadura via armazém
+        redis: cliente Redis (ou None: só memória + armazém)
+        relogio: callable() -> agora em ms (testes)
+    """
+
+    def __init__(self, simbolos, intervalos, fonte=None, buscar=None, redis=None,
+                 armazem=None, fechados=FECHADOS_INGESTAO, relogio=None):
+        self.janelas = {(s.upper(), i): JanelaKlines(s.upper(), i, fechados)
+                        for s in simbolos for i in intervalos}
+        self.fonte = fonte or stream_klines_binance
+        self.buscar = buscar or buscar_klines_binance
+        self.redis = redis
+        self.armazem = armazem or armazem_candles
+        self.fechados = fechados
+        self.relogio = relogio or (lambda: int(time.time() * 1000))
+
+        self._parar = threading.Event()
+        self._thread = None
+        self.conexao = None      # conexão ativa da fonte (fechada em parar())
+
+        # Contadores
+        self.eventos = 0
+        self.fechamentos = 0
+        self.lacunas = 0
+        self.semeaduras = 0
+        self.reconexoes = 0
+        self.erros_redis = 0
+
+    def streams(self):
+        return [f"{s.lower()}@kline_{i}" for s, i in self.janelas]
+
+    def processar(self, evento):
+        """Entrega um evento do stream ao par correspondente"""
+        k = evento.get('k')
+        if not k:
+            return None
+        janela = self.janelas.get((evento.get('s', k.get('s', '')).upper(), k.get('i')))
+        if janela is None:
+            return None
+        self.eventos += 1
+
+        if not janela.semeada:
+            self.semear(janela)
+        resultado = janela.aplicar(k)
+        if resultado == 'lacuna':
+            self.lacunas += 1
+            print(f"   ⚠️ Ingestão {janela.symbol} {janela.interval}: lacuna antes de {k['t']}; ressemeando")
+            self.semear(janela)
+            resultado = janela.aplicar(k)
+
+        if resultado == 'fechou':
+            self.fechamentos += 1
+            self._gravar_fechado(janela, linha_de_evento(k))
+        elif resultado == 'aberto':
+            self._publicar_aberto(janela)
+        return resultado
+
+    def semear(self, janela):
+        """Janela do armazém (REST só para o que falta) → memória + Redis"""
+        agora_ms = self.relogio()
+        klines = self.armazem.obter(janela.symbol, janela.interval, self.fechados + 1, self.buscar,
+                                    agora_ms=agora_ms)
+        if klines is None:
+            raise RuntimeError(f"semeadura de {janela.symbol} {janela.interval} falhou")
+        janela.semear(klines.para_linhas(), agora_ms)
+        self.semeaduras += 1
+        if self.redis is None:
+            return
+        try:
+            pipe = self.redis.pipeline()
+            pipe.delete(chave_fechados(janela.symbol, janela.interval))
+            if janela.fechados:
+                pipe.rpush(chave_fechados(janela.symbol, janela.interval),
+                           *[json.dumps(linha) for linha in janela.fechados])
+            if janela.aberto is not None:
+                pipe.psetex(chave_aberto(janela.symbol, janela.interval), TTL_ABERTO_MS,
+                            json.dumps(janela.aberto))
+            pipe.execute()
+        except Exception:
+            self.erros_redis += 1
+
+    def _gravar_fechado(self, janela, linha):
+        self.armazem.gravar(janela.symbol, janela.interval, registros_de_klines(decodificar_klines([linha])))
+        if self.redis is None:
+            return
+        try:
+            pipe = self.redis.pipeline()
+            pipe.rpush(chave_fechados(janela.symbol, janela.interval), json.dumps(linha))
+            pipe.ltrim(chave_fechados(janela.symbol, janela.interval), -self.fechados, -1)
+            pipe.delete(chave_aberto(janela.symbol, janela.interval))
+            pipe.execute()
+        except Exception:
+            self.erros_redis += 1
+
+    def _publicar_aberto(self, janela):
+        if self.redis is None:
+            return
+        try:
+            self.redis.psetex(chave_aberto(janela.symbol, janela.interval), TTL_ABERTO_MS,
+                              json.dumps(janela.aberto))
+        except Exception:
+            self.erros_redis += 1
+
+    def reiniciar(self):
+        """Stream caiu: eventos perdidos, cada par ressemeia na próxima mensagem"""
+        for janela in self.janelas.values():
+            janela.semeada = False
+
+    def executar(self):
+        """Loop do stream com reconexão (bloqueante; ver iniciar())"""
+        tentativa = 0
+        while not self._parar.is_set():
+            try:
+                for evento in self.fonte(self):
+                    if self._parar.is_set():
+                        break
+                    self.processar(evento)
+                    tentativa = 0
+            except Exception as e:
+                if not self._parar.is_set():
+                    print(f"   ⚠️ Ingestão: stream interrompido: {e}")
+            self.reiniciar()
+            if self._parar.is_set():
+                break
+            self.reconexoes += 1
+            self._parar.wait(ESPERA_RECONEXAO[min(tentativa, len(ESPERA_RECONEXAO) - 1)])
+            tentativa += 1
+
+    def iniciar(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._parar.clear()
+            self._thread = threading.Thread(target=self.executar, daemon=True, name='ingestao-klines')
+            self._thread.start()
+        return self
+
+    def parar(self, timeout=5):
+        self._parar.set()
+        conexao = self.conexao
+        if conexao is not None:
+            try:
+                conexao.close()
+            except Exception:
+                pass
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def linhas(self, symbol, interval, limit):
+        janela = self.janelas.get((symbol.upper(), interval))
+        return janela.linhas(limit, self.relogio()) if janela is not None else None
+
+    def estatisticas(self):
+        return {
+            'pares': len(self.janelas),
+            'semeados': sum(j.semeada for j in self.janelas.values()),
+            'eventos': self.eventos,
+            'fechamentos': self.fechamentos,
+            'lacunas': self.lacunas,
+            'semeaduras': self.semeaduras,
+            'reconexoes': self.reconexoes,
+            'erros_redis': self.erros_redis,
+        }
+
+
+def stream_klines_binance(ingestor, url=None):
+    """Eventos de kline do stream combinado da Binance"""
+    if not WEBSOCKETS_DISPONIVEL:
+        raise RuntimeError("websockets não instalado")
+    url = url or f"{STREAM_URL}?streams={'/'.join(ingestor.streams())}"
+    with _ws_connect(url, open_timeout=10, ping_interval=20, ping_timeout=20) as conexao:
+        ingestor.conexao = conexao
+        try:
+            while True:
+                # Silêncio além do limite levanta TimeoutError: reconecta
+                evento = json.loads(conexao.recv(timeout=SILENCIO_MAXIMO))
+                # Stream combinado embrulha em {'stream': ..., 'data': ...}
+                yield evento.get('data', evento)
+        finally:
+            ingestor.conexao = None
+
+
+def ler_klines_redis(redis_client, symbol, interval, limit, agora_ms=None):
+    """
+    Janela publicada pelo worker de ingestão
+
+    Returns:
+        Linhas no formato de /api/v3/klines (o último é o candle em
+        formação), ou None se o par não é ingerido, o stream está mudo ou
+        a janela não cobre `limit` contínuos
+    """
+    passo = INTERVALOS_MS.get(interval)
+    if redis_client is None or passo is None or limit < 1:
+        return None
+    pipe = redis_client.pipeline()
+    pipe.get(chave_aberto(symbol, interval))
+    pipe.lrange(chave_fechados(symbol, interval), -max(limit - 1, 1), -1)
+    aberto, fechados = pipe.execute()
+    if not aberto:
+        return None
+    aberto = json.loads(aberto)
+    agora_ms = int(time.time() * 1000) if agora_ms is None else agora_ms
+    if aberto[6] < agora_ms:
+        return None   # já fechou e o evento de fechamento não chegou
+    fechados = [json.loads(f) for f in fechados][len(fechados) - (limit - 1):] if limit > 1 else []
+    if len(fechados) < limit - 1:
+        return None
+    # Contínuos até o aberto (uma lacuna ainda não ressemeada não serve)
+    esperado = aberto[0] - len(fechados) * passo
+    if any(linha[0] != esperado + i * passo for i, linha in enumerate(fechados)):
+        return None
+    return fechados + [aberto]
+
+
+def main():
+    import redis as redis_lib
+
+    if not SIMBOLOS_INGESTAO:
+        print("❌ COLLECTOR_INGEST_SYMBOLS vazio: nada para ingerir")
+        return
+    # Só redis:// ou rediss://: UPSTASH_REDIS_REST_URL é o endpoint HTTPS do
+    # REST e não serve para o redis-py
+    redis_url = os.environ.get('REDIS_URL')
+    if not redis_url:
+        print("❌ REDIS_URL não configurado: a ingestão grava no Redis (redis:// ou rediss://); "
+              "UPSTASH_REDIS_REST_URL não serve, use a URL TCP do Upstash")
+        return
+    redis_client = redis_lib.from_url(redis_url)
+    ingestor = IngestorKlines(SIMBOLOS_INGESTAO, INTERVALOS_INGESTAO, redis=redis_client)
+    print(f"🚀 Ingestão de klines: {len(ingestor.janelas)} streams ({', '.join(SIMBOLOS_INGESTAO)})")
+    ingestor.executar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+KLINES
+Decodificador único da resposta de /api/v3/klines (Binance ou coletor)
+
+Cada linha da Binance tem 12 campos, com preços e volumes em string:
+    [abertura, open, high, low, close, volume, fechamento, quote_volume,
+     trades, taker_buy_base, taker_buy_quote, ignore]
+
+O payload (bytes, str, lista de listas ou o envelope {'data': [...]} do
+coletor) vira direto arrays tipados por coluna: as linhas são transpostas
+com zip(*linhas) e cada coluna convertida uma vez pelo NumPy, sem o
+DataFrame de strings (dtype object) + astype que cada busca montava.
+
+Entre coletor e sne-web há também um formato binário colunar, negociado
+por Accept (MIME_KLINES_BINARIO; JSON continua o padrão): cabeçalho fixo +
+as 11 colunas int64/float64 little-endian, com os bytes embaralhados por
+posição (byte 0 de todos os valores, depois byte 1, ...) e zlib. O
+decodificador volta direto para arrays com np.frombuffer, sem texto.
+
+Uso:
+    klines = decodificar_klines(response.content)  # JSON ou binário
+    klines.close, klines.trades, klines.taker_buy_base
+    Candles.de_klines(klines)                      # contêiner do motor
+    klines.para_dataframe(['close', 'volume'])     # borda pandas
+    codificar_klines_binario(klines)               # corpo binário (coletor)
+"""
+
+import json
+import struct
+import zlib
+
+import numpy as np
+
+from http_upstream import upstream_get
+from rastreamento import registrar_transferencia
+
+try:
+    import orjson
+    ORJSON_DISPONIVEL = True
+except ImportError:
+    orjson = None
+    ORJSON_DISPONIVEL = False
+
+# (coluna, dtype) na ordem da resposta; 'ignore' é descartado
+COLUNAS_KLINES = (
+    ('timestamp', np.int64),
+    ('open', np.float64),
+    ('high', np.float64),
+    ('low', np.float64),
+    ('close', np.float64),
+    ('volume', np.float64),
+    ('close_time', np.int64),
+    ('quote_volume', np.float64),
+    ('trades', np.int64),
+    ('taker_buy_base', np.float64),
+    ('taker_buy_quote', np.float64),
+)
+NOMES_KLINES = tuple(nome for nome, _ in COLUNAS_KLINES)
+# Colunas de horário (ms desde epoch) convertidas para datetime64 no DataFrame
+_COLUNAS_TEMPO = ('timestamp', 'close_time')
+
+# Formato binário: mágico, versão, flags, quantidade de candles
+MIME_KLINES_BINARIO = 'application/vnd.sne.klines'
+_MAGICO = b'SNEK'
+_VERSAO_BINARIO = 1
+_CABECALHO = struct.Struct('<4sBB2xI')
+_COMPRIMIDO = 0x01
+_EMBARALHADO = 0x02
+_DTYPES_BINARIO = tuple(np.dtype(dtype).newbyteorder('<') for _, dtype in COLUNAS_KLINES)
+
+
+class Klines:
+    """Colunas tipadas de uma resposta de klines (um array por campo)"""
+
+    __slots__ = NOMES_KLINES
+
+    def __init__(self, **colunas):
+        for nome in NOMES_KLINES:
+            setattr(self, nome, colunas[nome])
+
+    def __len__(self):
+        return len(self.timestamp)
+
+    def __getitem__(self, coluna):
+        return getattr(self, coluna)
+
+    def para_dataframe(self, colunas=None, tempo_como_datetime=True):
+        """
+        DataFrame já tipado com as colunas pedidas (todas por padrão)
+
+        Args:
+            colunas: Nomes de NOMES_KLINES
+            tempo_como_datetime: timestamp/close_time em datetime64[ms]
+        """
+        import pandas as pd   # só nesta borda: o coletor usa o módulo sem pandas
+
+        dados = {}
+        for nome in colunas or NOMES_KLINES:
+            valores = getattr(self, nome)
+            if tempo_como_datetime and nome in _COLUNAS_TEMPO:
+                valores = valores.astype('datetime64[ms]')
+            dados[nome] = valores
+        return pd.DataFrame(dados)
+
+    def para_linhas(self):
+        """Linhas no formato da Binance (preços/volumes em string, 'ignore' = "0")"""
+        colunas = [getattr(self, nome).tolist() for nome in NOMES_KLINES]
+        for i, (_, dtype) in enumerate(COLUNAS_KLINES):
+            if dtype is np.float64:
+                colunas[i] = [repr(v) for v in colunas[i]]
+        return [list(linha) + ["0"] for linha in zip(*colunas)]
+
+
+def carregar_json(payload):
+    """bytes/str → objeto Python (orjson quando disponível)"""
+    if isinstance(payload, memoryview):
+        payload = payload.tobytes()
+    if ORJSON_DISPONIVEL:
+        return orjson.loads(payload)
+    return json.loads(payload)
+
+
+def codificar_klines_binario(klines, nivel=1):
+    """
+    Klines → corpo binário colunar (MIME_KLINES_BINARIO)
+
+    Args:
+        nivel: nível do zlib (0 = sem compressão)
+    """
+    n = len(klines)
+    colunas = b''.join(np.ascontiguousarray(klines[nome], dtype=dtype).tobytes()
+                       for nome, dtype in zip(NOMES_KLINES, _DTYPES_BINARIO))
+    flags = 0
+    if nivel:
+        # Bytes da mesma posição juntos: expoentes e bytes altos repetem muito
+        colunas = zlib.compress(np.frombuffer(colunas, np.uint8).reshape(-1, 8).T.tobytes(), nivel)
+        flags = _COMPRIMIDO | _EMBARALHADO
+    return _CABECALHO.pack(_MAGICO, _VERSAO_BINARIO, flags, n) + colunas
+
+
+def decodificar_klines_binario(payload):
+    """
+    Corpo binário colunar → Klines (arrays sobre o buffer, sem cópia extra)
+
+    Raises:
+        ValueError: mágico, versão ou tamanho inválidos
+    """
+    payload = memoryview(payload)
+    if len(payload) < _CABECALHO.size:
+        raise ValueError("Klines binário truncado")
+    magico, versao, flags, n = _CABECALHO.unpack_from(payload)
+    if magico != _MAGICO or versao != _VERSAO_BINARIO:
+        raise ValueError(f"Klines binário desconhecido ({magico!r}, versão {versao})")
+
+    corpo = payload[_CABECALHO.size:]
+    if flags & _COMPRIMIDO:
+        corpo = zlib.decompress(corpo)
+    if len(corpo) != n * 8 * len(NOMES_KLINES):
+        raise ValueError(f"Klines binário com {len(corpo)} bytes para {n} candles")
+    if flags & _EMBARALHADO:
+        corpo = np.frombuffer(corpo, np.uint8).reshape(8, -1).T.tobytes()
+
+    valores = {}
+    for i, (nome, dtype) in enumerate(zip(NOMES_KLINES, _DTYPES_BINARIO)):
+        valores[nome] = np.frombuffer(corpo, dtype=dtype, count=n, offset=i * n * 8)
+    return Klines(**valores)
+
+
+def decodificar_klines(payload):
+    """
+    Resposta de klines → Klines
+
+    Args:
+        payload: bytes/str do corpo (JSON ou binário), lista de linhas ou
+                 {'data': linhas}
+
+    Raises:
+        ValueError: payload que não é uma lista de klines
+    """
+    if isinstance(payload, Klines):
+        return payload
+    if isinstance(payload, (bytes, bytearray, memoryview)) and bytes(payload[:4]) == _MAGICO:
+        return decodificar_klines_binario(payload)
+    if isinstance(payload, (bytes, bytearray, memoryview, str)):
+        payload = carregar_json(payload)
+    if isinstance(payload, dict):
+        if 'error' in payload:
+            raise ValueError(f"Resposta de erro em vez de klines: {payload['error']}")
+        payload = payload.get('data') or []
+    if not isinstance(payload, (list, tuple)):
+        raise ValueError(f"Klines inesperados: {type(payload).__name__}")
+
+    n = len(payload)
+    colunas = list(zip(*payload)) if n else []
+    if n and len(colunas) < 6:
+        raise ValueError(f"Klines com {len(colunas)} campos (mínimo 6)")
+
+    valores = {}
+    for i, (nome, dtype) in enumerate(COLUNAS_KLINES):
+        if i < len(colunas):
+            valores[nome] = np.array(colunas[i], dtype=dtype)
+        else:
+            # Linhas reduzidas (só OHLCV): campos extras zerados
+            valores[nome] = np.zeros(n, dtype=dtype)
+    return Klines(**valores)
+
+
+def buscar_klines_binance(symbol, interval, limit, inicio=None, timeout=10):
+    """
+    GET /api/v3/klines decodificado
+
+    Args:
+        inicio: startTime em ms (None = últimos `limit` candles)
+
+    Raises:
+        requests.HTTPError: resposta diferente de 2xx
+    """
+    params = {"symbol": symbol, "interval": interval, "limit": limit}
+    if inicio is not None:
+        params["startTime"] = int(inicio)
+    response = upstream_get("https://api.binance.com/api/v3/klines", params=params, timeout=timeout)
+    registrar_transferencia(len(response.content), cache=False)
+    response.raise_for_status()
+    return decodificar_klines(response.content)
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTTP UPSTREAM (sne-telegram)
+Uma sessão keep-alive por host para as chamadas do webhook (api.telegram.org)
+
+Versão enxuta do http_upstream do motor: só o pool de conexões e os
+contadores. Sem orçamento de peso nem disjuntor, que aqui não têm uso
+(um único host, só POST, sem retentativa).
+
+Uso:
+    response = upstream_post("https://api.telegram.org/bot.../sendMessage", json=...)
+    estatisticas_upstream()   # requisições, conexões novas, reuso por host
+"""
+
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+POOL_CONEXOES = 8
+TIMEOUT_PADRAO = (3.05, 10)
+
+
+class ClienteHost:
+    """Sessão keep-alive de um host (host:porta) + contadores"""
+
+    def __init__(self, host):
+        self.host = host
+        self.requisicoes = 0
+        self.erros = 0
+        self.adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_CONEXOES)
+        self.sessao = requests.Session()
+        self.sessao.mount('https://', self.adaptador)
+        self.sessao.mount('http://', self.adaptador)
+
+    def request(self, metodo, url, **kwargs):
+        kwargs.setdefault('timeout', TIMEOUT_PADRAO)
+        self.requisicoes += 1
+        try:
+            return self.sessao.request(metodo, url, **kwargs)
+        except requests.RequestException:
+            self.erros += 1
+            raise
+
+    def estatisticas(self):
+        conexoes = requisicoes_pool = 0
+        pools = self.adaptador.poolmanager.pools
+        for chave in list(pools.keys()):
+            pool = pools.get(chave)
+            if pool is not None:
+                conexoes += pool.num_connections
+                requisicoes_pool += pool.num_requests
+        return {
+            'requisicoes': self.requisicoes,
+            'erros': self.erros,
+            'conexoes_novas': conexoes,
+            'reuso': round(1 - conexoes / requisicoes_pool, 3) if requisicoes_pool else 0.0,
+            'pool': POOL_CONEXOES,
+        }
+
+
+_clientes = {}
+_trava_clientes = threading.Lock()
+
+
+def cliente_host(url):
+    """ClienteHost do host:porta da url (criado na primeira chamada)"""
+    netloc = urlsplit(url).netloc
+    cliente = _clientes.get(netloc)
+    if cliente is None:
+        with _trava_clientes:
+            cliente = _clientes.get(netloc)
+            if cliente is None:
+                cliente = _clientes[netloc] = ClienteHost(netloc)
+    return cliente
+
+
+def upstream_request(metodo, url, **kwargs):
+    """requests.request pela sessão do host da url"""
+    return cliente_host(url).request(metodo, url, **kwargs)
+
+
+def upstream_get(url, **kwargs):
+    return upstream_request('GET', url, **kwargs)
+
+
+def upstream_post(url, **kwargs):
+    return upstream_request('POST', url, **kwargs)
+
+
+def estatisticas_upstream():
+    """Contadores por host"""
+    with _trava_clientes:
+        clientes = list(_clientes.values())
+    return {cliente.host: cliente.estatisticas() for cliente in clientes}
@@ -5,7 +5,7 @@ from flask import request, jsonify
 from . import app
 import logging
 import os
-import requests
+from .http_upstream import upstream_post
 import html
 from functools import wraps
 import time
@@ -62,7 +62,7 @@ def send_telegram_message(text: str, chat_id: str = None, retry_count: int = 3)
     
     for attempt in range(retry_count):
         try:
-            response = requests.post(url, json=payload, timeout=10)
+            response = upstream_post(url, json=payload, timeout=10)
             response.raise_for_status()
             logger.info(f"Message sent successfully to {chat_id}")
             return True
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ANÁLISE EM LOTE
+Executa analise_completa para vários (symbol, timeframe) de uma vez:
+- cada requisição à Binance é feita uma única vez no lote inteiro
+- MTF e order book são compartilhados entre timeframes do mesmo símbolo
+- os estágios de CPU rodam num pool de processos
+- os resultados são entregues conforme cada par termina
+- as requisições saem com prioridade de lote (atrás das análises interativas
+  no orçamento de peso da Binance, ver http_upstream)
+"""
+
+import os
+import logging
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from dados_mercado import DadosMercado, _cronometrar, MAX_WORKERS_PREFETCH
+from multi_timeframe import buscar_dados_tf, TIMEFRAMES_MTF
+from fluxo_ativo import FluxoAtivo
+from http_upstream import PRIORIDADE_LOTE, com_prioridade, fechar_sessoes
+
+logger = logging.getLogger(__name__)
+
+# Processos para os estágios de CPU (0 = usar threads)
+MAX_WORKERS_LOTE = int(os.getenv('MOTOR_LOTE_WORKERS', os.cpu_count() or 2))
+
+
+def _planejar_requisicoes(pares, timeframes_mtf, limit, limit_mtf, depth_limit):
+    """
+    Monta o conjunto de requisições únicas do lote
+
+    Returns:
+        (tarefas, dependencias): tarefas é {chave: (func, *args)} e
+        dependencias é {(symbol, timeframe): [chaves]}
+    """
+    from motor_renan import coletar_dados
+
+    tarefas = {}
+    dependencias = {}
+    for symbol, timeframe in pares:
+        chaves = []
+
+        chave = ('dados', symbol, timeframe, limit)
+        tarefas.setdefault(chave, (coletar_dados, symbol, timeframe, limit))
+        chaves.append(chave)
+
+        chave = ('depth', symbol, depth_limit)
+        tarefas.setdefault(chave, (FluxoAtivo().obter_depth, symbol, depth_limit))
+        chaves.append(chave)
+
+        for tf in timeframes_mtf:
+            chave = ('mtf', symbol, tf, limit_mtf)
+            tarefas.setdefault(chave, (buscar_dados_tf, symbol, tf, limit_mtf))
+            chaves.append(chave)
+
+        dependencias[(symbol, timeframe)] = chaves
+    return tarefas, dependencias
+
+
+def _montar_mercado(symbol, timeframe, chaves, resultados, tempos, transferencias=None):
+    """Monta o DadosMercado de um par a partir das requisições do lote"""
+    mercado = DadosMercado(symbol, timeframe)
+    transferencias = transferencias or {}
+    for chave in chaves:
+        tipo = chave[0]
+        if tipo == 'dados':
+            mercado.dados = resultados[chave]
+            nome = 'dados'
+        elif tipo == 'depth':
+            mercado.depth = resultados[chave]
+            nome = 'depth'
+        else:
+            tf = chave[2]
+            mercado.dados_mtf[tf] = resultados[chave]
+            nome = f'mtf:{tf}'
+        mercado.tempos[nome] = tempos[chave]
+        if chave in transferencias:
+            mercado.transferencias[nome] = transferencias[chave]
+    mercado.tempo_total = max(mercado.tempos.values()) if mercado.tempos else 0.0
+    return mercado
+
+
+def _analisar_par(symbol, timeframe, mercado):
+    """Executado no worker: roda os estágios com os dados já carregados"""
+    from motor_renan import analise_completa
+    return analise_completa(symbol, timeframe, mercado=mercado)
+
+
+def _contexto_processos():
+    """forkserver (ou spawn): fork depois das threads de I/O herdaria travas
+    e sessões HTTP no meio de uma requisição"""
+    metodo = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return multiprocessing.get_context(metodo)
+
+
+def _criar_pool_cpu(max_workers, processos):
+    """Pool de processos; cai para threads se o ambiente não permitir forkserver/spawn"""
+    if processos and max_workers > 0:
+        try:
+            return ProcessPoolExecutor(max_workers=max_workers, mp_context=_contexto_processos(),
+                                       initializer=fechar_sessoes)
+        except (OSError, NotImplementedError, ImportError) as e:
+            logger.warning(f"Pool de processos indisponível ({e}), usando threads")
+    return ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix='motor-lote')
+
+
+def analise_completa_lote(symbols, timeframes, timeframes_mtf=TIMEFRAMES_MTF,
+                          limit=200, limit_mtf=100, depth_limit=1000,
+                          max_workers=None, processos=True):
+    """
+    Análise completa para todos os pares symbols × timeframes
+
+    Gerador: cada par é entregue assim que termina, sem esperar o lote.
+    Um par é enviado ao pool de CPU assim que as requisições de que
+    depende ficam prontas.
+
+    Args:
+        symbols: Lista de pares (ex: ['BTCUSDT', 'ETHUSDT'])
+        timeframes: Lista de timeframes principais (ex: ['15m', '1h'])
+        max_workers: Processos para os estágios (default MOTOR_LOTE_WORKERS)
+        processos: False executa os estágios em threads
+
+    Yields:
+        (symbol, timeframe, resultado) com o mesmo formato de analise_completa
+    """
+    pares = list(dict.fromkeys((s.upper(), tf) for s in symbols for tf in timeframes))
+    if not pares:
+        return
+
+    tarefas, dependencias = _planejar_requisicoes(pares, timeframes_mtf, limit, limit_mtf, depth_limit)
+    logger.info(f"Análise em lote: {len(pares)} pares, {len(tarefas)} requisições únicas")
+
+    resultados = {}
+    tempos = {}
+    transferencias = {}
+    aguardando = dict(dependencias)
+
+    workers_io = max(1, min(MAX_WORKERS_PREFETCH * 2, len(tarefas)))
+    workers_cpu = MAX_WORKERS_LOTE if max_workers is None else max_workers
+    pool_cpu = _criar_pool_cpu(min(workers_cpu, len(pares)), processos)
+    pool_io = ThreadPoolExecutor(max_workers=workers_io, thread_name_prefix='motor-lote-io')
+
+    try:
+        buscar = com_prioridade(_cronometrar, PRIORIDADE_LOTE)
+        buscas = {pool_io.submit(buscar, func, *args): chave
+                  for chave, (func, *args) in tarefas.items()}
+        analises = {}
+
+        while buscas or analises:
+            concluidos, _ = wait(list(buscas) + list(analises), return_when=FIRST_COMPLETED)
+
+            for futuro in concluidos:
+                if futuro in buscas:
+                    chave = buscas.pop(futuro)
+                    resultados[chave], tempos[chave], transferencias[chave] = futuro.result()
+                    continue
+
+                symbol, timeframe = analises.pop(futuro)
+                try:
+                    resultado = futuro.result()
+                except Exception as e:
+                    logger.error(f"Erro na análise em lote {symbol} {timeframe}: {e}", exc_info=True)
+                    resultado = {"erro": str(e)}
+                yield symbol, timeframe, resultado
+
+            # Pares cujas requisições já terminaram seguem para o pool de CPU
+            for par, chaves in list(aguardando.items()):
+                if not all(chave in resultados for chave in chaves):
+                    continue
+                del aguardando[par]
+                symbol, timeframe = par
+                mercado = _montar_mercado(symbol, timeframe, chaves, resultados, tempos, transferencias)
+                if mercado.dados is None:
+                    yield symbol, timeframe, {"erro": "Falha ao coletar dados"}
+                    continue
+                analises[pool_cpu.submit(_analisar_par, symbol, timeframe, mercado)] = par
+    finally:
+        pool_io.shutdown(wait=False, cancel_futures=True)
+        pool_cpu.shutdown(wait=False, cancel_futures=True)
@@ -98,7 +98,11 @@ def create_app():
 
     @app.route('/health', methods=['GET'])
     def health():
-        return jsonify({'status': 'ok', 'service': 'sne-web', 'version': '1.0'}), 200
+        from http_upstream import estatisticas_upstream
+        from app.utils.redis_safe import cache_compartilhado
+        return jsonify({'status': 'ok', 'service': 'sne-web', 'version': '1.0',
+                        'upstream': estatisticas_upstream(),
+                        'cache': cache_compartilhado().estatisticas()}), 200
 
     logger.info("Flask app created successfully")
     return app
@@ -3,7 +3,7 @@ API endpoints for SNE Web
 """
 from flask import request, jsonify, g
 from . import app
-from .motor import analisar_par, obter_sinal
+from .motor import analisar_par, obter_sinal, campos_pedidos
 from .auth_siwe import require_auth, check_tier_limits, save_analysis
 import logging
 import os
@@ -14,17 +14,21 @@ logger = logging.getLogger(__name__)
 def analyze():
     """
     Analyze endpoint - Usa motor_renan.py real
-    Expected payload: { "symbol": "BTCUSDT", "timeframe": "15m" }
+    Expected payload: { "symbol": "BTCUSDT", "timeframe": "15m", "fields": "sintese,mtf" }
     """
     try:
         data = request.get_json() or {}
         symbol = data.get('symbol') or data.get('pair', 'BTCUSDT')
         timeframe = data.get('timeframe', '15m')
+        try:
+            campos = campos_pedidos(data, request.args)
+        except ValueError as e:
+            return jsonify({'status': 'error', 'error': str(e)}), 400
 
         logger.info(f"Analysis requested for {symbol} on {timeframe}")
 
         # Usar motor real
-        resultado = analisar_par(symbol, timeframe)
+        resultado = analisar_par(symbol, timeframe, campos=campos)
 
         if resultado.get('status') == 'error':
             return jsonify(resultado), 500
@@ -45,7 +49,7 @@ def analyze_authenticated():
     Analyze endpoint com autenticação SIWE e tier limiting
     Endpoint: POST /api/analyze/auth
     Headers: Authorization: Bearer <token>
-    Body: { "symbol": "BTCUSDT", "timeframe": "15m" }
+    Body: { "symbol": "BTCUSDT", "timeframe": "15m", "fields": "sintese,mtf" }
     """
     try:
         from .auth_siwe import check_tier_limits
@@ -55,6 +59,10 @@ def analyze_authenticated():
         data = request.get_json() or {}
         symbol = data.get('symbol') or data.get('pair', 'BTCUSDT')
         timeframe = data.get('timeframe', '15m')
+        try:
+            campos = campos_pedidos(data, request.args)
+        except ValueError as e:
+            return jsonify({'status': 'error', 'error': str(e)}), 400
 
         # Verificar rate limits
         if not check_tier_limits(user['address'], tier, 'analysis'):
@@ -66,7 +74,7 @@ def analyze_authenticated():
         logger.info(f"Authenticated analysis for {user['address']} ({tier}): {symbol} on {timeframe}")
 
         # Usar motor real
-        resultado = analisar_par(symbol, timeframe)
+        resultado = analisar_par(symbol, timeframe, campos=campos)
 
         if resultado.get('status') == 'error':
             return jsonify(resultado), 500
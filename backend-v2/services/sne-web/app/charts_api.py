@@ -5,23 +5,23 @@ Integração com dados de mercado e indicadores
 
 from flask import Blueprint, request, jsonify, g
 import logging
-import requests
 import json as json_lib
 import hmac
 import hashlib
 from datetime import datetime
 import uuid
 from .auth_siwe import require_auth, check_tier_limits
-from app.utils.redis_safe import SafeRedis
+from app.utils.redis_safe import cache_compartilhado
 
 charts_bp = Blueprint('charts', __name__)
 logger = logging.getLogger(__name__)
 
-# Redis para cache
-redis_client = SafeRedis()
+# Cache em dois níveis (memória + Redis) para candles e preços
+redis_client = cache_compartilhado()
 
 # Import do collector client (centralizado)
-from .collector_client import get_klines, get_binance_data
+from .collector_client import get_klines_colunas, get_binance_data
+from http_upstream import upstream_get
 
 # Configuração Binance API (exemplo)
 BINANCE_BASE_URL = 'https://api.binance.com/api/v3'
@@ -29,24 +29,16 @@ BINANCE_BASE_URL = 'https://api.binance.com/api/v3'
 def get_candles_from_binance(symbol: str, interval: str, limit: int = 500):
     """Busca dados de candles via coletor (cache-first)"""
     try:
-        # Usar o collector_client unificado
-        data = get_klines(symbol, interval, limit)
+        # Colunas tipadas direto do coletor (binário negociado, JSON como fallback)
+        klines = get_klines_colunas(symbol, interval, limit)
 
-        if not data:
+        if not len(klines):
             logger.error(f"No data returned from collector for {symbol}")
             return []
 
-        # Converter formato Binance para formato interno
-        candles = []
-        for candle in data:
-            candles.append({
-                'timestamp': int(candle[0]),
-                'open': float(candle[1]),
-                'high': float(candle[2]),
-                'low': float(candle[3]),
-                'close': float(candle[4]),
-                'volume': float(candle[5])
-            })
+        colunas = ('timestamp', 'open', 'high', 'low', 'close', 'volume')
+        candles = [dict(zip(colunas, linha))
+                   for linha in zip(*(klines[c].tolist() for c in colunas))]
 
         logger.info(f"Candles from collector: {symbol} {len(candles)} candles")
         return candles
@@ -63,7 +55,7 @@ def get_klines(symbol: str, interval: str, limit: int = 200):
     if collector_url:
         try:
             # Usar coletor
-            response = requests.get(
+            response = upstream_get(
                 f"{collector_url}/api/v1/market/klines",
                 params={
                     'symbol': symbol.upper(),
@@ -86,7 +78,7 @@ def get_klines(symbol: str, interval: str, limit: int = 200):
     # Fallback para Binance direto (só em desenvolvimento)
     try:
         logger.warning("Using Binance fallback - should not happen in production")
-        response = requests.get(
+        response = upstream_get(
             "https://api.binance.com/api/v3/klines",
             params={
                 'symbol': symbol.upper(),
@@ -4,8 +4,14 @@ Substitui chamadas diretas para Binance por chamadas seguras ao coletor
 """
 
 import os
+import threading
 import requests
 import logging
+from urllib.parse import urlsplit
+
+from http_upstream import (
+    CONFIG_HOSTS, PRIORIDADE_LOTE, ConfigHost, prioridade_atual, upstream_get, upstream_post,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -15,15 +21,32 @@ if _raw and not _raw.startswith(("http://", "https://")):
     _raw = "https://" + _raw
 COLLECTOR_URL = _raw.rstrip("/")
 
+# Pool keep-alive do coletor: o prefetch do motor faz várias buscas em paralelo
+if COLLECTOR_URL:
+    CONFIG_HOSTS[urlsplit(COLLECTOR_URL).hostname] = ConfigHost(pool=32, timeout=(3.05, 15), tentativas=1)
+
 # Token simples (mais rápido que HMAC). Defina no Render e no Railway.
 COLLECTOR_TOKEN = (os.getenv("COLLECTOR_TOKEN") or "").strip()
 
+# Última resposta de get_klines nesta thread (bytes recebidos e se veio do cache)
+_local = threading.local()
+
+def ultima_transferencia():
+    """{'bytes': n, 'cache': bool|None} da última chamada de get_klines na thread atual"""
+    return getattr(_local, "transferencia", {"bytes": 0, "cache": None})
+
 def _headers():
     h = {}
     if COLLECTOR_TOKEN:
         h["Authorization"] = f"Bearer {COLLECTOR_TOKEN}"
+    # Lote/scanner: o coletor põe as buscas atrás das interativas na Binance
+    if prioridade_atual() == PRIORIDADE_LOTE:
+        h["X-SNE-Priority"] = "lote"
     return h
 
+# Klines em colunas binárias quando o coletor souber; senão ele responde JSON
+ACCEPT_KLINES = "application/vnd.sne.klines, application/json;q=0.9"
+
 def get_klines(symbol: str, interval: str, limit: int = 100):
     """
     Busca dados de klines via coletor (cache-first)
@@ -36,7 +59,7 @@ def get_klines(symbol: str, interval: str, limit: int = 100):
         logger.info(f"Coletando dados via COLLECTOR_URL: {symbol} {interval} limit={limit}")
 
         url = f"{COLLECTOR_URL}/binance/klines"
-        r = requests.get(
+        r = upstream_get(
             url,
             params={"symbol": symbol.upper(), "interval": interval, "limit": limit},
             headers=_headers(),
@@ -47,12 +70,118 @@ def get_klines(symbol: str, interval: str, limit: int = 100):
         result = r.json()
         if isinstance(result, dict) and "error" in result:
             raise RuntimeError(f"Collector error: {result['error']}")
+        source = result.get("source") if isinstance(result, dict) else None
+        _local.transferencia = {
+            "bytes": len(r.content),
+            "cache": None if source is None else source == "cache",
+        }
         return result["data"] if isinstance(result, dict) and "data" in result else result
 
     except requests.exceptions.RequestException as e:
         logger.error(f"Erro na comunicação com coletor: {str(e)}")
         raise RuntimeError(f"Falha ao coletar dados: {str(e)}")
 
+def get_klines_colunas(symbol: str, interval: str, limit: int = 100, inicio: int = None):
+    """
+    Como get_klines, mas decodifica o corpo direto em colunas tipadas
+    (klines.Klines: int64/float64, com taker buy e número de trades).
+    Pede o formato binário colunar; JSON continua aceito.
+
+    inicio: startTime em ms (None = últimos `limit` candles)
+    """
+    from klines import MIME_KLINES_BINARIO, carregar_json, decodificar_klines, decodificar_klines_binario
+
+    if not COLLECTOR_URL:
+        raise RuntimeError("COLLECTOR_URL não configurado no backend")
+
+    try:
+        logger.info(f"Coletando dados via COLLECTOR_URL: {symbol} {interval} limit={limit}")
+
+        url = f"{COLLECTOR_URL}/binance/klines"
+        params = {"symbol": symbol.upper(), "interval": interval, "limit": limit}
+        if inicio is not None:
+            params["startTime"] = int(inicio)
+        headers = dict(_headers(), Accept=ACCEPT_KLINES)
+        r = upstream_get(url, params=params, headers=headers, timeout=15)
+        r.raise_for_status()
+
+        if r.headers.get("Content-Type", "").startswith(MIME_KLINES_BINARIO):
+            source = r.headers.get("X-SNE-Source") or None
+            klines = decodificar_klines_binario(r.content)
+        else:
+            result = carregar_json(r.content)
+            if isinstance(result, dict) and "error" in result:
+                raise RuntimeError(f"Collector error: {result['error']}")
+            source = result.get("source") if isinstance(result, dict) else None
+            klines = decodificar_klines(result)
+        _local.transferencia = {
+            "bytes": len(r.content),
+            "cache": None if source is None else source == "cache",
+        }
+        return klines
+
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Erro na comunicação com coletor: {str(e)}")
+        raise RuntimeError(f"Falha ao coletar dados: {str(e)}")
+
+def get_klines_many(pedidos):
+    """
+    Vários klines numa chamada ao coletor (/binance/klines/batch)
+
+    pedidos: (symbol, interval, limit[, since]) ou dicts com essas chaves;
+             since é startTime em ms
+
+    Returns:
+        Lista na ordem dos pedidos: klines.Klines, ou None para o pedido
+        que falhou no coletor (o erro vai para o log)
+    """
+    from klines import carregar_json, decodificar_klines
+
+    if not COLLECTOR_URL:
+        raise RuntimeError("COLLECTOR_URL não configurado no backend")
+
+    corpo = []
+    for pedido in pedidos:
+        if not isinstance(pedido, dict):
+            pedido = dict(zip(("symbol", "interval", "limit", "since"), pedido))
+        item = {"symbol": pedido["symbol"].upper(), "interval": pedido["interval"]}
+        for campo in ("limit", "since"):
+            if pedido.get(campo) is not None:
+                item[campo] = int(pedido[campo])
+        corpo.append(item)
+    if not corpo:
+        return []
+
+    try:
+        logger.info(f"Coletando lote via COLLECTOR_URL: {len(corpo)} pedidos")
+
+        r = upstream_post(f"{COLLECTOR_URL}/binance/klines/batch", json={"requests": corpo},
+                          headers=_headers(), timeout=30)
+        r.raise_for_status()
+        result = carregar_json(r.content)
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Erro na comunicação com coletor: {str(e)}")
+        raise RuntimeError(f"Falha ao coletar dados: {str(e)}")
+
+    if isinstance(result, dict) and "error" in result:
+        raise RuntimeError(f"Collector error: {result['error']}")
+    itens = result.get("results", [])
+    if len(itens) != len(corpo):
+        raise RuntimeError(f"Collector batch: {len(itens)} resultados para {len(corpo)} pedidos")
+
+    _local.transferencia = {
+        "bytes": len(r.content),
+        "cache": all(item.get("source") == "cache" for item in itens),
+    }
+    klines = []
+    for pedido, item in zip(corpo, itens):
+        if "error" in item:
+            logger.warning(f"Collector batch {pedido['symbol']} {pedido['interval']}: {item['error']}")
+            klines.append(None)
+        else:
+            klines.append(decodificar_klines(item))
+    return klines
+
 def get_binance_data(endpoint: str, params: dict = None):
     """
     Função genérica para outros endpoints do Binance via coletor
@@ -62,7 +191,7 @@ def get_binance_data(endpoint: str, params: dict = None):
 
     try:
         url = f"{COLLECTOR_URL}/binance/{endpoint.lstrip('/')}"
-        r = requests.get(url, params=params or {}, headers=_headers(), timeout=10)
+        r = upstream_get(url, params=params or {}, headers=_headers(), timeout=10)
         r.raise_for_status()
 
         result = r.json()
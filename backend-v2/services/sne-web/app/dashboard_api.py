@@ -10,13 +10,13 @@ import json as json_lib
 
 from .auth_siwe import require_auth, check_tier_limits
 from .motor import analisar_par
-from app.utils.redis_safe import SafeRedis
+from app.utils.redis_safe import cache_compartilhado
 
 dashboard_bp = Blueprint('dashboard', __name__)
 logger = logging.getLogger(__name__)
 
-# Redis para cache
-redis_client = SafeRedis()
+# Cache em dois níveis (memória + Redis)
+redis_client = cache_compartilhado()
 
 @dashboard_bp.route('/summary', methods=['GET'])
 @require_auth
@@ -88,7 +88,7 @@ def generate_dashboard_summary(tier: str) -> dict:
     # Análise básica para dashboard
     try:
         # Análise rápida do BTC (cacheada)
-        btc_analysis = analisar_par('BTCUSDT', '1h')
+        btc_analysis = analisar_par('BTCUSDT', '1h', campos=['sintese'])
         btc_signal = btc_analysis.get('analysis', {}).get('recommendation', 'HOLD')
     except Exception as e:
         btc_signal = 'HOLD'
@@ -188,7 +188,7 @@ def radar_signals():
         timeframe = data.get('timeframe', '4H')
 
         # Usar motor de análise para gerar sinais
-        analysis_result = analisar_par(symbol, timeframe)
+        analysis_result = analisar_par(symbol, timeframe, campos=['sintese'])
 
         if not analysis_result:
             return jsonify({'signals': []}), 200
@@ -6,69 +6,67 @@ Wrapper para motor_renan.py com adaptações para ambiente cloud
 import sys
 import os
 import logging
-import json
-import numpy as np
-import pandas as pd
 from pathlib import Path
-from datetime import datetime, date
+from contextlib import nullcontext
 
 # Adicionar diretório raiz ao path para importar módulos do SNE
 ROOT_DIR = Path(__file__).parent.parent.parent.parent
 sys.path.insert(0, str(ROOT_DIR))
 
+from serializacao import normalizar
+
 logger = logging.getLogger(__name__)
 
 def make_json_serializable(obj):
     """
     Converte objetos não serializáveis para tipos JSON válidos
+    (uma passada no codificador, ver serializacao)
+    """
+    return normalizar(obj)
+
+def campos_pedidos(data: dict, args=None):
+    """
+    Projeção 'fields' do body ou da query string ("sintese,mtf" ou lista)
+
+    Returns:
+        Tupla de campos ou None (resultado completo)
+
+    Raises:
+        ValueError: campo desconhecido
     """
-    if isinstance(obj, (np.integer, np.int64, np.int32)):
-        return int(obj)
-    elif isinstance(obj, (np.floating, np.float64, np.float32)):
-        return float(obj)
-    elif isinstance(obj, np.ndarray):
-        return obj.tolist()
-    elif isinstance(obj, pd.DataFrame):
-        return obj.to_dict(orient='records')
-    elif isinstance(obj, pd.Series):
-        return obj.to_dict()
-    elif isinstance(obj, (datetime, date)):
-        return obj.isoformat()
-    elif isinstance(obj, bool):
-        return bool(obj)  # Garantir que é bool Python nativo
-    elif isinstance(obj, dict):
-        return {key: make_json_serializable(value) for key, value in obj.items()}
-    elif isinstance(obj, (list, tuple)):
-        return [make_json_serializable(item) for item in obj]
-    elif pd.isna(obj):
-        return None
-    else:
-        # Tentar converter para string se não for um tipo básico
-        try:
-            json.dumps(obj)
-            return obj
-        except (TypeError, ValueError):
-            return str(obj)
+    from motor_renan import normalizar_campos
+    return normalizar_campos(data.get('fields') or (args or {}).get('fields'))
 
-def analisar_par(symbol: str = "BTCUSDT", timeframe: str = "1h") -> dict:
+def analisar_par(symbol: str = "BTCUSDT", timeframe: str = "1h", rastreador=None, campos=None) -> dict:
     """
     Analisa um par de trading usando o motor SNE completo
     
     Args:
         symbol: Par de trading (ex: BTCUSDT)
         timeframe: Timeframe (ex: 1h, 15m)
+        rastreador: Rastreador opcional (spans de busca, estágios e serialização)
+        campos: Projeção de full_analysis (ex: ['sintese', 'mtf']); só os
+                estágios necessários rodam. O resumo 'analysis' só vem
+                quando 'sintese' está entre os campos.
     
     Returns:
         dict: Resultado da análise completa
     """
     try:
         # Importar motor_renan
-        from motor_renan import analise_completa
+        from motor_renan import analise_completa, normalizar_campos
         
         logger.info(f"Analisando {symbol} no timeframe {timeframe}")
         
+        campos = normalizar_campos(campos)
+        resumo = campos is None or 'sintese' in campos
+        campos_motor = campos
+        if campos is not None and resumo:
+            # Saem da mesma execução da síntese; só alimentam o resumo
+            campos_motor = tuple(sorted(set(campos) | {'confluencia', 'niveis_operacionais'}))
+        
         # Executar análise completa
-        resultado = analise_completa(symbol, timeframe)
+        resultado = analise_completa(symbol, timeframe, rastreador=rastreador, campos=campos_motor)
         
         # Verificar se houve erro
         if 'erro' in resultado:
@@ -80,38 +78,46 @@ def analisar_par(symbol: str = "BTCUSDT", timeframe: str = "1h") -> dict:
                 'timeframe': timeframe
             }
         
-        # Extrair informações principais para resposta simplificada
-        sintese = resultado.get('sintese', {})
-        confluencia = resultado.get('confluencia', {})
-        niveis = resultado.get('niveis_operacionais', {})
+        # Serialização medida como etapa própria quando há rastreador
+        serializacao = rastreador.span('serializacao') if rastreador is not None else nullcontext()
+        with serializacao:
+            # Uma única passada sobre a análise completa; o resumo sai dela
+            try:
+                completo = make_json_serializable(resultado)
+            except Exception as e:
+                logger.warning(f"Erro ao serializar análise completa: {e}")
+                completo = make_json_serializable({
+                    'sintese': resultado.get('sintese', {}),
+                    'confluencia': resultado.get('confluencia', {}),
+                    'niveis_operacionais': resultado.get('niveis_operacionais', {})
+                })
         
-        # Formatar resposta para API (convertendo valores não serializáveis)
         response = {
             'status': 'ok',
             'symbol': symbol,
-            'timeframe': timeframe,
-            'analysis': {
-                'confluence_score': make_json_serializable(confluencia.get('score', 0)),
+            'timeframe': timeframe
+        }
+        
+        if resumo:
+            # Extrair informações principais para resposta simplificada
+            sintese = completo.get('sintese', {})
+            confluencia = completo.get('confluencia', {})
+            niveis = completo.get('niveis_operacionais', {})
+            response['analysis'] = {
+                'confluence_score': confluencia.get('score', 0),
                 'bias': sintese.get('bias', 'NEUTRAL'),
                 'recommendation': sintese.get('recomendacao', 'HOLD'),
-                'entry': make_json_serializable(niveis.get('entry_price', 0)),
-                'stop_loss': make_json_serializable(niveis.get('stop_loss', 0)),
-                'take_profit': make_json_serializable(niveis.get('tp1', 0)),
-                'rr_ratio': make_json_serializable(niveis.get('rr_ratio', 'N/A'))
+                'entry': niveis.get('entry_price', 0),
+                'stop_loss': niveis.get('stop_loss', 0),
+                'take_profit': niveis.get('tp1', 0),
+                'rr_ratio': niveis.get('rr_ratio', 'N/A')
             }
-        }
         
-        # Incluir análise completa (convertendo valores não serializáveis)
-        # Limitar profundidade para evitar respostas muito grandes
-        try:
-            response['full_analysis'] = make_json_serializable(resultado)
-        except Exception as e:
-            logger.warning(f"Erro ao serializar análise completa: {e}")
-            response['full_analysis'] = {
-                'sintese': make_json_serializable(sintese),
-                'confluencia': make_json_serializable(confluencia),
-                'niveis_operacionais': make_json_serializable(niveis)
-            }
+        if campos is not None:
+            # Fontes do resumo que não foram pedidas ficam fora de full_analysis
+            completo = {chave: valor for chave, valor in completo.items()
+                        if chave in ('symbol', 'timeframe') or chave in campos}
+        response['full_analysis'] = completo
         
         return response
         
@@ -144,7 +150,7 @@ def obter_sinal(symbol: str = "BTCUSDT", timeframe: str = "15m") -> dict:
         dict: Sinal de trading
     """
     try:
-        resultado = analisar_par(symbol, timeframe)
+        resultado = analisar_par(symbol, timeframe, campos=['sintese'])
         
         if resultado.get('status') != 'ok':
             return resultado
@@ -40,13 +40,13 @@ def balance():
     GET /api/passport/balance
     """
     from web3 import Web3
-    from app.utils.redis_safe import SafeRedis
+    from app.utils.redis_safe import cache_compartilhado
     import os
     import time
     import json
 
     addr = session["siwe_address"]
-    redis_client = SafeRedis()
+    redis_client = cache_compartilhado()
 
     # Cache key para balance (30s TTL)
     cache_key = f"passport:balance:{addr}"
@@ -22,6 +22,26 @@ def fail(code: str, message: str, status: int = 400, **details):
     payload = {"ok": False, "error": {"code": code, "message": message, "details": details or None}}
     return jsonify(payload), status
 
+def _com_server_timing(resposta, rastreador):
+    """Attach Server-Timing header to an ok()/fail() response"""
+    corpo, status = resposta
+    corpo.headers["Server-Timing"] = rastreador.server_timing()
+    return corpo, status
+
+def _envelope_analise(addr, symbol, timeframe, market, resultado, executado_em, cached):
+    """Per-user response around a motor result (the cache only holds the shared part)"""
+    return {
+        "analysisId": f"analysis_{symbol}_{addr[:8]}_{timeframe}_{executado_em}",
+        "user": addr,
+        "symbol": symbol,
+        "timeframe": timeframe,
+        "market": market,
+        "status": "completed",
+        "result": resultado,
+        "cached": cached,
+        "executedAt": str(executado_em)
+    }
+
 def require_session(fn):
     """Decorator to require authenticated session"""
     @wraps(fn)
@@ -154,14 +174,14 @@ def signals_get():
     Get market signals (public preview)
     GET /api/radar/signals?market=crypto&limit=10
     """
-    from app.utils.redis_safe import SafeRedis
+    from app.utils.redis_safe import cache_compartilhado
     import json
 
     try:
         market = request.args.get('market', 'crypto')
         limit = int(request.args.get('limit', 10))
 
-        redis_client = SafeRedis()
+        redis_client = cache_compartilhado()
 
         # Cache para sinais públicos (10s TTL)
         cache_key = f"radar:signals:public:{market}:{limit}"
@@ -217,10 +237,19 @@ def analyze():
     """
     Request market analysis for specific symbol using SNE motor
     POST /api/radar/analyze
-    Body: { "symbol": "BTCUSDT", "timeframe": "15m", "market": "crypto" }
+    Body: { "symbol": "BTCUSDT", "timeframe": "15m", "market": "crypto", "timings": false,
+            "fields": "sintese,niveis_operacionais" }
+
+    "fields" (or ?fields=) limits result.full_analysis to those motor fields;
+    only the stages they depend on run, and only that subtree is cached.
+
+    Server-Timing header carries per-stage durations; "timings": true
+    (or ?timings=1) also returns them in data._timings.
     """
-    from .motor import analisar_par
-    from app.utils.redis_safe import SafeRedis
+    from .motor import analisar_par, campos_pedidos
+    from rastreamento import Rastreador
+    from serializacao import codificar_texto
+    from app.utils.redis_safe import cache_compartilhado
     from .auth_siwe import check_tier_limits
     import json
 
@@ -229,10 +258,17 @@ def analyze():
         symbol = body.get("symbol")
         timeframe = body.get("timeframe", "15m")
         market = body.get("market", "crypto")
+        incluir_tempos = str(body.get("timings", request.args.get("timings", ""))).lower() in ("1", "true", "yes")
+        rastreador = Rastreador()
 
         if not symbol:
             return fail("BAD_REQUEST", "Missing symbol", 400)
 
+        try:
+            campos = campos_pedidos(body, request.args)
+        except ValueError as e:
+            return fail("BAD_REQUEST", str(e), 400)
+
         addr = session["siwe_address"]
         tier = session.get("tier", "free")
 
@@ -240,46 +276,49 @@ def analyze():
         if not check_tier_limits(addr, tier, 'analysis'):
             return fail("LIMIT_EXCEEDED", "Analysis limit reached for your tier", 429)
 
-        redis_client = SafeRedis()
+        redis_client = cache_compartilhado()
 
-        # Cache key para análise
+        # Cache key para análise (só o resultado do motor: o envelope traz o
+        # endereço de quem pediu e é montado a cada requisição)
         cache_key = f"radar:analysis:{symbol}:{timeframe}"
+        if campos is not None:
+            cache_key += f":fields={','.join(campos)}"
 
         # Verificar cache (5min para análises)
-        cached_result = redis_client.get(cache_key)
+        with rastreador.span("cache") as span:
+            cached_result = redis_client.get(cache_key)
+            span.cache = bool(cached_result)
         if cached_result:
-            cached_data = json.loads(cached_result)
-            cached_data["cached"] = True
-            return ok(cached_data)
+            cacheado = json.loads(cached_result)
+            cached_data = _envelope_analise(addr, symbol, timeframe, market, cacheado["result"],
+                                            cacheado["executedAt"], cached=True)
+            if incluir_tempos:
+                cached_data["_timings"] = rastreador.to_dict()
+            return _com_server_timing(ok(cached_data), rastreador)
 
         # Executar análise real com motor SNE
         try:
             logger.info(f"Running SNE analysis for {symbol} on {timeframe}")
 
-            resultado = analisar_par(symbol, timeframe)
+            resultado = analisar_par(symbol, timeframe, rastreador=rastreador, campos=campos)
 
             if resultado.get('status') == 'error':
                 logger.error(f"SNE motor error: {resultado}")
-                return fail("ANALYSIS_ERROR", "Failed to analyze market data", 500)
+                return _com_server_timing(fail("ANALYSIS_ERROR", "Failed to analyze market data", 500), rastreador)
+
+            executado_em = int(time.time())
+
+            # Cache por 5 minutos, sem dados do usuário
+            redis_client.set(cache_key, codificar_texto({"result": resultado, "executedAt": executado_em}), ex=300)
 
             # Formatar resposta
-            analysis_data = {
-                "analysisId": f"analysis_{symbol}_{addr[:8]}_{timeframe}_{int(time.time())}",
-                "user": addr,
-                "symbol": symbol,
-                "timeframe": timeframe,
-                "market": market,
-                "status": "completed",
-                "result": resultado,
-                "cached": False,
-                "executedAt": str(int(time.time()))
-            }
-
-            # Cache por 5 minutos
-            redis_client.set(cache_key, json.dumps(analysis_data), ex=300)
+            analysis_data = _envelope_analise(addr, symbol, timeframe, market, resultado,
+                                              executado_em, cached=False)
 
             logger.info(f"Analysis completed for {addr}: {symbol}")
-            return ok(analysis_data)
+            if incluir_tempos:
+                analysis_data["_timings"] = rastreador.to_dict()
+            return _com_server_timing(ok(analysis_data), rastreador)
 
         except Exception as e:
             logger.error(f"SNE motor execution error: {e}")
@@ -1,10 +1,33 @@
 """
 Redis wrapper seguro com fallback quando Redis não está disponível
 Suporta tanto TCP Redis quanto REST API (Upstash)
+
+Uma conexão por processo (RedisCompartilhado): pool de conexões TCP, ou
+Upstash REST sobre a sessão keep-alive do http_upstream. Se o Redis cai
+(ou não responde no boot), uma thread tenta reconectar com backoff em vez
+de deixar o processo sem cache até o próximo deploy.
+
+Dois jeitos de usar:
+- SafeRedis(): as chamadas de sempre (get/setex/incr/expire...) direto no
+  Redis, para contadores e nonces que não podem ser servidos da memória
+- cache_compartilhado(): cache em dois níveis para chaves quentes (sinais,
+  análises, produtos): L1 LRU em memória com TTL, L2 no Redis, mget/mset
+  numa ida só e contadores de hit/miss por nível
+
+Uso:
+    cache = cache_compartilhado()
+    cache.get(chave) / cache.set(chave, valor, ex=30)
+    cache.mget([k1, k2]) / cache.mset({k1: v1, k2: v2}, ex=30)
+    cache.estatisticas()
 """
 
 import os
+import time
+import random
 import logging
+import threading
+import urllib.parse
+from collections import OrderedDict
 from typing import Any, Optional
 
 # Try to import redis, fallback if not available
@@ -16,11 +39,19 @@ except ImportError:
     REDIS_AVAILABLE = False
     logging.warning("Redis not available - using in-memory fallback")
 
-import requests
-import urllib.parse
+from http_upstream import upstream_get, upstream_post
 
 logger = logging.getLogger(__name__)
 
+REDIS_POOL_MAX = int(os.getenv('REDIS_POOL_MAX', '32'))       # conexões TCP por processo
+BACKOFF_RECONEXAO = (0.5, 1, 2, 5, 10, 30)                   # segundos entre tentativas
+
+CACHE_L1_MAX_ITENS = int(os.getenv('CACHE_L1_MAX_ITENS', '2048'))
+# L1 é por processo: TTL curto para não servir por muito tempo o que outro
+# worker já trocou no Redis
+CACHE_L1_TTL_MAX = float(os.getenv('CACHE_L1_TTL_MAX', '30'))
+
+
 class UpstashRedis:
     """Upstash Redis REST API client - Correct URL format"""
 
@@ -34,7 +65,7 @@ class UpstashRedis:
         if not self.available:
             return None
         try:
-            r = requests.get(f"{self.url}/{path}", headers=self.headers, timeout=5)
+            r = upstream_get(f"{self.url}/{path}", headers=self.headers, timeout=5)
             if r.status_code == 200:
                 return r.json().get("result")
             logger.warning(f"Upstash {path} -> {r.status_code}: {r.text[:200]}")
@@ -53,6 +84,13 @@ class UpstashRedis:
         key = urllib.parse.quote(key, safe="")
         return self._get(f"get/{key}")
 
+    def set(self, key: str, value: Any, ex: int = None) -> bool:
+        """Set (com EX opcional) - Upstash format: /set/key/value[/EX/seconds]"""
+        key = urllib.parse.quote(key, safe="")
+        val = urllib.parse.quote(str(value), safe="")
+        path = f"set/{key}/{val}" + (f"/EX/{int(ex)}" if ex else "")
+        return self._get(path) == "OK"
+
     def setex(self, key: str, time: int, value: Any) -> bool:
         """Set with expiration - Upstash format: /setex/key/seconds/value"""
         key = urllib.parse.quote(key, safe="")
@@ -81,150 +119,429 @@ class UpstashRedis:
         res = self._get(f"expire/{key}/{int(time)}")
         return res == 1 or res is True
 
-class SafeRedis:
+    def mget(self, keys):
+        """Várias chaves numa requisição - Upstash format: /mget/k1/k2/..."""
+        caminho = "/".join(urllib.parse.quote(k, safe="") for k in keys)
+        res = self._get(f"mget/{caminho}")
+        return res if isinstance(res, list) and len(res) == len(keys) else [None] * len(keys)
+
+    def pipeline(self, comandos):
+        """Vários comandos numa requisição - POST /pipeline [["SET", k, v, "EX", n], ...]"""
+        if not self.available:
+            return None
+        try:
+            r = upstream_post(f"{self.url}/pipeline", json=comandos, headers=self.headers, timeout=5)
+            if r.status_code == 200:
+                return [item.get("result") for item in r.json()]
+            logger.warning(f"Upstash pipeline -> {r.status_code}: {r.text[:200]}")
+            return None
+        except Exception as e:
+            logger.warning(f"Upstash request error: {e}")
+            self.available = False
+            return None
+
+
+def _erro_de_conexao(erro):
+    return REDIS_AVAILABLE and isinstance(erro, (redis.exceptions.ConnectionError, redis.exceptions.TimeoutError))
+
+
+class RedisCompartilhado:
     """
-    Wrapper para Redis que funciona mesmo quando Redis não está disponível.
-    Útil para desenvolvimento e quando Redis cai em produção.
+    A conexão Redis do processo (Upstash REST ou TCP com pool)
+
+    Erro de conexão marca indisponível e agenda a reconexão em segundo
+    plano; enquanto isso as chamadas respondem o valor de fallback na hora.
     """
 
-    def __init__(self, host: str = 'localhost', port: int = 6379, db: int = 0, **kwargs):
-        self.host = host
-        self.port = port
-        self.db = db
-        self.kwargs = kwargs
+    def __init__(self):
         self.redis = None
         self.upstash = None
         self.available = False
         self.use_upstash = False
+        self.erros = 0
+        self.reconexoes = 0
+        self._trava = threading.Lock()
+        self._reconectando = False
+
+        if not self._conectar() and self._configurado():
+            self._agendar_reconexao()
 
-        self._connect()
+    @staticmethod
+    def _configurado():
+        return bool((os.getenv('REDIS_REST_URL') or os.getenv('UPSTASH_REDIS_REST_URL'))
+                    or (REDIS_AVAILABLE and os.getenv('REDIS_URL')))
 
-    def _connect(self):
-        """Tenta conectar ao Redis (Upstash REST ou TCP)"""
+    def _conectar(self):
+        """Tenta conectar ao Redis (Upstash REST ou TCP); True se respondeu ao PING"""
         # Primeiro tenta Upstash REST API
         upstash_url = os.getenv('REDIS_REST_URL') or os.getenv('UPSTASH_REDIS_REST_URL')
         upstash_token = os.getenv('REDIS_REST_TOKEN') or os.getenv('UPSTASH_REDIS_REST_TOKEN')
 
         if upstash_url and upstash_token:
             try:
-                self.upstash = UpstashRedis(upstash_url, upstash_token)
+                if self.upstash is None:
+                    self.upstash = UpstashRedis(upstash_url, upstash_token)
+                self.upstash.available = True
                 if self.upstash.ping():
-                    self.available = True
                     self.use_upstash = True
+                    self.available = True
                     logger.info(f"Upstash Redis connected: {upstash_url}")
-                    return
+                    return True
             except Exception as e:
                 logger.warning(f"Upstash connection failed: {str(e)}")
 
         # Se Upstash falhou, tenta TCP Redis (só se REDIS_URL definido)
-        if REDIS_AVAILABLE:
-            try:
-                # Suporte a REDIS_URL do ambiente - só tenta se explicitamente configurado
-                redis_url = os.getenv('REDIS_URL')
-                if redis_url:
-                    self.redis = redis.from_url(redis_url)
-                    # Test connection
-                    self.redis.ping()
-                    self.available = True
-                    self.use_upstash = False
-                    logger.info(f"TCP Redis connected: {redis_url}")
-                else:
-                    # Em produção, não tenta localhost automaticamente
-                    logger.info("No REDIS_URL configured - Redis disabled")
-                    self.available = False
-            except Exception as e:
-                self.available = False
-                logger.warning(f"Redis unavailable: {str(e)}. Using fallback mode.")
-        else:
-            self.available = False
+        if not REDIS_AVAILABLE:
             logger.info("Redis library not available - using fallback mode")
+            return False
+        redis_url = os.getenv('REDIS_URL')
+        if not redis_url:
+            # Em produção, não tenta localhost automaticamente
+            logger.info("No REDIS_URL configured - Redis disabled")
+            return False
+        try:
+            if self.redis is None:
+                # Um pool para o processo todo; a reconexão reaproveita
+                self.redis = redis.from_url(
+                    redis_url, decode_responses=True, max_connections=REDIS_POOL_MAX,
+                    socket_connect_timeout=1, socket_timeout=1, health_check_interval=30,
+                )
+            self.redis.ping()
+            self.use_upstash = False
+            self.available = True
+            logger.info(f"TCP Redis connected: {redis_url}")
+            return True
+        except Exception as e:
+            logger.warning(f"Redis unavailable: {str(e)}. Using fallback mode.")
+            return False
 
-    def get(self, key: str) -> Optional[str]:
-        """Get com fallback"""
+    def _agendar_reconexao(self):
+        with self._trava:
+            if self._reconectando:
+                return
+            self._reconectando = True
+        threading.Thread(target=self._reconectar, name='redis-reconexao', daemon=True).start()
+
+    def _reconectar(self):
+        tentativa = 0
+        try:
+            while True:
+                espera = BACKOFF_RECONEXAO[min(tentativa, len(BACKOFF_RECONEXAO) - 1)]
+                time.sleep(espera * random.uniform(0.8, 1.2))
+                tentativa += 1
+                if self._conectar():
+                    self.reconexoes += 1
+                    logger.info(f"Redis reconectado após {tentativa} tentativa(s)")
+                    return
+        finally:
+            with self._trava:
+                self._reconectando = False
+
+    def executar(self, operacao, indisponivel=None, erro=None):
+        """
+        operacao(cliente) com fallback
+
+        Returns:
+            Resultado, `indisponivel` sem Redis, ou `erro` se a chamada falhou
+        """
         if not self.available:
-            return None
+            return indisponivel
+        cliente = self.upstash if self.use_upstash else self.redis
         try:
+            resultado = operacao(cliente)
+        except Exception as e:
+            self.erros += 1
+            logger.warning(f"Redis error: {str(e)}")
+            if _erro_de_conexao(e):
+                self.available = False
+                self._agendar_reconexao()
+            return erro
+        if self.use_upstash and not self.upstash.available:
+            # UpstashRedis engole o erro de rede e se desliga
+            self.erros += 1
+            self.available = False
+            self._agendar_reconexao()
+            return erro
+        return resultado
+
+    def mget(self, chaves):
+        """Lista de valores (None onde não há) numa ida ao Redis"""
+        chaves = list(chaves)
+        if not chaves:
+            return []
+        valores = self.executar(lambda c: c.mget(chaves))
+        return list(valores) if valores is not None else [None] * len(chaves)
+
+    def mget_com_ttl(self, chaves):
+        """
+        [(valor, pttl)] na ordem das chaves: GET + PTTL de cada uma numa ida
+        ao Redis. pttl em ms como o Redis devolve (-1 sem expiração, -2 não existe)
+        """
+        chaves = list(chaves)
+        if not chaves:
+            return []
+
+        def ler(cliente):
             if self.use_upstash:
-                return self.upstash.get(key)
+                respostas = cliente.pipeline([[comando, chave] for chave in chaves for comando in ('GET', 'PTTL')])
             else:
-                return self.redis.get(key)
-        except Exception as e:
-            logger.warning(f"Redis get error: {str(e)}")
-            return None
+                pipe = cliente.pipeline(transaction=False)
+                for chave in chaves:
+                    pipe.get(chave)
+                    pipe.pttl(chave)
+                respostas = pipe.execute()
+            if respostas is None or len(respostas) != 2 * len(chaves):
+                return None
+            return list(zip(respostas[0::2], respostas[1::2]))
 
-    def set(self, key: str, value: Any) -> bool:
-        """Set com fallback"""
-        if not self.available:
-            return True  # Success in fallback mode
-        try:
+        pares = self.executar(ler)
+        return pares if pares is not None else [(None, -2)] * len(chaves)
+
+    def mset(self, itens, ex=None):
+        """Grava {chave: valor} (com EX opcional) numa ida ao Redis"""
+        if not itens:
+            return True
+
+        def gravar(cliente):
             if self.use_upstash:
-                return self.upstash.setex(key, 0, value)  # Upstash não tem set sem expiração
+                comandos = [["SET", k, str(v)] + (["EX", int(ex)] if ex else []) for k, v in itens.items()]
+                return cliente.pipeline(comandos) is not None
+            pipe = cliente.pipeline(transaction=False)
+            for chave, valor in itens.items():
+                pipe.set(chave, valor, ex=ex)
+            pipe.execute()
+            return True
+
+        return self.executar(gravar, indisponivel=False, erro=False)
+
+    def estatisticas(self):
+        return {
+            'disponivel': self.available,
+            'backend': ('upstash' if self.use_upstash else 'tcp') if self.available else None,
+            'erros': self.erros,
+            'reconexoes': self.reconexoes,
+            'reconectando': self._reconectando,
+        }
+
+
+_compartilhados = {}
+_trava_compartilhados = threading.Lock()
+
+
+def redis_compartilhado():
+    """RedisCompartilhado do processo (conecta na primeira chamada)"""
+    conexao = _compartilhados.get('redis')
+    if conexao is None:
+        with _trava_compartilhados:
+            conexao = _compartilhados.get('redis')
+            if conexao is None:
+                conexao = _compartilhados['redis'] = RedisCompartilhado()
+    return conexao
+
+
+class CacheL1:
+    """LRU em memória com TTL por chave (seguro entre threads)"""
+
+    def __init__(self, max_itens=CACHE_L1_MAX_ITENS, ttl_max=CACHE_L1_TTL_MAX, relogio=time.monotonic):
+        self.max_itens = max_itens
+        self.ttl_max = ttl_max
+        self.relogio = relogio
+        self._itens = OrderedDict()   # chave -> (expira_em, valor)
+        self._trava = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.despejos = 0
+
+    def get(self, chave):
+        """(True, valor) ou (False, None)"""
+        with self._trava:
+            item = self._itens.get(chave)
+            if item is not None:
+                if item[0] > self.relogio():
+                    self._itens.move_to_end(chave)
+                    self.hits += 1
+                    return True, item[1]
+                del self._itens[chave]
+            self.misses += 1
+            return False, None
+
+    def set(self, chave, valor, ttl=None):
+        ttl = self.ttl_max if not ttl else min(ttl, self.ttl_max)
+        with self._trava:
+            self._itens[chave] = (self.relogio() + ttl, valor)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+                self.despejos += 1
+
+    def delete(self, chave):
+        with self._trava:
+            self._itens.pop(chave, None)
+
+    def limpar(self):
+        with self._trava:
+            self._itens.clear()
+
+    def estatisticas(self):
+        with self._trava:
+            return {'hits': self.hits, 'misses': self.misses, 'itens': len(self._itens),
+                    'despejos': self.despejos, 'max_itens': self.max_itens}
+
+
+class CacheDoisNiveis:
+    """
+    L1 (memória do processo) na frente do L2 (Redis compartilhado)
+
+    Leitura: L1, depois L2 (o que vem do L2 sobe para o L1 com o TTL que
+    ainda resta no Redis, no máximo ttl_max). Escrita: nos dois. Sem Redis,
+    o L1 sozinho continua segurando as chaves quentes.
+    """
+
+    def __init__(self, l2=None, l1=None):
+        self.l2 = l2 if l2 is not None else redis_compartilhado()
+        self.l1 = l1 if l1 is not None else CacheL1()
+        self.l2_hits = 0
+        self.l2_misses = 0
+
+    def get(self, chave):
+        achou, valor = self.l1.get(chave)
+        if achou:
+            return valor
+        (valor, pttl), = self.l2.mget_com_ttl([chave])
+        self._contar_l2(valor)
+        self._promover(chave, valor, pttl)
+        return valor
+
+    def set(self, chave, valor, ex=None):
+        self.l1.set(chave, valor, ex)
+        return self.l2.executar(lambda c: c.set(chave, valor, ex=ex), indisponivel=False, erro=False)
+
+    def setex(self, chave, tempo, valor):
+        return self.set(chave, valor, ex=tempo)
+
+    def delete(self, chave):
+        self.l1.delete(chave)
+        return self.l2.executar(lambda c: c.delete(chave), indisponivel=0, erro=0)
+
+    def mget(self, chaves):
+        """Valores na ordem das chaves; as que faltam no L1 vão juntas ao Redis"""
+        chaves = list(chaves)
+        valores = [None] * len(chaves)
+        faltantes = []
+        for i, chave in enumerate(chaves):
+            achou, valor = self.l1.get(chave)
+            if achou:
+                valores[i] = valor
             else:
-                return self.redis.set(key, value)
-        except Exception as e:
-            logger.warning(f"Redis set error: {str(e)}")
-            return False
+                faltantes.append(i)
+        if faltantes:
+            do_redis = self.l2.mget_com_ttl([chaves[i] for i in faltantes])
+            for i, (valor, pttl) in zip(faltantes, do_redis):
+                self._contar_l2(valor)
+                self._promover(chaves[i], valor, pttl)
+                valores[i] = valor
+        return valores
+
+    def mset(self, itens, ex=None):
+        for chave, valor in itens.items():
+            self.l1.set(chave, valor, ex)
+        return self.l2.mset(itens, ex=ex)
+
+    def _promover(self, chave, valor, pttl):
+        """Sobe para o L1 sem passar da expiração que a chave tem no Redis"""
+        if valor is None:
+            return
+        if pttl is None or pttl == -1:
+            self.l1.set(chave, valor)       # sem expiração: limite do L1
+        elif pttl > 0:
+            self.l1.set(chave, valor, pttl / 1000)
+
+    def _contar_l2(self, valor):
+        if valor is None:
+            self.l2_misses += 1
+        else:
+            self.l2_hits += 1
+
+    def estatisticas(self):
+        return {'l1': self.l1.estatisticas(),
+                'l2': dict(self.l2.estatisticas(), hits=self.l2_hits, misses=self.l2_misses)}
+
+
+def cache_compartilhado():
+    """CacheDoisNiveis do processo"""
+    cache = _compartilhados.get('cache')
+    if cache is None:
+        with _trava_compartilhados:
+            cache = _compartilhados.get('cache')
+            if cache is None:
+                cache = _compartilhados['cache'] = CacheDoisNiveis()
+    return cache
+
+
+class SafeRedis:
+    """
+    Wrapper para Redis que funciona mesmo quando Redis não está disponível.
+    Útil para desenvolvimento e quando Redis cai em produção.
+
+    Todas as instâncias usam a conexão do processo (redis_compartilhado):
+    criar um SafeRedis não abre conexão nem faz PING.
+    """
+
+    def __init__(self, host: str = 'localhost', port: int = 6379, db: int = 0, **kwargs):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.kwargs = kwargs
+        self.conexao = redis_compartilhado()
+
+    @property
+    def available(self):
+        return self.conexao.available
+
+    @property
+    def use_upstash(self):
+        return self.conexao.use_upstash
+
+    @property
+    def redis(self):
+        return self.conexao.redis
+
+    @property
+    def upstash(self):
+        return self.conexao.upstash
+
+    def get(self, key: str) -> Optional[str]:
+        """Get com fallback"""
+        return self.conexao.executar(lambda c: c.get(key))
+
+    def set(self, key: str, value: Any, ex: int = None) -> bool:
+        """Set (com EX opcional) com fallback"""
+        return self.conexao.executar(lambda c: c.set(key, value, ex=ex), indisponivel=True, erro=False)
 
     def setex(self, key: str, time: int, value: Any) -> bool:
         """Set with expiration com fallback"""
-        if not self.available:
-            return True  # Success in fallback mode
-        try:
-            if self.use_upstash:
-                return self.upstash.setex(key, time, value)
-            else:
-                return self.redis.setex(key, time, value)
-        except Exception as e:
-            logger.warning(f"Redis setex error: {str(e)}")
-            return False
+        return self.conexao.executar(lambda c: c.setex(key, time, value), indisponivel=True, erro=False)
 
     def delete(self, key: str) -> int:
         """Delete com fallback"""
-        if not self.available:
-            return 1  # Success in fallback mode
-        try:
-            if self.use_upstash:
-                return self.upstash.delete(key)
-            else:
-                return self.redis.delete(key)
-        except Exception as e:
-            logger.warning(f"Redis delete error: {str(e)}")
-            return 0
+        return self.conexao.executar(lambda c: c.delete(key), indisponivel=1, erro=0)
 
     def incr(self, key: str) -> int:
         """Increment com fallback"""
-        if not self.available:
-            return 1  # Sempre retorna 1 no fallback
-        try:
-            if self.use_upstash:
-                return self.upstash.incr(key)
-            else:
-                return self.redis.incr(key)
-        except Exception as e:
-            logger.warning(f"Redis incr error: {str(e)}")
-            return 1
+        return self.conexao.executar(lambda c: c.incr(key), indisponivel=1, erro=1)
 
     def expire(self, key: str, time: int) -> bool:
         """Expire com fallback"""
-        if not self.available:
-            return True  # Success in fallback mode
-        try:
-            if self.use_upstash:
-                return self.upstash.expire(key, time)
-            else:
-                return self.redis.expire(key, time)
-        except Exception as e:
-            logger.warning(f"Redis expire error: {str(e)}")
-            return False
+        return self.conexao.executar(lambda c: c.expire(key, time), indisponivel=True, erro=False)
+
+    def mget(self, keys):
+        """Várias chaves numa ida ao Redis (None onde não há)"""
+        return self.conexao.mget(keys)
+
+    def mset(self, mapping, ex: int = None) -> bool:
+        """Várias chaves (com EX opcional) numa ida ao Redis"""
+        return self.conexao.mset(mapping, ex=ex)
 
     def ping(self) -> bool:
         """Test connection"""
-        if not self.available:
-            return False
-        try:
-            if self.use_upstash:
-                return self.upstash.ping()
-            else:
-                return self.redis.ping()
-        except Exception as e:
-            return False
+        return bool(self.conexao.executar(lambda c: c.ping(), indisponivel=False, erro=False))
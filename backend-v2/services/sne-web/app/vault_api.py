@@ -40,11 +40,11 @@ def products():
     GET /api/vault/products
     """
     from app.models import Product
-    from app.utils.redis_safe import SafeRedis
+    from app.utils.redis_safe import cache_compartilhado
     import json
 
     try:
-        redis_client = SafeRedis()
+        redis_client = cache_compartilhado()
 
         # Cache produtos (5min - mudam raramente)
         cache_key = "vault:products"
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+CANDLES
+Contêiner colunar e somente leitura de candles OHLCV:
+arrays float64 contíguos (open/high/low/close/volume) + timestamps int64 (ms).
+
+- tail() e janela() devolvem views sem cópia
+- indicadores ficam num cache lateral (FrameIndicadores), nunca como
+  colunas acrescentadas ao contêiner
+- para_dataframe() existe só nas bordas, para o código que ainda espera pandas
+"""
+
+import numpy as np
+import pandas as pd
+
+from frame_indicadores import FrameIndicadores, compartilhar_frame
+from klines import decodificar_klines
+
+COLUNAS = ('open', 'high', 'low', 'close', 'volume')
+
+
+def _somente_leitura(valores, dtype):
+    array = np.array(valores, dtype=dtype, copy=True, order='C')
+    array.flags.writeable = False
+    return array
+
+
+class Candles:
+    """
+    Candles OHLCV imutáveis
+
+    Args:
+        timestamp: Abertura de cada candle em ms desde epoch
+        open, high, low, close, volume: Sequências do mesmo tamanho
+    """
+
+    __slots__ = ('timestamp', 'open', 'high', 'low', 'close', 'volume', '_series', '_indicadores')
+
+    def __init__(self, timestamp, open, high, low, close, volume, _views=False):
+        if _views:
+            # Uso interno: fatias de arrays já somente leitura
+            valores = (timestamp, open, high, low, close, volume)
+        else:
+            valores = (_somente_leitura(timestamp, np.int64),) + tuple(
+                _somente_leitura(v, np.float64) for v in (open, high, low, close, volume))
+
+        tamanhos = {len(v) for v in valores}
+        if len(tamanhos) > 1:
+            raise ValueError(f"Colunas com tamanhos diferentes: {sorted(tamanhos)}")
+
+        for nome, valor in zip(('timestamp',) + COLUNAS, valores):
+            object.__setattr__(self, nome, valor)
+        object.__setattr__(self, '_series', {})
+        object.__setattr__(self, '_indicadores', None)
+
+    def __setattr__(self, nome, valor):
+        raise AttributeError("Candles é somente leitura")
+
+    # Construção --------------------------------------------------------------
+
+    @classmethod
+    def de_dataframe(cls, df):
+        """A partir de um DataFrame com colunas OHLCV e 'timestamp' (ou DatetimeIndex)"""
+        if 'timestamp' in df.columns:
+            ts = df['timestamp']
+        elif isinstance(df.index, pd.DatetimeIndex):
+            ts = df.index
+        else:
+            ts = np.zeros(len(df), dtype=np.int64)
+        if np.issubdtype(np.asarray(ts).dtype, np.datetime64):
+            ts = np.asarray(ts, dtype='datetime64[ms]').astype(np.int64)
+        return cls(ts, *(df[c].to_numpy() for c in COLUNAS))
+
+    @classmethod
+    def de_klines(cls, klines):
+        """A partir da resposta de /api/v3/klines (bytes, lista de listas ou Klines)"""
+        klines = decodificar_klines(klines)
+        return cls(klines.timestamp, *(klines[c] for c in COLUNAS))
+
+    # Acesso ------------------------------------------------------------------
+
+    def __len__(self):
+        return len(self.close)
+
+    def __getitem__(self, coluna):
+        """Coluna como pd.Series sobre o array (sem cópia), para os cálculos do frame"""
+        serie = self._series.get(coluna)
+        if serie is None:
+            serie = pd.Series(getattr(self, coluna), index=self.index, name=coluna, copy=False)
+            self._series[coluna] = serie
+        return serie
+
+    @property
+    def columns(self):
+        return ('timestamp',) + COLUNAS
+
+    @property
+    def index(self):
+        return pd.RangeIndex(len(self))
+
+    @property
+    def preco_atual(self):
+        return float(self.close[-1]) if len(self) else None
+
+    @property
+    def indicadores(self):
+        """Cache lateral de indicadores (ver FrameIndicadores)"""
+        if self._indicadores is None:
+            object.__setattr__(self, '_indicadores', FrameIndicadores(self))
+        return self._indicadores
+
+    # Views -------------------------------------------------------------------
+
+    def janela(self, inicio, fim=None):
+        """Candles [inicio:fim] como view (sem cópia); cache de indicadores próprio"""
+        fatia = slice(inicio, fim)
+        return Candles(self.timestamp[fatia], *(getattr(self, c)[fatia] for c in COLUNAS), _views=True)
+
+    def tail(self, n):
+        return self.janela(max(len(self) - n, 0))
+
+    # Bordas ------------------------------------------------------------------
+
+    def para_dataframe(self):
+        """
+        DataFrame compatível com coletar_dados (timestamp datetime64[ms] + OHLCV)
+
+        O DataFrame recebe cópias graváveis das colunas e compartilha o cache
+        de indicadores deste contêiner.
+        """
+        df = pd.DataFrame({'timestamp': self.timestamp.astype('datetime64[ms]')})
+        for coluna in COLUNAS:
+            df[coluna] = np.array(getattr(self, coluna))
+        return compartilhar_frame(self, df)
+
+    def __getstate__(self):
+        return {nome: getattr(self, nome) for nome in ('timestamp',) + COLUNAS}
+
+    def __setstate__(self, estado):
+        for nome, valor in estado.items():
+            valor.flags.writeable = False
+            object.__setattr__(self, nome, valor)
+        object.__setattr__(self, '_series', {})
+        object.__setattr__(self, '_indicadores', None)
+
+    def __repr__(self):
+        return f"Candles({len(self)} candles)"
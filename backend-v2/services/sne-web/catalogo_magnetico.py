@@ -1,10 +1,286 @@
 import pandas as pd
+import bisect
+import csv
+import io
 import os
+import threading
+import time
 from datetime import datetime
 
 # Caminho para o arquivo CSV que armazena as zonas magnéticas
 CAMINHO_CATALOGO = "catalogo_magnetico.csv"
 
+# Log de eventos (append-only) ao lado do CSV; compactado no CSV periodicamente
+SUFIXO_LOG = ".log"
+LIMITE_LOG = int(os.getenv('MOTOR_CATALOGO_COMPACTAR', 500))      # eventos até compactar
+INTERVALO_VERIFICACAO = float(os.getenv('MOTOR_CATALOGO_VERIFICAR', 1.0))  # segundos entre stats
+
+COLUNAS_CATALOGO = ["zona", "forca_total", "ocorrencias", "ultima_data"]
+
+
+# ============================================================================
+# CATÁLOGO EM MEMÓRIA
+# ============================================================================
+
+class CatalogoMagnetico:
+    """
+    Catálogo de zonas magnéticas mantido em memória
+
+    - Zonas num array ordenado: zona mais próxima e zonas dentro de uma
+      margem por bisect, sem ler disco por consulta
+    - Força e ocorrências atualizadas incrementalmente
+    - Persistência: CSV (snapshot) + log append-only com os eventos; o log
+      é compactado no CSV a cada LIMITE_LOG eventos
+    - Outros processos escrevendo no mesmo catálogo são percebidos por
+      os.stat (no máximo a cada INTERVALO_VERIFICACAO): log que cresceu é
+      lido só a partir do ponto já aplicado; CSV trocado recarrega tudo
+
+    Args:
+        caminho: CSV do catálogo (default CAMINHO_CATALOGO)
+    """
+
+    def __init__(self, caminho=None, limite_log=None, intervalo_verificacao=None):
+        self.caminho = caminho or CAMINHO_CATALOGO
+        self.caminho_log = self.caminho + SUFIXO_LOG
+        self.limite_log = LIMITE_LOG if limite_log is None else limite_log
+        self.intervalo_verificacao = (INTERVALO_VERIFICACAO if intervalo_verificacao is None
+                                      else intervalo_verificacao)
+
+        self._trava = threading.RLock()
+        self._zonas = []            # zonas ordenadas
+        self._dados = {}            # zona -> [forca_total, ocorrencias, ultima_data]
+        self._mais_fortes = None    # cache da ordenação por força
+        self._assinatura_csv = None
+        self._log_inode = None
+        self._log_offset = 0
+        self._eventos_log = 0       # eventos no log ainda não compactados
+        self._ultima_verificacao = 0.0
+        self.recargas = 0
+        self._carregar()
+
+    # Consultas ---------------------------------------------------------------
+
+    def __len__(self):
+        self._verificar()
+        return len(self._zonas)
+
+    @property
+    def existe(self):
+        return os.path.exists(self.caminho) or os.path.exists(self.caminho_log)
+
+    def zona_mais_proxima(self, preco):
+        """(zona, distância) da zona mais próxima do preço, ou (None, None)"""
+        self._verificar()
+        with self._trava:
+            zonas = self._zonas
+            if not zonas:
+                return None, None
+            i = bisect.bisect_left(zonas, preco)
+            candidatas = zonas[max(i - 1, 0):i + 1]
+            zona = min(candidatas, key=lambda z: abs(z - preco))
+            return zona, abs(zona - preco)
+
+    def zonas_na_margem(self, preco, margem):
+        """Zonas em [preco - margem, preco + margem], em ordem crescente"""
+        self._verificar()
+        with self._trava:
+            inicio = bisect.bisect_left(self._zonas, preco - margem)
+            fim = bisect.bisect_right(self._zonas, preco + margem)
+            return self._zonas[inicio:fim]
+
+    def mais_fortes(self, limite=10):
+        """Zonas com maior força total"""
+        self._verificar()
+        with self._trava:
+            if self._mais_fortes is None:
+                self._mais_fortes = sorted(self._zonas, key=lambda z: -self._dados[z][0])
+            return self._mais_fortes[:limite]
+
+    def registro(self, zona):
+        """{'zona', 'forca_total', 'ocorrencias', 'ultima_data'} ou None"""
+        self._verificar()
+        with self._trava:
+            dados = self._dados.get(float(zona))
+            if dados is None:
+                return None
+            return dict(zip(COLUNAS_CATALOGO, [float(zona)] + list(dados)))
+
+    def registros(self):
+        """Todos os registros, ordenados por zona"""
+        self._verificar()
+        with self._trava:
+            return [dict(zip(COLUNAS_CATALOGO, [z] + list(self._dados[z]))) for z in self._zonas]
+
+    # Atualização -------------------------------------------------------------
+
+    def registrar(self, eventos):
+        """
+        Soma rupturas ao catálogo e grava no log
+
+        Args:
+            eventos: Iterável de (zona, forca, data)
+        """
+        linhas = io.StringIO()
+        escritor = csv.writer(linhas, lineterminator='\n')
+        eventos = [(float(z), float(f), str(d)) for z, f, d in eventos]
+        if not eventos:
+            return
+        escritor.writerows(eventos)
+
+        with self._trava:
+            try:
+                with open(self.caminho_log, 'a', encoding='utf-8') as log:
+                    log.write(linhas.getvalue())
+            except OSError as e:
+                # Sem disco: mantém em memória
+                print(f"[CATÁLOGO] ⚠️ Falha ao gravar log: {e}")
+                for evento in eventos:
+                    self._aplicar(*evento)
+                return
+
+            # O próprio log é a fonte: lê o que entrou desde o último ponto
+            # (inclui eventos de outros processos)
+            self._verificar(forcar=True)
+            if self.limite_log and self._eventos_log >= self.limite_log:
+                self.compactar()
+
+    def compactar(self):
+        """Grava o estado atual no CSV (troca atômica) e zera o log"""
+        with self._trava:
+            self._verificar(forcar=True)
+            temporario_log = self.caminho_log + '.compactando'
+            try:
+                if os.path.exists(self.caminho_log):
+                    os.replace(self.caminho_log, temporario_log)
+                    # Eventos gravados entre a última leitura e a troca
+                    self._ler_log(temporario_log, self._log_offset)
+
+                temporario = self.caminho + '.tmp'
+                with open(temporario, 'w', encoding='utf-8', newline='') as arquivo:
+                    escritor = csv.writer(arquivo, lineterminator='\n')
+                    escritor.writerow(COLUNAS_CATALOGO)
+                    for zona in sorted(self._zonas, key=lambda z: -self._dados[z][0]):
+                        forca, ocorrencias, data = self._dados[zona]
+                        escritor.writerow([zona, forca, ocorrencias, data])
+                os.replace(temporario, self.caminho)
+                if os.path.exists(temporario_log):
+                    os.remove(temporario_log)
+            except OSError as e:
+                print(f"[CATÁLOGO] ⚠️ Falha ao compactar: {e}")
+                return
+
+            self._assinatura_csv = _assinatura(self.caminho)
+            self._log_inode = None
+            self._log_offset = 0
+            self._eventos_log = 0
+
+    # Internos ----------------------------------------------------------------
+
+    def _aplicar(self, zona, forca, data, ocorrencias=1):
+        dados = self._dados.get(zona)
+        if dados is None:
+            self._dados[zona] = [forca, ocorrencias, data]
+            bisect.insort(self._zonas, zona)
+        else:
+            dados[0] += forca
+            dados[1] += ocorrencias
+            dados[2] = data
+        self._mais_fortes = None
+
+    def _carregar(self):
+        """Estado = CSV + todo o log"""
+        with self._trava:
+            self._zonas = []
+            self._dados = {}
+            self._mais_fortes = None
+            self._log_inode = None
+            self._log_offset = 0
+            self._eventos_log = 0
+            self._assinatura_csv = _assinatura(self.caminho)
+            if self._assinatura_csv is not None:
+                self._ler_csv()
+            self._ler_log(self.caminho_log, 0)
+            self._ultima_verificacao = time.monotonic()
+            self.recargas += 1
+
+    def _ler_csv(self):
+        try:
+            with open(self.caminho, encoding='utf-8', newline='') as arquivo:
+                for linha in csv.DictReader(arquivo):
+                    try:
+                        zona = float(linha['zona'])
+                    except (KeyError, TypeError, ValueError):
+                        continue
+                    # Aceita também o formato antigo de registrar_ruptura (zona, timestamp)
+                    forca = float(linha.get('forca_total') or 0)
+                    ocorrencias = int(float(linha.get('ocorrencias') or 1))
+                    data = linha.get('ultima_data') or linha.get('timestamp') or ''
+                    self._aplicar(zona, forca, data, ocorrencias)
+        except OSError:
+            pass
+
+    def _ler_log(self, caminho, offset):
+        """Aplica os eventos do log a partir de offset (só linhas completas)"""
+        try:
+            with open(caminho, 'rb') as log:
+                estado = os.fstat(log.fileno())
+                log.seek(offset)
+                bruto = log.read()
+        except OSError:
+            return
+        completo = bruto[:bruto.rfind(b'\n') + 1]
+        for zona, forca, data in csv.reader(io.StringIO(completo.decode('utf-8'))):
+            self._aplicar(float(zona), float(forca), data)
+            self._eventos_log += 1
+        if caminho == self.caminho_log:
+            self._log_inode = estado.st_ino
+            self._log_offset = offset + len(completo)
+
+    def _verificar(self, forcar=False):
+        """Recarrega só se os arquivos mudaram (os.stat, sem leitura)"""
+        agora = time.monotonic()
+        if not forcar and agora - self._ultima_verificacao < self.intervalo_verificacao:
+            return
+        with self._trava:
+            self._ultima_verificacao = agora
+            if _assinatura(self.caminho) != self._assinatura_csv:
+                self._carregar()
+                return
+            try:
+                estado = os.stat(self.caminho_log)
+            except OSError:
+                if self._log_inode is not None:
+                    self._carregar()     # log removido por outro processo
+                return
+            if self._log_inode not in (None, estado.st_ino) or estado.st_size < self._log_offset:
+                self._carregar()
+            elif estado.st_size > self._log_offset:
+                self._ler_log(self.caminho_log, self._log_offset)
+
+
+def _assinatura(caminho):
+    try:
+        estado = os.stat(caminho)
+    except OSError:
+        return None
+    return estado.st_ino, estado.st_mtime_ns, estado.st_size
+
+
+_catalogo = None
+_trava_catalogo = threading.Lock()
+
+
+def obter_catalogo():
+    """Catálogo do processo (carregado uma vez, ver CatalogoMagnetico)"""
+    global _catalogo
+    caminho = os.path.abspath(CAMINHO_CATALOGO)
+    if _catalogo is None or _catalogo.caminho != caminho:
+        with _trava_catalogo:
+            if _catalogo is None or _catalogo.caminho != caminho:
+                _catalogo = CatalogoMagnetico(caminho)
+    return _catalogo
+
+
 # ✅ Atualização do Catálogo de Zonas Magnéticas
 def atualizar_catalogo(df):
     """
@@ -14,50 +290,15 @@ def atualizar_catalogo(df):
         print("[CATÁLOGO] Nenhuma ruptura detectada.")
         return
 
-    df_rupturas = df[df["ruptura"]].copy()
-    df_rupturas["zona"] = (df_rupturas["close"] // 50) * 50
-    df_rupturas["forca"] = df_rupturas["densidade"]
-
-    try:
-        catalogo = pd.read_csv(CAMINHO_CATALOGO)
-    except FileNotFoundError:
-        catalogo = pd.DataFrame(columns=["zona", "forca_total", "ocorrencias", "ultima_data"])
-
-    zonas_existentes = catalogo["zona"].values if not catalogo.empty else []
-
-    for idx, row in df_rupturas.iterrows():
-        zona = row["zona"]
-        densidade = row["forca"]
-        # Usar timestamp do DataFrame se disponível, senão usar índice
-        if hasattr(idx, 'strftime'):
-            data = idx.strftime('%Y-%m-%d %H:%M:%S')
-        else:
-            data = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    df_rupturas = df[df["ruptura"]]
+    zonas = (df_rupturas["close"] // 50) * 50
+    # Usar timestamp do DataFrame se disponível, senão o horário atual
+    if hasattr(df_rupturas.index, 'strftime'):
+        datas = df_rupturas.index.strftime('%Y-%m-%d %H:%M:%S')
+    else:
+        datas = [datetime.now().strftime('%Y-%m-%d %H:%M:%S')] * len(df_rupturas)
 
-        if zona in zonas_existentes:
-            idx = catalogo.index[catalogo["zona"] == zona][0]
-            catalogo.at[idx, "forca_total"] += densidade
-            catalogo.at[idx, "ocorrencias"] += 1
-            catalogo.at[idx, "ultima_data"] = data
-        else:
-            novo = {
-                "zona": zona,
-                "forca_total": densidade,
-                "ocorrencias": 1,
-                "ultima_data": data
-            }
-            catalogo = pd.concat([catalogo, pd.DataFrame([novo])], ignore_index=True)
-
-    # Consolidar zonas duplicadas
-    if not catalogo.empty:
-        catalogo = catalogo.groupby('zona').agg({
-            'forca_total': 'sum',
-            'ocorrencias': 'sum',
-            'ultima_data': 'last'
-        }).reset_index()
-        catalogo = catalogo.sort_values('forca_total', ascending=False)
-    
-    catalogo.to_csv(CAMINHO_CATALOGO, index=False)
+    obter_catalogo().registrar(zip(zonas.to_numpy(), df_rupturas["densidade"].to_numpy(), datas))
     print(f"[CATÁLOGO] Atualizado com {len(df_rupturas)} rupturas.")
 
 # ✅ Exibir Zonas Relevantes
@@ -65,29 +306,18 @@ def exibir_zonas_relevantes(limite=5):
     """
     Retorna uma lista das zonas magnéticas mais relevantes com base na força média.
     """
-    try:
-        catalogo = pd.read_csv(CAMINHO_CATALOGO)
-    except FileNotFoundError:
-        # Não imprimir mensagem de erro repetidamente
-        return []
-
-    if catalogo.empty:
+    registros = obter_catalogo().registros()
+    if not registros:
         # Não imprimir mensagem de catálogo vazio repetidamente
         return []
 
-    catalogo["forca_media"] = catalogo["forca_total"] / catalogo["ocorrencias"]
-    catalogo = catalogo.sort_values(by="forca_media", ascending=False)
-
-    zonas_relevantes = []
-    for _, row in catalogo.head(limite).iterrows():
-        zonas_relevantes.append({
-            "zona": float(row["zona"]),
-            "forca_total": round(row["forca_total"], 2),
-            "ocorrencias": int(row["ocorrencias"]),
-            "ultima_data": row["ultima_data"]
-        })
-
-    return zonas_relevantes
+    registros.sort(key=lambda r: r["forca_total"] / r["ocorrencias"], reverse=True)
+    return [{
+        "zona": float(r["zona"]),
+        "forca_total": round(r["forca_total"], 2),
+        "ocorrencias": int(r["ocorrencias"]),
+        "ultima_data": r["ultima_data"]
+    } for r in registros[:limite]]
 
 # ✅ Obter Zonas Magnéticas (Lista Simples)
 def obter_zonas_magneticas():
@@ -95,39 +325,25 @@ def obter_zonas_magneticas():
     Retorna lista simples com os valores das zonas magnéticas.
     Usado pelo modo_renan.py
     """
-    try:
-        catalogo = pd.read_csv(CAMINHO_CATALOGO)
-        if catalogo.empty:
-            return []
-        
-        # Retornar apenas os valores das zonas (top 10 mais fortes)
-        catalogo = catalogo.sort_values('forca_total', ascending=False)
-        return catalogo['zona'].head(10).tolist()
-    except FileNotFoundError:
-        return []
+    # Top 10 mais fortes, direto da memória
+    return obter_catalogo().mais_fortes(10)
 
 # ✅ Verificação de Ressonância
 def verificar_ressonancia(preco_atual, margem=10):
     """
     Verifica se o preço atual está em uma zona de ressonância mapeada.
     """
-    try:
-        catalogo = pd.read_csv(CAMINHO_CATALOGO)
-    except FileNotFoundError:
+    catalogo = obter_catalogo()
+    if not catalogo.existe:
         print("[ERRO] Catálogo Magnético não encontrado.")
         return False
 
-    if catalogo.empty:
-        # Não imprimir mensagem de catálogo vazio repetidamente
-        return False
+    # Verifica se o preço está dentro da margem de alguma zona (bisect)
+    zonas = catalogo.zonas_na_margem(preco_atual, margem)
+    if zonas:
+        print(f"[RESSONÂNCIA] Preço {preco_atual} em zona magnética {zonas[0]}")
+        return True
 
-    # Verifica se o preço está dentro da margem de alguma zona
-    zonas = catalogo["zona"].values
-    for zona in zonas:
-        if abs(preco_atual - zona) <= margem:
-            print(f"[RESSONÂNCIA] Preço {preco_atual} em zona magnética {zona}")
-            return True
-    
     return False
 
 # ✅ Identificação de Proximidade com Zona Magnética
@@ -147,14 +363,8 @@ def registrar_ruptura(preco, timestamp):
     """
     Registra uma nova ruptura magnética no catálogo.
     """
-    if not os.path.exists(CAMINHO_CATALOGO):
-        df = pd.DataFrame(columns=["zona", "timestamp"])
-    else:
-        df = pd.read_csv(CAMINHO_CATALOGO)
-
-    nova_entrada = {"zona": preco, "timestamp": timestamp}
-    df = pd.concat([df, pd.DataFrame([nova_entrada])], ignore_index=True)
-    df.to_csv(CAMINHO_CATALOGO, index=False)
+    # Ocorrência sem densidade medida (antes gravava outro esquema no mesmo CSV)
+    obter_catalogo().registrar([(preco, 0.0, timestamp)])
     print(f"🔴 Ruptura registrada em {preco} USDT | ⏱ {timestamp}")
 
 # ✅ Identificação de Compressão Magnética
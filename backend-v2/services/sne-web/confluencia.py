@@ -54,12 +54,9 @@ def calcular_confluencia(mtf, fluxo, zonas, sentiment):
     
     # 2. Fluxo DOM (peso 2.5)
     if fluxo and 'pressao' in fluxo:
-        if fluxo['pressao'] in ['COMPRA', 'VENDA']:
-            score += 2.5
-            validacoes.append({'camada': 'Fluxo DOM', 'contribuicao': 2.5, 'status': '✅'})
-        else:
-            score += 1
-            validacoes.append({'camada': 'Fluxo DOM', 'contribuicao': 1, 'status': '⚠️'})
+        contribuicao, status = avaliar_fluxo(fluxo)
+        score += contribuicao
+        validacoes.append({'camada': 'Fluxo DOM', 'contribuicao': contribuicao, 'status': status})
     
     # 3. Zonas Magnéticas (peso 2)
     if zonas and 'zona_proxima' in zonas:
@@ -93,6 +90,31 @@ def calcular_confluencia(mtf, fluxo, zonas, sentiment):
     }
 
 
+def avaliar_fluxo(fluxo, banda_proxima=0.5):
+    """
+    Contribuição do fluxo DOM (0-2.5)
+
+    A pressão total (bids/asks em todo o book) só vale 2.5 quando o
+    desequilíbrio perto do preço (bandas até banda_proxima %) concorda;
+    sem bandas, mantém a regra só pela pressão.
+    """
+    pressao = fluxo.get('pressao')
+    bandas = [b for b in fluxo.get('bandas') or [] if b.get('banda_pct', 0) <= banda_proxima]
+    imbalance = sum(b['imbalance'] for b in bandas) / len(bandas) if bandas else None
+
+    if pressao in ['COMPRA', 'VENDA']:
+        sentido = 1 if pressao == 'COMPRA' else -1
+        if imbalance is None or imbalance * sentido > -0.1:
+            return 2.5, '✅'
+        # Liquidez perto do preço contra a pressão total
+        return 1.5, '⚠️'
+
+    # Book neutro no total mas desequilibrado perto do preço
+    if imbalance is not None and abs(imbalance) >= 0.3:
+        return 1.5, '⚠️'
+    return 1, '⚠️'
+
+
 def interpretar_confluencia(score):
     """Interpreta o score de confluência"""
     if score >= 8:
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+EXECUTOR DE ESTÁGIOS
+Executa o pipeline do motor como um grafo de dependências:
+cada estágio declara entradas e saídas, e estágios independentes
+rodam em paralelo num pool de threads
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# Limite de estágios simultâneos por análise
+MAX_WORKERS_ESTAGIOS = int(os.getenv('MOTOR_STAGE_WORKERS', 6))
+
+
+class Estagio:
+    """
+    Um estágio do pipeline
+
+    Args:
+        nome: Identificador do estágio (usado nos tempos)
+        func: Função chamada com as entradas como argumentos nomeados
+        entradas: Chaves do contexto lidas pelo estágio
+        saidas: Chaves do contexto produzidas; com uma saída a função
+                retorna o valor, com várias retorna uma tupla na mesma ordem
+    """
+
+    def __init__(self, nome, func, entradas=(), saidas=()):
+        self.nome = nome
+        self.func = func
+        self.entradas = tuple(entradas)
+        self.saidas = tuple(saidas)
+
+    def executar(self, contexto):
+        """
+        Executa o estágio e devolve {saida: valor}
+
+        Raises:
+            ValueError se a função devolver um número de valores diferente
+            das saídas declaradas
+        """
+        resultado = self.func(**{chave: contexto[chave] for chave in self.entradas})
+        if len(self.saidas) == 1:
+            return {self.saidas[0]: resultado}
+        if len(self.saidas) == 0:
+            return {}
+        resultado = tuple(resultado)
+        if len(resultado) != len(self.saidas):
+            raise ValueError(f"Estágio {self.nome}: {len(resultado)} valores para "
+                             f"{len(self.saidas)} saídas {list(self.saidas)}")
+        return dict(zip(self.saidas, resultado))
+
+    def __repr__(self):
+        return f"Estagio({self.nome!r}, {list(self.entradas)} -> {list(self.saidas)})"
+
+
+def validar_estagios(estagios, chaves_iniciais=()):
+    """
+    Valida o grafo: nomes e saídas únicos, entradas resolvíveis e sem ciclos
+
+    Raises:
+        ValueError com a descrição do problema
+    """
+    nomes = set()
+    produtores = {chave: None for chave in chaves_iniciais}
+    for estagio in estagios:
+        if estagio.nome in nomes:
+            raise ValueError(f"Estágio duplicado: {estagio.nome}")
+        nomes.add(estagio.nome)
+        for saida in estagio.saidas:
+            if saida in produtores:
+                origem = produtores[saida] or 'contexto inicial'
+                raise ValueError(f"Saída '{saida}' produzida por {origem} e {estagio.nome}")
+            produtores[saida] = estagio.nome
+
+    for estagio in estagios:
+        faltando = [e for e in estagio.entradas if e not in produtores]
+        if faltando:
+            raise ValueError(f"Estágio {estagio.nome}: entradas sem produtor {faltando}")
+
+    # Ciclos: ordenação topológica simulada
+    disponiveis = set(chaves_iniciais)
+    pendentes = list(estagios)
+    while pendentes:
+        prontos = [e for e in pendentes if all(x in disponiveis for x in e.entradas)]
+        if not prontos:
+            raise ValueError(f"Ciclo de dependências entre {[e.nome for e in pendentes]}")
+        for estagio in prontos:
+            disponiveis.update(estagio.saidas)
+            pendentes.remove(estagio)
+
+
+def estagios_necessarios(estagios, saidas):
+    """
+    Subconjunto dos estágios necessário para produzir `saidas`
+
+    Percorre o grafo de trás para frente: entram os produtores das saídas
+    pedidas e, recursivamente, os produtores das entradas deles. Chaves sem
+    produtor (contexto inicial) são ignoradas.
+
+    Returns:
+        Lista de Estagio na ordem em que foram declarados
+    """
+    produtores = {saida: estagio for estagio in estagios for saida in estagio.saidas}
+    necessarios = set()
+    pendentes = list(saidas)
+    while pendentes:
+        estagio = produtores.get(pendentes.pop())
+        if estagio is None or estagio.nome in necessarios:
+            continue
+        necessarios.add(estagio.nome)
+        pendentes.extend(estagio.entradas)
+    return [estagio for estagio in estagios if estagio.nome in necessarios]
+
+
+def executar_estagios(estagios, contexto, max_workers=None):
+    """
+    Executa os estágios respeitando as dependências
+
+    Um estágio é submetido ao pool assim que todas as suas entradas
+    estão no contexto. Exceções de um estágio são propagadas depois
+    que os estágios em andamento terminam.
+
+    Args:
+        estagios: Lista de Estagio
+        contexto: dict com as chaves iniciais (é atualizado in-place)
+        max_workers: Tamanho do pool (default MOTOR_STAGE_WORKERS)
+
+    Returns:
+        (contexto, tempos) onde tempos é {nome_estagio: segundos}
+    """
+    validar_estagios(estagios, contexto.keys())
+
+    tempos = {}
+    pendentes = list(estagios)
+    em_execucao = {}
+    workers = max(1, min(max_workers or MAX_WORKERS_ESTAGIOS, len(estagios) or 1))
+
+    def _rodar(estagio):
+        inicio = time.perf_counter()
+        try:
+            return estagio.executar(contexto)
+        finally:
+            tempos[estagio.nome] = time.perf_counter() - inicio
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='motor-estagio') as pool:
+        while pendentes or em_execucao:
+            prontos = [e for e in pendentes if all(x in contexto for x in e.entradas)]
+            for estagio in prontos:
+                pendentes.remove(estagio)
+                em_execucao[pool.submit(_rodar, estagio)] = estagio
+            if not em_execucao:
+                # Nada rodando e nenhum pendente pronto: esperar seria para sempre
+                faltando = {e.nome: [x for x in e.entradas if x not in contexto] for e in pendentes}
+                raise RuntimeError(f"Estágios sem como rodar (entradas nunca produzidas): {faltando}")
+
+            concluidos, _ = wait(list(em_execucao), return_when=FIRST_COMPLETED)
+            for futuro in concluidos:
+                em_execucao.pop(futuro)
+                erro = futuro.exception()
+                if erro is not None:
+                    wait(list(em_execucao))
+                    raise erro
+                contexto.update(futuro.result())
+
+    return contexto, tempos
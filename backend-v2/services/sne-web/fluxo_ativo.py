@@ -4,7 +4,87 @@
 FLUXO ATIVO - Análise de Liquidez e DOM
 """
 
-import requests
+import numpy as np
+
+from http_upstream import upstream_get
+from rastreamento import registrar_transferencia
+from livro_ofertas import LivroOfertas, obter_livro
+
+# Faixas de distância do preço médio (%) para o desequilíbrio por banda
+BANDAS_DEPTH = (0.1, 0.5, 1.0, 2.0)
+# Maiores paredes (níveis com mais notional) por lado
+N_PAREDES = 3
+
+
+def _lado_em_arrays(niveis):
+    """[[preco, qtd], ...] (strings da Binance ou floats) → (precos, qtds)"""
+    arr = np.asarray(niveis, dtype=float).reshape(-1, 2)
+    return arr[:, 0], arr[:, 1]
+
+
+def _notional_por_distancia(precos, qtds, meio, sentido, bandas):
+    """
+    Notional acumulado de um lado até cada distância de banda
+
+    Distância relativa ao meio (em %) ordenada + cumsum do notional;
+    searchsorted acha o último nível dentro de cada banda.
+    """
+    distancias = sentido * (precos - meio) / meio * 100
+    ordem = np.argsort(distancias, kind='stable')   # já vem ordenado: O(n)
+    acumulado = np.concatenate(([0.0], np.cumsum((precos * qtds)[ordem])))
+    return acumulado[np.searchsorted(distancias[ordem], bandas, side='right')]
+
+
+def _paredes(precos, qtds, meio, n=N_PAREDES):
+    """Os n níveis com maior notional, do maior para o menor"""
+    if not len(precos):
+        return []
+    notional = precos * qtds
+    n = min(n, len(notional))
+    maiores = np.argpartition(notional, -n)[-n:]
+    maiores = maiores[np.argsort(-notional[maiores], kind='stable')]
+    return [{
+        'preco': float(precos[i]),
+        'quantidade': float(qtds[i]),
+        'notional': float(notional[i]),
+        'distancia_pct': float(abs(precos[i] - meio) / meio * 100),
+    } for i in maiores]
+
+
+def calcular_bandas_depth(bid_precos, bid_qtds, ask_precos, ask_qtds, meio, bandas=BANDAS_DEPTH):
+    """
+    Notional de bids/asks e desequilíbrio em faixas de distância do meio
+
+    Args:
+        bid_precos, bid_qtds, ask_precos, ask_qtds: Arrays do order book
+        meio: Preço médio entre melhor bid e melhor ask
+        bandas: Distâncias (%) do meio
+
+    Returns:
+        (bandas, paredes): lista de {'banda_pct', 'bid_notional', 'ask_notional',
+        'imbalance'} com imbalance = (bid - ask) / (bid + ask) em [-1, 1], e
+        {'bids': [...], 'asks': [...]} com as maiores paredes
+    """
+    if not meio:
+        return [], {'bids': [], 'asks': []}
+
+    limites = np.asarray(bandas, dtype=float)
+    bid = _notional_por_distancia(bid_precos, bid_qtds, meio, -1, limites)
+    ask = _notional_por_distancia(ask_precos, ask_qtds, meio, 1, limites)
+    total = bid + ask
+    imbalance = np.divide(bid - ask, total, out=np.zeros_like(total), where=total > 0)
+
+    resultado = [{
+        'banda_pct': float(banda),
+        'bid_notional': float(b),
+        'ask_notional': float(a),
+        'imbalance': float(i),
+    } for banda, b, a, i in zip(limites, bid, ask, imbalance)]
+    paredes = {
+        'bids': _paredes(bid_precos, bid_qtds, meio),
+        'asks': _paredes(ask_precos, ask_qtds, meio),
+    }
+    return resultado, paredes
 
 
 class FluxoAtivo:
@@ -14,11 +94,17 @@ class FluxoAtivo:
         self.base_url = "https://api.binance.com/api/v3"
     
     def obter_depth(self, symbol: str, limit: int = 5000):
-        """Obtém order book depth da Binance"""
+        """Obtém order book depth (livro local se sincronizado, senão REST da Binance)"""
+        livro = obter_livro(symbol)
+        if livro is not None:
+            registrar_transferencia(0, cache=True)
+            return livro.como_depth(limit)
+
         try:
             url = f"{self.base_url}/depth"
             params = {"symbol": symbol, "limit": limit}
-            response = requests.get(url, params=params, timeout=5)
+            response = upstream_get(url, params=params, timeout=5)
+            registrar_transferencia(len(response.content), cache=False)
             
             if response.status_code == 200:
                 return response.json()
@@ -26,30 +112,53 @@ class FluxoAtivo:
         except:
             return None
     
-    def calcular_pressao_liquidez(self, symbol: str):
-        """Calcula pressão de compra/venda no order book"""
+    def calcular_pressao_liquidez(self, symbol: str, depth: dict = None):
+        """
+        Calcula pressão de compra/venda no order book
+        
+        Args:
+            symbol: Par a analisar
+            depth: Order book já carregado (ex: DadosMercado.depth) ou um
+                   LivroOfertas; se None, usa o livro local do símbolo ou
+                   busca na Binance
+        """
         try:
-            depth = self.obter_depth(symbol, limit=1000)
+            if depth is None:
+                depth = obter_livro(symbol) or self.obter_depth(symbol, limit=1000)
             
-            if not depth:
+            if isinstance(depth, LivroOfertas):
+                # Totais e topo mantidos pelo livro: O(1)
+                bid_density, ask_density = depth.densidades()
+                best_bid, best_ask = depth.melhor_bid, depth.melhor_ask
+                bid_precos, bid_qtds, ask_precos, ask_qtds = depth.arrays()
+            elif not depth:
                 return {
                     'bid_density': 0,
                     'ask_density': 0,
                     'ratio': 1.0,
                     'pressao': 'NEUTRO',
                     'score': 0,
-                    'preco_atual': 0
+                    'preco_atual': 0,
+                    'bandas': [],
+                    'paredes': {'bids': [], 'asks': []}
                 }
+            else:
+                bid_precos, bid_qtds = _lado_em_arrays(depth['bids'])
+                ask_precos, ask_qtds = _lado_em_arrays(depth['asks'])
+                
+                # Calcular densidade de bids e asks
+                bid_density = float(bid_qtds.sum())
+                ask_density = float(ask_qtds.sum())
+                
+                # Obter preço atual (média entre melhor bid e ask)
+                best_bid = float(bid_precos[0]) if len(bid_precos) else 0
+                best_ask = float(ask_precos[0]) if len(ask_precos) else 0
             
-            # Calcular densidade de bids e asks
-            bid_density = sum([float(b[1]) for b in depth['bids']])
-            ask_density = sum([float(a[1]) for a in depth['asks']])
-            
-            # Obter preço atual (média entre melhor bid e ask)
-            best_bid = float(depth['bids'][0][0]) if depth['bids'] else 0
-            best_ask = float(depth['asks'][0][0]) if depth['asks'] else 0
             preco_atual = (best_bid + best_ask) / 2 if best_bid > 0 and best_ask > 0 else 0
             
+            # Onde a liquidez está: notional e desequilíbrio por distância do meio
+            bandas, paredes = calcular_bandas_depth(bid_precos, bid_qtds, ask_precos, ask_qtds, preco_atual)
+            
             # Evitar divisão por zero
             if ask_density == 0:
                 ratio = 2.0
@@ -73,7 +182,9 @@ class FluxoAtivo:
                 'ratio': ratio,
                 'pressao': pressao,
                 'score': score,
-                'preco_atual': preco_atual
+                'preco_atual': preco_atual,
+                'bandas': bandas,
+                'paredes': paredes
             }
         
         except Exception as e:
@@ -84,6 +195,8 @@ class FluxoAtivo:
                 'pressao': 'NEUTRO',
                 'score': 0,
                 'preco_atual': 0,
+                'bandas': [],
+                'paredes': {'bids': [], 'asks': []},
                 'erro': str(e)
             }
     
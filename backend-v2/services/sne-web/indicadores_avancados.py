@@ -14,6 +14,9 @@ warnings.filterwarnings('ignore')
 
 # Importar funções básicas do módulo original
 from indicadores import calcular_indicadores, detectar_padroes_candlestick
+from kernels_numericos import obv, desvio_medio_movel, psar
+from perfil_volume import calcular_perfil_volume
+from frame_indicadores import frame_indicadores, compartilhar_frame
 
 
 # ============================================================================
@@ -23,8 +26,9 @@ from indicadores import calcular_indicadores, detectar_padroes_candlestick
 def calcular_williams_r(df, periodo=14):
     """Calcula Williams %R - Oscilador de momentum"""
     try:
-        high_max = df['high'].rolling(window=periodo).max()
-        low_min = df['low'].rolling(window=periodo).min()
+        frame = frame_indicadores(df)
+        high_max = frame.maxima(periodo)
+        low_min = frame.minima(periodo)
         df['Williams_R'] = ((high_max - df['close']) / (high_max - low_min)) * -100
         return df
     except Exception as e:
@@ -36,13 +40,13 @@ def calcular_cci(df, periodo=20):
     """Calcula Commodity Channel Index (CCI)"""
     try:
         # Typical Price
-        tp = (df['high'] + df['low'] + df['close']) / 3
+        tp = frame_indicadores(df).preco_tipico()
         
         # Simple Moving Average of TP
         sma_tp = tp.rolling(window=periodo).mean()
         
-        # Mean Deviation
-        md = tp.rolling(window=periodo).apply(lambda x: np.mean(np.abs(x - x.mean())))
+        # Mean Deviation (todas as janelas de uma vez)
+        md = pd.Series(desvio_medio_movel(tp.values, periodo), index=df.index)
         
         # CCI
         df['CCI'] = (tp - sma_tp) / (0.015 * md)
@@ -56,7 +60,7 @@ def calcular_mfi(df, periodo=14):
     """Calcula Money Flow Index (MFI) - RSI baseado em volume"""
     try:
         # Typical Price
-        tp = (df['high'] + df['low'] + df['close']) / 3
+        tp = frame_indicadores(df).preco_tipico()
         
         # Raw Money Flow
         rmf = tp * df['volume']
@@ -81,14 +85,7 @@ def calcular_mfi(df, periodo=14):
 def calcular_adx(df, periodo=14):
     """Calcula Average Directional Index (ADX)"""
     try:
-        # True Range
-        tr = np.maximum(
-            df['high'] - df['low'],
-            np.maximum(
-                abs(df['high'] - df['close'].shift(1)),
-                abs(df['low'] - df['close'].shift(1))
-            )
-        )
+        frame = frame_indicadores(df)
         
         # Directional Movement
         dm_plus = np.where(
@@ -101,7 +98,7 @@ def calcular_adx(df, periodo=14):
         )
         
         # Smoothed values
-        atr = tr.rolling(window=periodo).mean()
+        atr = frame.atr(periodo)
         di_plus = 100 * (pd.Series(dm_plus).rolling(window=periodo).mean() / atr)
         di_minus = 100 * (pd.Series(dm_minus).rolling(window=periodo).mean() / atr)
         
@@ -120,43 +117,8 @@ def calcular_adx(df, periodo=14):
 def calcular_parabolic_sar(df, af=0.02, max_af=0.2):
     """Calcula Parabolic SAR"""
     try:
-        high = df['high'].values
-        low = df['low'].values
-        close = df['close'].values
-        
-        sar = np.zeros(len(df))
-        trend = np.zeros(len(df))
-        af_current = af
-        
-        # Inicialização
-        sar[0] = low[0]
-        trend[0] = 1  # 1 = uptrend, -1 = downtrend
-        
-        for i in range(1, len(df)):
-            if trend[i-1] == 1:  # Uptrend
-                sar[i] = sar[i-1] + af_current * (high[i-1] - sar[i-1])
-                
-                # Verificar reversão
-                if low[i] <= sar[i]:
-                    trend[i] = -1
-                    sar[i] = high[i-1]
-                    af_current = af
-                else:
-                    trend[i] = 1
-                    if high[i] > high[i-1]:
-                        af_current = min(af_current + af, max_af)
-            else:  # Downtrend
-                sar[i] = sar[i-1] + af_current * (low[i-1] - sar[i-1])
-                
-                # Verificar reversão
-                if high[i] >= sar[i]:
-                    trend[i] = 1
-                    sar[i] = low[i-1]
-                    af_current = af
-                else:
-                    trend[i] = -1
-                    if low[i] < low[i-1]:
-                        af_current = min(af_current + af, max_af)
+        # trend: 1 = uptrend, -1 = downtrend
+        sar, trend = psar(df['high'].values, df['low'].values, af, max_af)
         
         df['PSAR'] = sar
         df['PSAR_Trend'] = trend
@@ -173,18 +135,7 @@ def calcular_parabolic_sar(df, af=0.02, max_af=0.2):
 def calcular_obv(df):
     """Calcula On Balance Volume (OBV)"""
     try:
-        obv = np.zeros(len(df))
-        obv[0] = df['volume'].iloc[0]
-        
-        for i in range(1, len(df)):
-            if df['close'].iloc[i] > df['close'].iloc[i-1]:
-                obv[i] = obv[i-1] + df['volume'].iloc[i]
-            elif df['close'].iloc[i] < df['close'].iloc[i-1]:
-                obv[i] = obv[i-1] - df['volume'].iloc[i]
-            else:
-                obv[i] = obv[i-1]
-        
-        df['OBV'] = obv
+        df['OBV'] = obv(df['close'].values, df['volume'].values)
         return df
     except Exception as e:
         print(f"❌ Erro ao calcular OBV: {e}")
@@ -192,49 +143,15 @@ def calcular_obv(df):
 
 
 def calcular_volume_profile(df, bins=20):
-    """Calcula Volume Profile simplificado"""
+    """Calcula Volume Profile (volume rateado pelas faixas de preço de cada candle)"""
     try:
-        # Dividir preços em bins
-        price_min = df['low'].min()
-        price_max = df['high'].max()
-        bin_size = (price_max - price_min) / bins
-        
-        # Calcular volume por bin
-        volume_profile = np.zeros(bins)
-        bin_prices = np.zeros(bins)
-        
-        for i in range(bins):
-            bin_start = price_min + i * bin_size
-            bin_end = price_min + (i + 1) * bin_size
-            bin_prices[i] = (bin_start + bin_end) / 2
-            
-            # Volume neste range de preço
-            mask = (df['low'] >= bin_start) & (df['high'] <= bin_end)
-            volume_profile[i] = df[mask]['volume'].sum()
-        
-        # Encontrar POC (Point of Control)
-        poc_index = np.argmax(volume_profile)
-        poc_price = bin_prices[poc_index]
-        
-        # Value Area (70% do volume)
-        sorted_indices = np.argsort(volume_profile)[::-1]
-        cumulative_volume = 0
-        total_volume = np.sum(volume_profile)
-        value_area_indices = []
-        
-        for idx in sorted_indices:
-            cumulative_volume += volume_profile[idx]
-            value_area_indices.append(idx)
-            if cumulative_volume >= 0.7 * total_volume:
-                break
-        
-        val_prices = bin_prices[value_area_indices]
-        val_low = np.min(val_prices)
-        val_high = np.max(val_prices)
-        
-        df['Volume_Profile_POC'] = poc_price
-        df['Volume_Profile_VAL'] = val_low
-        df['Volume_Profile_VAH'] = val_high
+        perfil = calcular_perfil_volume(df['high'].values, df['low'].values, df['volume'].values, bins=bins)
+        if perfil is None:
+            return df
+        
+        df['Volume_Profile_POC'] = perfil.poc
+        df['Volume_Profile_VAL'] = perfil.val
+        df['Volume_Profile_VAH'] = perfil.vah
         
         return df
     except Exception as e:
@@ -249,18 +166,13 @@ def calcular_volume_profile(df, bins=20):
 def calcular_keltner_channels(df, periodo=20, multiplicador=2):
     """Calcula Keltner Channels"""
     try:
+        frame = frame_indicadores(df)
+        
         # EMA central
-        df['KC_Mid'] = df['close'].ewm(span=periodo).mean()
+        df['KC_Mid'] = frame.ema(periodo, adjust=True)
         
         # ATR para bandas
-        tr = np.maximum(
-            df['high'] - df['low'],
-            np.maximum(
-                abs(df['high'] - df['close'].shift(1)),
-                abs(df['low'] - df['close'].shift(1))
-            )
-        )
-        atr = pd.Series(tr).rolling(window=periodo).mean()
+        atr = frame.atr(periodo)
         
         # Bandas
         df['KC_Upper'] = df['KC_Mid'] + (multiplicador * atr)
@@ -275,8 +187,9 @@ def calcular_keltner_channels(df, periodo=20, multiplicador=2):
 def calcular_donchian_channels(df, periodo=20):
     """Calcula Donchian Channels"""
     try:
-        df['DC_Upper'] = df['high'].rolling(window=periodo).max()
-        df['DC_Lower'] = df['low'].rolling(window=periodo).min()
+        frame = frame_indicadores(df)
+        df['DC_Upper'] = frame.maxima(periodo)
+        df['DC_Lower'] = frame.minima(periodo)
         df['DC_Mid'] = (df['DC_Upper'] + df['DC_Lower']) / 2
         
         return df
@@ -546,11 +459,19 @@ def analisar_confluencia_indicadores(df):
         return {"confluencia_score": 0, "sinal": "ERRO", "detalhes": []}
 
 
-def gerar_sinal_completo(df):
-    """Gera sinal completo baseado em todos os indicadores"""
+def gerar_sinal_completo(df, df_completo=None):
+    """
+    Gera sinal completo baseado em todos os indicadores
+    
+    Args:
+        df: DataFrame OHLCV
+        df_completo: Resultado de calcular_indicadores_avancados para df, se já
+                     calculado (evita refazer todos os indicadores)
+    """
     try:
         # Calcular indicadores avançados
-        df_completo = calcular_indicadores_avancados(df.copy())
+        if df_completo is None:
+            df_completo = calcular_indicadores_avancados(compartilhar_frame(df, df.copy()))
         
         # Análise de confluência
         confluencia = analisar_confluencia_indicadores(df_completo)
@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LIVRO DE OFERTAS LOCAL
+Order book mantido em memória: snapshot REST + stream de diffs (<symbol>@depth)
+
+Sincronização (procedimento documentado pela Binance):
+    1. Abre o stream e guarda os eventos recebidos
+    2. Busca o snapshot REST (lastUpdateId)
+    3. Descarta eventos com u <= lastUpdateId
+    4. O primeiro evento aplicado precisa cobrir lastUpdateId + 1 (U <= id + 1 <= u)
+    5. Daí em diante cada evento começa em U == u anterior + 1; um buraco na
+       sequência (ou queda do stream) invalida o livro até um novo snapshot
+
+Os níveis ficam em listas ordenadas de preço (bisect) com as quantidades em
+paralelo e totais por lado mantidos a cada atualização: densidade, ratio e
+melhor bid/ask saem em O(1); atualizar um nível custa O(log n) + deslocamento.
+Cada lado é limitado à profundidade do snapshot (níveis mais distantes não
+são conhecidos), o que mantém a mesma semântica do depth REST com limit=N.
+
+Uso:
+    livro = obter_livro('BTCUSDT')   # None se não assinado ou fora de sincronia
+    if livro:
+        livro.melhor_bid, livro.melhor_ask, livro.densidades(), livro.ratio()
+
+Símbolos em MOTOR_LIVRO_SIMBOLOS (ex: "BTCUSDT,ETHUSDT") são assinados no
+primeiro obter_livro(); assinar_livro() assina explicitamente.
+"""
+
+import bisect
+import json
+import math
+import os
+import threading
+import time
+
+import numpy as np
+
+from http_upstream import upstream_get
+
+try:
+    from websockets.sync.client import connect as _ws_connect
+    WEBSOCKETS_DISPONIVEL = True
+except ImportError:
+    _ws_connect = None
+    WEBSOCKETS_DISPONIVEL = False
+
+BASE_URL = "https://api.binance.com/api/v3"
+STREAM_URL = "wss://stream.binance.com:9443/ws"
+
+PROFUNDIDADE_LIVRO = int(os.getenv('MOTOR_LIVRO_PROFUNDIDADE', 1000))
+SIMBOLOS_LIVRO = [s.strip().upper() for s in os.getenv('MOTOR_LIVRO_SIMBOLOS', '').split(',') if s.strip()]
+MAX_PENDENTES = 1000            # eventos guardados enquanto não há snapshot
+INTERVALO_SNAPSHOT = 1.0        # segundos mínimos entre snapshots (peso 50 cada)
+ESPERA_RECONEXAO = (1, 2, 5, 10, 30)
+
+
+class LivroOfertas:
+    """Order book de um símbolo (listas ordenadas + totais por lado)"""
+
+    def __init__(self, symbol, profundidade=PROFUNDIDADE_LIVRO):
+        self.symbol = symbol
+        self.profundidade = profundidade
+        self._trava = threading.RLock()
+        self._limpar()
+
+    def _limpar(self):
+        # Os dois lados em ordem crescente de preço: melhor bid é o último
+        self._bids_precos, self._bids_qtds = [], []
+        self._asks_precos, self._asks_qtds = [], []
+        self.total_bid = 0.0
+        self.total_ask = 0.0
+        self.ultimo_id = None
+        self.sincronizado = False
+        self._aguardando_primeiro = False
+        self.atualizado_em = None
+
+    # Atualização -------------------------------------------------------------
+
+    def carregar_snapshot(self, snapshot):
+        """Substitui o livro pelo snapshot REST ({'lastUpdateId', 'bids', 'asks'})"""
+        with self._trava:
+            self._limpar()
+            bids = sorted((float(p), float(q)) for p, q in snapshot.get('bids', []) if float(q) > 0)
+            asks = sorted((float(p), float(q)) for p, q in snapshot.get('asks', []) if float(q) > 0)
+            bids = bids[-self.profundidade:]
+            asks = asks[:self.profundidade]
+            self._bids_precos = [p for p, _ in bids]
+            self._bids_qtds = [q for _, q in bids]
+            self._asks_precos = [p for p, _ in asks]
+            self._asks_qtds = [q for _, q in asks]
+            self.total_bid = math.fsum(self._bids_qtds)
+            self.total_ask = math.fsum(self._asks_qtds)
+            self.ultimo_id = int(snapshot['lastUpdateId'])
+            self._aguardando_primeiro = True
+            self.sincronizado = True
+            self.atualizado_em = time.time()
+
+    def aplicar(self, evento):
+        """
+        Aplica um evento de diff ({'U', 'u', 'b', 'a'})
+
+        Returns:
+            False se o evento não encaixa na sequência (livro invalidado)
+        """
+        with self._trava:
+            if self.ultimo_id is None:
+                return False
+            primeiro, ultimo = int(evento['U']), int(evento['u'])
+            if ultimo <= self.ultimo_id:
+                return True      # já contido no snapshot / repetido
+            esperado = self.ultimo_id + 1
+            if self._aguardando_primeiro:
+                encaixa = primeiro <= esperado
+            else:
+                encaixa = primeiro == esperado
+            if not encaixa:
+                self.sincronizado = False
+                return False
+
+            for preco, qtd in evento.get('b', []):
+                self.total_bid += self._atualizar_nivel(
+                    self._bids_precos, self._bids_qtds, float(preco), float(qtd), bids=True)
+            for preco, qtd in evento.get('a', []):
+                self.total_ask += self._atualizar_nivel(
+                    self._asks_precos, self._asks_qtds, float(preco), float(qtd), bids=False)
+
+            self.ultimo_id = ultimo
+            self._aguardando_primeiro = False
+            self.atualizado_em = time.time()
+            return True
+
+    def _atualizar_nivel(self, precos, qtds, preco, qtd, bids):
+        """Insere/atualiza/remove um nível; devolve a variação do total do lado"""
+        i = bisect.bisect_left(precos, preco)
+        existe = i < len(precos) and precos[i] == preco
+        if qtd <= 0:
+            if not existe:
+                return 0.0
+            del precos[i]
+            return -qtds.pop(i)
+        if existe:
+            delta = qtd - qtds[i]
+            qtds[i] = qtd
+            return delta
+
+        precos.insert(i, preco)
+        qtds.insert(i, qtd)
+        if len(precos) <= self.profundidade:
+            return qtd
+        # Acima da profundidade: descarta o nível mais distante do topo
+        if bids:
+            del precos[0]
+            return qtd - qtds.pop(0)
+        precos.pop()
+        return qtd - qtds.pop()
+
+    # Consultas ---------------------------------------------------------------
+
+    @property
+    def melhor_bid(self):
+        return self._bids_precos[-1] if self._bids_precos else 0.0
+
+    @property
+    def melhor_ask(self):
+        return self._asks_precos[0] if self._asks_precos else 0.0
+
+    @property
+    def preco_medio(self):
+        bid, ask = self.melhor_bid, self.melhor_ask
+        return (bid + ask) / 2 if bid > 0 and ask > 0 else 0.0
+
+    def densidades(self):
+        """(densidade de bids, densidade de asks) em O(1)"""
+        return max(self.total_bid, 0.0), max(self.total_ask, 0.0)
+
+    def ratio(self):
+        """bid/ask como em FluxoAtivo (2.0 sem asks)"""
+        bid, ask = self.densidades()
+        return bid / ask if ask > 0 else 2.0
+
+    def como_depth(self, limite=None):
+        """Livro no formato da resposta REST /depth (bids decrescentes, asks crescentes)"""
+        with self._trava:
+            n = limite or self.profundidade
+            bids = [[p, q] for p, q in zip(self._bids_precos[-n:], self._bids_qtds[-n:])]
+            bids.reverse()
+            asks = [[p, q] for p, q in zip(self._asks_precos[:n], self._asks_qtds[:n])]
+            return {'lastUpdateId': self.ultimo_id, 'bids': bids, 'asks': asks}
+
+    def arrays(self):
+        """(bid_precos, bid_qtds, ask_precos, ask_qtds) do topo para fora"""
+        with self._trava:
+            return (np.array(self._bids_precos[::-1]), np.array(self._bids_qtds[::-1]),
+                    np.array(self._asks_precos), np.array(self._asks_qtds))
+
+    @property
+    def niveis(self):
+        return len(self._bids_precos), len(self._asks_precos)
+
+
+# ============================================================================
+# MANUTENÇÃO (stream + snapshots)
+# ============================================================================
+
+def obter_snapshot_binance(symbol, limit=PROFUNDIDADE_LIVRO):
+    """Snapshot REST /depth"""
+    response = upstream_get(f"{BASE_URL}/depth", params={"symbol": symbol, "limit": limit}, timeout=5)
+    response.raise_for_status()
+    return response.json()
+
+
+class MantenedorLivro:
+    """
+    Mantém um LivroOfertas sincronizado com o stream de diffs
+
+    Args:
+        symbol: Par (ex: BTCUSDT)
+        fonte: callable(mantenedor) -> iterável de eventos de diff; por padrão
+               o stream <symbol>@depth@100ms da Binance (requer websockets)
+        obter_snapshot: callable(symbol, limit) -> snapshot; por padrão REST
+    """
+
+    def __init__(self, symbol, fonte=None, obter_snapshot=None,
+                 profundidade=PROFUNDIDADE_LIVRO, intervalo_snapshot=INTERVALO_SNAPSHOT):
+        self.symbol = symbol.upper()
+        self.livro = LivroOfertas(self.symbol, profundidade)
+        self.fonte = fonte or stream_depth_binance
+        self.obter_snapshot = obter_snapshot or obter_snapshot_binance
+        self.intervalo_snapshot = intervalo_snapshot
+
+        self._pendentes = []
+        self._ultimo_snapshot = 0.0
+        self._parar = threading.Event()
+        self._thread = None
+        self.conexao = None      # conexão ativa da fonte (fechada em parar())
+
+        # Contadores
+        self.eventos = 0
+        self.snapshots = 0
+        self.lacunas = 0
+        self.reconexoes = 0
+
+    def processar(self, evento):
+        """Entrega um evento do stream; devolve True se o livro está sincronizado"""
+        self.eventos += 1
+        if self._pendentes or self.livro.ultimo_id is None:
+            self._pendentes.append(evento)
+            del self._pendentes[:-MAX_PENDENTES]
+            return self._sincronizar()
+
+        if not self.livro.aplicar(evento):
+            self.lacunas += 1
+            print(f"   ⚠️ Livro {self.symbol}: lacuna na sequência (U={evento.get('U')}, "
+                  f"esperado {self.livro.ultimo_id + 1}); ressincronizando")
+            self._pendentes = [evento]
+            return self._sincronizar()
+        return True
+
+    def _sincronizar(self):
+        agora = time.monotonic()
+        if self.snapshots and agora - self._ultimo_snapshot < self.intervalo_snapshot:
+            return False
+        self._ultimo_snapshot = agora
+        try:
+            snapshot = self.obter_snapshot(self.symbol, self.livro.profundidade)
+        except Exception as e:
+            print(f"   ⚠️ Livro {self.symbol}: erro no snapshot: {e}")
+            return False
+        if not snapshot:
+            return False
+
+        self.livro.carregar_snapshot(snapshot)
+        self.snapshots += 1
+        pendentes, self._pendentes = self._pendentes, []
+        for i, evento in enumerate(pendentes):
+            if not self.livro.aplicar(evento):
+                # Snapshot anterior aos eventos guardados: precisa de outro
+                self._pendentes = pendentes[i:]
+                return False
+        return True
+
+    def reiniciar(self):
+        """Stream caiu: o livro só volta a valer após novo snapshot"""
+        self.livro.sincronizado = False
+        self.livro.ultimo_id = None
+        self._pendentes = []
+
+    def executar(self):
+        """Loop do stream com reconexão (bloqueante; ver iniciar())"""
+        tentativa = 0
+        while not self._parar.is_set():
+            try:
+                for evento in self.fonte(self):
+                    if self._parar.is_set():
+                        break
+                    self.processar(evento)
+                    tentativa = 0
+            except Exception as e:
+                if not self._parar.is_set():
+                    print(f"   ⚠️ Livro {self.symbol}: stream interrompido: {e}")
+            self.reiniciar()
+            if self._parar.is_set():
+                break
+            self.reconexoes += 1
+            self._parar.wait(ESPERA_RECONEXAO[min(tentativa, len(ESPERA_RECONEXAO) - 1)])
+            tentativa += 1
+
+    def iniciar(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._parar.clear()
+            self._thread = threading.Thread(target=self.executar, daemon=True,
+                                            name=f'livro-{self.symbol}')
+            self._thread.start()
+        return self
+
+    def parar(self, timeout=5):
+        self._parar.set()
+        conexao = self.conexao
+        if conexao is not None:
+            try:
+                conexao.close()
+            except Exception:
+                pass
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def estatisticas(self):
+        bids, asks = self.livro.niveis
+        return {
+            'symbol': self.symbol,
+            'sincronizado': self.livro.sincronizado,
+            'ultimo_id': self.livro.ultimo_id,
+            'niveis_bid': bids,
+            'niveis_ask': asks,
+            'eventos': self.eventos,
+            'snapshots': self.snapshots,
+            'lacunas': self.lacunas,
+            'reconexoes': self.reconexoes,
+        }
+
+
+def stream_depth_binance(mantenedor, url=None):
+    """Eventos de diff do WebSocket da Binance (<symbol>@depth@100ms)"""
+    if not WEBSOCKETS_DISPONIVEL:
+        raise RuntimeError("websockets não instalado")
+    url = url or f"{STREAM_URL}/{mantenedor.symbol.lower()}@depth@100ms"
+    with _ws_connect(url, open_timeout=10, ping_interval=20, ping_timeout=20) as conexao:
+        mantenedor.conexao = conexao
+        try:
+            for mensagem in conexao:
+                evento = json.loads(mensagem)
+                # Stream combinado (/stream?streams=) embrulha em {'data': ...}
+                yield evento.get('data', evento)
+        finally:
+            mantenedor.conexao = None
+
+
+# ============================================================================
+# LIVROS DO PROCESSO
+# ============================================================================
+
+_mantenedores = {}
+_trava_mantenedores = threading.Lock()
+
+
+def assinar_livro(symbol, fonte=None, obter_snapshot=None, iniciar=True, **kwargs):
+    """Mantenedor do símbolo (criado e iniciado na primeira chamada)"""
+    symbol = symbol.upper()
+    with _trava_mantenedores:
+        mantenedor = _mantenedores.get(symbol)
+        if mantenedor is None:
+            mantenedor = MantenedorLivro(symbol, fonte=fonte, obter_snapshot=obter_snapshot, **kwargs)
+            _mantenedores[symbol] = mantenedor
+            if iniciar:
+                mantenedor.iniciar()
+    return mantenedor
+
+
+def cancelar_livro(symbol):
+    with _trava_mantenedores:
+        mantenedor = _mantenedores.pop(symbol.upper(), None)
+    if mantenedor is not None:
+        mantenedor.parar()
+
+
+def obter_livro(symbol):
+    """LivroOfertas sincronizado do símbolo, ou None (usar o REST)"""
+    symbol = (symbol or '').upper()
+    mantenedor = _mantenedores.get(symbol)
+    if mantenedor is None:
+        if symbol not in SIMBOLOS_LIVRO or not WEBSOCKETS_DISPONIVEL:
+            return None
+        mantenedor = assinar_livro(symbol)
+    livro = mantenedor.livro
+    return livro if livro.sincronizado else None
+
+
+def estatisticas_livros():
+    return {symbol: m.estatisticas() for symbol, m in list(_mantenedores.items())}
@@ -5,17 +5,23 @@ MULTI-TIMEFRAME ANALYSIS
 Análise automatizada em múltiplos timeframes
 """
 
-import requests
-import pandas as pd
+from klines import buscar_klines_binance
+from armazem_candles import obter_klines
+from rastreamento import registrar_transferencia
 
+# Timeframes padrão da análise multi-TF
+TIMEFRAMES_MTF = ('1m', '5m', '15m', '1h', '4h')
 
-def analise_multitf(symbol='BTCUSDT', timeframes=['1m', '5m', '15m', '1h', '4h']):
+
+def analise_multitf(symbol='BTCUSDT', timeframes=TIMEFRAMES_MTF, dados_tf=None):
     """
     Análise em múltiplos timeframes
     
     Args:
         symbol: Par a analisar
         timeframes: Lista de TFs
+        dados_tf: dict {tf: DataFrame} já carregado (ex: DadosMercado.dados_mtf);
+                  se None, busca cada TF na Binance
     
     Returns:
         dict com análise por TF
@@ -23,7 +29,10 @@ def analise_multitf(symbol='BTCUSDT', timeframes=['1m', '5m', '15m', '1h', '4h']
     resultados = {}
     
     for tf in timeframes:
-        dados = buscar_dados_tf(symbol, tf)
+        if dados_tf is not None:
+            dados = dados_tf.get(tf)
+        else:
+            dados = buscar_dados_tf(symbol, tf)
         if dados is not None:
             analise = analisar_tf(dados, tf)
             resultados[tf] = analise
@@ -41,24 +50,37 @@ def analise_multitf(symbol='BTCUSDT', timeframes=['1m', '5m', '15m', '1h', '4h']
 def buscar_dados_tf(symbol, interval, limit=100):
     """Busca dados de um timeframe"""
     try:
-        url = "https://api.binance.com/api/v3/klines"
-        params = {"symbol": symbol, "interval": interval, "limit": limit}
-        response = requests.get(url, params=params, timeout=10)
-        
-        if response.status_code == 200:
-            data = response.json()
-            df = pd.DataFrame(data, columns=[
-                'timestamp', 'open', 'high', 'low', 'close', 'volume',
-                'close_time', 'quote_volume', 'trades', 'taker_buy_base',
-                'taker_buy_quote', 'ignore'
-            ])
-            df = df[['close', 'volume']].astype(float)
-            return df
-        return None
+        # Candles fechados do armazém local; da Binance só o que falta
+        klines = obter_klines(symbol, interval, limit, buscar=buscar_klines_binance)
+        if klines is None:
+            return None
+        return klines.para_dataframe(['close', 'volume'])
     except:
         return None
 
 
+def buscar_dados_mtf(symbol, timeframes, limit=100):
+    """
+    Dados de vários timeframes numa só requisição ao coletor (klines/batch)
+
+    Se o lote falhar inteiro, cai para buscar_dados_tf por timeframe.
+
+    Returns:
+        dict {tf: DataFrame ou None}
+    """
+    from app.collector_client import get_klines_many, ultima_transferencia
+
+    try:
+        lote = get_klines_many([(symbol, tf, limit) for tf in timeframes])
+        registrar_transferencia(**ultima_transferencia())
+    except Exception as e:
+        print(f"   ⚠️ Lote MTF do coletor falhou ({e}), buscando por timeframe")
+        return {tf: buscar_dados_tf(symbol, tf, limit) for tf in timeframes}
+
+    return {tf: klines.para_dataframe(['close', 'volume']) if klines is not None and len(klines) else None
+            for tf, klines in zip(timeframes, lote)}
+
+
 def analisar_tf(dados, tf):
     """Analisa um timeframe específico"""
     try:
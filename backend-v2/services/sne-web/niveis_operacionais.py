@@ -9,6 +9,9 @@ import pandas as pd
 import numpy as np
 from datetime import datetime
 
+from pontos_swing import detectar_swings
+from frame_indicadores import frame_indicadores
+
 
 class NiveisOperacionais:
     """Classe para calcular níveis operacionais precisos"""
@@ -70,17 +73,7 @@ class NiveisOperacionais:
     def calcular_atr(self, df, period=14):
         """Calcula ATR (Average True Range)"""
         try:
-            high = df['high']
-            low = df['low']
-            close = df['close']
-            
-            # True Range
-            tr1 = high - low
-            tr2 = abs(high - close.shift(1))
-            tr3 = abs(low - close.shift(1))
-            
-            tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
-            atr = tr.rolling(window=period).mean()
+            atr = frame_indicadores(df).atr(period)
             
             return atr.iloc[-1] if not atr.empty else 0
             
@@ -91,18 +84,15 @@ class NiveisOperacionais:
     def identificar_sr_niveis(self, df, lookback=20):
         """Identifica níveis de suporte e resistência"""
         try:
-            highs = df['high'].rolling(window=lookback, center=True).max()
-            lows = df['low'].rolling(window=lookback, center=True).min()
-            
-            # Identificar máximos e mínimos locais
-            resistance_levels = []
-            support_levels = []
-            
-            for i in range(lookback, len(df) - lookback):
-                if df['high'].iloc[i] == highs.iloc[i]:
-                    resistance_levels.append(df['high'].iloc[i])
-                if df['low'].iloc[i] == lows.iloc[i]:
-                    support_levels.append(df['low'].iloc[i])
+            # Identificar máximos e mínimos locais (janela centrada de lookback candles)
+            topos, fundos = detectar_swings(df['high'].values, df['low'].values,
+                                            lookback // 2, lookback - 1 - lookback // 2)
+            
+            # Apenas candles a pelo menos lookback candles das bordas
+            topos = topos[(topos >= lookback) & (topos < len(df) - lookback)]
+            fundos = fundos[(fundos >= lookback) & (fundos < len(df) - lookback)]
+            resistance_levels = df['high'].values[topos].tolist()
+            support_levels = df['low'].values[fundos].tolist()
             
             # Ordenar e pegar os mais relevantes
             resistance_levels = sorted(resistance_levels, reverse=True)[:5]
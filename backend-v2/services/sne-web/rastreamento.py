@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+RASTREAMENTO
+Spans por etapa da análise (busca, estágios, serialização) com duração,
+uso de cache e bytes transferidos.
+
+Uso:
+    rastreador = Rastreador()
+    resultado = analise_completa(symbol, tf, rastreador=rastreador)
+    with rastreador.span('serializacao'):
+        ...
+    response.headers['Server-Timing'] = rastreador.server_timing()
+
+As funções de busca informam o que transferiram com
+registrar_transferencia(); quem as chama agrupa por tarefa com
+coletar_transferencias() (ver dados_mercado._cronometrar).
+"""
+
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+# Nome do span da busca de dados (soma das requisições do pré-carregamento)
+SPAN_BUSCA = 'busca'
+
+_local = threading.local()
+_TOKEN_INVALIDO = re.compile(r'[^A-Za-z0-9_.-]')
+
+
+class Span:
+    """Uma etapa medida"""
+
+    __slots__ = ('nome', 'duracao', 'cache', 'bytes')
+
+    def __init__(self, nome, duracao=0.0, cache=None, bytes=0):
+        self.nome = nome
+        self.duracao = duracao  # segundos
+        self.cache = cache      # True/False, ou None quando não se aplica
+        self.bytes = bytes
+
+    def to_dict(self):
+        dados = {'dur_ms': round(self.duracao * 1000, 2)}
+        if self.cache is not None:
+            dados['cache'] = self.cache
+        if self.bytes:
+            dados['bytes'] = self.bytes
+        return dados
+
+
+class Rastreador:
+    """Coleção de spans de uma requisição (seguro entre threads)"""
+
+    def __init__(self):
+        self.spans = []
+        self._trava = threading.Lock()
+
+    def adicionar(self, nome, duracao, cache=None, bytes=0):
+        span = Span(nome, duracao, cache, bytes)
+        with self._trava:
+            self.spans.append(span)
+        return span
+
+    @contextmanager
+    def span(self, nome, cache=None):
+        """Mede o bloco; cache/bytes podem ser ajustados no span devolvido"""
+        span = Span(nome, cache=cache)
+        inicio = time.perf_counter()
+        try:
+            yield span
+        finally:
+            span.duracao = time.perf_counter() - inicio
+            with self._trava:
+                self.spans.append(span)
+
+    def to_dict(self):
+        """{nome: {'dur_ms', 'cache'?, 'bytes'?}} na ordem de registro (campo _timings)"""
+        with self._trava:
+            return {span.nome: span.to_dict() for span in self.spans}
+
+    def server_timing(self):
+        """Valor do header HTTP Server-Timing"""
+        with self._trava:
+            spans = list(self.spans)
+        partes = []
+        for span in spans:
+            parte = f"{_TOKEN_INVALIDO.sub('_', span.nome)};dur={span.duracao * 1000:.1f}"
+            descricao = []
+            if span.cache is not None:
+                descricao.append('cache=hit' if span.cache else 'cache=miss')
+            if span.bytes:
+                descricao.append(f'bytes={span.bytes}')
+            if descricao:
+                parte += f';desc="{" ".join(descricao)}"'
+            partes.append(parte)
+        return ', '.join(partes)
+
+    def registrar_busca(self, mercado):
+        """Span da busca de dados a partir de um DadosMercado"""
+        transferencias = list(getattr(mercado, 'transferencias', {}).values())
+        caches = [t['cache'] for t in transferencias if t['cache'] is not None]
+        return self.adicionar(
+            SPAN_BUSCA, mercado.tempo_total,
+            cache=all(caches) if caches else None,
+            bytes=sum(t['bytes'] for t in transferencias))
+
+    def registrar_estagios(self, tempos):
+        """Um span por estágio do executor, na ordem em que foram declarados"""
+        for nome, duracao in tempos.items():
+            self.adicionar(nome, duracao)
+
+
+def registrar_transferencia(bytes=0, cache=None):
+    """
+    Informa o que a busca atual transferiu
+
+    Sem coletar_transferencias() ativo na thread, não faz nada.
+
+    Args:
+        bytes: Tamanho do corpo recebido
+        cache: True se veio de cache, False se da origem, None se desconhecido
+    """
+    coletor = getattr(_local, 'coletor', None)
+    if coletor is None:
+        return
+    coletor['bytes'] += bytes
+    if cache is not None:
+        coletor['cache'] = cache if coletor['cache'] is None else (coletor['cache'] and cache)
+
+
+@contextmanager
+def coletar_transferencias():
+    """Agrupa as transferências registradas nesta thread durante o bloco"""
+    anterior = getattr(_local, 'coletor', None)
+    coletor = {'bytes': 0, 'cache': None}
+    _local.coletor = coletor
+    try:
+        yield coletor
+    finally:
+        _local.coletor = anterior
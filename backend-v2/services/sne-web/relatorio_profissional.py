@@ -5,16 +5,34 @@ RELATÓRIO PROFISSIONAL REFORMULADO
 Sistema de relatórios melhorado com estrutura clara e acionável
 """
 
+import hashlib
+import html
+import os
+import threading
+from collections import OrderedDict
 from datetime import datetime
 import pandas as pd
 import numpy as np
 
+from serializacao import codificar
+
+# Máximo de relatórios renderizados mantidos em memória (LRU)
+MAX_RELATORIOS_CACHE = int(os.getenv('MOTOR_RELATORIOS_CACHE', 256))
+
+# Marca no lugar de data/hora no relatório em cache; trocada pela hora do pedido
+MARCA_HORARIO = '\ue000'
+
 
 class RelatorioProfissional:
     """Classe para gerar relatórios profissionais e acionáveis"""
     
-    def __init__(self):
-        """Inicializa o gerador de relatórios"""
+    def __init__(self, horario=None):
+        """
+        Inicializa o gerador de relatórios
+
+        horario: texto no lugar de data/hora (default: agora)
+        """
+        self.horario = horario
         self.emoji_map = {
             'SHORT': '🔴',
             'LONG': '🟢',
@@ -28,7 +46,7 @@ class RelatorioProfissional:
     
     def gerar_cabecalho_profissional(self, symbol, timeframe, preco_atual, contexto, estrutura):
         """Gera cabeçalho profissional do relatório"""
-        timestamp = datetime.now().strftime("%d/%m/%Y %H:%M")
+        timestamp = self._horario()
         regime = contexto.get('regime', 'UNKNOWN')
         forca_regime = contexto.get('forca_regime', 0)
         tendencia = estrutura.get('tendencia', 'UNKNOWN')
@@ -692,7 +710,7 @@ Risco: 1.5% do capital | Posição: 30% do tamanho padrão."""
             relatorio += f"""
 {'='*80}
 📈 Gráfico técnico anexado acima
-⏰ Próxima atualização: {datetime.now().strftime('%d/%m/%Y %H:%M')}
+⏰ Próxima atualização: {self._horario()}
 {'='*80}"""
             
             return relatorio
@@ -704,7 +722,7 @@ Risco: 1.5% do capital | Posição: 30% do tamanho padrão."""
                                           mtf, fluxo, sintese, candles_detalhados, niveis_operacionais, gestao_risco):
         """Gera relatório em blocos organizados para Telegram"""
         try:
-            timestamp = datetime.now().strftime("%d/%m/%Y %H:%M")
+            timestamp = self._horario()
             regime = contexto.get('regime', 'UNKNOWN')
             forca_regime = contexto.get('forca_regime', 0)
             tendencia = estrutura.get('tendencia', 'UNKNOWN')
@@ -901,7 +919,7 @@ Risco: 1.5% do capital | Posição: 30% do tamanho padrão."""
 
 ---
 📈 Gráfico técnico anexado acima
-⏰ Próxima atualização: {datetime.now().strftime('%d/%m/%Y %H:%M')}
+⏰ Próxima atualização: {self._horario()}
 """
             
             # Retornar blocos organizados
@@ -911,6 +929,9 @@ Risco: 1.5% do capital | Posição: 30% do tamanho padrão."""
             return [f"❌ Erro ao gerar blocos organizados: {str(e)}"]
     
     # Métodos auxiliares
+    def _horario(self):
+        return self.horario or datetime.now().strftime("%d/%m/%Y %H:%M")
+
     def _descrever_movimento_recente(self, regime, volatilidade):
         """Descreve o movimento recente do mercado"""
         if regime == 'CONSOLIDATION':
@@ -1224,19 +1245,19 @@ Risco: 1.5% do capital | Posição: 30% do tamanho padrão."""
 ✅ Resistência em EMA 21/SMA 200 (peso: 1.3/10)"""
 
 
-def gerar_relatorio_profissional(resultado):
+def gerar_relatorio_profissional(resultado, horario=None):
     """Função principal para gerar relatório profissional"""
     try:
-        gerador = RelatorioProfissional()
+        gerador = RelatorioProfissional(horario)
         return gerador.gerar_relatorio_completo(resultado)
     except Exception as e:
         return f"❌ Erro ao gerar relatório profissional: {str(e)}"
 
 
-def gerar_relatorio_telegram_blocos(resultado):
+def gerar_relatorio_telegram_blocos(resultado, horario=None):
     """Função para gerar relatório do Telegram em blocos organizados"""
     try:
-        gerador = RelatorioProfissional()
+        gerador = RelatorioProfissional(horario)
         return gerador._gerar_relatorio_blocos_organizados(
             resultado.get('symbol', 'UNKNOWN'),
             resultado.get('timeframe', '1h'),
@@ -1254,6 +1275,137 @@ def gerar_relatorio_telegram_blocos(resultado):
         return [f"❌ Erro ao gerar relatório em blocos: {str(e)}"]
 
 
+# ============================================================================
+# CACHE DE RENDERIZAÇÃO
+# ============================================================================
+
+def _renderizar_texto(resultado):
+    """Relatório completo como texto único"""
+    relatorio = gerar_relatorio_profissional(resultado, MARCA_HORARIO)
+    if isinstance(relatorio, list):
+        return "\n\n".join(relatorio)
+    return relatorio
+
+
+def _renderizar_html(resultado):
+    """Blocos do relatório como HTML (texto escapado, quebras preservadas)"""
+    return "\n".join(f'<section class="relatorio-bloco"><pre>{html.escape(bloco)}</pre></section>'
+                     for bloco in _renderizar_blocos(resultado))
+
+
+def _renderizar_blocos(resultado):
+    """Blocos do Telegram"""
+    return gerar_relatorio_telegram_blocos(resultado, MARCA_HORARIO)
+
+
+# Campos do resultado lidos pelos relatórios (entram no hash da chave)
+CAMPOS_RELATORIO = ('symbol', 'timeframe', 'contexto', 'estrutura', 'mtf', 'fluxo', 'sintese',
+                    'candles_detalhados', 'niveis_operacionais', 'gestao_risco')
+
+# Formato -> função de renderização
+FORMATOS_RELATORIO = {
+    'texto': _renderizar_texto,
+    'telegram': _renderizar_blocos,
+    'html': _renderizar_html,
+}
+
+
+class CacheRelatorios:
+    """
+    Relatórios renderizados por (hash do resultado, formato)
+
+    Em cache fica o relatório com MARCA_HORARIO no lugar de data/hora; cada
+    pedido recebe a hora em que foi atendido, não a da renderização.
+
+    A renderização só acontece no primeiro pedido; pedidos simultâneos do
+    mesmo relatório esperam essa renderização em vez de repeti-la. Acima de
+    max_itens o relatório usado há mais tempo sai do cache.
+    """
+
+    def __init__(self, max_itens=MAX_RELATORIOS_CACHE):
+        self.max_itens = max_itens
+        self._itens = OrderedDict()
+        self._em_andamento = {}
+        self._trava = threading.Lock()
+        self.renderizacoes = 0
+        self.acertos = 0
+
+    @staticmethod
+    def chave(resultado, formato):
+        """Hash dos campos lidos pelo relatório + formato"""
+        conteudo = {campo: resultado.get(campo) for campo in CAMPOS_RELATORIO}
+        conteudo['preco'] = (resultado.get('indicadores') or {}).get('preco')
+        return hashlib.blake2b(codificar(conteudo), digest_size=16).hexdigest(), formato
+
+    def obter(self, resultado, formato='texto', chave=None):
+        """
+        Relatório no formato pedido (renderiza só se ainda não estiver no cache)
+
+        chave: identificador do conteúdo já conhecido pelo chamador (ex: chave
+               da análise no Redis); dispensa o hash do resultado
+        """
+        if formato not in FORMATOS_RELATORIO:
+            raise ValueError(f"Formato de relatório desconhecido: {formato}")
+        chave = self.chave(resultado, formato) if chave is None else (chave, formato)
+
+        while True:
+            with self._trava:
+                if chave in self._itens:
+                    self._itens.move_to_end(chave)
+                    self.acertos += 1
+                    return _carimbar(self._itens[chave])
+                evento = self._em_andamento.get(chave)
+                responsavel = evento is None
+                if responsavel:
+                    evento = self._em_andamento[chave] = threading.Event()
+            if responsavel:
+                break
+            evento.wait()
+
+        try:
+            relatorio = FORMATOS_RELATORIO[formato](resultado)
+            with self._trava:
+                self.renderizacoes += 1
+                self._itens[chave] = relatorio
+                while len(self._itens) > self.max_itens:
+                    self._itens.popitem(last=False)
+            return _carimbar(relatorio)
+        finally:
+            with self._trava:
+                del self._em_andamento[chave]
+            evento.set()
+
+    def limpar(self):
+        with self._trava:
+            self._itens.clear()
+
+    def __len__(self):
+        return len(self._itens)
+
+
+def _carimbar(relatorio):
+    """Cópia do relatório em cache com a hora atual no lugar da marca"""
+    horario = datetime.now().strftime("%d/%m/%Y %H:%M")
+    # Blocos do Telegram são lista: cada consumidor recebe a sua
+    if isinstance(relatorio, list):
+        return [bloco.replace(MARCA_HORARIO, horario) for bloco in relatorio]
+    return relatorio.replace(MARCA_HORARIO, horario)
+
+
+cache_relatorios = CacheRelatorios()
+
+
+def obter_relatorio(resultado, formato='texto', chave=None):
+    """
+    Relatório do resultado no formato 'texto', 'telegram' (lista de blocos)
+    ou 'html', renderizado uma vez por conteúdo e formato
+
+    Returns:
+        str (texto/html) ou list de str (telegram)
+    """
+    return cache_relatorios.obter(resultado, formato, chave)
+
+
 if __name__ == "__main__":
     # Teste do módulo
     print("🧪 Testando gerador de relatórios profissionais...")
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SERIALIZAÇÃO
+Codificador JSON do resultado da análise em uma única passada.
+
+Escalares e arrays NumPy, NaN (vira null), datetimes e DataFrames/Series
+são tratados pelo próprio codificador (orjson), que escreve bytes direto;
+só tipos desconhecidos passam por _converter. Sem orjson instalado, cai
+numa conversão recursiva em Python + json.dumps com a mesma saída.
+
+Uso:
+    redis.set(chave, codificar_texto(resultado))
+    Response(codificar(resultado), mimetype='application/json')
+    dados = normalizar(resultado)   # só dict/list/str/int/float/bool/None
+"""
+
+import json
+import math
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+try:
+    import orjson
+    ORJSON_DISPONIVEL = True
+    _OPCOES = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+except ImportError:
+    orjson = None
+    ORJSON_DISPONIVEL = False
+
+
+def _converter(obj):
+    """Tipos que o orjson não conhece (devolve algo que ele conhece)"""
+    if isinstance(obj, pd.DataFrame):
+        return obj.to_dict(orient='records')
+    if isinstance(obj, pd.Series):
+        return obj.to_dict()
+    if obj is pd.NaT or obj is pd.NA:
+        return None
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    # Mesmo fallback de make_json_serializable
+    return str(obj)
+
+
+def _normalizar_python(obj):
+    """Conversão recursiva para tipos JSON nativos (caminho sem orjson)"""
+    if isinstance(obj, dict):
+        return {_chave(k): _normalizar_python(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_normalizar_python(v) for v in obj]
+    if obj is None or isinstance(obj, (str, bool)):
+        return obj
+    if isinstance(obj, (int, np.integer)):
+        return int(obj)
+    if isinstance(obj, (float, np.floating)):
+        valor = float(obj)
+        return None if math.isnan(valor) or math.isinf(valor) else valor
+    if isinstance(obj, np.bool_):
+        return bool(obj)
+    if isinstance(obj, np.ndarray) and obj.dtype.kind in 'biuf':
+        return _normalizar_python(obj.tolist())
+    if isinstance(obj, np.datetime64):
+        return str(obj.astype('datetime64[us]'))
+    return _normalizar_python(_converter(obj))
+
+
+def _chave(chave):
+    if isinstance(chave, str):
+        return chave
+    if isinstance(chave, (bool, np.bool_)):
+        return 'true' if chave else 'false'
+    if isinstance(chave, (int, np.integer)):
+        return str(int(chave))
+    if isinstance(chave, (float, np.floating)):
+        return str(float(chave))
+    if isinstance(chave, (datetime, date)):
+        return chave.isoformat()
+    return str(chave)
+
+
+def codificar(obj):
+    """Resultado → JSON em bytes (UTF-8)"""
+    if ORJSON_DISPONIVEL:
+        try:
+            return orjson.dumps(obj, default=_converter, option=_OPCOES)
+        except orjson.JSONEncodeError:
+            # Ex: chaves de dict NumPy, não aceitas pelo orjson
+            pass
+    return json.dumps(_normalizar_python(obj), ensure_ascii=False,
+                      separators=(',', ':')).encode('utf-8')
+
+
+def codificar_texto(obj):
+    """Como codificar(), em str (Redis/Upstash)"""
+    return codificar(obj).decode('utf-8')
+
+
+def normalizar(obj):
+    """Resultado com apenas tipos JSON nativos (substitui make_json_serializable)"""
+    if ORJSON_DISPONIVEL:
+        return orjson.loads(codificar(obj))
+    return _normalizar_python(obj)
@@ -1,10 +1,12 @@
 """
 API Analyze - Análise técnica completa (compatível com radar existente)
 """
-from flask import Blueprint, jsonify, request, g
+from flask import Blueprint, Response, jsonify, request, g
 from app.utils.tier_checker import require_tier
 from app.utils.logging import get_request_id
 from app.utils.metrics import analysis_requests, analysis_duration
+from app.services.motor.rastreamento import Rastreador
+from app.services.motor.serializacao import codificar, codificar_texto
 import redis
 import os
 import time
@@ -15,6 +17,9 @@ logger = logging.getLogger(__name__)
 
 analyze_bp = Blueprint('analyze', __name__)
 
+# Campos do motor lidos por extract_signal
+CAMPOS_SINAL = ('sintese', 'indicadores', 'contexto')
+
 # Redis para cache (com fallback seguro)
 from app.utils.redis_safe import SafeRedis
 redis_client = SafeRedis(
@@ -24,6 +29,55 @@ redis_client = SafeRedis(
     decode_responses=True
 )
 
+def _pediu_tempos(data):
+    """_timings só entra na resposta quando pedido (body ou query string)"""
+    valor = data.get('timings', request.args.get('timings', ''))
+    return str(valor).lower() in ('1', 'true', 'yes')
+
+def _campos_pedidos(data):
+    """
+    Projeção fields= (body ou query string) normalizada
+
+    Raises:
+        ValueError: campo desconhecido
+    """
+    campos = data.get('fields', request.args.get('fields'))
+    if not campos:
+        return None
+    try:
+        from app.services.motor.motor_renan import normalizar_campos
+    except ImportError:
+        return None
+    return normalizar_campos(campos)
+
+def _chave_cache(prefixo, symbol, timeframe, campos):
+    """Resultado completo e cada projeção têm entradas de cache separadas"""
+    chave = f'{prefixo}:{symbol}:{timeframe}'
+    return chave if campos is None else f"{chave}:fields={','.join(campos)}"
+
+def _acrescentar_tempos(corpo, rastreador):
+    """Objeto JSON já codificado + campo _timings, sem decodificar de novo"""
+    if isinstance(corpo, str):
+        corpo = corpo.encode('utf-8')
+    corpo = corpo.rstrip()
+    separador = b',' if corpo[:-1].strip() != b'{' else b''
+    return corpo[:-1] + separador + b'"_timings":' + codificar(rastreador.to_dict()) + b'}'
+
+def _responder(resultado, rastreador, incluir_tempos=False, status=200, corpo=None):
+    """
+    Resposta JSON com header Server-Timing e, se pedido, o campo _timings
+
+    corpo: resultado já codificado (ex: valor do cache), enviado como está;
+    _timings é emendado no fim do objeto
+    """
+    if corpo is None:
+        corpo = codificar(resultado)
+    if incluir_tempos:
+        corpo = _acrescentar_tempos(corpo, rastreador)
+    resposta = Response(corpo, status=status, mimetype='application/json')
+    resposta.headers['Server-Timing'] = rastreador.server_timing()
+    return resposta
+
 @analyze_bp.route('/api/analyze', methods=['POST'])
 @require_tier('free')  # Todos os tiers podem acessar (análise básica)
 def analyze():
@@ -33,8 +87,12 @@ def analyze():
     Body:
     - symbol: par de trading (ex: BTCUSDT)
     - timeframe: intervalo (1h, 4h, 1d)
+    - timings: true para incluir _timings na resposta (ou ?timings=1)
+    - fields: projeção, ex: "sintese,niveis_operacionais,mtf" (ou ?fields=);
+      só os estágios necessários rodam e só esses campos são cacheados
     
     Retorna: análise completa com sintese, niveis_operacionais, contexto, estrutura, confluencia
+    Header Server-Timing: duração de cada etapa (cache, busca, estágios, serialização)
     """
     request_id = get_request_id()
     start_time = time.time()
@@ -42,35 +100,45 @@ def analyze():
     data = request.get_json() or {}
     symbol = data.get('symbol', 'BTCUSDT').upper()
     timeframe = data.get('timeframe', '1h')
+    incluir_tempos = _pediu_tempos(data)
+    rastreador = Rastreador()
+    try:
+        campos = _campos_pedidos(data)
+    except ValueError as e:
+        return jsonify({"status": "error", "error": str(e)}), 400
     
     # Verificar cache
-    cache_key = f'analyze:{symbol}:{timeframe}'
-    cached = redis_client.get(cache_key)
+    cache_key = _chave_cache('analyze', symbol, timeframe, campos)
+    with rastreador.span('cache') as span:
+        cached = redis_client.get(cache_key)
+        span.cache = bool(cached)
     
     if cached:
         analysis_requests.labels(tier=g.user.get('tier', 'free'), cached=True).inc()
         analysis_duration.observe(time.time() - start_time)
-        return jsonify(json.loads(cached))
+        return _responder(None, rastreador, incluir_tempos, corpo=cached)
     
     try:
         # Importar motor service
         from app.services.motor_service import analyze as motor_analyze
         
-        # Executar análise real
-        resultado = motor_analyze(symbol, timeframe)
+        # Executar análise real (resultado cru: uma passada só no codificador)
+        resultado = motor_analyze(symbol, timeframe, rastreador=rastreador, campos=campos, serializar=False)
         
         # Se houver erro, retornar
         if resultado.get('status') == 'error':
             analysis_requests.labels(tier=g.user.get('tier', 'free'), cached=False, error=True).inc()
-            return jsonify(resultado), 500
+            return _responder(resultado, rastreador, incluir_tempos, 500)
         
-        # Cachear resultado (TTL curto - 30s)
-        redis_client.setex(cache_key, 30, json.dumps(resultado))
+        # Cachear resultado (TTL curto - 30s); o mesmo JSON vai na resposta
+        with rastreador.span('serializacao'):
+            corpo = codificar_texto(resultado)
+        redis_client.setex(cache_key, 30, corpo)
         
         analysis_requests.labels(tier=g.user.get('tier', 'free'), cached=False).inc()
         analysis_duration.observe(time.time() - start_time)
         
-        return jsonify(resultado)
+        return _responder(resultado, rastreador, incluir_tempos, corpo=corpo)
         
     except ImportError:
         # Fallback: retornar dados mockados se motor não estiver disponível
@@ -117,7 +185,7 @@ def analyze():
         }
         
         # Cachear resultado (TTL curto - 30s)
-        redis_client.setex(cache_key, 30, json.dumps(resultado))
+        redis_client.setex(cache_key, 30, codificar_texto(resultado))
         
         analysis_requests.labels(tier=g.user.get('tier', 'free'), cached=False).inc()
         analysis_duration.observe(time.time() - start_time)
@@ -162,8 +230,8 @@ def get_signal():
         # Importar motor service
         from app.services.motor_service import analyze as motor_analyze, extract_signal
         
-        # Executar análise completa
-        resultado_completo = motor_analyze(symbol, timeframe)
+        # Executar só o necessário para o sinal (síntese + preço)
+        resultado_completo = motor_analyze(symbol, timeframe, campos=CAMPOS_SINAL)
         
         # Se houver erro, retornar erro
         if resultado_completo.get('status') == 'error':
@@ -185,7 +253,7 @@ def get_signal():
         ttl = TTL_BY_TIMEFRAME.get(timeframe, 300)
         
         # Cachear resultado
-        redis_client.setex(cache_key, ttl, json.dumps(sinal_result))
+        redis_client.setex(cache_key, ttl, codificar_texto(sinal_result))
         
         analysis_requests.labels(tier=g.user.get('tier', 'free'), cached=False).inc()
         analysis_duration.observe(time.time() - start_time)
@@ -8,10 +8,13 @@ from app.utils.metrics import dashboard_requests, dashboard_duration
 import redis
 import os
 import time
-import requests
 import pandas as pd
 import logging
 
+from app.services.motor.klines import buscar_klines_binance
+from app.services.motor.armazem_candles import obter_klines
+from app.services.motor.http_upstream import estatisticas_upstream, resumo_upstream
+
 logger = logging.getLogger(__name__)
 
 v1_bp = Blueprint('v1', __name__)
@@ -41,8 +44,6 @@ def buscar_dados_binance(symbol, interval, limit, skip_rate_limit=False):
         DataFrame com candles ou None se erro
     """
     try:
-        url = "https://api.binance.com/api/v3/klines"
-        
         # Mapear intervalos para Binance Data API
         interval_mapping = {
             "1m": "1m", "3m": "3m", "5m": "5m",
@@ -54,37 +55,18 @@ def buscar_dados_binance(symbol, interval, limit, skip_rate_limit=False):
         
         binance_interval = interval_mapping.get(interval, interval)
         
-        params = {
-            "symbol": symbol,
-            "interval": binance_interval,
-            "limit": min(limit, 1000)
-        }
-        
-        response = requests.get(url, params=params, timeout=10)
-        
-        if response.status_code != 200:
-            print(f"❌ Erro Binance {response.status_code}: {response.text}")
-            return None
-        
-        data = response.json()
+        # Candles fechados do armazém local; da Binance só o que falta
+        klines = obter_klines(symbol, binance_interval, min(limit, 1000), buscar=buscar_klines_binance)
         
-        if not data or len(data) == 0:
+        if klines is None or len(klines) == 0:
             return None
         
         # Converter para DataFrame
-        df = pd.DataFrame(data, columns=[
-            "open_time", "open", "high", "low", "close", "volume",
-            "close_time", "qav", "trades", "tbb", "tbq", "ignore"
-        ])
-        
-        # Converter tipos
-        df["open_time"] = pd.to_datetime(df["open_time"], unit="ms")
-        df = df.astype({
-            "open": float, "high": float, "low": float,
-            "close": float, "volume": float
-        })
-        
-        df.set_index("open_time", inplace=True)
+        df = klines.para_dataframe([
+            "open", "high", "low", "close", "volume",
+            "close_time", "quote_volume", "trades", "taker_buy_base", "taker_buy_quote"
+        ], tempo_como_datetime=False).rename(columns={"quote_volume": "qav", "taker_buy_base": "tbb", "taker_buy_quote": "tbq"})
+        df.index = pd.to_datetime(klines.timestamp, unit="ms").rename("open_time")
         
         # Calcular indicadores básicos
         df["EMA8"] = df["close"].ewm(span=8, adjust=False).mean()
@@ -203,29 +185,23 @@ def get_system_status():
     Status do sistema (compatível com radar existente)
     
     Retorna: circuit breakers, rate limits, API call counts
+    (contadores do agendador upstream deste processo; rate_limits é o peso
+    usado no minuto segundo a Binance)
     """
     request_id = get_request_id()
     start_time = time.time()
     
     try:
-        # TODO: Implementar sistema de circuit breakers e rate limits real
-        # Por enquanto, retornar estrutura compatível
+        servicos = {
+            "binance": resumo_upstream('binance.com'),
+            "cmc": resumo_upstream('coinmarketcap.com'),
+            "coinglass": resumo_upstream('coinglass.com'),
+        }
         status = {
-            "circuit_breakers": {
-                "binance": False,
-                "cmc": False,
-                "coinglass": False
-            },
-            "rate_limits": {
-                "binance": 0,
-                "cmc": 0,
-                "coinglass": 0
-            },
-            "api_call_counts": {
-                "binance": 0,
-                "cmc": 0,
-                "coinglass": 0
-            },
+            "circuit_breakers": {nome: r['aberto'] for nome, r in servicos.items()},
+            "rate_limits": {nome: r['peso_usado'] for nome, r in servicos.items()},
+            "api_call_counts": {nome: r['requisicoes'] for nome, r in servicos.items()},
+            "upstream": estatisticas_upstream(),
             "timestamp": int(time.time())
         }
         
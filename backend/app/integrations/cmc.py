@@ -3,9 +3,10 @@ Integração com CoinMarketCap API
 """
 import os
 import time
-import requests
 from typing import Dict, Any
 
+from app.services.motor.http_upstream import upstream_get
+
 # Cache simples em memória
 _cache = {}
 
@@ -61,7 +62,7 @@ def get_global_metrics(ttl: int = 60, timeout: int = 10) -> Dict[str, Any]:
     headers = {"X-CMC_PRO_API_KEY": api_key}
     
     try:
-        resp = requests.get(url, headers=headers, timeout=timeout)
+        resp = upstream_get(url, headers=headers, timeout=timeout)
         if resp.status_code != 200:
             # Fallback para dados mockados se API falhar
             return {
@@ -10,6 +10,8 @@ import numpy as np
 from datetime import datetime, timedelta
 import pytz
 
+from .klines import decodificar_klines
+
 
 def analisar_candle_atual(df, timeframe="1h"):
     """
@@ -630,14 +632,9 @@ if __name__ == "__main__":
     response = requests.get(url, params=params, timeout=10)
     
     if response.status_code == 200:
-        data = response.json()
-        df = pd.DataFrame(data, columns=[
-            'timestamp', 'open', 'high', 'low', 'close', 'volume',
-            'close_time', 'quote_volume', 'trades', 'taker_buy_base',
-            'taker_buy_quote', 'ignore'
-        ])
-        df = df[['open', 'high', 'low', 'close', 'volume']].astype(float)
-        df.index = pd.to_datetime([datetime.fromtimestamp(int(ts)/1000) for ts in data], unit='s')
+        klines = decodificar_klines(response.content)
+        df = klines.para_dataframe(['open', 'high', 'low', 'close', 'volume'])
+        df.index = pd.DatetimeIndex(klines.timestamp.astype('datetime64[ms]'))
         
         analise = analisar_candle_atual(df, "1h")
         
@@ -8,6 +8,9 @@ Identifica níveis chave de S/R usando múltiplos métodos
 import pandas as pd
 import numpy as np
 
+from .pontos_swing import detectar_swings
+from .frame_indicadores import frame_indicadores
+
 
 def calcular_range_atr(df, periodo=14):
     """
@@ -21,17 +24,10 @@ def calcular_range_atr(df, periodo=14):
         dict com dados de range
     """
     try:
-        # Calcular True Range
-        df['prev_close'] = df['close'].shift(1)
-        df['tr1'] = df['high'] - df['low']
-        df['tr2'] = abs(df['high'] - df['prev_close'])
-        df['tr3'] = abs(df['low'] - df['prev_close'])
-        df['true_range'] = df[['tr1', 'tr2', 'tr3']].max(axis=1)
-        
-        # Calcular ATR
-        df['atr'] = df['true_range'].rolling(window=periodo).mean()
+        # ATR compartilhado (True Range calculado uma vez por df)
+        atr = frame_indicadores(df).atr(periodo)
         
-        atr_atual = df['atr'].iloc[-1]
+        atr_atual = atr.iloc[-1]
         preco_atual = df['close'].iloc[-1]
         
         # Range percentual
@@ -42,7 +38,7 @@ def calcular_range_atr(df, periodo=14):
         range_dia_percent = (range_dia / preco_atual) * 100
         
         # Classificar volatilidade baseada no ATR
-        atr_medio = df['atr'].tail(50).mean()
+        atr_medio = atr.tail(50).mean()
         
         if atr_atual > atr_medio * 1.5:
             volatilidade_status = "ALTA"
@@ -107,15 +103,12 @@ def calcular_suportes_resistencias(df, num_niveis=3):
         # 2. Máximas e mínimas locais (swing points)
         window = 20
         if len(df) >= window:
-            # Encontrar máximas locais (resistências)
-            for i in range(window, len(df) - window):
-                if df['high'].iloc[i] == df['high'].iloc[i-window:i+window].max():
-                    resistencias.append(df['high'].iloc[i])
+            # Janela [i-window, i+window) em torno de cada candle
+            topos, fundos = detectar_swings(df['high'].values, df['low'].values, window, window - 1)
             
-            # Encontrar mínimas locais (suportes)
-            for i in range(window, len(df) - window):
-                if df['low'].iloc[i] == df['low'].iloc[i-window:i+window].min():
-                    suportes.append(df['low'].iloc[i])
+            # Máximas locais (resistências) e mínimas locais (suportes)
+            resistencias.extend(df['high'].values[topos[topos < len(df) - window]].tolist())
+            suportes.extend(df['low'].values[fundos[fundos < len(df) - window]].tolist())
         
         # 3. Níveis psicológicos (números redondos)
         preco_atual = df['close'].iloc[-1]
@@ -10,6 +10,8 @@ import numpy as np
 from datetime import datetime
 import pytz
 
+from .frame_indicadores import frame_indicadores
+
 
 def analisar_contexto(dados):
     """
@@ -115,7 +117,7 @@ def calcular_volatilidade(dados):
     """Calcula volatilidade em %"""
     try:
         # ATR em %
-        atr = dados['close'].diff().abs().rolling(14).mean().iloc[-1]
+        atr = frame_indicadores(dados).variacao_media(14).iloc[-1]
         volatilidade = (atr / dados['close'].iloc[-1]) * 100
         
         # Também calcular por retornos
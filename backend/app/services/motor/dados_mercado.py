@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DADOS DE MERCADO
+Pré-carregamento concorrente de todas as requisições de uma análise
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .multi_timeframe import buscar_dados_tf, TIMEFRAMES_MTF
+from .fluxo_ativo import FluxoAtivo
+from .frame_indicadores import frame_indicadores
+from .candles import Candles
+from .rastreamento import coletar_transferencias
+from .http_upstream import com_prioridade
+
+# Limite de threads simultâneas por análise
+MAX_WORKERS_PREFETCH = int(os.getenv('MOTOR_PREFETCH_WORKERS', 8))
+
+
+class DadosMercado:
+    """Contexto compartilhado com os dados de mercado de uma análise"""
+
+    def __init__(self, symbol, timeframe):
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.dados = None       # DataFrame do timeframe principal (com indicadores)
+        self.dados_mtf = {}     # {tf: DataFrame} para a análise multi-timeframe
+        self.depth = None       # Order book bruto da Binance
+        self.tempos = {}        # Tempo de cada requisição (segundos)
+        self.transferencias = {}  # {requisição: {'bytes': n, 'cache': bool|None}}
+        self.tempo_total = 0.0  # Tempo de parede do pré-carregamento
+
+    @property
+    def preco_atual(self):
+        """Último fechamento do timeframe principal"""
+        if self.dados is None or self.dados.empty:
+            return None
+        return self.dados['close'].iloc[-1]
+
+    @property
+    def candles(self):
+        """Contêiner somente leitura por trás de dados (ver candles.Candles)"""
+        if self.dados is None:
+            return None
+        frame = frame_indicadores(self.dados)
+        if isinstance(frame.df, Candles):
+            return frame.df
+        return Candles.de_dataframe(self.dados)
+
+
+def _cronometrar(func, *args):
+    """Executa func e devolve (resultado, duração, transferência)"""
+    inicio = time.perf_counter()
+    with coletar_transferencias() as transferencia:
+        try:
+            resultado = func(*args)
+        except Exception as e:
+            print(f"   ⚠️ Erro no pré-carregamento ({getattr(func, '__name__', func)}): {e}")
+            resultado = None
+    return resultado, time.perf_counter() - inicio, transferencia
+
+
+def prefetch_dados_mercado(symbol, timeframe, timeframes_mtf=TIMEFRAMES_MTF,
+                           limit=200, limit_mtf=100, depth_limit=1000, incluir_depth=True):
+    """
+    Dispara todas as requisições de uma análise ao mesmo tempo
+
+    Klines do timeframe principal, klines de cada timeframe da análise MTF e
+    o order book são buscados em paralelo; a latência passa a ser a da
+    requisição mais lenta e não a soma de todas.
+
+    timeframes_mtf=() e incluir_depth=False pulam as buscas que a análise
+    não vai usar (ver campos= em analise_completa).
+
+    Returns:
+        DadosMercado com os resultados (None nos campos cuja requisição falhou)
+    """
+    # Import tardio: motor_renan importa este módulo
+    from .motor_renan import coletar_dados
+
+    mercado = DadosMercado(symbol, timeframe)
+
+    tarefas = {'dados': (coletar_dados, symbol, timeframe, limit)}
+    if incluir_depth:
+        tarefas['depth'] = (FluxoAtivo().obter_depth, symbol, depth_limit)
+    for tf in timeframes_mtf:
+        tarefas[f'mtf:{tf}'] = (buscar_dados_tf, symbol, tf, limit_mtf)
+
+    inicio = time.perf_counter()
+    workers = max(1, min(MAX_WORKERS_PREFETCH, len(tarefas)))
+    # As threads do pool herdam a prioridade upstream de quem chamou
+    buscar = com_prioridade(_cronometrar)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='motor-prefetch') as pool:
+        futuros = {nome: pool.submit(buscar, func, *args)
+                   for nome, (func, *args) in tarefas.items()}
+
+        for nome, futuro in futuros.items():
+            resultado, duracao, transferencia = futuro.result()
+            mercado.tempos[nome] = duracao
+            mercado.transferencias[nome] = transferencia
+
+            if nome == 'dados':
+                mercado.dados = resultado
+            elif nome == 'depth':
+                mercado.depth = resultado
+            else:
+                mercado.dados_mtf[nome.split(':', 1)[1]] = resultado
+
+    mercado.tempo_total = time.perf_counter() - inicio
+    return mercado
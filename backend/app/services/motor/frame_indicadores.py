@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+FRAME DE INDICADORES
+Séries de indicadores calculadas sob demanda e memorizadas por
+(indicador, parâmetros), compartilhadas por todos os estágios que
+recebem o mesmo DataFrame.
+
+Antes, TR/ATR, EMAs e máximas/mínimas móveis eram recalculados em
+indicadores, indicadores_avancados, padroes_graficos, niveis_operacionais,
+calcular_suportes_resistencias e contexto_global para o mesmo candle set.
+
+Uso:
+    frame = frame_indicadores(df)   # o mesmo objeto df devolve o mesmo frame
+    atr = frame.atr(14)             # calcula na primeira vez, depois reutiliza
+
+As séries devolvidas são compartilhadas: não devem ser alteradas in-place.
+"""
+
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Funções de cálculo registradas: nome -> func(frame, **params)
+CALCULOS = {}
+
+_ATRIBUTO = '_frame_indicadores'
+_trava_anexar = threading.Lock()
+
+
+def _registrar(nome):
+    def decorador(func):
+        CALCULOS[nome] = func
+        return func
+    return decorador
+
+
+class FrameIndicadores:
+    """
+    Cache preguiçoso de séries de indicadores sobre um DataFrame OHLCV
+
+    Args:
+        df: DataFrame com open/high/low/close/volume (não é copiado)
+    """
+
+    def __init__(self, df):
+        self.df = df
+        self._series = {}
+        self._trava = threading.RLock()
+        self.calculos = 0   # Séries efetivamente calculadas
+        self.acertos = 0    # Acessos servidos pelo cache
+
+    def serie(self, nome, **params):
+        """Série do indicador `nome` com os parâmetros dados (memorizada)"""
+        chave = (nome, tuple(sorted(params.items())))
+        with self._trava:
+            if chave in self._series:
+                self.acertos += 1
+                return self._series[chave]
+            if nome not in CALCULOS:
+                raise KeyError(f"Indicador desconhecido: {nome}")
+            valor = CALCULOS[nome](self, **params)
+            self._series[chave] = valor
+            self.calculos += 1
+            return valor
+
+    # Atalhos -----------------------------------------------------------------
+
+    def tr(self):
+        return self.serie('tr')
+
+    def atr(self, periodo=14):
+        return self.serie('atr', periodo=periodo)
+
+    def ema(self, periodo, coluna='close', adjust=False):
+        return self.serie('ema', periodo=periodo, coluna=coluna, adjust=adjust)
+
+    def sma(self, periodo, coluna='close'):
+        return self.serie('sma', periodo=periodo, coluna=coluna)
+
+    def desvio(self, periodo, coluna='close'):
+        return self.serie('desvio', periodo=periodo, coluna=coluna)
+
+    def maxima(self, periodo, coluna='high'):
+        return self.serie('maxima', periodo=periodo, coluna=coluna)
+
+    def minima(self, periodo, coluna='low'):
+        return self.serie('minima', periodo=periodo, coluna=coluna)
+
+    def rsi(self, periodo=14):
+        return self.serie('rsi', periodo=periodo)
+
+    def macd(self, rapida=12, lenta=26):
+        return self.serie('macd', rapida=rapida, lenta=lenta)
+
+    def macd_sinal(self, rapida=12, lenta=26, sinal=9):
+        return self.serie('macd_sinal', rapida=rapida, lenta=lenta, sinal=sinal)
+
+    def preco_tipico(self):
+        return self.serie('preco_tipico')
+
+    def variacao_media(self, periodo=14):
+        return self.serie('variacao_media', periodo=periodo)
+
+
+# ============================================================================
+# CÁLCULOS
+# ============================================================================
+
+@_registrar('tr')
+def _tr(frame):
+    """True Range (NaN no primeiro candle, sem fechamento anterior)"""
+    df = frame.df
+    fechamento_anterior = df['close'].shift(1)
+    return pd.Series(np.maximum(
+        df['high'] - df['low'],
+        np.maximum(abs(df['high'] - fechamento_anterior), abs(df['low'] - fechamento_anterior))
+    ), index=df.index)
+
+
+@_registrar('atr')
+def _atr(frame, periodo):
+    return frame.tr().rolling(window=periodo).mean()
+
+
+@_registrar('ema')
+def _ema(frame, periodo, coluna, adjust):
+    return frame.df[coluna].ewm(span=periodo, adjust=adjust).mean()
+
+
+@_registrar('sma')
+def _sma(frame, periodo, coluna):
+    return frame.df[coluna].rolling(window=periodo).mean()
+
+
+@_registrar('desvio')
+def _desvio(frame, periodo, coluna):
+    return frame.df[coluna].rolling(window=periodo).std()
+
+
+@_registrar('maxima')
+def _maxima(frame, periodo, coluna):
+    return frame.df[coluna].rolling(window=periodo).max()
+
+
+@_registrar('minima')
+def _minima(frame, periodo, coluna):
+    return frame.df[coluna].rolling(window=periodo).min()
+
+
+@_registrar('rsi')
+def _rsi(frame, periodo):
+    """RSI por média móvel simples de ganhos/perdas (mesma fórmula de calcular_indicadores)"""
+    delta = frame.df['close'].diff()
+    gain = (delta.where(delta > 0, 0)).rolling(window=periodo).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=periodo).mean()
+    rs = gain / loss
+    return 100 - (100 / (1 + rs))
+
+
+@_registrar('macd')
+def _macd(frame, rapida, lenta):
+    return frame.ema(rapida) - frame.ema(lenta)
+
+
+@_registrar('macd_sinal')
+def _macd_sinal(frame, rapida, lenta, sinal):
+    return frame.macd(rapida, lenta).ewm(span=sinal, adjust=False).mean()
+
+
+@_registrar('preco_tipico')
+def _preco_tipico(frame):
+    df = frame.df
+    return (df['high'] + df['low'] + df['close']) / 3
+
+
+@_registrar('variacao_media')
+def _variacao_media(frame, periodo):
+    """Média móvel da variação absoluta do fechamento (ATR só de fechamentos)"""
+    return frame.df['close'].diff().abs().rolling(periodo).mean()
+
+
+# ============================================================================
+# COMPARTILHAMENTO
+# ============================================================================
+
+def frame_indicadores(df):
+    """
+    Frame do DataFrame, criado no primeiro acesso
+
+    O frame fica preso ao próprio objeto df: cópias e fatias (df.copy(),
+    df.tail()) não o herdam e recebem um frame próprio. Contêineres com
+    cache próprio (Candles) devolvem o seu.
+    """
+    if not isinstance(df, pd.DataFrame):
+        return df.indicadores
+    frame = df.__dict__.get(_ATRIBUTO)
+    if frame is None:
+        with _trava_anexar:
+            frame = df.__dict__.get(_ATRIBUTO)
+            if frame is None:
+                frame = FrameIndicadores(df)
+                object.__setattr__(df, _ATRIBUTO, frame)
+    return frame
+
+
+def compartilhar_frame(origem, destino):
+    """
+    Faz destino (ex: origem.copy()) usar o frame de origem
+
+    Só é válido quando os dois têm as mesmas colunas OHLCV e o mesmo índice.
+
+    Returns:
+        destino
+    """
+    object.__setattr__(destino, _ATRIBUTO, frame_indicadores(origem))
+    return destino
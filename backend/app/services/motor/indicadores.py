@@ -7,11 +7,12 @@ Inclui: Osciladores, Momentum, Volatilidade, Volume, Padrões Gráficos
 """
 
 import pandas as pd
-import numpy as np
 from typing import Dict, List, Tuple, Optional
 import warnings
 warnings.filterwarnings('ignore')
 
+from .frame_indicadores import frame_indicadores
+
 
 def calcular_indicadores_simples(closes):
     """
@@ -65,56 +66,47 @@ def calcular_indicadores(df):
             print(f"⚠️ Colunas faltando: {missing_cols}")
             return df
         
+        # Séries compartilhadas com os demais estágios (calculadas uma vez por df)
+        frame = frame_indicadores(df)
+        
         # EMAs
-        df['EMA8'] = df['close'].ewm(span=8, adjust=False).mean()
-        df['EMA21'] = df['close'].ewm(span=21, adjust=False).mean()
-        df['EMA50'] = df['close'].ewm(span=50, adjust=False).mean()
-        df['EMA200'] = df['close'].ewm(span=200, adjust=False).mean()
+        df['EMA8'] = frame.ema(8)
+        df['EMA21'] = frame.ema(21)
+        df['EMA50'] = frame.ema(50)
+        df['EMA200'] = frame.ema(200)
         
         # SMAs
-        df['SMA20'] = df['close'].rolling(window=20).mean()
-        df['SMA50'] = df['close'].rolling(window=50).mean()
-        df['SMA200'] = df['close'].rolling(window=200).mean()
+        df['SMA20'] = frame.sma(20)
+        df['SMA50'] = frame.sma(50)
+        df['SMA200'] = frame.sma(200)
         
         # RSI
-        delta = df['close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-        rs = gain / loss
-        df['RSI'] = 100 - (100 / (1 + rs))
+        df['RSI'] = frame.rsi(14)
         
         # MACD
-        exp1 = df['close'].ewm(span=12, adjust=False).mean()
-        exp2 = df['close'].ewm(span=26, adjust=False).mean()
-        df['MACD'] = exp1 - exp2
-        df['MACD_Signal'] = df['MACD'].ewm(span=9, adjust=False).mean()
+        df['MACD'] = frame.macd()
+        df['MACD_Signal'] = frame.macd_sinal()
         df['MACD_Hist'] = df['MACD'] - df['MACD_Signal']
         
         # Bollinger Bands
-        df['BB_Mid'] = df['close'].rolling(window=20).mean()
-        bb_std = df['close'].rolling(window=20).std()
+        df['BB_Mid'] = frame.sma(20)
+        bb_std = frame.desvio(20)
         df['BB_Upper'] = df['BB_Mid'] + (bb_std * 2)
         df['BB_Lower'] = df['BB_Mid'] - (bb_std * 2)
         df['BB_Width'] = df['BB_Upper'] - df['BB_Lower']
         
         # Stochastic
-        low_14 = df['low'].rolling(window=14).min()
-        high_14 = df['high'].rolling(window=14).max()
+        low_14 = frame.minima(14)
+        high_14 = frame.maxima(14)
         df['Stoch_K'] = 100 * (df['close'] - low_14) / (high_14 - low_14)
         df['Stoch_D'] = df['Stoch_K'].rolling(window=3).mean()
         
         # ATR (Average True Range)
-        df['TR'] = np.maximum(
-            df['high'] - df['low'],
-            np.maximum(
-                abs(df['high'] - df['close'].shift(1)),
-                abs(df['low'] - df['close'].shift(1))
-            )
-        )
-        df['ATR'] = df['TR'].rolling(window=14).mean()
+        df['TR'] = frame.tr()
+        df['ATR'] = frame.atr(14)
         
         # Volume MA
-        df['Volume_MA'] = df['volume'].rolling(window=20).mean()
+        df['Volume_MA'] = frame.sma(20, 'volume')
         
         print(f"✅ Indicadores calculados com sucesso para {len(df)} candles")
         return df
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+INDICADORES INCREMENTAIS
+Motor de indicadores com estado: semeado uma vez com o histórico e depois
+atualizado em O(1) a cada candle novo (ou em formação), sem recalcular as
+séries inteiras com pandas.
+
+Os valores seguem as mesmas fórmulas de indicadores.calcular_indicadores
+(EMAs adjust=False, RSI/ATR por média móvel de 14, desvio padrão amostral),
+com RSI/ATR no estilo Wilder opcionais. O estado é um dict de tipos
+simples, pronto para json.dumps / Redis.
+"""
+
+import math
+
+PERIODOS_EMA = (8, 21, 50, 200)
+PERIODO_RSI = 14
+PERIODO_ATR = 14
+PERIODO_BB = 20
+PERIODO_VOLUME = 20
+MACD_RAPIDA, MACD_LENTA, MACD_SINAL = 12, 26, 9
+
+NAN = float('nan')
+
+
+def _ema(anterior, valor, periodo):
+    """Um passo de EMA (adjust=False); a primeira observação semeia a média"""
+    if anterior is None:
+        return valor
+    alpha = 2.0 / (periodo + 1)
+    return alpha * valor + (1 - alpha) * anterior
+
+
+class _JanelaMovel:
+    """
+    Janela deslizante de tamanho fixo com média e variância em O(1)
+
+    Usa a atualização de Welford para inclusão/remoção e recalcula
+    média e M2 a partir do buffer a cada volta completa, o que elimina
+    o acúmulo de erro de arredondamento (custo amortizado O(1)).
+    """
+
+    def __init__(self, tamanho):
+        self.tamanho = tamanho
+        self.buffer = []
+        self.pos = 0
+        self.media = 0.0
+        self.m2 = 0.0
+
+    def _estatisticas_com(self, valor):
+        """(n, media, m2) resultantes de incluir valor, sem alterar a janela"""
+        n = len(self.buffer)
+        if n < self.tamanho:
+            n += 1
+            delta = valor - self.media
+            media = self.media + delta / n
+            return n, media, self.m2 + delta * (valor - media)
+
+        antigo = self.buffer[self.pos]
+        delta = valor - antigo
+        media = self.media + delta / n
+        m2 = self.m2 + delta * (valor - media + antigo - self.media)
+        return n, media, max(m2, 0.0)
+
+    def simular(self, valor):
+        """(media, desvio) com valor incluído; NaN enquanto a janela não enche"""
+        n, media, m2 = self._estatisticas_com(valor)
+        if n < self.tamanho:
+            return NAN, NAN
+        desvio = math.sqrt(m2 / (n - 1)) if n > 1 else NAN
+        return media, desvio
+
+    def adicionar(self, valor):
+        _, self.media, self.m2 = self._estatisticas_com(valor)
+        if len(self.buffer) < self.tamanho:
+            self.buffer.append(valor)
+        else:
+            self.buffer[self.pos] = valor
+        self.pos = (self.pos + 1) % self.tamanho
+        if self.pos == 0:
+            self._recalcular()
+
+    def _recalcular(self):
+        n = len(self.buffer)
+        self.media = sum(self.buffer) / n
+        self.m2 = sum((x - self.media) ** 2 for x in self.buffer)
+
+    def estado(self):
+        # Buffer em ordem cronológica: a posição de escrita volta a zero
+        return self.buffer[self.pos:] + self.buffer[:self.pos]
+
+    @classmethod
+    def de_estado(cls, tamanho, valores):
+        janela = cls(tamanho)
+        for valor in valores[-tamanho:]:
+            janela.adicionar(valor)
+        return janela
+
+
+class _MediaWilder:
+    """Média de Wilder: SMA dos primeiros N valores, depois (ant*(N-1)+x)/N"""
+
+    def __init__(self, periodo):
+        self.periodo = periodo
+        self.n = 0
+        self.valor = 0.0
+
+    def simular(self, x):
+        if self.n < self.periodo:
+            n = self.n + 1
+            media = self.valor + (x - self.valor) / n
+            return (media if n == self.periodo else NAN), n, media
+        media = (self.valor * (self.periodo - 1) + x) / self.periodo
+        return media, self.n + 1, media
+
+    def adicionar(self, x):
+        _, self.n, self.valor = self.simular(x)
+
+    def estado(self):
+        return [self.n, self.valor]
+
+    @classmethod
+    def de_estado(cls, periodo, estado):
+        media = cls(periodo)
+        media.n, media.valor = estado
+        return media
+
+
+class IndicadoresIncrementais:
+    """
+    Indicadores de um par/timeframe atualizados candle a candle
+
+    Uso:
+        motor = IndicadoresIncrementais.semear(df)       # uma vez, O(n)
+        motor.atualizar(candle, fechado=False)            # candle em formação
+        motor.atualizar(candle, fechado=True)             # candle fechou
+        redis.set(chave, json.dumps(motor.estado()))
+        motor = IndicadoresIncrementais.de_estado(json.loads(...))
+
+    Args:
+        wilder: RSI e ATR com suavização de Wilder em vez da média
+                móvel simples usada em calcular_indicadores
+    """
+
+    def __init__(self, wilder=False):
+        self.wilder = wilder
+        self.n = 0
+        self.ultimo_close = None
+        self.emas = {p: None for p in PERIODOS_EMA}
+        self.ema_rapida = None
+        self.ema_lenta = None
+        self.sinal = None
+        self.bb = _JanelaMovel(PERIODO_BB)
+        self.volume = _JanelaMovel(PERIODO_VOLUME)
+        if wilder:
+            self.ganho = _MediaWilder(PERIODO_RSI)
+            self.perda = _MediaWilder(PERIODO_RSI)
+            self.tr = _MediaWilder(PERIODO_ATR)
+        else:
+            self.ganho = _JanelaMovel(PERIODO_RSI)
+            self.perda = _JanelaMovel(PERIODO_RSI)
+            self.tr = _JanelaMovel(PERIODO_ATR)
+        self.valores = {}
+
+    @classmethod
+    def semear(cls, df, wilder=False):
+        """Cria o motor a partir de um DataFrame OHLCV (candles fechados)"""
+        motor = cls(wilder=wilder)
+        colunas = [df[c].to_numpy(dtype=float) for c in ('high', 'low', 'close', 'volume')]
+        for high, low, close, volume in zip(*colunas):
+            motor._avancar(high, low, close, volume, fechado=True)
+        return motor
+
+    def atualizar(self, candle, fechado=True):
+        """
+        Aplica um candle e retorna os indicadores resultantes
+
+        Args:
+            candle: dict com high, low, close e volume
+            fechado: False para o candle em formação (o estado não muda e
+                     a próxima chamada recalcula a partir do último fechado)
+
+        Returns:
+            dict com as mesmas chaves de coluna de calcular_indicadores
+        """
+        return self._avancar(float(candle['high']), float(candle['low']),
+                             float(candle['close']), float(candle['volume']), fechado)
+
+    def _avancar(self, high, low, close, volume, fechado):
+        anterior = self.ultimo_close
+        emas = {p: _ema(self.emas[p], close, p) for p in PERIODOS_EMA}
+        ema_rapida = _ema(self.ema_rapida, close, MACD_RAPIDA)
+        ema_lenta = _ema(self.ema_lenta, close, MACD_LENTA)
+        macd = ema_rapida - ema_lenta
+        sinal = _ema(self.sinal, macd, MACD_SINAL)
+
+        # Primeira variação é 0 (mesmo comportamento do diff + where do pandas)
+        delta = 0.0 if anterior is None else close - anterior
+        ganho, perda = max(delta, 0.0), max(-delta, 0.0)
+        media_ganho = self._simular(self.ganho, ganho)
+        media_perda = self._simular(self.perda, perda)
+
+        # O primeiro candle não tem TR (close anterior inexistente)
+        if anterior is None:
+            tr, atr = None, NAN
+        else:
+            tr = max(high - low, abs(high - anterior), abs(low - anterior))
+            atr = self._simular(self.tr, tr)
+
+        bb_mid, bb_std = self.bb.simular(close)
+        volume_ma, _ = self.volume.simular(volume)
+
+        valores = {f'EMA{p}': emas[p] for p in PERIODOS_EMA}
+        valores.update({
+            'RSI': self._rsi(media_ganho, media_perda),
+            'MACD': macd,
+            'MACD_Signal': sinal,
+            'MACD_Hist': macd - sinal,
+            'SMA20': bb_mid,
+            'BB_Mid': bb_mid,
+            'BB_Upper': bb_mid + 2 * bb_std,
+            'BB_Lower': bb_mid - 2 * bb_std,
+            'BB_Width': 4 * bb_std,
+            'ATR': atr,
+            'Volume_MA': volume_ma,
+            'close': close,
+        })
+
+        if fechado:
+            self.n += 1
+            self.ultimo_close = close
+            self.emas = emas
+            self.ema_rapida, self.ema_lenta, self.sinal = ema_rapida, ema_lenta, sinal
+            self.ganho.adicionar(ganho)
+            self.perda.adicionar(perda)
+            if tr is not None:
+                self.tr.adicionar(tr)
+            self.bb.adicionar(close)
+            self.volume.adicionar(volume)
+            self.valores = valores
+        return valores
+
+    @staticmethod
+    def _simular(media, valor):
+        """Média com valor incluído (_JanelaMovel ou _MediaWilder)"""
+        return media.simular(valor)[0]
+
+    @staticmethod
+    def _rsi(ganho, perda):
+        if math.isnan(ganho) or math.isnan(perda):
+            return NAN
+        if perda == 0:
+            return NAN if ganho == 0 else 100.0
+        return 100 - 100 / (1 + ganho / perda)
+
+    def estado(self):
+        """Estado completo em tipos simples (serializável em JSON)"""
+        return {
+            'wilder': self.wilder,
+            'n': self.n,
+            'ultimo_close': self.ultimo_close,
+            'emas': {str(p): v for p, v in self.emas.items()},
+            'macd': [self.ema_rapida, self.ema_lenta, self.sinal],
+            'ganho': self.ganho.estado(),
+            'perda': self.perda.estado(),
+            'tr': self.tr.estado(),
+            'bb': self.bb.estado(),
+            'volume': self.volume.estado(),
+        }
+
+    @classmethod
+    def de_estado(cls, estado):
+        """Reconstrói o motor a partir de estado()"""
+        motor = cls(wilder=estado['wilder'])
+        motor.n = estado['n']
+        motor.ultimo_close = estado['ultimo_close']
+        motor.emas = {int(p): v for p, v in estado['emas'].items()}
+        motor.ema_rapida, motor.ema_lenta, motor.sinal = estado['macd']
+        if motor.wilder:
+            motor.ganho = _MediaWilder.de_estado(PERIODO_RSI, estado['ganho'])
+            motor.perda = _MediaWilder.de_estado(PERIODO_RSI, estado['perda'])
+            motor.tr = _MediaWilder.de_estado(PERIODO_ATR, estado['tr'])
+        else:
+            motor.ganho = _JanelaMovel.de_estado(PERIODO_RSI, estado['ganho'])
+            motor.perda = _JanelaMovel.de_estado(PERIODO_RSI, estado['perda'])
+            motor.tr = _JanelaMovel.de_estado(PERIODO_ATR, estado['tr'])
+        motor.bb = _JanelaMovel.de_estado(PERIODO_BB, estado['bb'])
+        motor.volume = _JanelaMovel.de_estado(PERIODO_VOLUME, estado['volume'])
+        return motor
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+KERNELS NUMÉRICOS
+Núcleos em arrays para os indicadores que antes rodavam em loops Python
+(OBV, desvio médio do CCI, Parabolic SAR).
+
+Se o numba estiver instalado o PSAR é compilado; caso contrário usa o
+mesmo algoritmo em Python puro sobre listas. MOTOR_NUMBA=0 desliga a
+compilação mesmo com numba disponível.
+"""
+
+import os
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+try:
+    if os.getenv('MOTOR_NUMBA', '1') == '0':
+        raise ImportError("desativado por MOTOR_NUMBA=0")
+    from numba import njit
+    NUMBA_DISPONIVEL = True
+except ImportError:
+    NUMBA_DISPONIVEL = False
+
+
+def obv(close, volume):
+    """
+    On Balance Volume vetorizado
+
+    Soma acumulada do volume com sinal da variação do fechamento;
+    o primeiro valor é o próprio volume.
+    """
+    close = np.asarray(close, dtype=float)
+    volume = np.asarray(volume, dtype=float)
+    if len(close) == 0:
+        return np.zeros(0)
+
+    delta = np.diff(close)
+    fluxo = np.empty(len(close))
+    fluxo[0] = volume[0]
+    fluxo[1:] = np.where(delta > 0, volume[1:], np.where(delta < 0, -volume[1:], 0.0))
+    return np.cumsum(fluxo)
+
+
+def desvio_medio_movel(valores, periodo):
+    """
+    Desvio médio absoluto em janela móvel (NaN até a janela encher)
+
+    Todas as janelas são avaliadas de uma vez sobre uma view (n, periodo),
+    sem chamadas Python por janela como em rolling().apply().
+    """
+    valores = np.asarray(valores, dtype=float)
+    resultado = np.full(len(valores), np.nan)
+    if len(valores) < periodo:
+        return resultado
+
+    janelas = sliding_window_view(valores, periodo)
+    medias = janelas.mean(axis=1, keepdims=True)
+    resultado[periodo - 1:] = np.abs(janelas - medias).mean(axis=1)
+    return resultado
+
+
+def _psar_loop(high, low, af, max_af, sar, trend):
+    """Loop do Parabolic SAR (mesma regra de calcular_parabolic_sar)"""
+    n = len(high)
+    af_atual = af
+    sar[0] = low[0]
+    trend[0] = 1.0
+
+    for i in range(1, n):
+        if trend[i - 1] == 1.0:
+            s = sar[i - 1] + af_atual * (high[i - 1] - sar[i - 1])
+            if low[i] <= s:
+                trend[i] = -1.0
+                s = high[i - 1]
+                af_atual = af
+            else:
+                trend[i] = 1.0
+                if high[i] > high[i - 1]:
+                    af_atual = min(af_atual + af, max_af)
+        else:
+            s = sar[i - 1] + af_atual * (low[i - 1] - sar[i - 1])
+            if high[i] >= s:
+                trend[i] = 1.0
+                s = low[i - 1]
+                af_atual = af
+            else:
+                trend[i] = -1.0
+                if low[i] < low[i - 1]:
+                    af_atual = min(af_atual + af, max_af)
+        sar[i] = s
+
+
+if NUMBA_DISPONIVEL:
+    _psar_compilado = njit(cache=True, nogil=True)(_psar_loop)
+
+
+def psar(high, low, af=0.02, max_af=0.2, compilado=None):
+    """
+    Parabolic SAR
+
+    Args:
+        compilado: None usa numba quando disponível; False força Python puro
+
+    Returns:
+        (sar, trend) como arrays float64; trend é 1 (alta) ou -1 (baixa)
+    """
+    high = np.ascontiguousarray(high, dtype=float)
+    low = np.ascontiguousarray(low, dtype=float)
+    n = len(high)
+    if n == 0:
+        return np.zeros(0), np.zeros(0)
+
+    if compilado is None:
+        compilado = NUMBA_DISPONIVEL
+    if compilado and NUMBA_DISPONIVEL:
+        sar, trend = np.zeros(n), np.zeros(n)
+        _psar_compilado(high, low, float(af), float(max_af), sar, trend)
+        return sar, trend
+
+    # Listas Python: indexação escalar muito mais barata que em ndarray
+    sar, trend = [0.0] * n, [0.0] * n
+    _psar_loop(high.tolist(), low.tolist(), af, max_af, sar, trend)
+    return np.array(sar), np.array(trend)
@@ -22,7 +22,13 @@ from .indicadores_avancados import (
 import pandas as pd
 from .analise_candles_detalhada import analisar_candle_atual
 from .gestao_risco_profissional import GestaoRiscoProfissional
-from .relatorio_profissional import gerar_relatorio_profissional
+from .relatorio_profissional import gerar_relatorio_profissional, obter_relatorio
+from .dados_mercado import prefetch_dados_mercado
+from .executor_estagios import Estagio, executar_estagios, estagios_necessarios
+from .frame_indicadores import compartilhar_frame
+from .candles import Candles
+from .klines import buscar_klines_binance
+from .armazem_candles import obter_klines
 
 # Importação condicional de requests
 try:
@@ -31,74 +37,176 @@ except ImportError:
     print("⚠️ Módulo 'requests' não encontrado. Algumas funcionalidades podem não funcionar.")
     requests = None
 
+import logging
+logger = logging.getLogger(__name__)
 
-def analise_completa(symbol="BTCUSDT", timeframe="1h"):
+
+def analise_completa(symbol="BTCUSDT", timeframe="1h", mercado=None, rastreador=None, campos=None):
     """
     SNE Scanner - Análise Completa Integrada
     
+    Os estágios de análise rodam via executor_estagios (ver ESTAGIOS_ANALISE);
+    estágios independentes executam em paralelo.
+    
+    Args:
+        symbol: Par a analisar
+        timeframe: Timeframe principal
+        mercado: DadosMercado já carregado (ex: analise_completa_lote);
+                 se None, os dados são buscados aqui
+        rastreador: Rastreador opcional; recebe o span da busca e um span
+                    por estágio (ver rastreamento)
+        campos: Projeção do resultado (ex: 'sintese,niveis_operacionais' ou
+                lista; ver CAMPOS_RESULTADO). Só rodam os estágios (e as
+                buscas) de que esses campos dependem. None = tudo.
+    
     Returns:
-        dict com todas as camadas de análise
+        dict com todas as camadas de análise (ou só symbol, timeframe e
+        os campos pedidos)
+    
+    Raises:
+        ValueError: campos desconhecidos
     """
+    campos = normalizar_campos(campos)
+    if campos is None:
+        estagios = ESTAGIOS_ANALISE
+    else:
+        estagios = estagios_necessarios(
+            ESTAGIOS_ANALISE, {saida for campo in campos for saida in CAMPOS_RESULTADO[campo]})
+    nomes_estagios = {e.nome for e in estagios}
+
     print(f"\n🔄 SNE SCANNER - Analisando {symbol}...")
     
-    # 1. COLETAR DADOS
-    print("   📊 Coletando dados...")
-    dados = coletar_dados(symbol, timeframe)
+    # 1. COLETAR DADOS (todas as requisições em paralelo)
+    if mercado is None:
+        print("   📊 Coletando dados...")
+        buscas = {}
+        if 'mtf' not in nomes_estagios:
+            buscas['timeframes_mtf'] = ()
+        if 'fluxo' not in nomes_estagios:
+            buscas['incluir_depth'] = False
+        mercado = prefetch_dados_mercado(symbol, timeframe, **buscas)
+    if rastreador is not None:
+        rastreador.registrar_busca(mercado)
+    dados = mercado.dados
     if dados is None:
         return {"erro": "Falha ao coletar dados"}
     
-    # 2. ANÁLISES FUNDAMENTAIS
-    print("   🌍 Analisando contexto macro...")
-    contexto = analisar_contexto(dados)
+    # 2-9. ESTÁGIOS DE ANÁLISE (grafo de dependências)
+    contexto_estagios = {
+        'symbol': symbol,
+        'timeframe': timeframe,
+        'dados': dados,
+        'mercado': mercado
+    }
+    ctx, tempos = executar_estagios(estagios, contexto_estagios)
+    if rastreador is not None:
+        rastreador.registrar_estagios(
+            {e.nome: tempos[e.nome] for e in estagios if e.nome in tempos})
+    logger.info("Tempos dos estágios (%s %s): %s", symbol, timeframe,
+                ", ".join(f"{nome}={t * 1000:.0f}ms" for nome, t in sorted(tempos.items(), key=lambda x: -x[1])))
+    
+    resultado = {'symbol': symbol, 'timeframe': timeframe}
+    for campo in ('contexto', 'estrutura', 'mtf', 'indicadores', 'analise_avancada', 'zonas',
+                  'fluxo', 'confluencia', 'padroes', 'wedges', 'candles_detalhados'):
+        if campo in ctx:
+            resultado[campo] = ctx[campo]
+    
+    if 'sintese' in ctx:
+        # Integrar gestão de risco na síntese
+        sintese = ctx['sintese']
+        sintese.update(ctx['gestao'])
+        resultado['sintese'] = sintese
+        resultado['niveis_operacionais'] = {
+            'entry_price': sintese.get('entry_price', 0),
+            'stop_loss': sintese.get('stop_loss', 0),
+            'tp1': sintese.get('tp1', 0),
+            'tp2': sintese.get('tp2', 0),
+            'tp3': sintese.get('tp3', 0),
+            'rr_ratio': sintese.get('rr_ratio', 'N/A')
+        }
+        resultado['gestao_risco'] = sintese.get('gestao_risco', {})
     
-    print("   📊 Analisando estrutura...")
-    estrutura = analisar_estrutura(dados)
+    if campos is not None:
+        # Dependências calculadas, mas não pedidas, ficam fora
+        resultado = {chave: valor for chave, valor in resultado.items()
+                     if chave in ('symbol', 'timeframe') or chave in campos}
     
+    print("   ✅ Análise completa!\n")
+    return resultado
+
+
+# ============================================================================
+# ESTÁGIOS DA ANÁLISE
+# ============================================================================
+
+def _estagio_contexto(dados):
+    print("   🌍 Analisando contexto macro...")
+    return analisar_contexto(dados)
+
+
+def _estagio_estrutura(dados):
+    print("   📊 Analisando estrutura...")
+    return analisar_estrutura(dados)
+
+
+def _estagio_mtf(symbol, mercado):
     print("   ⏰ Análise multi-timeframe...")
-    mtf = analise_multitf(symbol)
-    
-    # 3. ANÁLISES AVANÇADAS
+    return analise_multitf(symbol, dados_tf=mercado.dados_mtf)
+
+
+def _estagio_zonas(dados):
     print("   🧲 Detectando zonas magnéticas...")
     zonas = obter_zonas_magneticas()
     preco_atual = dados['close'].iloc[-1]
     zona_proxima = min(zonas, key=lambda z: abs(z - preco_atual)) if zonas else None
     dist_pct = abs(zona_proxima - preco_atual) / preco_atual * 100 if zona_proxima else 0
-    
+    return {
+        'zona_proxima': zona_proxima,
+        'distancia_pct': dist_pct
+    }
+
+
+def _estagio_fluxo(symbol, mercado):
     print("   🌊 Analisando fluxo DOM...")
     fluxo_obj = FluxoAtivo()
-    fluxo = fluxo_obj.calcular_pressao_liquidez(symbol)
-    
-    # 4. PADRÕES GRÁFICOS (incluindo Wedges)
+    # depth já pré-carregado; {} evita nova requisição se a busca falhou
+    return fluxo_obj.calcular_pressao_liquidez(symbol, depth=mercado.depth or {})
+
+
+def _estagio_padroes(dados):
     print("   🔺 Detectando padrões gráficos...")
-    padroes = detectar_padroes(dados)
-    wedges = detectar_wedges(dados)
-    
-    # 5. ANÁLISE DETALHADA DE CANDLES
+    return detectar_padroes(dados)
+
+
+def _estagio_wedges(dados):
+    return detectar_wedges(dados)
+
+
+def _estagio_candles(dados, timeframe):
     print("   🕐 Analisando candle atual...")
-    candles_analise = analisar_candle_atual(dados, timeframe)
-    
-    # 6. CONFLUÊNCIA
+    return analisar_candle_atual(dados, timeframe)
+
+
+def _estagio_confluencia(mtf, fluxo, zonas):
     print("   🧠 Calculando confluência...")
-    zonas_dict = {
-        'zona_proxima': zona_proxima,
-        'distancia_pct': dist_pct
-    }
-    conf = calcular_confluencia(mtf, fluxo, zonas_dict, None)
-    
-    # 7. INDICADORES BÁSICOS
+    return calcular_confluencia(mtf, fluxo, zonas, None)
+
+
+def _estagio_indicadores(dados):
+    """Indicadores básicos + avançados do timeframe principal"""
     ind = {
         'ema8': dados['EMA8'].iloc[-1],
         'ema21': dados['EMA21'].iloc[-1],
         'rsi': dados['RSI'].iloc[-1],
-        'preco': preco_atual
+        'preco': dados['close'].iloc[-1]
     }
     
-    # 7.5. INDICADORES AVANÇADOS
     print("   🔬 Calculando indicadores avançados...")
     try:
-        dados_avancados = calcular_indicadores_avancados(dados.copy())
+        # Cópia (o cálculo adiciona colunas) que reaproveita as séries já calculadas em dados
+        dados_avancados = calcular_indicadores_avancados(compartilhar_frame(dados, dados.copy()))
         confluencia_avancada = analisar_confluencia_indicadores(dados_avancados)
-        sinal_completo = gerar_sinal_completo(dados)
+        sinal_completo = gerar_sinal_completo(dados, df_completo=dados_avancados)
         
         # Adicionar indicadores avançados ao resultado
         ind['indicadores_avancados'] = {
@@ -129,46 +237,54 @@ def analise_completa(symbol="BTCUSDT", timeframe="1h"):
         ind['confluencia_avancada'] = None
         ind['sinal_completo'] = None
     
-    # 8. ANÁLISE COMPLETA DOS INDICADORES AVANÇADOS
+    return ind
+
+
+def _estagio_analise_avancada(indicadores):
     print("   🔬 Analisando indicadores avançados...")
-    analise_avancada = analisar_indicadores_avancados_completos(ind.get('indicadores_avancados', {}), ind.get('confluencia_avancada', {}), ind.get('sinal_completo', {}))
-    
-    # 9. SÍNTESE INTELIGENTE
+    return analisar_indicadores_avancados_completos(
+        indicadores.get('indicadores_avancados', {}),
+        indicadores.get('confluencia_avancada', {}),
+        indicadores.get('sinal_completo', {})
+    )
+
+
+def _estagio_sintese(contexto, estrutura, mtf, confluencia, indicadores, fluxo, timeframe, padroes, wedges):
     print("   ✨ Gerando síntese...")
-    sintese = gerar_sintese(contexto, estrutura, mtf, conf, ind, fluxo, timeframe, padroes, wedges)
+    return gerar_sintese(contexto, estrutura, mtf, confluencia, indicadores, fluxo, timeframe, padroes, wedges)
+
+
+def _estagio_gestao_risco(sintese, indicadores, contexto, estrutura, timeframe):
+    """
+    Gestão de risco profissional com níveis operacionais
     
-    # 9. GESTÃO DE RISCO PROFISSIONAL COM NÍVEIS OPERACIONAIS
+    Returns:
+        dict com as chaves a integrar na síntese
+    """
     print("   🛡️ Aplicando gestão de risco com níveis precisos...")
     gestao_risco = GestaoRiscoProfissional(capital_base=10.0)
     
     # Determinar direção baseada na síntese
     direcao = 'SHORT' if 'SHORT' in sintese.get('recomendacao', '') else 'LONG'
     
-    # Calcular gestão de risco com níveis operacionais usando dados simulados
-    # IMPORTANTE: Usar o mesmo preço_atual para consistência
-    dados_simulados = {
-        'dados': dados,
-        'preco_atual': preco_atual  # Usar o mesmo preço coletado no início
-    }
     try:
-        import pandas as pd
         import numpy as np
         
         # Criar dados simulados baseados no preço atual
-        preco_atual = ind.get('preco', 100000)
-        np.random.seed(42)
+        preco_atual = indicadores.get('preco', 100000)
+        rng = np.random.RandomState(42)
         
         candles = []
         preco_base = preco_atual
         
         for i in range(20):
-            variacao = np.random.normal(0, 0.002)
+            variacao = rng.normal(0, 0.002)
             preco_base = preco_base * (1 + variacao)
             
             open_price = preco_base
-            high_price = open_price * (1 + abs(np.random.normal(0, 0.001)))
-            low_price = open_price * (1 - abs(np.random.normal(0, 0.001)))
-            close_price = open_price * (1 + np.random.normal(0, 0.0005))
+            high_price = open_price * (1 + abs(rng.normal(0, 0.001)))
+            low_price = open_price * (1 - abs(rng.normal(0, 0.001)))
+            close_price = open_price * (1 + rng.normal(0, 0.0005))
             
             candles.append({
                 'open': open_price,
@@ -184,46 +300,86 @@ def analise_completa(symbol="BTCUSDT", timeframe="1h"):
             dados_simulados, contexto, estrutura, timeframe, direcao
         )
         
-        # Integrar resultado na síntese
         if 'erro' not in gestao_completa:
-            sintese['gestao_risco_completa'] = gestao_completa
-            sintese['niveis_operacionais'] = gestao_completa.get('niveis_operacionais', {})
-            sintese['gestao_risco'] = gestao_completa.get('gestao_risco', {})
-        else:
-            sintese['gestao_risco'] = {'erro': gestao_completa['erro']}
+            return {
+                'gestao_risco_completa': gestao_completa,
+                'niveis_operacionais': gestao_completa.get('niveis_operacionais', {}),
+                'gestao_risco': gestao_completa.get('gestao_risco', {})
+            }
+        return {'gestao_risco': {'erro': gestao_completa['erro']}}
             
     except Exception as e:
         print(f"   ⚠️ Erro na gestão de risco: {e}")
-        sintese['gestao_risco'] = {'erro': f'Erro na gestão de risco: {str(e)}'}
-    
-    resultado = {
-        'symbol': symbol,
-        'timeframe': timeframe,
-        'contexto': contexto,
-        'estrutura': estrutura,
-        'mtf': mtf,
-        'indicadores': ind,
-        'analise_avancada': analise_avancada,
-        'zonas': zonas_dict,
-        'fluxo': fluxo,
-        'confluencia': conf,
-        'padroes': padroes,
-        'wedges': wedges,
-        'candles_detalhados': candles_analise,
-        'sintese': sintese,
-        'niveis_operacionais': {
-            'entry_price': sintese.get('entry_price', 0),
-            'stop_loss': sintese.get('stop_loss', 0),
-            'tp1': sintese.get('tp1', 0),
-            'tp2': sintese.get('tp2', 0),
-            'tp3': sintese.get('tp3', 0),
-            'rr_ratio': sintese.get('rr_ratio', 'N/A')
-        },
-        'gestao_risco': sintese.get('gestao_risco', {})
-    }
-    
-    print("   ✅ Análise completa!\n")
-    return resultado
+        return {'gestao_risco': {'erro': f'Erro na gestão de risco: {str(e)}'}}
+
+
+# Campos do resultado -> saídas do grafo de que dependem (projeção via campos=)
+CAMPOS_RESULTADO = {
+    'contexto': ('contexto',),
+    'estrutura': ('estrutura',),
+    'mtf': ('mtf',),
+    'indicadores': ('indicadores',),
+    'analise_avancada': ('analise_avancada',),
+    'zonas': ('zonas',),
+    'fluxo': ('fluxo',),
+    'confluencia': ('confluencia',),
+    'padroes': ('padroes',),
+    'wedges': ('wedges',),
+    'candles_detalhados': ('candles_detalhados',),
+    'sintese': ('sintese', 'gestao'),
+    'niveis_operacionais': ('sintese', 'gestao'),
+    'gestao_risco': ('sintese', 'gestao'),
+}
+
+
+def normalizar_campos(campos):
+    """
+    Projeção pedida pelo cliente -> tupla ordenada de campos
+
+    Aceita 'a,b' ou lista. symbol e timeframe sempre vêm no resultado.
+
+    Returns:
+        None para o resultado completo (campos vazio/None)
+
+    Raises:
+        ValueError: campos fora de CAMPOS_RESULTADO
+    """
+    if campos is None:
+        return None
+    if isinstance(campos, str):
+        campos = campos.split(',')
+    campos = {str(c).strip() for c in campos} - {''}
+    if not campos:
+        return None
+    desconhecidos = campos - set(CAMPOS_RESULTADO) - {'symbol', 'timeframe'}
+    if desconhecidos:
+        raise ValueError(f"Campos desconhecidos: {', '.join(sorted(desconhecidos))}")
+    return tuple(sorted(campos & set(CAMPOS_RESULTADO)))
+
+
+# Grafo da análise: para adicionar um estágio basta declará-lo aqui
+ESTAGIOS_ANALISE = [
+    Estagio('contexto', _estagio_contexto, ['dados'], ['contexto']),
+    Estagio('estrutura', _estagio_estrutura, ['dados'], ['estrutura']),
+    Estagio('mtf', _estagio_mtf, ['symbol', 'mercado'], ['mtf']),
+    Estagio('zonas', _estagio_zonas, ['dados'], ['zonas']),
+    Estagio('fluxo', _estagio_fluxo, ['symbol', 'mercado'], ['fluxo']),
+    Estagio('padroes', _estagio_padroes, ['dados'], ['padroes']),
+    Estagio('wedges', _estagio_wedges, ['dados'], ['wedges']),
+    Estagio('candles', _estagio_candles, ['dados', 'timeframe'], ['candles_detalhados']),
+    Estagio('indicadores', _estagio_indicadores, ['dados'], ['indicadores']),
+    Estagio('confluencia', _estagio_confluencia, ['mtf', 'fluxo', 'zonas'], ['confluencia']),
+    Estagio('analise_avancada', _estagio_analise_avancada, ['indicadores'], ['analise_avancada']),
+    Estagio('sintese', _estagio_sintese,
+            ['contexto', 'estrutura', 'mtf', 'confluencia', 'indicadores', 'fluxo', 'timeframe', 'padroes', 'wedges'],
+            ['sintese']),
+    Estagio('gestao_risco', _estagio_gestao_risco,
+            ['sintese', 'indicadores', 'contexto', 'estrutura', 'timeframe'], ['gestao']),
+]
+
+
+def _buscar_klines(symbol, interval, limit, inicio=None):
+    return buscar_klines_binance(symbol, interval, limit, inicio=inicio, timeout=30)
 
 
 def coletar_dados(symbol, interval, limit=200):
@@ -246,41 +402,23 @@ def coletar_dados(symbol, interval, limit=200):
         
         interval = interval_map.get(interval, interval)
         
-        url = "https://api.binance.com/api/v3/klines"
-        params = {"symbol": symbol, "interval": interval, "limit": limit}
-        
         if requests is None:
             logger.error("Módulo 'requests' não está disponível")
             raise ImportError("Módulo 'requests' não está disponível. Instale com: pip install requests")
         
         logger.info(f"Coletando dados da Binance: {symbol} {interval}")
-        response = requests.get(url, params=params, timeout=30)
-        
-        logger.info(f"Resposta Binance: status_code={response.status_code}")
-        
-        if response.status_code == 200:
-            data = response.json()
-            if not data or len(data) == 0:
-                logger.warning(f"Nenhum dado retornado da Binance para {symbol}")
-                return None
-                
-            df = pd.DataFrame(data, columns=[
-                'timestamp', 'open', 'high', 'low', 'close', 'volume',
-                'close_time', 'quote_volume', 'trades', 'taker_buy_base',
-                'taker_buy_quote', 'ignore'
-            ])
-            df = df[['timestamp', 'open', 'high', 'low', 'close', 'volume']].astype({
-                'timestamp': 'datetime64[ms]',
-                'open': float, 'high': float, 'low': float,
-                'close': float, 'volume': float
-            })
-            
-            df = calcular_indicadores(df)
-            logger.info(f"Dados coletados com sucesso: {len(df)} candles")
-            return df
-        else:
-            logger.error(f"Erro na API Binance: status_code={response.status_code}, response={response.text[:200]}")
+        # Candles fechados do armazém local; da Binance só o que falta (ver armazem_candles)
+        klines = obter_klines(symbol, interval, limit, buscar=_buscar_klines)
+        if klines is None or len(klines) == 0:
+            logger.warning(f"Nenhum dado retornado da Binance para {symbol}")
             return None
+            
+        # Contêiner somente leitura; o DataFrame é só a visão de compatibilidade
+        df = Candles.de_klines(klines).para_dataframe()
+        
+        df = calcular_indicadores(df)
+        logger.info(f"Dados coletados com sucesso: {len(df)} candles")
+        return df
     except requests.exceptions.Timeout as e:
         logger.error(f"Timeout ao coletar dados da Binance: {e}")
         return None
@@ -738,7 +876,8 @@ def gerar_sintese(contexto, estrutura, mtf, confluencia, indicadores, fluxo, tim
 def gerar_relatorio_profissional_telegram(resultado):
     """Gera relatório profissional para Telegram (sem print)"""
     try:
-        relatorio = gerar_relatorio_profissional(resultado)
+        # Renderizado uma vez por resultado, mesmo com vários destinatários
+        relatorio = obter_relatorio(resultado, 'texto')
         
         # Limpar caracteres problemáticos para Telegram
         relatorio_limpo = limpar_texto_telegram(relatorio)
@@ -753,10 +892,9 @@ def enviar_relatorio_completo_telegram(resultado):
     try:
         # ⚠️ xenos_bot não está no novo projeto - função opcional
         # from xenos_bot import enviar_oraculo
-        from .relatorio_profissional import gerar_relatorio_telegram_blocos
         
-        # Gerar relatório em blocos organizados
-        blocos = gerar_relatorio_telegram_blocos(resultado)
+        # Gerar relatório em blocos organizados (cache por conteúdo do resultado)
+        blocos = obter_relatorio(resultado, 'telegram')
         
         # ⚠️ xenos_bot.enviar_oraculo não está disponível no novo projeto
         # Enviar cada bloco (comentado até integrar bot Telegram)
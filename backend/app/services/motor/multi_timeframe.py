@@ -5,17 +5,22 @@ MULTI-TIMEFRAME ANALYSIS
 Análise automatizada em múltiplos timeframes
 """
 
-import requests
-import pandas as pd
+from .klines import buscar_klines_binance
+from .armazem_candles import obter_klines
 
+# Timeframes padrão da análise multi-TF
+TIMEFRAMES_MTF = ('1m', '5m', '15m', '1h', '4h')
 
-def analise_multitf(symbol='BTCUSDT', timeframes=['1m', '5m', '15m', '1h', '4h']):
+
+def analise_multitf(symbol='BTCUSDT', timeframes=TIMEFRAMES_MTF, dados_tf=None):
     """
     Análise em múltiplos timeframes
     
     Args:
         symbol: Par a analisar
         timeframes: Lista de TFs
+        dados_tf: dict {tf: DataFrame} já carregado (ex: DadosMercado.dados_mtf);
+                  se None, busca cada TF na Binance
     
     Returns:
         dict com análise por TF
@@ -23,7 +28,10 @@ def analise_multitf(symbol='BTCUSDT', timeframes=['1m', '5m', '15m', '1h', '4h']
     resultados = {}
     
     for tf in timeframes:
-        dados = buscar_dados_tf(symbol, tf)
+        if dados_tf is not None:
+            dados = dados_tf.get(tf)
+        else:
+            dados = buscar_dados_tf(symbol, tf)
         if dados is not None:
             analise = analisar_tf(dados, tf)
             resultados[tf] = analise
@@ -41,20 +49,11 @@ def analise_multitf(symbol='BTCUSDT', timeframes=['1m', '5m', '15m', '1h', '4h']
 def buscar_dados_tf(symbol, interval, limit=100):
     """Busca dados de um timeframe"""
     try:
-        url = "https://api.binance.com/api/v3/klines"
-        params = {"symbol": symbol, "interval": interval, "limit": limit}
-        response = requests.get(url, params=params, timeout=10)
-        
-        if response.status_code == 200:
-            data = response.json()
-            df = pd.DataFrame(data, columns=[
-                'timestamp', 'open', 'high', 'low', 'close', 'volume',
-                'close_time', 'quote_volume', 'trades', 'taker_buy_base',
-                'taker_buy_quote', 'ignore'
-            ])
-            df = df[['close', 'volume']].astype(float)
-            return df
-        return None
+        # Candles fechados do armazém local; da Binance só o que falta
+        klines = obter_klines(symbol, interval, limit, buscar=buscar_klines_binance)
+        if klines is None:
+            return None
+        return klines.para_dataframe(['close', 'volume'])
     except:
         return None
 
@@ -5,10 +5,11 @@ PADRÕES GRÁFICOS
 Detecta padrões técnicos e divergências
 """
 
-import pandas as pd
 import numpy as np
 from scipy.signal import find_peaks
 
+from .frame_indicadores import frame_indicadores
+
 
 def detectar_padroes(dados):
     """Detecta padrões gráficos"""
@@ -528,17 +529,6 @@ def verificar_confirmacao_quebra(df, wedges):
 def calcular_atr(df, periodo=14):
     """Calcula Average True Range"""
     try:
-        high = df['high']
-        low = df['low']
-        close = df['close']
-        
-        tr1 = high - low
-        tr2 = abs(high - close.shift(1))
-        tr3 = abs(low - close.shift(1))
-        
-        tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
-        atr = tr.rolling(periodo).mean()
-        
-        return atr.iloc[-1]
+        return frame_indicadores(df).atr(periodo).iloc[-1]
     except:
         return 0
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PERFIL DE VOLUME
+Distribui o volume de cada candle proporcionalmente pelas faixas de preço
+que ele cobre (high-low), em uma única passada vetorizada:
+searchsorted localiza a faixa do low e do high, as faixas intermediárias
+recebem a parte cheia via soma acumulada e as pontas a parte parcial.
+
+Retorna POC, VAH e VAL; aceita número de faixas e janelas de sessão.
+"""
+
+import numpy as np
+import pandas as pd
+
+AREA_VALOR_PADRAO = 0.7
+
+
+class PerfilVolume:
+    """Resultado do perfil de volume"""
+
+    def __init__(self, bordas, volumes, area_valor=AREA_VALOR_PADRAO):
+        self.bordas = bordas            # len(volumes) + 1 limites das faixas
+        self.volumes = volumes          # Volume por faixa
+        self.precos = (bordas[:-1] + bordas[1:]) / 2
+        self.total = float(volumes.sum())
+
+        self.poc_indice = int(np.argmax(volumes))
+        self.area_indices = _indices_area_valor(volumes, area_valor)
+
+    @property
+    def poc(self):
+        """Preço (centro da faixa) com maior volume"""
+        return float(self.precos[self.poc_indice])
+
+    @property
+    def val(self):
+        """Value Area Low: centro da faixa mais baixa da área de valor"""
+        return float(self.precos[self.area_indices].min())
+
+    @property
+    def vah(self):
+        """Value Area High: centro da faixa mais alta da área de valor"""
+        return float(self.precos[self.area_indices].max())
+
+    def to_dict(self):
+        return {
+            'poc': self.poc,
+            'val': self.val,
+            'vah': self.vah,
+            'total_volume': self.total,
+            'precos': self.precos.tolist(),
+            'volumes': self.volumes.tolist(),
+        }
+
+
+def _indices_area_valor(volumes, area_valor):
+    """Faixas de maior volume até acumular area_valor do total"""
+    ordem = np.argsort(volumes, kind='stable')[::-1]
+    acumulado = np.cumsum(volumes[ordem])
+    alvo = area_valor * acumulado[-1]
+    quantidade = int(np.searchsorted(acumulado, alvo, side='left')) + 1
+    return ordem[:min(quantidade, len(ordem))]
+
+
+def distribuir_volume(high, low, volume, bordas):
+    """
+    Volume por faixa com rateio proporcional à sobreposição
+
+    Candles sem amplitude (high == low) vão inteiros para a faixa do preço;
+    a parte de um candle fora de [bordas[0], bordas[-1]] é descartada.
+    Custo O(candles + faixas), sem loop Python.
+    """
+    high = np.asarray(high, dtype=float)
+    low = np.asarray(low, dtype=float)
+    volume = np.asarray(volume, dtype=float)
+    n_faixas = len(bordas) - 1
+
+    amplitude = high - low
+    com_amplitude = amplitude > 0
+    densidade = np.where(com_amplitude, volume / np.where(com_amplitude, amplitude, 1.0), 0.0)
+    dentro = (low >= bordas[0]) & (low <= bordas[-1])
+
+    low = np.clip(low, bordas[0], bordas[-1])
+    high = np.clip(high, bordas[0], bordas[-1])
+    ultimo = n_faixas - 1
+    i_low = np.clip(np.searchsorted(bordas, low, side='right') - 1, 0, ultimo)
+    i_high = np.clip(np.searchsorted(bordas, high, side='right') - 1, 0, ultimo)
+
+    volumes = np.zeros(n_faixas)
+    mesma_faixa = i_low == i_high
+
+    # Candle contido numa única faixa
+    parcela = np.where(com_amplitude, densidade * (high - low), np.where(dentro, volume, 0.0))
+    np.add.at(volumes, i_low[mesma_faixa], parcela[mesma_faixa])
+
+    # Candle que cruza faixas: pontas parciais...
+    cruza = ~mesma_faixa
+    il, ih, d = i_low[cruza], i_high[cruza], densidade[cruza]
+    np.add.at(volumes, il, d * (bordas[il + 1] - low[cruza]))
+    np.add.at(volumes, ih, d * (high[cruza] - bordas[ih]))
+
+    # ...e faixas intermediárias cheias via diferenças + soma acumulada
+    largura = np.diff(bordas)
+    delta = np.zeros(n_faixas + 1)
+    np.add.at(delta, il + 1, d)
+    np.add.at(delta, ih, -d)
+    volumes += np.cumsum(delta[:-1]) * largura
+
+    return volumes
+
+
+def calcular_perfil_volume(high, low, volume, bins=20, area_valor=AREA_VALOR_PADRAO,
+                           preco_min=None, preco_max=None):
+    """
+    Perfil de volume sobre arrays de high/low/volume
+
+    Args:
+        bins: Número de faixas de preço
+        area_valor: Fração do volume na área de valor (padrão 70%)
+        preco_min, preco_max: Limites das faixas (padrão: mínima e máxima dos dados)
+
+    Returns:
+        PerfilVolume, ou None sem dados/amplitude
+    """
+    high = np.asarray(high, dtype=float)
+    low = np.asarray(low, dtype=float)
+    if len(high) == 0 or bins < 1:
+        return None
+
+    preco_min = float(np.nanmin(low)) if preco_min is None else preco_min
+    preco_max = float(np.nanmax(high)) if preco_max is None else preco_max
+    if not preco_max > preco_min:
+        return None
+
+    bordas = np.linspace(preco_min, preco_max, bins + 1)
+    volumes = distribuir_volume(high, low, volume, bordas)
+    return PerfilVolume(bordas, volumes, area_valor)
+
+
+def _timestamps(df):
+    if 'timestamp' in df.columns:
+        return pd.to_datetime(df['timestamp'])
+    if isinstance(df.index, pd.DatetimeIndex):
+        return df.index.to_series()
+    return None
+
+
+def perfil_volume_df(df, bins=20, area_valor=AREA_VALOR_PADRAO, inicio=None, fim=None, ultimos=None):
+    """
+    Perfil de volume de um DataFrame OHLCV, opcionalmente numa janela
+
+    Args:
+        inicio, fim: Limites da sessão (timestamps; usa a coluna 'timestamp'
+                     ou um DatetimeIndex)
+        ultimos: Considera apenas os últimos N candles
+    """
+    if inicio is not None or fim is not None:
+        ts = _timestamps(df)
+        if ts is None:
+            raise ValueError("Janela de sessão requer coluna 'timestamp' ou DatetimeIndex")
+        mascara = np.ones(len(df), dtype=bool)
+        if inicio is not None:
+            mascara &= (ts >= pd.Timestamp(inicio)).to_numpy()
+        if fim is not None:
+            mascara &= (ts < pd.Timestamp(fim)).to_numpy()
+        df = df[mascara]
+    if ultimos is not None:
+        df = df.tail(ultimos)
+
+    return calcular_perfil_volume(df['high'].values, df['low'].values, df['volume'].values,
+                                  bins=bins, area_valor=area_valor)
+
+
+def perfis_por_sessao(df, frequencia='1D', bins=20, area_valor=AREA_VALOR_PADRAO):
+    """
+    Um perfil por sessão (ex: '1D' diário, '4h', '1W')
+
+    Returns:
+        dict {inicio_da_sessao: PerfilVolume}
+    """
+    ts = _timestamps(df)
+    if ts is None:
+        raise ValueError("Perfis por sessão requerem coluna 'timestamp' ou DatetimeIndex")
+
+    sessoes = ts.dt.floor(frequencia).to_numpy()
+    perfis = {}
+    for sessao in pd.unique(sessoes):
+        parte = df[sessoes == sessao]
+        perfil = calcular_perfil_volume(parte['high'].values, parte['low'].values,
+                                        parte['volume'].values, bins=bins, area_valor=area_valor)
+        if perfil is not None:
+            perfis[pd.Timestamp(sessao)] = perfil
+    return perfis
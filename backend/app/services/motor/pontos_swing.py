@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PONTOS DE SWING
+Detector de máximas e mínimas locais compartilhado pelos módulos de S/R.
+Usa máxima/mínima móvel (O(n), sem fatiar o DataFrame a cada candle).
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def _extremo_movel(valores, antes, depois, funcao):
+    """Extremo da janela [i-antes, i+depois] alinhado em i (NaN nas bordas)"""
+    tamanho = antes + depois + 1
+    rolagem = pd.Series(valores).rolling(window=tamanho)
+    movel = rolagem.max() if funcao == 'max' else rolagem.min()
+    # O rolling alinha no fim da janela; desloca para alinhar em i
+    return movel.shift(-depois).to_numpy()
+
+
+def detectar_swings(high, low, antes, depois=None):
+    """
+    Índices de swing highs e swing lows
+
+    Um candle i é swing high quando high[i] é a máxima da janela
+    [i-antes, i+depois] (idem para lows com a mínima). Só entram
+    candles com a janela completa.
+
+    Args:
+        high, low: Arrays/Series de máximas e mínimas
+        antes: Candles à esquerda na janela
+        depois: Candles à direita (padrão: igual a antes)
+
+    Returns:
+        (indices_topos, indices_fundos) como arrays de inteiros
+    """
+    depois = antes if depois is None else depois
+    high = np.asarray(high, dtype=float)
+    low = np.asarray(low, dtype=float)
+    if len(high) < antes + depois + 1:
+        vazio = np.array([], dtype=int)
+        return vazio, vazio
+
+    maximas = _extremo_movel(high, antes, depois, 'max')
+    minimas = _extremo_movel(low, antes, depois, 'min')
+    return np.flatnonzero(high == maximas), np.flatnonzero(low == minimas)
@@ -2,54 +2,34 @@
 Motor Service - Wrapper para integrar motor_renan com endpoints
 """
 import logging
-import json
-import numpy as np
-import pandas as pd
-from datetime import datetime, date
+from contextlib import nullcontext
+from datetime import datetime
 from typing import Dict, Any, Optional
 
+from app.services.motor.serializacao import normalizar
+
 logger = logging.getLogger(__name__)
 
 def make_json_serializable(obj):
     """
     Converte objetos não serializáveis para tipos JSON válidos
-    Compatível com motor_renan.py
+    Compatível com motor_renan.py (uma passada no codificador, ver motor.serializacao)
     """
-    if isinstance(obj, (np.integer, np.int64, np.int32)):
-        return int(obj)
-    elif isinstance(obj, (np.floating, np.float64, np.float32)):
-        return float(obj)
-    elif isinstance(obj, np.ndarray):
-        return obj.tolist()
-    elif isinstance(obj, pd.DataFrame):
-        return obj.to_dict(orient='records')
-    elif isinstance(obj, pd.Series):
-        return obj.to_dict()
-    elif isinstance(obj, (datetime, date)):
-        return obj.isoformat()
-    elif isinstance(obj, bool):
-        return bool(obj)
-    elif isinstance(obj, dict):
-        return {key: make_json_serializable(value) for key, value in obj.items()}
-    elif isinstance(obj, (list, tuple)):
-        return [make_json_serializable(item) for item in obj]
-    elif pd.isna(obj):
-        return None
-    else:
-        # Tentar converter para string se não for um tipo básico
-        try:
-            json.dumps(obj)
-            return obj
-        except (TypeError, ValueError):
-            return str(obj)
+    return normalizar(obj)
 
-def analyze(symbol: str = "BTCUSDT", timeframe: str = "1h") -> Dict[str, Any]:
+def analyze(symbol: str = "BTCUSDT", timeframe: str = "1h", rastreador=None, campos=None,
+            serializar: bool = True) -> Dict[str, Any]:
     """
     Executa análise completa usando motor_renan
     
     Args:
         symbol: Par de trading (ex: BTCUSDT)
         timeframe: Intervalo (1h, 4h, 1d)
+        rastreador: Rastreador opcional (spans de busca, estágios e serialização)
+        campos: Projeção do resultado (ex: ['sintese', 'niveis_operacionais']);
+                só os estágios necessários rodam e só esses campos são serializados
+        serializar: False devolve o resultado cru do motor (tipos NumPy/pandas),
+                    para quem vai codificar direto em bytes (serializacao.codificar)
     
     Returns:
         Dict com análise completa serializada para JSON
@@ -61,7 +41,7 @@ def analyze(symbol: str = "BTCUSDT", timeframe: str = "1h") -> Dict[str, Any]:
         logger.info(f"🔬 Executando análise completa: {symbol} {timeframe}")
         
         # Executar análise
-        resultado = analise_completa(symbol, timeframe)
+        resultado = analise_completa(symbol, timeframe, rastreador=rastreador, campos=campos)
         
         # Verificar se houve erro
         if 'erro' in resultado:
@@ -73,8 +53,13 @@ def analyze(symbol: str = "BTCUSDT", timeframe: str = "1h") -> Dict[str, Any]:
                 "timeframe": timeframe
             }
         
+        if not serializar:
+            return resultado
+
         # Serializar resultado para JSON
-        resultado_serializado = make_json_serializable(resultado)
+        serializacao = rastreador.span('serializacao') if rastreador is not None else nullcontext()
+        with serializacao:
+            resultado_serializado = make_json_serializable(resultado)
         
         logger.info(f"✅ Análise completa executada com sucesso")
         
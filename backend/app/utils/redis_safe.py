@@ -1,12 +1,41 @@
 """
 Redis Safe - Wrapper para Redis com tratamento de erros
+
+Os blueprints criam um SafeRedis cada; todos do mesmo host/porta/db usam
+um único pool de conexões do processo. Redis fora do ar não é definitivo:
+passado o backoff (BACKOFF_RECONEXAO), a próxima chamada tenta de novo.
 """
 import os
+import time
 import redis
 import logging
+import threading
 
 logger = logging.getLogger(__name__)
 
+REDIS_POOL_MAX = int(os.getenv('REDIS_POOL_MAX', '32'))
+BACKOFF_RECONEXAO = (0.5, 1, 2, 5, 10, 30)   # segundos entre tentativas
+
+_pools = {}
+_trava_pools = threading.Lock()
+
+
+def _pool(host, port, db, decode_responses):
+    """ConnectionPool do processo para host/porta/db"""
+    chave = (host, port, db, decode_responses)
+    with _trava_pools:
+        pool = _pools.get(chave)
+        if pool is None:
+            pool = _pools[chave] = redis.ConnectionPool(
+                host=host, port=port, db=db, decode_responses=decode_responses,
+                max_connections=REDIS_POOL_MAX,
+                socket_connect_timeout=1,  # Timeout curto
+                socket_timeout=1,
+                health_check_interval=30,
+            )
+        return pool
+
+
 class SafeRedis:
     """Wrapper para Redis que não quebra se Redis não estiver disponível"""
     
@@ -15,87 +44,101 @@ class SafeRedis:
         self.port = port or int(os.getenv('REDIS_PORT', 6379))
         self.db = db
         self.decode_responses = decode_responses
-        self._client = None
+        self._client = redis.Redis(connection_pool=_pool(self.host, self.port, self.db, decode_responses))
         self._available = False
+        self._falhas = 0
+        self._proxima_tentativa = 0.0
+        self.reconexoes = 0
         
         # Tentar conectar
         self._connect()
     
     def _connect(self):
-        """Tenta conectar ao Redis"""
+        """Tenta conectar ao Redis (PING no pool compartilhado)"""
         try:
-            self._client = redis.Redis(
-                host=self.host,
-                port=self.port,
-                db=self.db,
-                decode_responses=self.decode_responses,
-                socket_connect_timeout=1,  # Timeout curto
-                socket_timeout=1
-            )
-            # Testar conexão
             self._client.ping()
+            if self._falhas:
+                self.reconexoes += 1
             self._available = True
+            self._falhas = 0
             logger.info(f"Redis conectado em {self.host}:{self.port}")
         except Exception as e:
-            self._available = False
-            logger.warning(f"Redis não disponível ({self.host}:{self.port}): {e}")
-            logger.warning("App funcionará sem cache Redis")
-            self._client = None
+            self._marcar_indisponivel(e)
+    
+    def _marcar_indisponivel(self, erro):
+        espera = BACKOFF_RECONEXAO[min(self._falhas, len(BACKOFF_RECONEXAO) - 1)]
+        if self._available or not self._falhas:
+            logger.warning(f"Redis não disponível ({self.host}:{self.port}): {erro}")
+            logger.warning(f"App funcionará sem cache Redis (nova tentativa em {espera}s)")
+        self._available = False
+        self._falhas += 1
+        self._proxima_tentativa = time.monotonic() + espera
+    
+    def _disponivel(self):
+        """Disponível, ou passado o backoff tenta reconectar agora"""
+        if not self._available and time.monotonic() >= self._proxima_tentativa:
+            self._connect()
+        return self._available
+    
+    def _erro(self, e, acao):
+        logger.warning(f"Erro ao {acao} Redis: {e}")
+        if isinstance(e, (redis.exceptions.ConnectionError, redis.exceptions.TimeoutError)):
+            self._marcar_indisponivel(e)
     
     def get(self, key, default=None):
         """Get com fallback"""
-        if not self._available or not self._client:
+        if not self._disponivel():
             return default
         try:
             return self._client.get(key) or default
         except Exception as e:
-            logger.warning(f"Erro ao ler do Redis: {e}")
+            self._erro(e, "ler do")
             return default
     
     def setex(self, key, time, value):
         """Setex com tratamento de erro"""
-        if not self._available or not self._client:
+        if not self._disponivel():
             return False
         try:
             self._client.setex(key, time, value)
             return True
         except Exception as e:
-            logger.warning(f"Erro ao escrever no Redis: {e}")
+            self._erro(e, "escrever no")
             return False
     
     def delete(self, key):
         """Delete com tratamento de erro"""
-        if not self._available or not self._client:
+        if not self._disponivel():
             return False
         try:
             self._client.delete(key)
             return True
         except Exception as e:
-            logger.warning(f"Erro ao deletar do Redis: {e}")
+            self._erro(e, "deletar do")
             return False
     
     def incr(self, key):
         """Increment com tratamento de erro"""
-        if not self._available or not self._client:
+        if not self._disponivel():
             return 0
         try:
             return self._client.incr(key)
         except Exception as e:
-            logger.warning(f"Erro ao incrementar no Redis: {e}")
+            self._erro(e, "incrementar no")
             return 0
     
     def expire(self, key, time):
         """Expire com tratamento de erro"""
-        if not self._available or not self._client:
+        if not self._disponivel():
             return False
         try:
             self._client.expire(key, time)
             return True
         except Exception as e:
-            logger.warning(f"Erro ao definir expire no Redis: {e}")
+            self._erro(e, "definir expire no")
             return False
     
     def is_available(self):
-        """Verifica se Redis está disponível"""
-        return self._available
+        """Verifica se Redis está disponível (tenta reconectar passado o backoff)"""
+        return self._disponivel()
 
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Benchmark: corpo de klines do coletor em JSON (formato atual)
+vs binário colunar (MIME_KLINES_BINARIO) — tamanho e tempo de decodificação
+
+Uso: python scripts/benchmark_klines_binario.py [repeticoes] [candles]
+"""
+import os
+import sys
+import json
+import time
+import zlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from app.services.motor.klines import (
+    ORJSON_DISPONIVEL, carregar_json, codificar_klines_binario, decodificar_klines,
+)
+
+
+def linhas_sinteticas(candles=1000):
+    """Linhas no formato da Binance (preços e volumes como string)"""
+    rng = np.random.RandomState(0)
+    close = 40000 + np.cumsum(rng.normal(0, 25, candles))
+    volume = rng.uniform(50, 500, candles)
+    inicio = 1_700_000_000_000
+    return [[inicio + i * 60_000, f"{c - 3:.2f}", f"{c + 12:.2f}", f"{c - 15:.2f}", f"{c:.2f}",
+             f"{v:.5f}", inicio + i * 60_000 + 59_999, f"{v * c:.8f}", int(rng.randint(100, 5000)),
+             f"{v / 2:.5f}", f"{v * c / 2:.8f}", "0"]
+            for i, (c, v) in enumerate(zip(close, volume))]
+
+
+def cronometrar(func, repeticoes):
+    func()
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        func()
+    return (time.perf_counter() - inicio) / repeticoes * 1000
+
+
+def main():
+    repeticoes = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    candles = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+
+    corpo_json = json.dumps({'source': 'cache', 'data': linhas_sinteticas(candles)}).encode()
+    klines = decodificar_klines(carregar_json(corpo_json))
+    corpo_binario = codificar_klines_binario(klines)
+    corpo_cru = codificar_klines_binario(klines, nivel=0)
+
+    print(f"orjson: {'sim' if ORJSON_DISPONIVEL else 'não'} | {candles} candles | {repeticoes} repetições")
+    print("Tamanho do corpo:")
+    for nome, tamanho in (('JSON', len(corpo_json)),
+                          ('JSON + gzip de transporte', len(zlib.compress(corpo_json, 6))),
+                          ('binário sem compressão', len(corpo_cru)),
+                          ('binário (zlib 1, embaralhado)', len(corpo_binario))):
+        print(f"  {nome:32s} {tamanho:8d} bytes ({tamanho / len(corpo_json):6.1%})")
+
+    print("Tempo:")
+    caminhos = {
+        'decodificar JSON → Klines': lambda: decodificar_klines(carregar_json(corpo_json)),
+        'decodificar binário → Klines': lambda: decodificar_klines(corpo_binario),
+        'decodificar binário cru': lambda: decodificar_klines(corpo_cru),
+        'codificar binário (coletor)': lambda: codificar_klines_binario(klines),
+    }
+    for nome, func in caminhos.items():
+        print(f"  {nome:32s} {cronometrar(func, repeticoes):8.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
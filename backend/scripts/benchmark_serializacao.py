@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Benchmark: make_json_serializable + json.dumps (caminho anterior)
+vs serializacao.codificar (uma passada)
+
+Uso: python scripts/benchmark_serializacao.py [repeticoes]
+"""
+import os
+import sys
+import json
+import time
+from datetime import datetime, date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from app.services.motor.serializacao import codificar, normalizar, ORJSON_DISPONIVEL
+
+
+def make_json_serializable_anterior(obj):
+    """Versão recursiva anterior (motor_service / sne-web app.motor)"""
+    if isinstance(obj, (np.integer, np.int64, np.int32)):
+        return int(obj)
+    elif isinstance(obj, (np.floating, np.float64, np.float32)):
+        return float(obj)
+    elif isinstance(obj, np.ndarray):
+        return obj.tolist()
+    elif isinstance(obj, pd.DataFrame):
+        return obj.to_dict(orient='records')
+    elif isinstance(obj, pd.Series):
+        return obj.to_dict()
+    elif isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    elif isinstance(obj, bool):
+        return bool(obj)
+    elif isinstance(obj, dict):
+        return {key: make_json_serializable_anterior(value) for key, value in obj.items()}
+    elif isinstance(obj, (list, tuple)):
+        return [make_json_serializable_anterior(item) for item in obj]
+    elif pd.isna(obj):
+        return None
+    else:
+        try:
+            json.dumps(obj)
+            return obj
+        except (TypeError, ValueError):
+            return str(obj)
+
+
+def resultado_sintetico(candles=200):
+    """Estrutura com o formato de analise_completa (escalares NumPy, listas, DataFrame)"""
+    rng = np.random.RandomState(0)
+    close = 100 + np.cumsum(rng.normal(0, 1, candles))
+    df = pd.DataFrame({
+        'open': close, 'high': close + 1, 'low': close - 1, 'close': close,
+        'volume': rng.uniform(1, 10, candles),
+    })
+    escalares = {f'ind_{i}': np.float64(rng.normal()) for i in range(60)}
+    return {
+        'symbol': 'BTCUSDT',
+        'timeframe': '1h',
+        'contexto': dict(escalares, tendencia='ALTA', volatilidade=np.float64(1.2)),
+        'estrutura': {'suportes': [np.float64(v) for v in close[:30]],
+                      'resistencias': [np.float64(v) for v in close[30:60]]},
+        'indicadores': escalares,
+        'analise_avancada': {f'bloco_{b}': dict(escalares) for b in range(8)},
+        'mtf': {tf: {'score': np.int64(3), 'rsi': np.float64(55.0), 'serie': close[-50:].copy()}
+                for tf in ('1m', '5m', '15m', '1h', '4h')},
+        'padroes': [{'tipo': 'pivot', 'preco': np.float64(v), 'indice': np.int64(i), 'confirmado': np.bool_(i % 2)}
+                    for i, v in enumerate(close[:80])],
+        'candles': df,
+        'sintese': dict(escalares, entry_price=np.float64(close[-1]), rr_ratio='1:2.5'),
+    }
+
+
+def cronometrar(func, repeticoes):
+    func()
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        func()
+    return (time.perf_counter() - inicio) / repeticoes * 1000
+
+
+def main():
+    repeticoes = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    resultado = resultado_sintetico()
+
+    caminhos = {
+        'anterior (walk + json.dumps)': lambda: json.dumps(make_json_serializable_anterior(resultado)),
+        'anterior sne-web (2 walks)': lambda: json.dumps({
+            'analysis': make_json_serializable_anterior(resultado['sintese']),
+            'full_analysis': make_json_serializable_anterior(resultado)}),
+        'codificar (bytes)': lambda: codificar(resultado),
+        'normalizar (dict)': lambda: normalizar(resultado),
+    }
+
+    print(f"orjson: {'sim' if ORJSON_DISPONIVEL else 'não'} | {len(codificar(resultado))} bytes | {repeticoes} repetições")
+    for nome, func in caminhos.items():
+        print(f"  {nome:32s} {cronometrar(func, repeticoes):8.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Copia os módulos do motor usados fora do backend a partir da fonte única
+(backend/app/services/motor), trocando os imports relativos por absolutos
+
+Os serviços do backend-v2 são construídos cada um a partir da própria pasta
+(Railway/nixpacks), sem acesso ao backend; por isso as cópias ficam no
+repositório, mas não se editam à mão: edita-se o backend e roda-se este
+script antes do deploy. tests/test_modulos_compartilhados.py falha se
+alguma cópia divergir.
+
+Uso: python scripts/copiar_modulos_compartilhados.py [--verificar]
+"""
+import os
+import re
+import sys
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RAIZ = os.path.dirname(BACKEND)
+FONTE = os.path.join(BACKEND, 'app', 'services', 'motor')
+SERVICOS = os.path.join(RAIZ, 'backend-v2', 'services')
+
+# Módulo -> pastas (em backend-v2/services) que recebem a cópia; '.' é a
+# própria services/, onde fica professional_indicators
+MODULOS = {
+    'http_upstream.py': ('sne-collector', 'sne-web'),
+    'klines.py': ('sne-collector', 'sne-web'),
+    'armazem_candles.py': ('sne-collector', 'sne-web'),
+    'rastreamento.py': ('sne-collector', 'sne-web'),
+    'perfil_volume.py': ('sne-web', '.'),
+}
+
+
+def converter(codigo):
+    """Imports relativos do pacote → imports de módulos soltos"""
+    return re.sub(r'^(\s*)from \.(\w+) import', r'\1from \2 import', codigo, flags=re.M)
+
+
+def copias():
+    """(destino, conteúdo esperado) de cada cópia"""
+    for modulo, destinos in MODULOS.items():
+        with open(os.path.join(FONTE, modulo), encoding='utf-8') as arquivo:
+            codigo = converter(arquivo.read())
+        for servico in destinos:
+            yield os.path.normpath(os.path.join(SERVICOS, servico, modulo)), codigo
+
+
+def divergentes():
+    """Cópias ausentes ou diferentes da fonte"""
+    resultado = []
+    for destino, codigo in copias():
+        try:
+            with open(destino, encoding='utf-8') as arquivo:
+                if arquivo.read() == codigo:
+                    continue
+        except FileNotFoundError:
+            pass
+        resultado.append(destino)
+    return resultado
+
+
+def main():
+    if '--verificar' in sys.argv[1:]:
+        pendentes = divergentes()
+        for destino in pendentes:
+            print(f"❌ divergente: {os.path.relpath(destino, RAIZ)}")
+        return 1 if pendentes else 0
+
+    for destino, codigo in copias():
+        with open(destino, 'w', encoding='utf-8') as arquivo:
+            arquivo.write(codigo)
+        print(f"✅ {os.path.relpath(destino, RAIZ)}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""
+Teste da análise em lote (sem rede)
+"""
+import sys
+import os
+import time
+import threading
+from collections import Counter
+
+# Adicionar diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from app.services.motor import analise_lote, motor_renan
+from app.services.motor.fluxo_ativo import FluxoAtivo
+
+ATRASO = 0.1
+
+
+def _instalar_fakes(monkeypatch):
+    chamadas = Counter()
+    trava = threading.Lock()
+
+    def _contar(chave):
+        with trava:
+            chamadas[chave] += 1
+
+    def _fake_coletar(symbol, interval, limit=200):
+        _contar(('dados', symbol, interval))
+        time.sleep(ATRASO)
+        if symbol == 'FALHAUSDT':
+            return None
+        return pd.DataFrame({'close': [1.0, 2.0, 3.0]})
+
+    def _fake_buscar_tf(symbol, interval, limit=100):
+        _contar(('mtf', symbol, interval))
+        time.sleep(ATRASO)
+        return pd.DataFrame({'close': [1.0] * 60, 'volume': [1.0] * 60})
+
+    def _fake_depth(self, symbol, limit=5000):
+        _contar(('depth', symbol))
+        time.sleep(ATRASO)
+        return {'bids': [['99', '2']], 'asks': [['101', '1']]}
+
+    def _fake_analise(symbol, timeframe, mercado=None):
+        return {'symbol': symbol, 'timeframe': timeframe, 'mercado': mercado}
+
+    monkeypatch.setattr(motor_renan, 'coletar_dados', _fake_coletar)
+    monkeypatch.setattr(motor_renan, 'analise_completa', _fake_analise)
+    monkeypatch.setattr(analise_lote, 'buscar_dados_tf', _fake_buscar_tf)
+    monkeypatch.setattr(FluxoAtivo, 'obter_depth', _fake_depth)
+    return chamadas
+
+
+def _analisar_no_processo(symbol, timeframe, mercado):
+    """Substitui _analisar_par no worker (importável pelo processo filho)"""
+    return {'symbol': symbol, 'pid': os.getpid(), 'linhas': len(mercado.dados),
+            'mtf': sorted(mercado.dados_mtf), 'bids': mercado.depth['bids']}
+
+
+def test_lote_deduplica_requisicoes(monkeypatch):
+    """MTF e depth são buscados uma vez por símbolo, não por par"""
+    chamadas = _instalar_fakes(monkeypatch)
+
+    resultados = list(analise_lote.analise_completa_lote(
+        ['BTCUSDT', 'ethusdt'], ['15m', '1h', '4h'], processos=False))
+
+    assert len(resultados) == 6
+    assert all(n == 1 for n in chamadas.values()), chamadas
+    # 6 klines principais + 2 depth + 2 × 5 MTF
+    assert sum(chamadas.values()) == 18
+
+    por_par = {(s, tf): r for s, tf, r in resultados}
+    m15 = por_par[('ETHUSDT', '15m')]['mercado']
+    m4h = por_par[('ETHUSDT', '4h')]['mercado']
+    assert m15.depth is m4h.depth
+    assert m15.dados_mtf['1h'] is m4h.dados_mtf['1h']
+    assert m15.dados is not m4h.dados
+
+
+def test_lote_entrega_conforme_termina(monkeypatch):
+    """Pares prontos são entregues antes dos lentos e falhas viram erro"""
+    _instalar_fakes(monkeypatch)
+
+    def _analise_lenta(symbol, timeframe, mercado=None):
+        if symbol == 'LENTOUSDT':
+            time.sleep(ATRASO * 5)
+        return {'symbol': symbol}
+
+    monkeypatch.setattr(motor_renan, 'analise_completa', _analise_lenta)
+
+    ordem = [(s, r) for s, _, r in analise_lote.analise_completa_lote(
+        ['LENTOUSDT', 'BTCUSDT', 'FALHAUSDT'], ['1h'], processos=False, max_workers=3)]
+
+    assert ordem[-1][0] == 'LENTOUSDT'
+    assert dict(ordem)['FALHAUSDT'] == {"erro": "Falha ao coletar dados"}
+
+
+def test_lote_em_processos(monkeypatch):
+    """Estágios em processos (forkserver/spawn): mercado atravessa o pickle"""
+    _instalar_fakes(monkeypatch)
+    monkeypatch.setattr(analise_lote, '_analisar_par', _analisar_no_processo)
+
+    pool = analise_lote._criar_pool_cpu(1, True)
+    try:
+        assert pool._mp_context.get_start_method() in ('forkserver', 'spawn')
+    finally:
+        pool.shutdown()
+
+    resultados = {s: r for s, _, r in analise_lote.analise_completa_lote(
+        ['BTCUSDT', 'FALHAUSDT'], ['1h'], processos=True, max_workers=2)}
+
+    assert resultados['FALHAUSDT'] == {"erro": "Falha ao coletar dados"}
+    assert resultados['BTCUSDT']['pid'] != os.getpid()
+    assert resultados['BTCUSDT']['linhas'] == 3
+    assert resultados['BTCUSDT']['bids'] == [['99', '2']]
@@ -0,0 +1,162 @@
+"""
+Teste do armazém local de candles (memmap + preenchimento de buracos)
+"""
+import sys
+import os
+
+# Adicionar diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pytest
+
+from app.services.motor.armazem_candles import (
+    ArmazemCandles, DTYPE_REGISTRO, abertura_atual, registros_de_klines,
+)
+from app.services.motor.klines import decodificar_klines
+
+HORA = 3_600_000
+# Agora: 30 min depois da abertura de um candle de 1h (14/11/2023 22:00 UTC)
+ABERTO = 1_700_000_000_000 // HORA * HORA
+AGORA = ABERTO + HORA // 2
+
+
+class Upstream:
+    """Binance de mentira: candles de 1h até o em formação, respeitando startTime"""
+
+    def __init__(self, agora=AGORA):
+        self.agora = agora
+        self.chamadas = []
+
+    def __call__(self, symbol, interval, limit, inicio):
+        self.chamadas.append((limit, inicio))
+        aberto = abertura_atual('1h', self.agora)
+        if inicio is None:
+            inicio = aberto - (limit - 1) * HORA
+        aberturas = [t for t in range(inicio, aberto + 1, HORA)][:limit]
+        return decodificar_klines([[t, str(t / HORA), str(t / HORA + 1), str(t / HORA - 1), str(t / HORA),
+                                    "1.5", t + HORA - 1, "3", 7, "0.5", "1"] for t in aberturas])
+
+
+def test_primeira_janela_busca_tudo_e_grava_fechados(tmp_path):
+    armazem = ArmazemCandles(str(tmp_path))
+    upstream = Upstream()
+
+    klines = armazem.obter('BTCUSDT', '1h', 200, upstream, agora_ms=AGORA)
+    assert len(klines) == 200 and klines.timestamp[-1] == ABERTO
+    assert np.all(np.diff(klines.timestamp) == HORA)
+    # Um a mais que o esperado: a página curta confirma o candle em formação
+    assert upstream.chamadas == [(201, ABERTO - 199 * HORA)]
+
+    # O candle em formação não vai para o disco
+    guardados = armazem.ler('BTCUSDT', '1h')
+    assert len(guardados) == 199 and guardados['timestamp'][-1] == ABERTO - HORA
+    assert os.path.getsize(armazem.caminho('BTCUSDT', '1h')) == 199 * DTYPE_REGISTRO.itemsize
+
+
+def test_regime_busca_so_o_candle_aberto(tmp_path):
+    armazem = ArmazemCandles(str(tmp_path))
+    armazem.obter('BTCUSDT', '1h', 200, Upstream(), agora_ms=AGORA)
+
+    upstream = Upstream()
+    klines = armazem.obter('BTCUSDT', '1h', 200, upstream, agora_ms=AGORA + 60_000)
+    assert upstream.chamadas == [(1, None)]
+    assert len(klines) == 200 and klines.timestamp[-1] == ABERTO
+
+    # Logo após o fechamento: só o candle que fechou (append) + o novo
+    depois = AGORA + HORA
+    upstream = Upstream(depois)
+    klines = armazem.obter('BTCUSDT', '1h', 200, upstream, agora_ms=depois)
+    assert upstream.chamadas == [(3, ABERTO)]
+    assert klines.timestamp[-1] == ABERTO + HORA
+    assert armazem.ultimo('BTCUSDT', '1h') == ABERTO
+
+
+def test_buraco_no_meio_e_reescrito(tmp_path):
+    armazem = ArmazemCandles(str(tmp_path))
+    armazem.obter('BTCUSDT', '1h', 50, Upstream(), agora_ms=AGORA)
+
+    registros = armazem.ler('BTCUSDT', '1h')
+    furado = np.delete(registros, [10, 11, 12])
+    furado.tofile(armazem.caminho('BTCUSDT', '1h'))
+    assert armazem.lacunas('BTCUSDT', '1h', registros['timestamp'][0], ABERTO - HORA) == [
+        (int(registros['timestamp'][10]), int(registros['timestamp'][12]))]
+
+    upstream = Upstream()
+    klines = armazem.obter('BTCUSDT', '1h', 50, upstream, agora_ms=AGORA)
+    assert upstream.chamadas == [(41, int(registros['timestamp'][10]))]
+    assert np.array_equal(klines.timestamp[:-1], registros['timestamp'])
+    assert np.array_equal(armazem.ler('BTCUSDT', '1h'), registros)
+
+
+def test_relogio_local_adiantado_nao_grava_candle_aberto(tmp_path):
+    armazem = ArmazemCandles(str(tmp_path))
+    # Relógio local 5 s à frente: já "fechou" o candle que a Binance ainda forma
+    upstream = Upstream(ABERTO + HORA - 3000)
+    klines = armazem.obter('BTCUSDT', '1h', 10, upstream, agora_ms=ABERTO + HORA + 2000)
+    assert klines.timestamp[-1] == ABERTO
+    assert armazem.ultimo('BTCUSDT', '1h') == ABERTO - HORA
+
+    # Virada também na Binance: o candle agora fechado é buscado e gravado inteiro
+    upstream.agora = ABERTO + HORA + 10
+    klines = armazem.obter('BTCUSDT', '1h', 10, upstream, agora_ms=ABERTO + HORA + 5000)
+    assert klines.timestamp[-1] == ABERTO + HORA
+    assert armazem.ultimo('BTCUSDT', '1h') == ABERTO
+
+
+def test_relogio_local_atrasado_na_virada(tmp_path):
+    armazem = ArmazemCandles(str(tmp_path))
+    armazem.obter('BTCUSDT', '1h', 10, Upstream(), agora_ms=AGORA)
+
+    # Local ainda no candle ABERTO; a Binance já abriu o seguinte
+    upstream = Upstream(ABERTO + HORA + 1000)
+    klines = armazem.obter('BTCUSDT', '1h', 10, upstream, agora_ms=ABERTO + HORA - 1000)
+    assert upstream.chamadas == [(1, None), (2, ABERTO), (1, ABERTO + 2 * HORA)]
+    assert np.all(np.diff(klines.timestamp) == HORA)
+    assert klines.timestamp[-1] == ABERTO + HORA
+    assert armazem.ultimo('BTCUSDT', '1h') == ABERTO
+
+
+def test_gravar_append_descarta_registro_parcial(tmp_path):
+    armazem = ArmazemCandles(str(tmp_path))
+    registros = registros_de_klines(Upstream()('ETHUSDT', '1h', 5, None))
+    assert armazem.gravar('ETHUSDT', '1h', registros[:3]) == 3
+
+    with open(armazem.caminho('ETHUSDT', '1h'), 'ab') as arquivo:
+        arquivo.write(b'\x00' * 10)   # append interrompido
+    assert len(armazem.ler('ETHUSDT', '1h')) == 3
+
+    assert armazem.gravar('ETHUSDT', '1h', registros[3:]) == 2
+    assert np.array_equal(armazem.ler('ETHUSDT', '1h'), registros)
+    # Repetidos não duplicam
+    assert armazem.gravar('ETHUSDT', '1h', registros[1:4]) == 0
+    assert len(armazem.ler('ETHUSDT', '1h')) == 5
+
+
+def test_leitura_por_faixa(tmp_path):
+    armazem = ArmazemCandles(str(tmp_path))
+    registros = registros_de_klines(Upstream()('BTCUSDT', '1h', 20, None))
+    armazem.gravar('BTCUSDT', '1h', registros)
+
+    t = registros['timestamp']
+    assert np.array_equal(armazem.ler('BTCUSDT', '1h', t[5], t[9]), registros[5:10])
+    assert np.array_equal(armazem.ler('BTCUSDT', '1h', t[5] + 1), registros[6:])
+    assert len(armazem.ler('XRPUSDT', '1h')) == 0
+
+
+def test_falha_no_upstream_e_intervalo_sem_grade(tmp_path):
+    armazem = ArmazemCandles(str(tmp_path))
+    assert armazem.obter('BTCUSDT', '1h', 10, lambda *a: None, agora_ms=AGORA) is None
+    assert not os.path.exists(armazem.caminho('BTCUSDT', '1h'))
+
+    upstream = Upstream()
+    armazem.obter('BTCUSDT', '1M', 10, upstream, agora_ms=AGORA)
+    assert upstream.chamadas == [(10, None)]
+
+
+@pytest.mark.parametrize('interval,esperado', [
+    ('1h', ABERTO),
+    ('1w', 1_699_833_600_000),   # segunda-feira 13/11/2023 00:00 UTC
+])
+def test_abertura_atual(interval, esperado):
+    assert abertura_atual(interval, AGORA) == esperado
@@ -0,0 +1,116 @@
+"""
+Teste do cache do sne-collector (chave normalizada, TTL por candle, single-flight)
+"""
+import sys
+import os
+import threading
+import time
+
+# Coletor é um serviço à parte (módulos soltos, sem pacote)
+RAIZ = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(RAIZ, 'backend-v2', 'services', 'sne-collector'))
+
+import pytest
+
+from cache_binance import (
+    VooUnico, calcular_ttl_ms, chave_cache, normalizar_params, TTL_FECHADOS,
+)
+
+MINUTO = 60_000
+HORA = 60 * MINUTO
+ABERTO = 1_700_000_000_000 // HORA * HORA
+
+
+def _chave(endpoint, params):
+    return chave_cache(endpoint, normalizar_params(endpoint, params))
+
+
+def test_chaves_equivalentes():
+    base = _chave('klines', {'symbol': 'BTCUSDT', 'interval': '1h'})
+    assert _chave('klines', {'interval': '1h', 'symbol': 'btcusdt'}) == base
+    assert _chave('klines', {'symbol': 'BTCUSDT', 'interval': '1h', 'limit': '500', 'timeZone': '0'}) == base
+    assert _chave('klines', {'symbol': 'BTCUSDT', 'interval': '1h', 'startTime': ''}) == base
+    assert _chave('klines', {'symbol': 'BTCUSDT', 'interval': '1h', 'limit': '5000'}) == \
+        _chave('klines', {'symbol': 'BTCUSDT', 'interval': '1h', 'limit': 1000})
+
+    # 1m e 1M são intervalos diferentes; limit diferente é outro pedido
+    assert _chave('klines', {'symbol': 'BTCUSDT', 'interval': '1M'}) != \
+        _chave('klines', {'symbol': 'BTCUSDT', 'interval': '1m'})
+    assert _chave('klines', {'symbol': 'BTCUSDT', 'interval': '1h', 'limit': '100'}) != base
+
+    with pytest.raises(ValueError):
+        normalizar_params('klines', {'symbol': 'BTCUSDT', 'interval': '1h', 'limit': 'x'})
+
+
+def _linha(abertura, passo):
+    return [abertura, "1", "1", "1", "1", "1", abertura + passo - 1, "1", 1, "1", "1", "0"]
+
+
+def test_ttl_pelo_fechamento():
+    params = {'symbol': 'BTCUSDT', 'interval': '1h'}
+    agora = ABERTO + HORA // 2
+    aberto = [_linha(ABERTO - HORA, HORA), _linha(ABERTO, HORA)]
+    fechados = [_linha(ABERTO - 2 * HORA, HORA), _linha(ABERTO - HORA, HORA)]
+
+    assert calcular_ttl_ms('klines', params, aberto, agora) == 60_000
+    assert calcular_ttl_ms('klines', params, fechados, agora) == TTL_FECHADOS * 1000
+    # Faltando 5 s para fechar: não passa do fechamento
+    assert calcular_ttl_ms('klines', params, aberto, ABERTO + HORA - 5000) == 6000
+
+    # 1m: TTL curto mínimo; 4h: proporcional ao intervalo; 1d: teto de 300 s
+    assert calcular_ttl_ms('klines', {'interval': '1m'}, [_linha(ABERTO, MINUTO)], ABERTO + 100) == 1000
+    assert calcular_ttl_ms('klines', {'interval': '4h'}, [_linha(ABERTO, 4 * HORA)], ABERTO) == 240_000
+    assert calcular_ttl_ms('klines', {'interval': '1d'}, [_linha(ABERTO, 1440 * MINUTO)], ABERTO) == 300_000
+    assert calcular_ttl_ms('klines', {'interval': '3d'}, [_linha(ABERTO, 4320 * MINUTO)], ABERTO) == 300_000
+    assert calcular_ttl_ms('klines', {'interval': '1h', 'endTime': '1'}, [], agora) == TTL_FECHADOS * 1000
+    assert calcular_ttl_ms('ticker/price', {}, {'price': '1'}) == 2000
+
+
+def test_voo_unico_coalesce():
+    voo = VooUnico()
+    chamadas = []
+
+    def buscar():
+        chamadas.append(1)
+        time.sleep(0.1)
+        return {'data': len(chamadas)}
+
+    resultados = []
+    threads = [threading.Thread(target=lambda: resultados.append(voo.executar('k', buscar))) for _ in range(10)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(chamadas) == 1 and resultados == [{'data': 1}] * 10
+    assert voo.estatisticas() == {'buscas': 1, 'coalescidas': 9, 'em_voo': 0}
+
+    # Terminada a busca, a próxima chamada busca de novo
+    assert voo.executar('k', buscar) == {'data': 2}
+
+
+def test_voo_unico_propaga_erro():
+    voo = VooUnico()
+    liberar = threading.Event()
+
+    def falhar():
+        liberar.wait()
+        raise RuntimeError('upstream')
+
+    erros = []
+
+    def chamar():
+        try:
+            voo.executar('k', falhar)
+        except RuntimeError as e:
+            erros.append(str(e))
+
+    threads = [threading.Thread(target=chamar) for _ in range(3)]
+    for t in threads:
+        t.start()
+    while voo.estatisticas()['coalescidas'] < 2:
+        time.sleep(0.01)
+    liberar.set()
+    for t in threads:
+        t.join()
+    assert erros == ['upstream'] * 3
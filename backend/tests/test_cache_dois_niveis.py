@@ -0,0 +1,244 @@
+"""
+Teste do cache em dois níveis do sne-web (L1 em memória + Redis compartilhado)
+"""
+import sys
+import os
+import time
+import importlib.util
+
+import pytest
+import redis
+
+# sne-web é um serviço à parte (módulos soltos); carregado por caminho
+RAIZ = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SNE_WEB = os.path.join(RAIZ, 'backend-v2', 'services', 'sne-web')
+sys.path.append(SNE_WEB)
+
+spec = importlib.util.spec_from_file_location('sne_web_redis_safe',
+                                              os.path.join(SNE_WEB, 'app', 'utils', 'redis_safe.py'))
+redis_safe = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(redis_safe)
+
+CacheDoisNiveis, CacheL1 = redis_safe.CacheDoisNiveis, redis_safe.CacheL1
+RedisCompartilhado, SafeRedis = redis_safe.RedisCompartilhado, redis_safe.SafeRedis
+
+
+class RedisFalso:
+    """Cliente TCP falso: conta idas ao servidor e pode estar fora do ar"""
+
+    def __init__(self, falhas_ping=0):
+        self.dados = {}
+        self.pttls = {}
+        self.falhas_ping = falhas_ping
+        self.fora = False
+        self.chamadas = []
+
+    def _ida(self, nome):
+        self.chamadas.append(nome)
+        if self.fora:
+            raise redis.exceptions.ConnectionError("Connection refused")
+
+    def ping(self):
+        if self.falhas_ping:
+            self.falhas_ping -= 1
+            raise redis.exceptions.ConnectionError("Connection refused")
+        self._ida('ping')
+        return True
+
+    def get(self, chave):
+        self._ida('get')
+        return self.dados.get(chave)
+
+    def set(self, chave, valor, ex=None):
+        self._ida('set')
+        self.dados[chave] = str(valor)
+        self.pttls[chave] = int(ex * 1000) if ex else -1
+        return True
+
+    def delete(self, chave):
+        self._ida('delete')
+        return int(self.dados.pop(chave, None) is not None)
+
+    def incr(self, chave):
+        self._ida('incr')
+        self.dados[chave] = str(int(self.dados.get(chave, 0)) + 1)
+        return int(self.dados[chave])
+
+    def mget(self, chaves):
+        self._ida('mget')
+        return [self.dados.get(c) for c in chaves]
+
+    def pipeline(self, transaction=True):
+        cliente = self
+        comandos = []
+
+        class _Pipeline:
+            def set(self, chave, valor, ex=None):
+                comandos.append(('set', chave, valor, ex))
+
+            def get(self, chave):
+                comandos.append(('get', chave))
+
+            def pttl(self, chave):
+                comandos.append(('pttl', chave))
+
+            def execute(self):
+                cliente._ida('pipeline')
+                respostas = []
+                for nome, chave, *resto in comandos:
+                    if nome == 'set':
+                        cliente.dados[chave] = str(resto[0])
+                        cliente.pttls[chave] = int(resto[1] * 1000) if resto[1] else -1
+                        respostas.append(True)
+                    elif nome == 'get':
+                        respostas.append(cliente.dados.get(chave))
+                    else:
+                        respostas.append(cliente.pttls.get(chave, -1) if chave in cliente.dados else -2)
+                return respostas
+
+        return _Pipeline()
+
+
+@pytest.fixture
+def servidor(monkeypatch):
+    """REDIS_URL apontando para um RedisFalso; backoff curto"""
+    falso = RedisFalso()
+    monkeypatch.setenv('REDIS_URL', 'redis://falso:6379/0')
+    for nome in ('REDIS_REST_URL', 'UPSTASH_REDIS_REST_URL'):
+        monkeypatch.delenv(nome, raising=False)
+    monkeypatch.setattr(redis_safe.redis, 'from_url', lambda url, **kwargs: falso)
+    monkeypatch.setattr(redis_safe, 'BACKOFF_RECONEXAO', (0.01,))
+    monkeypatch.setattr(redis_safe, '_compartilhados', {})
+    return falso
+
+
+def _esperar(condicao, limite=2.0):
+    fim = time.monotonic() + limite
+    while time.monotonic() < fim:
+        if condicao():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_l1_lru_e_ttl():
+    agora = [0.0]
+    l1 = CacheL1(max_itens=2, ttl_max=30, relogio=lambda: agora[0])
+    l1.set('a', '1', ttl=5)
+    l1.set('b', '2', ttl=300)     # limitado a ttl_max
+    assert l1.get('a') == (True, '1')
+    l1.set('c', '3')              # despeja 'b' (menos usado)
+    assert l1.get('b') == (False, None)
+
+    agora[0] = 6
+    assert l1.get('a') == (False, None) and l1.get('c') == (True, '3')
+    agora[0] = 31
+    assert l1.get('c') == (False, None)
+    assert l1.estatisticas() == {'hits': 2, 'misses': 3, 'itens': 0, 'despejos': 1, 'max_itens': 2}
+
+
+def test_dois_niveis_e_pipeline(servidor):
+    cache = CacheDoisNiveis(l1=CacheL1())
+    servidor.dados.update({'x': '1', 'y': '2'})
+    servidor.chamadas.clear()
+
+    assert cache.get('x') == '1' and cache.get('x') == '1'
+    assert servidor.chamadas == ['pipeline']     # GET + PTTL; 2ª leitura veio do L1
+
+    # Só as chaves fora do L1 vão ao Redis, numa ida só
+    assert cache.mget(['x', 'y', 'z']) == ['1', '2', None]
+    assert servidor.chamadas == ['pipeline', 'pipeline']
+
+    assert cache.mset({'p': 'a', 'q': 'b'}, ex=30) is True
+    assert len(servidor.chamadas) == 3 and servidor.dados['q'] == 'b'
+    assert cache.mget(['p', 'q']) == ['a', 'b'] and len(servidor.chamadas) == 3
+
+    # delete tira dos dois níveis
+    cache.delete('x')
+    assert cache.get('x') is None
+    estatisticas = cache.estatisticas()
+    assert estatisticas['l1']['hits'] == 4 and estatisticas['l1']['misses'] == 4
+    assert (estatisticas['l2']['hits'], estatisticas['l2']['misses']) == (2, 2)
+    assert estatisticas['l2']['backend'] == 'tcp'
+
+
+def test_promocao_respeita_ttl_restante_no_redis(servidor):
+    agora = [0.0]
+    cache = CacheDoisNiveis(l1=CacheL1(relogio=lambda: agora[0]))
+    # Outro worker gravou com ex=10; aqui a chave chega com 2 s de vida
+    servidor.dados.update({'radar:signals:public': 'a', 'saldo': 'b', 'fixa': 'c'})
+    servidor.pttls.update({'radar:signals:public': 2000, 'saldo': 500, 'fixa': -1})
+
+    assert cache.get('radar:signals:public') == 'a'
+    assert cache.mget(['saldo', 'fixa']) == ['b', 'c']
+    del servidor.dados['radar:signals:public'], servidor.dados['saldo']   # expiraram no Redis
+
+    agora[0] = 1.0
+    assert cache.mget(['radar:signals:public', 'saldo', 'fixa']) == ['a', None, 'c']
+    agora[0] = 2.5
+    assert cache.get('radar:signals:public') is None
+    assert cache.get('fixa') == 'c'       # sem expiração: vale o limite do L1
+
+
+def test_sem_redis_l1_segura(monkeypatch):
+    for nome in ('REDIS_URL', 'REDIS_REST_URL', 'UPSTASH_REDIS_REST_URL'):
+        monkeypatch.delenv(nome, raising=False)
+    cache = CacheDoisNiveis(l2=RedisCompartilhado(), l1=CacheL1())
+    cache.set('radar:signals', '{"ok": 1}', ex=10)
+    assert cache.get('radar:signals') == '{"ok": 1}'
+    assert cache.mget(['radar:signals', 'outra']) == ['{"ok": 1}', None]
+    assert cache.estatisticas()['l2']['disponivel'] is False
+
+
+def test_reconexao_em_segundo_plano(servidor):
+    servidor.falhas_ping = 2      # fora do ar no boot
+    conexao = redis_safe.redis_compartilhado()
+    assert conexao.available is False
+    assert _esperar(lambda: conexao.available)
+    assert conexao.reconexoes == 1
+
+    # Cai no meio do caminho: fallback na hora, volta sozinho
+    seguro = SafeRedis()
+    servidor.fora = True
+    assert seguro.get('k') is None and seguro.incr('k') == 1
+    assert conexao.available is False and conexao.erros == 1
+    servidor.fora = False
+    assert _esperar(lambda: conexao.available)
+    assert seguro.incr('k') == 1 and seguro.incr('k') == 2
+
+
+def test_safe_redis_compartilha_a_conexao(servidor):
+    a, b = SafeRedis(), SafeRedis(host='outro')
+    assert a.conexao is b.conexao is redis_safe.redis_compartilhado()
+    assert servidor.chamadas == ['ping']          # um PING por processo
+    assert a.set('k', 'v', ex=10) is True and b.get('k') == 'v'
+
+
+def test_upstash_mget_e_pipeline(monkeypatch):
+    pedidos = []
+
+    class _Resposta:
+        status_code = 200
+
+        def __init__(self, corpo):
+            self.corpo = corpo
+
+        def json(self):
+            return self.corpo
+
+    def get(url, headers=None, timeout=None):
+        pedidos.append(url)
+        return _Resposta({'result': ['1', None]})
+
+    def post(url, json=None, headers=None, timeout=None):
+        pedidos.append((url, json))
+        return _Resposta([{'result': 'OK'}, {'result': 'OK'}])
+
+    monkeypatch.setattr(redis_safe, 'upstream_get', get)
+    monkeypatch.setattr(redis_safe, 'upstream_post', post)
+    upstash = redis_safe.UpstashRedis('https://eu1.upstash.io/', 'token')
+
+    assert upstash.mget(['a:1', 'b']) == ['1', None]
+    assert upstash.pipeline([['SET', 'a', '1', 'EX', 30], ['SET', 'b', '2']]) == ['OK', 'OK']
+    assert pedidos == ['https://eu1.upstash.io/mget/a%3A1/b',
+                       ('https://eu1.upstash.io/pipeline', [['SET', 'a', '1', 'EX', 30], ['SET', 'b', '2']])]
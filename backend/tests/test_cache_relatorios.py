@@ -0,0 +1,137 @@
+"""
+Teste do cache de renderização dos relatórios profissionais
+"""
+import sys
+import os
+import io
+import contextlib
+import threading
+import time
+
+# Adicionar diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pytest
+
+from app.services.motor import relatorio_profissional
+from app.services.motor.relatorio_profissional import CacheRelatorios
+
+
+def _resultado(preco=107393.87):
+    return {
+        'symbol': 'BTCUSDT',
+        'timeframe': '1h',
+        'contexto': {'regime': 'CONSOLIDATION', 'forca_regime': 6.5, 'volume_24h': 0},
+        'estrutura': {'tendencia': 'LATERAL'},
+        'mtf': {'resumo': '3/5 TFs em alta'},
+        'fluxo': {'pressao': 'COMPRA', 'ratio': np.float64(1.25)},
+        'confluencia': {'score': 7.3},
+        'sintese': {'acao': 'SHORT', 'score_confianca': 7.3, 'entry_price': 107608.66,
+                    'stop_loss': 109756.54, 'tp1': 104386.84, 'rr_ratio': '1:4.5'},
+        'indicadores': {'preco': preco},
+    }
+
+
+def _silencioso(func, *args):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args)
+
+
+def test_formatos_e_uma_renderizacao_por_conteudo():
+    cache = CacheRelatorios()
+    blocos = _silencioso(cache.obter, _resultado(), 'telegram')
+    assert isinstance(blocos, list) and len(blocos) == 6
+
+    texto = _silencioso(cache.obter, _resultado(), 'texto')
+    assert texto == "\n\n".join(blocos)
+    pagina = _silencioso(cache.obter, _resultado(), 'html')
+    assert pagina.count('<section') == 6 and '&lt;' not in blocos[0]
+
+    # Mesmo conteúdo (outro objeto) não renderiza de novo
+    for _ in range(5):
+        assert _silencioso(cache.obter, _resultado(), 'telegram') == blocos
+    assert cache.renderizacoes == 3
+    assert cache.acertos == 5
+
+    # Conteúdo diferente é outra entrada
+    _silencioso(cache.obter, _resultado(preco=1.0), 'telegram')
+    assert cache.renderizacoes == 4
+
+
+def test_blocos_devolvidos_sao_copias():
+    cache = CacheRelatorios()
+    blocos = _silencioso(cache.obter, _resultado(), 'telegram')
+    blocos.clear()
+    assert len(_silencioso(cache.obter, _resultado(), 'telegram')) == 6
+
+
+def test_limite_de_itens():
+    cache = CacheRelatorios(max_itens=2)
+    for preco in (1.0, 2.0, 3.0):
+        _silencioso(cache.obter, _resultado(preco), 'texto')
+    assert len(cache) == 2
+    _silencioso(cache.obter, _resultado(1.0), 'texto')   # saiu do cache
+    assert cache.renderizacoes == 4
+
+
+def test_pedidos_simultaneos_renderizam_uma_vez(monkeypatch):
+    chamadas = []
+
+    def _lento(resultado):
+        chamadas.append(1)
+        time.sleep(0.1)
+        return 'relatorio'
+
+    monkeypatch.setitem(relatorio_profissional.FORMATOS_RELATORIO, 'texto', _lento)
+    cache = CacheRelatorios()
+    saidas = []
+    threads = [threading.Thread(target=lambda: saidas.append(cache.obter(_resultado(), 'texto')))
+               for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert saidas == ['relatorio'] * 8
+    assert len(chamadas) == 1
+
+
+def test_formato_desconhecido():
+    with pytest.raises(ValueError):
+        CacheRelatorios().obter(_resultado(), 'pdf')
+
+
+def test_chave_ignora_campos_fora_do_relatorio():
+    cache = CacheRelatorios()
+    base = _resultado()
+    outro = dict(_resultado(), analise_avancada={'x': 1}, padroes=[1, 2])
+    assert cache.chave(base, 'texto') == cache.chave(outro, 'texto')
+    assert cache.chave(base, 'texto') != cache.chave(_resultado(preco=2.0), 'texto')
+
+    # Chave do chamador dispensa o hash
+    _silencioso(cache.obter, base, 'texto', 'analyze:BTCUSDT:1h')
+    assert cache.obter({}, 'texto', 'analyze:BTCUSDT:1h') == _silencioso(cache.obter, base, 'texto')
+
+
+def test_horario_do_pedido_nao_da_renderizacao(monkeypatch):
+    from datetime import datetime
+
+    class _Relogio:
+        agora = datetime(2025, 1, 2, 10, 0)
+
+        @classmethod
+        def now(cls):
+            return cls.agora
+
+    monkeypatch.setattr(relatorio_profissional, 'datetime', _Relogio)
+    cache = CacheRelatorios()
+    blocos = _silencioso(cache.obter, _resultado(), 'telegram')
+    assert '02/01/2025 10:00' in blocos[0]
+
+    _Relogio.agora = datetime(2025, 1, 2, 10, 7)
+    for formato in ('telegram', 'texto', 'html'):
+        relatorio = _silencioso(cache.obter, _resultado(), formato)
+        texto = "".join(relatorio) if isinstance(relatorio, list) else relatorio
+        assert '02/01/2025 10:07' in texto and '10:00' not in texto
+        assert relatorio_profissional.MARCA_HORARIO not in texto
+    assert cache.acertos == 1
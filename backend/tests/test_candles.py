@@ -0,0 +1,70 @@
+"""
+Teste do contêiner colunar de candles
+"""
+import sys
+import os
+import pickle
+
+# Adicionar diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.motor.candles import Candles
+from app.services.motor.frame_indicadores import frame_indicadores
+from app.services.motor.indicadores import calcular_indicadores
+
+
+def _klines(n=120):
+    rng = np.random.RandomState(2)
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    return [[1700000000000 + i * 3600000, f"{c:.2f}", f"{c + 1:.2f}", f"{c - 1:.2f}", f"{c:.2f}",
+             f"{v:.4f}", 0, "0", 10, "0", "0", "0"]
+            for i, (c, v) in enumerate(zip(close, rng.uniform(1, 9, n)))]
+
+
+def test_de_klines_igual_ao_dataframe_antigo():
+    dados = _klines()
+    df = pd.DataFrame(dados).iloc[:, :6]
+    df.columns = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+    df = df.astype({'timestamp': 'datetime64[ms]', 'open': float, 'high': float,
+                    'low': float, 'close': float, 'volume': float})
+
+    pd.testing.assert_frame_equal(Candles.de_klines(dados).para_dataframe(), df)
+
+
+def test_somente_leitura_e_views_sem_copia():
+    candles = Candles.de_klines(_klines())
+    with pytest.raises(ValueError):
+        candles.close[0] = 1.0
+    with pytest.raises(AttributeError):
+        candles.close = np.zeros(3)
+
+    ultimos = candles.tail(20)
+    assert len(ultimos) == 20
+    assert np.shares_memory(ultimos.close, candles.close)
+    assert ultimos.timestamp[0] == candles.timestamp[100]
+    assert candles.janela(10, 30).preco_atual == candles.close[29]
+    assert candles.close.flags['C_CONTIGUOUS'] and candles.timestamp.dtype == np.int64
+
+
+def test_indicadores_em_cache_lateral():
+    """Indicadores não viram colunas e são compartilhados com a visão DataFrame"""
+    candles = Candles.de_klines(_klines())
+    df = calcular_indicadores(candles.para_dataframe())
+
+    assert frame_indicadores(df) is candles.indicadores
+    assert candles.indicadores.atr(14).iloc[-1] == df['ATR'].iloc[-1]
+    assert candles.columns == ('timestamp', 'open', 'high', 'low', 'close', 'volume')
+
+    # A visão DataFrame é gravável e independente dos arrays
+    df.loc[0, 'close'] = -1.0
+    assert candles.close[0] != -1.0
+
+
+def test_pickle_preserva_somente_leitura():
+    candles = pickle.loads(pickle.dumps(Candles.de_klines(_klines())))
+    assert len(candles) == 120
+    assert not candles.close.flags.writeable
@@ -0,0 +1,92 @@
+"""
+Teste do catálogo de zonas magnéticas em memória (bisect + log append-only)
+"""
+import sys
+import os
+import io
+import contextlib
+
+# Adicionar diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+import pytest
+
+from app.services.motor import catalogo_magnetico
+from app.services.motor.catalogo_magnetico import CatalogoMagnetico
+
+
+@pytest.fixture
+def caminho(tmp_path, monkeypatch):
+    caminho = str(tmp_path / "catalogo.csv")
+    monkeypatch.setattr(catalogo_magnetico, 'CAMINHO_CATALOGO', caminho)
+    return caminho
+
+
+def test_consultas_por_bisect(caminho):
+    catalogo = CatalogoMagnetico(caminho, intervalo_verificacao=0)
+    catalogo.registrar([(100.0, 1.0, 'a'), (300.0, 5.0, 'b'), (200.0, 2.0, 'c'), (300.0, 1.0, 'd')])
+
+    assert catalogo.zonas_na_margem(205, 10) == [200.0]
+    assert catalogo.zonas_na_margem(250, 100) == [200.0, 300.0]
+    assert catalogo.zonas_na_margem(150, 10) == []
+    assert catalogo.zona_mais_proxima(260) == (300.0, 40.0)
+    assert catalogo.zona_mais_proxima(10) == (100.0, 90.0)
+    assert catalogo.mais_fortes(2) == [300.0, 200.0]
+    assert catalogo.registro(300) == {'zona': 300.0, 'forca_total': 6.0, 'ocorrencias': 2, 'ultima_data': 'd'}
+
+
+def test_log_compactacao_e_recarga(caminho):
+    catalogo = CatalogoMagnetico(caminho, limite_log=3, intervalo_verificacao=0)
+    catalogo.registrar([(100.0, 1.0, 'a'), (150.0, 2.0, 'b')])
+    assert os.path.exists(caminho + '.log') and not os.path.exists(caminho)
+
+    # Outro processo enxerga só o log
+    outro = CatalogoMagnetico(caminho, intervalo_verificacao=0)
+    assert outro.registros() == catalogo.registros()
+
+    # Terceiro evento compacta no CSV e zera o log
+    catalogo.registrar([(100.0, 3.0, 'c')])
+    assert os.path.exists(caminho) and not os.path.exists(caminho + '.log')
+    assert pd.read_csv(caminho).set_index('zona').loc[100.0, 'forca_total'] == 4.0
+
+    # O outro recarrega a partir do CSV novo; depois lê só o que cresceu no log
+    assert outro.registro(100)['forca_total'] == 4.0
+    recargas = outro.recargas
+    catalogo.registrar([(200.0, 1.0, 'd')])
+    assert outro.zonas_na_margem(200, 0) == [200.0]
+    assert outro.recargas == recargas
+
+    # Estado reconstruído do zero é o mesmo
+    assert CatalogoMagnetico(caminho).registros() == catalogo.registros()
+
+
+def test_sem_leitura_de_disco_entre_verificacoes(caminho):
+    catalogo = CatalogoMagnetico(caminho, intervalo_verificacao=3600)
+    CatalogoMagnetico(caminho).registrar([(100.0, 1.0, 'a')])
+    assert catalogo.zonas_na_margem(100, 0) == []     # ainda não verificou
+    catalogo._verificar(forcar=True)
+    assert catalogo.zonas_na_margem(100, 0) == [100.0]
+
+
+def test_funcoes_do_modulo(caminho):
+    df = pd.DataFrame({
+        'close': [101.0, 149.0, 260.0, 120.0],
+        'densidade': [1.0, 2.0, 5.0, 1.5],
+        'ruptura': [True, True, True, False],
+    }, index=pd.date_range('2024-01-01', periods=4, freq='h'))
+
+    with contextlib.redirect_stdout(io.StringIO()) as saida:
+        assert catalogo_magnetico.verificar_ressonancia(100) is False
+        catalogo_magnetico.atualizar_catalogo(df)
+        assert catalogo_magnetico.obter_zonas_magneticas() == [250.0, 100.0]
+        assert catalogo_magnetico.verificar_ressonancia(105) is True
+        assert catalogo_magnetico.verificar_ressonancia(180) is False
+        zona = catalogo_magnetico.identificar_proximidade_zona(270, limite=30)
+        catalogo_magnetico.registrar_ruptura(100.0, '2024-02-01 00:00:00')
+
+    assert "[ERRO] Catálogo Magnético não encontrado." in saida.getvalue()
+    assert zona == {'zona': 250.0, 'forca_total': 5.0, 'ocorrencias': 1, 'ultima_data': '2024-01-01 02:00:00'}
+    relevantes = catalogo_magnetico.exibir_zonas_relevantes()
+    assert relevantes[1] == {'zona': 100.0, 'forca_total': 3.0, 'ocorrencias': 3,
+                             'ultima_data': '2024-02-01 00:00:00'}
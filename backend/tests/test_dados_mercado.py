@@ -0,0 +1,86 @@
+"""
+Teste do pré-carregamento concorrente de dados de mercado (sem rede)
+"""
+import sys
+import os
+import time
+
+# Adicionar diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from app.services.motor import dados_mercado, motor_renan
+from app.services.motor.fluxo_ativo import FluxoAtivo
+from app.services.motor.multi_timeframe import analise_multitf
+
+ATRASO = 0.2
+
+
+def _fake_coletar(symbol, interval, limit=200):
+    time.sleep(ATRASO)
+    return pd.DataFrame({'close': [1.0, 2.0, 3.0]})
+
+
+def _fake_buscar_tf(symbol, interval, limit=100):
+    time.sleep(ATRASO)
+    return pd.DataFrame({'close': [float(i) for i in range(60)], 'volume': [1.0] * 60})
+
+
+def _fake_depth(self, symbol, limit=5000):
+    time.sleep(ATRASO)
+    return {'bids': [['99', '2']], 'asks': [['101', '1']]}
+
+
+def _instalar_fakes(monkeypatch):
+    monkeypatch.setattr(motor_renan, 'coletar_dados', _fake_coletar)
+    monkeypatch.setattr(dados_mercado, 'buscar_dados_tf', _fake_buscar_tf)
+    monkeypatch.setattr(FluxoAtivo, 'obter_depth', _fake_depth)
+
+
+def test_prefetch_concorrente(monkeypatch):
+    """As 7 requisições devem custar o tempo da mais lenta, não a soma"""
+    _instalar_fakes(monkeypatch)
+
+    inicio = time.perf_counter()
+    mercado = dados_mercado.prefetch_dados_mercado('BTCUSDT', '1h')
+    duracao = time.perf_counter() - inicio
+
+    assert duracao < ATRASO * 3, f"pré-carregamento serial? {duracao:.2f}s"
+    assert mercado.preco_atual == 3.0
+    assert set(mercado.dados_mtf) == {'1m', '5m', '15m', '1h', '4h'}
+    assert mercado.depth['bids'][0][0] == '99'
+    assert set(mercado.tempos) == {'dados', 'depth', 'mtf:1m', 'mtf:5m', 'mtf:15m', 'mtf:1h', 'mtf:4h'}
+
+
+def test_prefetch_falha_isolada(monkeypatch):
+    """Uma requisição que falha não derruba as demais"""
+    _instalar_fakes(monkeypatch)
+
+    def _depth_quebrado(self, symbol, limit=5000):
+        raise RuntimeError("timeout")
+
+    monkeypatch.setattr(FluxoAtivo, 'obter_depth', _depth_quebrado)
+
+    mercado = dados_mercado.prefetch_dados_mercado('BTCUSDT', '1h', timeframes_mtf=('1h',))
+    assert mercado.depth is None
+    assert mercado.dados is not None
+
+
+def test_estagios_consomem_contexto(monkeypatch):
+    """MTF e fluxo usam os dados pré-carregados sem tocar a rede"""
+    _instalar_fakes(monkeypatch)
+    mercado = dados_mercado.prefetch_dados_mercado('BTCUSDT', '1h')
+
+    def _proibido(*args, **kwargs):
+        raise AssertionError("requisição inesperada")
+
+    monkeypatch.setattr(FluxoAtivo, 'obter_depth', _proibido)
+    monkeypatch.setattr('app.services.motor.multi_timeframe.buscar_dados_tf', _proibido)
+
+    mtf = analise_multitf('BTCUSDT', dados_tf=mercado.dados_mtf)
+    assert len(mtf['timeframes']) == 5
+
+    fluxo = FluxoAtivo().calcular_pressao_liquidez('BTCUSDT', depth=mercado.depth)
+    assert fluxo['ratio'] == 2.0
+    assert fluxo['preco_atual'] == 100.0
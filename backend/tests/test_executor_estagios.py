@@ -0,0 +1,111 @@
+"""
+Teste do executor de estágios do motor (grafo de dependências)
+"""
+import sys
+import os
+import time
+
+# Adicionar diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from app.services.motor.executor_estagios import (
+    Estagio, executar_estagios, validar_estagios, estagios_necessarios
+)
+
+
+def _lento(valor, atraso=0.2):
+    def func(**kwargs):
+        time.sleep(atraso)
+        return valor
+    return func
+
+
+def test_estagios_independentes_em_paralelo():
+    """Estágios sem dependência entre si rodam ao mesmo tempo"""
+    estagios = [
+        Estagio('a', _lento(1), ['dados'], ['a']),
+        Estagio('b', _lento(2), ['dados'], ['b']),
+        Estagio('c', _lento(3), ['dados'], ['c']),
+    ]
+    inicio = time.perf_counter()
+    ctx, tempos = executar_estagios(estagios, {'dados': None})
+    duracao = time.perf_counter() - inicio
+
+    assert (ctx['a'], ctx['b'], ctx['c']) == (1, 2, 3)
+    assert duracao < 0.5
+    assert set(tempos) == {'a', 'b', 'c'}
+    assert all(t >= 0.2 for t in tempos.values())
+
+
+def test_dependencias_e_multiplas_saidas():
+    """Entradas chegam como argumentos nomeados; várias saídas via tupla"""
+    estagios = [
+        Estagio('soma', lambda x, y: x + y, ['x', 'y'], ['soma']),
+        Estagio('divmod', lambda soma: divmod(soma, 4), ['soma'], ['quociente', 'resto']),
+        Estagio('final', lambda quociente, resto: f"{quociente}r{resto}", ['quociente', 'resto'], ['final']),
+    ]
+    ctx, _ = executar_estagios(list(reversed(estagios)), {'x': 7, 'y': 3})
+    assert ctx['soma'] == 10
+    assert ctx['final'] == '2r2'
+
+
+def test_validacao_do_grafo():
+    """Saídas duplicadas, entradas órfãs e ciclos são rejeitados"""
+    with pytest.raises(ValueError, match="produzida"):
+        validar_estagios([Estagio('a', None, [], ['x']), Estagio('b', None, [], ['x'])])
+    with pytest.raises(ValueError, match="sem produtor"):
+        validar_estagios([Estagio('a', None, ['nada'], ['x'])])
+    with pytest.raises(ValueError, match="Ciclo"):
+        validar_estagios([Estagio('a', None, ['y'], ['x']), Estagio('b', None, ['x'], ['y'])])
+
+
+def test_saidas_a_menos_sao_erro():
+    """Estágio com menos valores que saídas não trava o pipeline"""
+    estagios = [
+        Estagio('par', lambda dados: (1,), ['dados'], ['a', 'b']),
+        Estagio('depois', lambda b: b, ['b'], ['c']),
+    ]
+    with pytest.raises(ValueError, match="par: 1 valores para 2 saídas"):
+        executar_estagios(estagios, {'dados': 1})
+
+    # Mesmo que uma saída some de outro jeito, o executor não espera para sempre
+    class _SemSaida(Estagio):
+        def executar(self, contexto):
+            return {}
+
+    with pytest.raises(RuntimeError, match="depois"):
+        executar_estagios([_SemSaida('mudo', None, ['dados'], ['b']), estagios[1]], {'dados': 1})
+
+
+def test_erro_de_estagio_propagado():
+    """Exceção de um estágio interrompe o pipeline"""
+    def quebra(dados):
+        raise RuntimeError("falhou")
+
+    estagios = [
+        Estagio('quebra', quebra, ['dados'], ['x']),
+        Estagio('depois', lambda x: x, ['x'], ['y']),
+    ]
+    with pytest.raises(RuntimeError, match="falhou"):
+        executar_estagios(estagios, {'dados': 1})
+
+
+def test_grafo_da_analise_valido():
+    """O grafo declarado em motor_renan é consistente"""
+    from app.services.motor.motor_renan import ESTAGIOS_ANALISE
+    validar_estagios(ESTAGIOS_ANALISE, ['symbol', 'timeframe', 'dados', 'mercado'])
+
+
+def test_estagios_necessarios():
+    """Só os produtores das saídas pedidas e das suas dependências"""
+    estagios = [
+        Estagio('a', None, ['dados'], ['a']),
+        Estagio('b', None, ['dados'], ['b']),
+        Estagio('c', None, ['a'], ['c']),
+        Estagio('d', None, ['c', 'dados'], ['d', 'd2']),
+    ]
+    assert [e.nome for e in estagios_necessarios(estagios, ['d2'])] == ['a', 'c', 'd']
+    assert [e.nome for e in estagios_necessarios(estagios, ['b', 'a'])] == ['a', 'b']
+    assert estagios_necessarios(estagios, []) == []
@@ -0,0 +1,93 @@
+"""
+Teste das métricas de depth por banda (notional, desequilíbrio, paredes)
+"""
+import sys
+import os
+
+# Adicionar diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pytest
+
+from app.services.motor.fluxo_ativo import FluxoAtivo, BANDAS_DEPTH
+from app.services.motor.livro_ofertas import LivroOfertas
+from app.services.motor.confluencia import calcular_confluencia, avaliar_fluxo
+
+
+def _depth(n=500, meio=100.0, semente=0):
+    rng = np.random.RandomState(semente)
+    passos = np.arange(1, n + 1) * 0.01
+    return {
+        'lastUpdateId': 1,
+        'bids': [[f"{meio - p:.2f}", f"{q:.4f}"] for p, q in zip(passos, rng.uniform(0.1, 5, n))],
+        'asks': [[f"{meio + p:.2f}", f"{q:.4f}"] for p, q in zip(passos, rng.uniform(0.1, 5, n))],
+    }
+
+
+def _bandas_por_laco(depth, meio):
+    """Referência direta, nível a nível"""
+    resultado = []
+    for banda in BANDAS_DEPTH:
+        bid = sum(float(p) * float(q) for p, q in depth['bids'] if (meio - float(p)) / meio * 100 <= banda)
+        ask = sum(float(p) * float(q) for p, q in depth['asks'] if (float(p) - meio) / meio * 100 <= banda)
+        resultado.append((bid, ask, (bid - ask) / (bid + ask) if bid + ask else 0.0))
+    return resultado
+
+
+def test_bandas_iguais_ao_laco():
+    depth = _depth()
+    fluxo = FluxoAtivo().calcular_pressao_liquidez('BTCUSDT', depth=depth)
+    assert fluxo['preco_atual'] == 100.0
+    assert [b['banda_pct'] for b in fluxo['bandas']] == list(BANDAS_DEPTH)
+
+    for banda, (bid, ask, imbalance) in zip(fluxo['bandas'], _bandas_por_laco(depth, 100.0)):
+        assert banda['bid_notional'] == pytest.approx(bid)
+        assert banda['ask_notional'] == pytest.approx(ask)
+        assert banda['imbalance'] == pytest.approx(imbalance)
+
+
+def test_paredes():
+    depth = _depth(n=50)
+    depth['bids'][30][1] = '80'
+    depth['asks'][7][1] = '60'
+    depth['asks'][40][1] = '70'
+    paredes = FluxoAtivo().calcular_pressao_liquidez('BTCUSDT', depth=depth)['paredes']
+
+    assert paredes['bids'][0]['preco'] == pytest.approx(99.69)
+    assert paredes['bids'][0]['notional'] == pytest.approx(99.69 * 80)
+    assert [p['preco'] for p in paredes['asks'][:2]] == pytest.approx([100.41, 100.08])
+    assert paredes['asks'][0]['distancia_pct'] == pytest.approx(0.41)
+    assert len(paredes['asks']) == 3
+
+
+def test_livro_local_e_depth_dao_o_mesmo():
+    depth = _depth(n=200, semente=1)
+    livro = LivroOfertas('BTCUSDT')
+    livro.carregar_snapshot(depth)
+
+    fluxo = FluxoAtivo()
+    pelo_livro = fluxo.calcular_pressao_liquidez('BTCUSDT', depth=livro)
+    pelo_depth = fluxo.calcular_pressao_liquidez('BTCUSDT', depth=depth)
+    assert pelo_livro['bandas'] == pytest.approx(pelo_depth['bandas'])
+    assert pelo_livro['paredes'] == pelo_depth['paredes']
+
+
+def test_depth_vazio():
+    fluxo = FluxoAtivo().calcular_pressao_liquidez('BTCUSDT', depth={'bids': [], 'asks': [['101', '1']]})
+    assert fluxo['bandas'] == [] and fluxo['paredes'] == {'bids': [], 'asks': []}
+    assert fluxo['ratio'] == 0 and fluxo['pressao'] == 'VENDA'
+
+
+def test_confluencia_usa_bandas():
+    perto_contra = [{'banda_pct': 0.1, 'imbalance': -0.6}, {'banda_pct': 0.5, 'imbalance': -0.4},
+                    {'banda_pct': 2.0, 'imbalance': 0.9}]
+    assert avaliar_fluxo({'pressao': 'COMPRA'}) == (2.5, '✅')
+    assert avaliar_fluxo({'pressao': 'COMPRA', 'bandas': perto_contra}) == (1.5, '⚠️')
+    assert avaliar_fluxo({'pressao': 'VENDA', 'bandas': perto_contra}) == (2.5, '✅')
+    assert avaliar_fluxo({'pressao': 'NEUTRO', 'bandas': perto_contra}) == (1.5, '⚠️')
+    assert avaliar_fluxo({'pressao': 'NEUTRO', 'bandas': []}) == (1, '⚠️')
+
+    confluencia = calcular_confluencia(None, {'pressao': 'COMPRA', 'bandas': perto_contra}, None, None)
+    assert confluencia['score'] == 2.5
+    assert confluencia['validacoes'][0] == {'camada': 'Fluxo DOM', 'contribuicao': 1.5, 'status': '⚠️'}
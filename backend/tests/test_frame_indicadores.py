@@ -0,0 +1,99 @@
+"""
+Teste do frame de indicadores (séries preguiçosas e compartilhadas)
+"""
+import sys
+import os
+import threading
+
+# Adicionar diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from app.services.motor import frame_indicadores as fi
+from app.services.motor.frame_indicadores import frame_indicadores, compartilhar_frame
+from app.services.motor.indicadores import calcular_indicadores
+from app.services.motor.indicadores_avancados import calcular_indicadores_avancados, gerar_sinal_completo
+from app.services.motor.padroes_graficos import calcular_atr
+from app.services.motor.niveis_operacionais import NiveisOperacionais
+
+
+def _candles(n=200, seed=9):
+    rng = np.random.RandomState(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    return pd.DataFrame({
+        'open': close, 'high': close + rng.uniform(0, 2, n), 'low': close - rng.uniform(0, 2, n),
+        'close': close, 'volume': rng.uniform(1, 50, n),
+    })
+
+
+def test_calcula_uma_vez_por_chave():
+    df = _candles()
+    frame = frame_indicadores(df)
+    assert frame_indicadores(df) is frame
+
+    a = frame.atr(14)
+    assert frame.atr(14) is a
+    assert frame.atr(20) is not a
+    assert frame.calculos == 3  # tr, atr14, atr20
+    assert frame.acertos == 2   # atr14 repetido e tr reaproveitado pelo atr20
+
+
+def test_copias_nao_herdam_mas_podem_compartilhar():
+    df = _candles()
+    frame = frame_indicadores(df)
+    assert frame_indicadores(df.copy()) is not frame
+    assert frame_indicadores(df.tail(50)) is not frame
+    assert frame_indicadores(compartilhar_frame(df, df.copy())) is frame
+
+
+def test_atr_compartilhado_entre_modulos():
+    """ATR de indicadores, padroes_graficos e niveis_operacionais vem do mesmo cálculo"""
+    df = calcular_indicadores(_candles())
+    frame = frame_indicadores(df)
+    calculos = frame.calculos
+
+    assert calcular_atr(df, 14) == df['ATR'].iloc[-1]
+    assert NiveisOperacionais().calcular_atr(df) == df['ATR'].iloc[-1]
+    assert frame.calculos == calculos
+
+
+def test_avancados_reaproveitam_basicos():
+    """Indicadores avançados e sinal completo não refazem as séries básicas"""
+    df = calcular_indicadores(_candles())
+    frame = frame_indicadores(df)
+    calculos = frame.calculos
+
+    avancados = calcular_indicadores_avancados(compartilhar_frame(df, df.copy()))
+    novos = frame.calculos - calculos
+    assert novos <= 6  # maxima/minima 20, preço típico, ATR20, EMA20 (Keltner)...
+
+    sinal = gerar_sinal_completo(df, df_completo=avancados)
+    assert frame.calculos - calculos == novos
+    assert sinal['indicadores_chave']['ATR'] == df['ATR'].iloc[-1]
+
+    # Mesmo resultado do caminho sem compartilhamento
+    referencia = calcular_indicadores_avancados(_candles())
+    pd.testing.assert_series_equal(avancados['ADX'], referencia['ADX'])
+    pd.testing.assert_series_equal(avancados['KC_Upper'], referencia['KC_Upper'])
+
+
+def test_acesso_concorrente_calcula_uma_vez(monkeypatch):
+    df = _candles()
+    frame = frame_indicadores(df)
+    chamadas = []
+    original = fi.CALCULOS['atr']
+
+    def _atr_lento(frame, periodo):
+        chamadas.append(periodo)
+        threading.Event().wait(0.05)
+        return original(frame, periodo)
+
+    monkeypatch.setitem(fi.CALCULOS, 'atr', _atr_lento)
+    threads = [threading.Thread(target=frame.atr, args=(14,)) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert chamadas == [14]
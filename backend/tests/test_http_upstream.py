@@ -0,0 +1,265 @@
+"""
+Teste das sessões keep-alive por host (reuso de conexão, orçamento de retentativas)
+e do agendador (peso por minuto, prioridade, disjuntor)
+"""
+import sys
+import os
+import time
+import threading
+import importlib.util
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Adicionar diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+import requests
+
+from app.services.motor import http_upstream
+from app.services.motor.http_upstream import (
+    PRIORIDADE_INTERATIVA, PRIORIDADE_LOTE, AgendadorHost, ConfigHost, UpstreamIndisponivel,
+    estatisticas_upstream, peso_binance, prioridade_upstream, resumo_upstream, upstream_get, upstream_post,
+)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'   # keep-alive
+    chamadas = []
+
+    def _responder(self):
+        _Handler.chamadas.append((self.command, self.path))
+        if self.command == 'POST':
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        corpo = b'{"ok": true}'
+        if self.path.startswith('/falha'):
+            self.send_response(503)
+        elif self.path.startswith('/banido'):
+            self.send_response(429)
+            self.send_header('Retry-After', '1')
+        else:
+            self.send_response(200)
+        if self.path.startswith('/peso'):
+            self.send_header('X-MBX-USED-WEIGHT-1M', '590')
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    do_GET = do_POST = _responder
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def servidor(monkeypatch):
+    monkeypatch.setattr(http_upstream, 'CONFIG_HOSTS', {
+        '127.0.0.1': ConfigHost(pool=4, timeout=(1, 2), tentativas=2),
+    })
+    http_upstream.fechar_sessoes()
+    _Handler.chamadas = []
+    srv = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{srv.server_port}"
+    srv.shutdown()
+    http_upstream.fechar_sessoes()
+
+
+def test_reusa_conexao(servidor):
+    for _ in range(20):
+        assert upstream_get(f"{servidor}/ok").json() == {'ok': True}
+    assert upstream_post(f"{servidor}/ok", json={'a': 1}).status_code == 200
+
+    estatisticas = estatisticas_upstream()[servidor.split('//')[1]]
+    assert estatisticas['requisicoes'] == 21
+    assert estatisticas['conexoes_novas'] == 1
+    assert estatisticas['reuso'] == pytest.approx(20 / 21, abs=1e-3)
+    assert estatisticas['pool'] == 4
+
+
+def test_retentativas_dentro_do_orcamento(servidor, monkeypatch):
+    monkeypatch.setattr(http_upstream, 'ORCAMENTO_MAXIMO', 3.0)
+    http_upstream.fechar_sessoes()
+    monkeypatch.setattr(http_upstream._RetryComOrcamento, 'sleep', lambda self, response=None: None)
+
+    respostas = [upstream_get(f"{servidor}/falha").status_code for _ in range(3)]
+    assert respostas == [503, 503, 503]
+
+    estatisticas = estatisticas_upstream()[servidor.split('//')[1]]
+    # 3 fichas: a 1ª chamada retenta 2x, a 2ª 1x, a 3ª nenhuma
+    assert estatisticas['retentativas'] == 3
+    assert estatisticas['retentativas_negadas'] == 2
+    assert len(_Handler.chamadas) == 6
+
+    # POST não é retentado
+    _Handler.chamadas = []
+    assert upstream_post(f"{servidor}/falha", json={}).status_code == 503
+    assert len(_Handler.chamadas) == 1
+
+
+def test_erro_de_conexao_conta(servidor):
+    with pytest.raises(requests.ConnectionError):
+        upstream_get("http://127.0.0.1:1/x")
+    assert estatisticas_upstream()['127.0.0.1:1']['erros'] == 1
+
+
+def test_config_pelo_sufixo_do_host():
+    assert http_upstream.config_host('api.binance.com').tentativas == 2
+    assert http_upstream.config_host('us1-abc.upstash.io') is http_upstream.CONFIG_HOSTS['upstash.io']
+    assert http_upstream.config_host('exemplo.com') is http_upstream.CONFIG_PADRAO
+
+
+def test_peso_binance():
+    assert peso_binance('/api/v3/klines', {'limit': 1000}) == 2
+    assert peso_binance('/api/v3/depth', {'limit': 1000}) == 50
+    assert peso_binance('/api/v3/depth', {'limit': '20'}) == 5
+    assert peso_binance('/api/v3/depth') == 5
+    assert peso_binance('/api/v3/ticker/24hr') == 80
+    assert peso_binance('/api/v3/ticker/24hr', {'symbol': 'BTCUSDT'}) == 2
+
+
+@pytest.fixture
+def servidor_com_peso(servidor, monkeypatch):
+    """Mesmo servidor, com orçamento de 600/min (10 fichas/s) de peso 50 por chamada"""
+    monkeypatch.setattr(http_upstream, 'CONFIG_HOSTS', {
+        '127.0.0.1': ConfigHost(pool=4, timeout=(1, 2), tentativas=0, peso_minuto=600,
+                                pesar=lambda caminho, params: 50),
+    })
+    http_upstream.fechar_sessoes()
+    return servidor
+
+
+def test_orcamento_de_peso_e_cabecalho(servidor_com_peso, monkeypatch):
+    monkeypatch.setitem(http_upstream.ESPERA_MAXIMA, PRIORIDADE_INTERATIVA, 0.5)
+    for _ in range(12):
+        upstream_get(f"{servidor_com_peso}/ok")
+    # 600 fichas: a 13ª precisaria esperar ~5 s, mais que a espera máxima
+    with pytest.raises(UpstreamIndisponivel):
+        upstream_get(f"{servidor_com_peso}/ok")
+    assert len(_Handler.chamadas) == 12
+
+    agendador = estatisticas_upstream()[servidor_com_peso.split('//')[1]]['agendador']
+    assert agendador['peso_gasto'] == 600 and agendador['negadas_orcamento'] == 1
+
+
+def test_peso_usado_informado_pelo_servidor(servidor_com_peso, monkeypatch):
+    monkeypatch.setitem(http_upstream.ESPERA_MAXIMA, PRIORIDADE_INTERATIVA, 0.5)
+    # Servidor diz 590 de 600 já usados (outro processo no mesmo IP)
+    upstream_get(f"{servidor_com_peso}/peso")
+    agendador = estatisticas_upstream()[servidor_com_peso.split('//')[1]]['agendador']
+    assert agendador['peso_usado'] == 590 and agendador['fichas'] < 15
+    with pytest.raises(UpstreamIndisponivel):
+        upstream_get(f"{servidor_com_peso}/ok")
+
+
+def test_lote_respeita_reserva_interativa(servidor_com_peso, monkeypatch):
+    monkeypatch.setitem(http_upstream.ESPERA_MAXIMA, PRIORIDADE_LOTE, 0.5)
+    with prioridade_upstream(PRIORIDADE_LOTE):
+        for _ in range(9):
+            upstream_get(f"{servidor_com_peso}/ok")
+        # 150 fichas são da reserva interativa
+        with pytest.raises(UpstreamIndisponivel):
+            upstream_get(f"{servidor_com_peso}/ok")
+    upstream_get(f"{servidor_com_peso}/ok")
+    agendador = estatisticas_upstream()[servidor_com_peso.split('//')[1]]['agendador']
+    assert agendador['por_prioridade'] == {'lote': 9, 'interativa': 1}
+
+
+def test_fila_atende_interativa_antes_do_lote(monkeypatch):
+    monkeypatch.setattr(http_upstream, 'RESERVA_INTERATIVA', 0.0)
+    agendador = AgendadorHost('exemplo', ConfigHost(peso_minuto=6000))
+    agendador.balde.gastar(6000)      # vazio: 100 fichas/s
+    ordem = []
+
+    def entrar(prioridade, nome):
+        agendador.entrar(20, prioridade)
+        ordem.append(nome)
+
+    lote = threading.Thread(target=entrar, args=(PRIORIDADE_LOTE, 'lote'))
+    lote.start()
+    time.sleep(0.05)
+    interativa = threading.Thread(target=entrar, args=(PRIORIDADE_INTERATIVA, 'interativa'))
+    interativa.start()
+    lote.join(3)
+    interativa.join(3)
+    assert ordem == ['interativa', 'lote']
+    assert agendador.estatisticas()['esperas'] == 2
+
+
+def test_disjuntor(servidor_com_peso, monkeypatch):
+    servidor = servidor_com_peso
+    # 429 com Retry-After: não retenta e fecha o host até lá, sem chamar o servidor
+    assert upstream_get(f"{servidor}/banido").status_code == 429
+    with pytest.raises(UpstreamIndisponivel):
+        upstream_get(f"{servidor}/ok")
+    assert len(_Handler.chamadas) == 1
+    assert resumo_upstream('127.0.0.1') == {'aberto': True, 'peso_usado': 0, 'requisicoes': 1}
+
+    # Passado o Retry-After, a sonda fecha o disjuntor
+    time.sleep(1.05)
+    assert upstream_get(f"{servidor}/ok").status_code == 200
+    assert resumo_upstream('127.0.0.1')['aberto'] is False
+
+    # Falhas seguidas abrem
+    monkeypatch.setattr(http_upstream, 'FALHAS_DISJUNTOR', 2)
+    monkeypatch.setattr(http_upstream._RetryComOrcamento, 'sleep', lambda self, response=None: None)
+    for _ in range(2):
+        with pytest.raises(requests.ConnectionError):
+            upstream_get("http://127.0.0.1:1/x")
+    with pytest.raises(UpstreamIndisponivel):
+        upstream_get("http://127.0.0.1:1/x")
+    agendador = estatisticas_upstream()['127.0.0.1:1']['agendador']
+    assert agendador['disjuntor'] == 'aberto' and agendador['negadas_disjuntor'] == 1
+
+
+def test_451_e_429_so_abrem_host_com_orcamento():
+    class _Resposta:
+        def __init__(self, status):
+            self.status_code = status
+            self.headers = {'Retry-After': '60'}
+
+    coletor = AgendadorHost('coletor', ConfigHost())
+    binance = AgendadorHost('api.binance.com', ConfigHost(peso_minuto=6000))
+    for status in (451, 429):
+        coletor.entrar(1)
+        coletor.registrar(_Resposta(status))
+    assert coletor.estatisticas()['aberto'] is False
+
+    binance.entrar(1)
+    binance.registrar(_Resposta(451))
+    with pytest.raises(UpstreamIndisponivel):
+        binance.entrar(1)
+
+
+def _copia(servico):
+    """http_upstream de um serviço do backend-v2 (módulo solto), carregado por caminho"""
+    raiz = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    caminho = os.path.join(raiz, 'backend-v2', 'services', servico, 'http_upstream.py')
+    spec = importlib.util.spec_from_file_location(f'http_upstream_{servico.replace("-", "_")}', caminho)
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    return modulo
+
+
+@pytest.mark.parametrize('servico', [None, 'sne-web', 'sne-collector'])
+def test_sonda_com_erro_repassado_fecha_disjuntor(servico):
+    modulo = http_upstream if servico is None else _copia(servico)
+
+    class _Resposta:
+        status_code = 503
+        headers = {'X-SNE-Upstream-Refused': '1'}
+
+    agora = [0.0]
+    agendador = modulo.AgendadorHost('coletor', modulo.ConfigHost(), relogio=lambda: agora[0])
+    for _ in range(modulo.FALHAS_DISJUNTOR):
+        agendador.entrar(1)
+        agendador.registrar(None)
+    with pytest.raises(modulo.UpstreamIndisponivel):
+        agendador.entrar(1)
+
+    # A sonda chega ao coletor, que repassa a recusa da Binance: o host está de pé
+    agora[0] += modulo.ESPERA_DISJUNTOR + 1
+    agendador.entrar(1)
+    agendador.registrar(_Resposta())
+    assert agendador.estatisticas()['disjuntor'] == 'fechado'
+    agora[0] += 3600
+    agendador.entrar(1)
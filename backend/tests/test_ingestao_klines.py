@@ -0,0 +1,236 @@
+"""
+Teste da ingestão de klines por stream no coletor (replay local da bolsa)
+"""
+import sys
+import os
+import io
+import json
+import contextlib
+import importlib.util
+import threading
+
+# Coletor é um serviço à parte (módulos soltos); carregado por caminho
+RAIZ = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+COLETOR = os.path.join(RAIZ, 'backend-v2', 'services', 'sne-collector')
+sys.path.append(COLETOR)
+
+import pytest
+
+import ingestao_klines
+from armazem_candles import ArmazemCandles, abertura_atual
+from ingestao_klines import IngestorKlines, ler_klines_redis
+from klines import decodificar_klines
+
+HORA = 3_600_000
+ABERTO = 1_700_000_000_000 // HORA * HORA
+
+
+class RedisFalso:
+    """O que a ingestão usa do Redis (listas, PSETEX e pipeline)"""
+
+    def __init__(self):
+        self.dados = {}
+
+    def get(self, chave):
+        return self.dados.get(chave)
+
+    def psetex(self, chave, ttl_ms, valor):
+        self.dados[chave] = valor.encode()
+
+    def delete(self, chave):
+        self.dados.pop(chave, None)
+
+    def rpush(self, chave, *valores):
+        self.dados.setdefault(chave, []).extend(v.encode() for v in valores)
+
+    def ltrim(self, chave, inicio, fim):
+        lista = self.dados.get(chave, [])
+        self.dados[chave] = lista[inicio:] if fim == -1 else lista[inicio:fim + 1]
+
+    def lrange(self, chave, inicio, fim):
+        lista = self.dados.get(chave, [])
+        return lista[inicio:] if fim == -1 else lista[inicio:fim + 1]
+
+    def pipeline(self):
+        redis = self
+
+        class _Pipeline:
+            def __init__(self):
+                self.comandos = []
+
+            def __getattr__(self, nome):
+                return lambda *args: self.comandos.append((nome, args))
+
+            def execute(self):
+                return [getattr(redis, nome)(*args) for nome, args in self.comandos]
+
+        return _Pipeline()
+
+
+class Bolsa:
+    """REST de klines de 1h até o candle em formação do relógio, respeitando startTime"""
+
+    def __init__(self, relogio):
+        self.relogio = relogio
+        self.buscas = []
+
+    def buscar(self, symbol, interval, limit, inicio=None):
+        self.buscas.append((limit, inicio))
+        aberto = abertura_atual('1h', self.relogio())
+        inicio = aberto - (limit - 1) * HORA if inicio is None else inicio
+        return decodificar_klines([[t, "1", "2", "0.5", "1", "3", t + HORA - 1, "3", 7, "1", "1"]
+                                   for t in range(inicio, aberto + 1, HORA)][:limit])
+
+
+def evento(abertura, close, fechou):
+    return {'stream': 'btcusdt@kline_1h', 'data': {'e': 'kline', 's': 'BTCUSDT', 'k': {
+        't': abertura, 'T': abertura + HORA - 1, 's': 'BTCUSDT', 'i': '1h', 'o': '1', 'c': str(close),
+        'h': '60', 'l': '0.5', 'v': '3', 'n': 7, 'x': fechou, 'q': '3', 'V': '1', 'Q': '1'}}}
+
+
+@pytest.fixture
+def relogio():
+    agora = {'ms': ABERTO + HORA // 2}
+    relogio = lambda: agora['ms']
+    relogio.agora = agora
+    return relogio
+
+
+def _ingestor(tmp_path, relogio, fonte=None):
+    return IngestorKlines(['BTCUSDT'], ['1h'], fonte=fonte, buscar=Bolsa(relogio).buscar, redis=RedisFalso(),
+                          armazem=ArmazemCandles(str(tmp_path)), fechados=10, relogio=relogio)
+
+
+def _fechamentos(linhas):
+    return [(linha[0], linha[4]) for linha in linhas]
+
+
+def test_aberto_fechamento_e_lacuna(tmp_path, relogio):
+    ingestor = _ingestor(tmp_path, relogio)
+    redis = ingestor.redis
+
+    assert ingestor.processar(evento(ABERTO, 50.0, False)['data']) == 'aberto'
+    linhas = ler_klines_redis(redis, 'BTCUSDT', '1h', 5, agora_ms=relogio())
+    assert [t for t, _ in _fechamentos(linhas)] == [ABERTO - i * HORA for i in range(4, -1, -1)]
+    assert linhas[-1][4] == '50.0'
+    assert ingestor.linhas('BTCUSDT', '1h', 5) == linhas
+    # Mais do que os 10 fechados guardados: não serve
+    assert ler_klines_redis(redis, 'BTCUSDT', '1h', 12, agora_ms=relogio()) is None
+
+    # Fechamento: vai para o armazém e para a lista; até o próximo candle, nada a servir
+    relogio.agora['ms'] = ABERTO + HORA - 1
+    assert ingestor.processar(evento(ABERTO, 51.0, True)['data']) == 'fechou'
+    assert ingestor.armazem.ultimo('BTCUSDT', '1h') == ABERTO
+    assert ler_klines_redis(redis, 'BTCUSDT', '1h', 3, agora_ms=relogio()) is None
+
+    relogio.agora['ms'] = ABERTO + HORA + 10
+    assert ingestor.processar(evento(ABERTO + HORA, 52.0, False)['data']) == 'aberto'
+    assert _fechamentos(ler_klines_redis(redis, 'BTCUSDT', '1h', 3, agora_ms=relogio())) == [
+        (ABERTO - HORA, '1.0'), (ABERTO, '51.0'), (ABERTO + HORA, '52.0')]
+    assert len(redis.dados['ingest:klines:BTCUSDT:1h:fechados']) == 10
+
+    # Dois fechamentos perdidos: ressemeia pelo armazém (REST só do que falta)
+    relogio.agora['ms'] = ABERTO + 3 * HORA + 10
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert ingestor.processar(evento(ABERTO + 3 * HORA, 53.0, False)['data']) == 'aberto'
+    assert ingestor.lacunas == 1 and ingestor.semeaduras == 2
+    linhas = ler_klines_redis(redis, 'BTCUSDT', '1h', 5, agora_ms=relogio())
+    assert _fechamentos(linhas) == [(ABERTO - HORA, '1.0'), (ABERTO, '51.0'), (ABERTO + HORA, '1.0'),
+                                    (ABERTO + 2 * HORA, '1.0'), (ABERTO + 3 * HORA, '53.0')]
+
+    # Aberto que já deveria ter fechado não é servido
+    assert ler_klines_redis(redis, 'BTCUSDT', '1h', 2, agora_ms=ABERTO + 4 * HORA) is None
+
+
+def test_eventos_ignorados(tmp_path, relogio):
+    ingestor = _ingestor(tmp_path, relogio)
+    ingestor.processar(evento(ABERTO, 50.0, False)['data'])
+    assert ingestor.processar(evento(ABERTO - HORA, 49.0, True)['data']) == 'velho'
+    assert ingestor.processar({'e': 'kline', 's': 'ETHUSDT', 'k': {'i': '1h'}}) is None
+    assert ingestor.processar({'result': None, 'id': 1}) is None
+    assert ingestor.eventos == 2
+
+
+@pytest.mark.skipif(not ingestao_klines.WEBSOCKETS_DISPONIVEL, reason="websockets não instalado")
+def test_stream_por_websocket_local(tmp_path, relogio, monkeypatch):
+    """Replay por WebSocket local: a 1ª conexão fica muda (heartbeat reconecta)"""
+    from websockets.sync.server import serve
+
+    lotes = [
+        [evento(ABERTO, 50.0, False), evento(ABERTO, 50.5, False)],
+        [evento(ABERTO, 51.0, True), evento(ABERTO + HORA, 52.0, False)],
+    ]
+    terminou = threading.Event()
+
+    def _replay(conexao):
+        lote = lotes.pop(0) if lotes else []
+        for mensagem in lote:
+            conexao.send(json.dumps(mensagem))
+        if not lotes:
+            terminou.set()
+        try:
+            conexao.recv()      # muda até o cliente desistir
+        except Exception:
+            pass
+
+    servidor = serve(_replay, 'localhost', 0)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    url = f"ws://localhost:{servidor.socket.getsockname()[1]}"
+
+    monkeypatch.setattr(ingestao_klines, 'SILENCIO_MAXIMO', 0.3)
+    monkeypatch.setattr(ingestao_klines, 'ESPERA_RECONEXAO', (0,))
+    ingestor = _ingestor(tmp_path, relogio, fonte=lambda i: ingestao_klines.stream_klines_binance(i, url=url))
+    with contextlib.redirect_stdout(io.StringIO()):
+        ingestor.iniciar()
+        assert terminou.wait(5)
+        for _ in range(100):
+            if ingestor.eventos >= 4:
+                break
+            threading.Event().wait(0.02)
+        ingestor.parar()
+    servidor.shutdown()
+
+    assert ingestor.eventos == 4 and ingestor.fechamentos == 1
+    assert ingestor.reconexoes >= 1
+    assert ingestor.semeaduras == 2      # uma por conexão
+    assert ingestor.armazem.ultimo('BTCUSDT', '1h') == ABERTO
+    linhas = ler_klines_redis(ingestor.redis, 'BTCUSDT', '1h', 2, agora_ms=relogio())
+    assert _fechamentos(linhas) == [(ABERTO, '51.0'), (ABERTO + HORA, '52.0')]
+
+
+def test_coletor_responde_do_stream(tmp_path, relogio, monkeypatch):
+    spec = importlib.util.spec_from_file_location('coletor_app_ingestao', os.path.join(COLETOR, 'app.py'))
+    coletor = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(coletor)
+
+    ingestor = _ingestor(tmp_path, relogio)
+    ingestor.processar(evento(ABERTO, 50.0, False)['data'])
+
+    monkeypatch.setattr(coletor, 'redis_client', ingestor.redis)
+    monkeypatch.setattr(coletor, 'redis_available', True)
+    monkeypatch.setattr(coletor, 'SIMBOLOS_INGESTAO', ['BTCUSDT'])
+    monkeypatch.setattr(coletor, 'INTERVALOS_INGESTAO', ['1h'])
+    monkeypatch.setattr(coletor, 'ler_klines_redis',
+                        lambda r, s, i, l: ler_klines_redis(r, s, i, l, agora_ms=relogio()))
+    monkeypatch.setattr(coletor, '_buscar_upstream', lambda *a: pytest.fail("REST com stream ativo"))
+
+    resultado = coletor.get_cached_binance_data('klines', {'symbol': 'btcusdt', 'interval': '1h', 'limit': '3'})
+    assert resultado['source'] == 'stream'
+    assert _fechamentos(resultado['data'])[-1] == (ABERTO, '50.0')
+
+    lote = coletor.get_klines_lote([['BTCUSDT', '1h', 3]])
+    assert lote[0]['source'] == 'stream' and lote[0]['data'] == resultado['data']
+
+
+def test_main_exige_redis_url(monkeypatch):
+    """Só Upstash REST configurado: erro claro, sem redis.from_url numa URL https"""
+    import redis
+
+    monkeypatch.delenv('REDIS_URL', raising=False)
+    monkeypatch.setenv('UPSTASH_REDIS_REST_URL', 'https://eu1.upstash.io')
+    monkeypatch.setattr(ingestao_klines, 'SIMBOLOS_INGESTAO', ['BTCUSDT'])
+    monkeypatch.setattr(redis, 'from_url', lambda url: pytest.fail(f"from_url({url})"))
+    saida = io.StringIO()
+    with contextlib.redirect_stdout(saida):
+        ingestao_klines.main()
+    assert 'REDIS_URL não configurado' in saida.getvalue()
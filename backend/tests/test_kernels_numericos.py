@@ -0,0 +1,108 @@
+"""
+Equivalência dos kernels numéricos (OBV, CCI, PSAR) com as versões em loop
+"""
+import sys
+import os
+
+# Adicionar diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.motor import kernels_numericos
+from app.services.motor.indicadores_avancados import calcular_obv, calcular_cci, calcular_parabolic_sar
+
+
+def _candles(n=500, seed=3):
+    rng = np.random.RandomState(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    close[50:60] = close[49]  # fechamentos repetidos (OBV inalterado)
+    return pd.DataFrame({
+        'high': close + rng.uniform(0, 2, n),
+        'low': close - rng.uniform(0, 2, n),
+        'close': close,
+        'volume': rng.uniform(1, 50, n),
+    })
+
+
+def _obv_loop(df):
+    obv = np.zeros(len(df))
+    obv[0] = df['volume'].iloc[0]
+    for i in range(1, len(df)):
+        if df['close'].iloc[i] > df['close'].iloc[i-1]:
+            obv[i] = obv[i-1] + df['volume'].iloc[i]
+        elif df['close'].iloc[i] < df['close'].iloc[i-1]:
+            obv[i] = obv[i-1] - df['volume'].iloc[i]
+        else:
+            obv[i] = obv[i-1]
+    return obv
+
+
+def _cci_rolling_apply(df, periodo=20):
+    tp = (df['high'] + df['low'] + df['close']) / 3
+    sma_tp = tp.rolling(window=periodo).mean()
+    md = tp.rolling(window=periodo).apply(lambda x: np.mean(np.abs(x - x.mean())))
+    return (tp - sma_tp) / (0.015 * md)
+
+
+def _psar_loop(df, af=0.02, max_af=0.2):
+    high, low = df['high'].values, df['low'].values
+    sar, trend = np.zeros(len(df)), np.zeros(len(df))
+    af_current = af
+    sar[0], trend[0] = low[0], 1
+    for i in range(1, len(df)):
+        if trend[i-1] == 1:
+            sar[i] = sar[i-1] + af_current * (high[i-1] - sar[i-1])
+            if low[i] <= sar[i]:
+                trend[i], sar[i], af_current = -1, high[i-1], af
+            else:
+                trend[i] = 1
+                if high[i] > high[i-1]:
+                    af_current = min(af_current + af, max_af)
+        else:
+            sar[i] = sar[i-1] + af_current * (low[i-1] - sar[i-1])
+            if high[i] >= sar[i]:
+                trend[i], sar[i], af_current = 1, low[i-1], af
+            else:
+                trend[i] = -1
+                if low[i] < low[i-1]:
+                    af_current = min(af_current + af, max_af)
+    return sar, trend
+
+
+def test_obv_igual_ao_loop():
+    df = _candles()
+    np.testing.assert_array_equal(calcular_obv(df.copy())['OBV'].values, _obv_loop(df))
+
+
+def test_cci_igual_ao_rolling_apply():
+    df = _candles()
+    esperado = _cci_rolling_apply(df)
+    obtido = calcular_cci(df.copy())['CCI']
+    np.testing.assert_allclose(obtido.values, esperado.values, rtol=1e-9, equal_nan=True)
+    assert obtido.isna().sum() == 19
+
+
+@pytest.mark.parametrize('compilado', [False, True])
+def test_psar_igual_ao_loop(compilado):
+    if compilado and not kernels_numericos.NUMBA_DISPONIVEL:
+        pytest.skip("numba não instalado")
+    df = _candles()
+    sar_esperado, trend_esperado = _psar_loop(df)
+    sar, trend = kernels_numericos.psar(df['high'].values, df['low'].values, compilado=compilado)
+    np.testing.assert_array_equal(sar, sar_esperado)
+    np.testing.assert_array_equal(trend, trend_esperado)
+
+
+def test_psar_no_dataframe():
+    df = calcular_parabolic_sar(_candles())
+    assert set(np.unique(df['PSAR_Trend'])) == {-1.0, 1.0}
+
+
+def test_series_curtas():
+    """Menos candles que o período e série vazia não quebram"""
+    assert np.isnan(kernels_numericos.desvio_medio_movel([1.0, 2.0], 20)).all()
+    assert len(kernels_numericos.obv([], [])) == 0
+    assert len(kernels_numericos.psar([], [])[0]) == 0
@@ -0,0 +1,130 @@
+"""
+Teste do decodificador de klines (bytes → colunas tipadas)
+"""
+import sys
+import os
+import json
+
+# Adicionar diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.motor import armazem_candles
+from app.services.motor import klines as modulo_klines
+from app.services.motor import multi_timeframe
+from app.services.motor.candles import Candles
+from app.services.motor.klines import (
+    codificar_klines_binario, decodificar_klines, decodificar_klines_binario, NOMES_KLINES,
+)
+
+COLUNAS_BINANCE = ['timestamp', 'open', 'high', 'low', 'close', 'volume', 'close_time',
+                   'quote_volume', 'trades', 'taker_buy_base', 'taker_buy_quote', 'ignore']
+
+
+def _linhas(n=50):
+    rng = np.random.RandomState(3)
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    return [[1700000000000 + i * 60000, f"{c:.8f}", f"{c + 1:.8f}", f"{c - 1:.8f}", f"{c:.8f}",
+             f"{v:.8f}", 1700000059999 + i * 60000, f"{v * c:.8f}", 10 + i, f"{v / 2:.8f}",
+             f"{v * c / 2:.8f}", "0"]
+            for i, (c, v) in enumerate(zip(close, rng.uniform(1, 9, n)))]
+
+
+def _dataframe_antigo(linhas):
+    """Caminho anterior: DataFrame de strings + astype"""
+    df = pd.DataFrame(linhas, columns=COLUNAS_BINANCE).drop(columns='ignore')
+    return df.astype({c: float for c in COLUNAS_BINANCE[1:6] + COLUNAS_BINANCE[7:8] + COLUNAS_BINANCE[9:11]})
+
+
+@pytest.mark.parametrize('formato', ['bytes', 'str', 'lista', 'envelope'])
+def test_decodifica_igual_ao_caminho_antigo(formato):
+    linhas = _linhas()
+    payload = {
+        'bytes': json.dumps(linhas).encode(),
+        'str': json.dumps(linhas),
+        'lista': linhas,
+        'envelope': json.dumps({'data': linhas, 'source': 'cache'}).encode(),
+    }[formato]
+
+    klines = decodificar_klines(payload)
+    antigo = _dataframe_antigo(linhas)
+    assert len(klines) == 50
+    for nome in NOMES_KLINES:
+        assert np.array_equal(klines[nome], antigo[nome].to_numpy()), nome
+    assert klines.timestamp.dtype == np.int64 and klines.trades.dtype == np.int64
+    assert klines.taker_buy_quote.dtype == np.float64
+
+
+def test_sem_orjson(monkeypatch):
+    monkeypatch.setattr(modulo_klines, 'ORJSON_DISPONIVEL', False)
+    linhas = _linhas(5)
+    assert np.array_equal(decodificar_klines(json.dumps(linhas).encode()).close,
+                          [float(l[4]) for l in linhas])
+
+
+def test_vazio_reduzido_e_erro():
+    vazio = decodificar_klines(b'[]')
+    assert len(vazio) == 0 and vazio.para_dataframe(['close', 'volume']).empty
+
+    # Só OHLCV: campos extras zerados
+    curtas = decodificar_klines([[1, '1', '2', '0.5', '1.5', '10']])
+    assert curtas.close.tolist() == [1.5] and curtas.trades.tolist() == [0]
+
+    with pytest.raises(ValueError):
+        decodificar_klines({'error': 'Timeout'})
+    with pytest.raises(ValueError):
+        decodificar_klines([[1, '2']])
+
+
+@pytest.mark.parametrize('nivel', [0, 1])
+def test_binario_ida_e_volta(nivel):
+    klines = decodificar_klines(_linhas())
+    corpo = codificar_klines_binario(klines, nivel=nivel)
+    volta = decodificar_klines(corpo)     # detecta o mágico
+    for nome in NOMES_KLINES:
+        assert np.array_equal(volta[nome], klines[nome]) and volta[nome].dtype == klines[nome].dtype, nome
+    assert len(decodificar_klines(codificar_klines_binario(decodificar_klines([])))) == 0
+
+
+def test_binario_corrompido():
+    corpo = codificar_klines_binario(decodificar_klines(_linhas(5)), nivel=0)
+    with pytest.raises(ValueError):
+        decodificar_klines_binario(corpo[:-8])
+    with pytest.raises(ValueError):
+        decodificar_klines_binario(corpo[:4] + b'\x09' + corpo[5:])
+    with pytest.raises(ValueError):
+        decodificar_klines_binario(b'SNEK')
+
+
+def test_para_dataframe_e_candles():
+    linhas = _linhas()
+    klines = decodificar_klines(json.dumps(linhas).encode())
+    df = klines.para_dataframe()
+    assert list(df.columns) == list(NOMES_KLINES)
+    assert df['timestamp'].dtype == 'datetime64[ms]' and df['trades'].dtype == np.int64
+
+    candles = Candles.de_klines(json.dumps(linhas).encode())
+    pd.testing.assert_frame_equal(candles.para_dataframe(), Candles.de_klines(linhas).para_dataframe())
+    assert candles.close.tolist() == klines.close.tolist()
+
+
+def test_buscar_dados_tf_decodifica_bytes(monkeypatch):
+    linhas = _linhas()
+
+    class _Resposta:
+        status_code = 200
+        content = json.dumps(linhas).encode()
+
+        def raise_for_status(self):
+            pass
+
+        def json(self):
+            raise AssertionError("não deve passar por response.json()")
+
+    monkeypatch.setattr(armazem_candles, 'ARMAZEM_ATIVO', False)
+    monkeypatch.setattr(modulo_klines, 'upstream_get', lambda *a, **k: _Resposta())
+    df = multi_timeframe.buscar_dados_tf('BTCUSDT', '1h')
+    pd.testing.assert_frame_equal(df, _dataframe_antigo(linhas)[['close', 'volume']])
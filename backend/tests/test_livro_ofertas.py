@@ -0,0 +1,186 @@
+"""
+Teste do livro de ofertas local (snapshot + diffs) com um replay local da bolsa
+"""
+import sys
+import os
+import io
+import json
+import random
+import contextlib
+import threading
+
+# Adicionar diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from app.services.motor import livro_ofertas
+from app.services.motor.livro_ofertas import LivroOfertas, MantenedorLivro
+from app.services.motor.fluxo_ativo import FluxoAtivo
+
+
+class BolsaReplay:
+    """Bolsa simulada: livro verdadeiro, eventos de diff numerados e snapshots REST"""
+
+    def __init__(self, semente=0, niveis=40):
+        self.rng = random.Random(semente)
+        self.id = 100
+        self.bids = {100.0 - i * 0.5: 1.0 + i for i in range(1, niveis)}
+        self.asks = {100.0 + i * 0.5: 1.0 + i for i in range(1, niveis)}
+        self.snapshots = []
+
+    def evento(self):
+        """Próximo diff (cada evento cobre 1-3 ids de atualização)"""
+        inicio = self.id + 1
+        self.id += self.rng.randint(1, 3)
+        b, a = [], []
+        for _ in range(self.rng.randint(1, 4)):
+            lado, livro = (b, self.bids) if self.rng.random() < 0.5 else (a, self.asks)
+            sinal = -1 if livro is self.bids else 1
+            preco = 100.0 + sinal * self.rng.randint(1, 45) * 0.5
+            qtd = 0.0 if self.rng.random() < 0.3 else round(self.rng.uniform(0.1, 9), 3)
+            if qtd:
+                livro[preco] = qtd
+            else:
+                livro.pop(preco, None)
+            lado.append([f"{preco:.2f}", f"{qtd:.3f}"])
+        return {'e': 'depthUpdate', 's': 'BTCUSDT', 'U': inicio, 'u': self.id, 'b': b, 'a': a}
+
+    def snapshot(self, symbol, limit):
+        self.snapshots.append(self.id)
+        return {
+            'lastUpdateId': self.id,
+            'bids': [[str(p), str(q)] for p, q in sorted(self.bids.items(), reverse=True)[:limit]],
+            'asks': [[str(p), str(q)] for p, q in sorted(self.asks.items())[:limit]],
+        }
+
+    def conferir(self, livro):
+        depth = livro.como_depth()
+        assert depth['bids'] == [[p, q] for p, q in sorted(self.bids.items(), reverse=True)][:livro.profundidade]
+        assert depth['asks'] == [[p, q] for p, q in sorted(self.asks.items())][:livro.profundidade]
+        bid, ask = livro.densidades()
+        assert bid == pytest.approx(sum(q for _, q in depth['bids']))
+        assert ask == pytest.approx(sum(q for _, q in depth['asks']))
+
+
+def _mantenedor(bolsa, **kwargs):
+    kwargs.setdefault('intervalo_snapshot', 0)
+    return MantenedorLivro('BTCUSDT', fonte=lambda m: iter(()), obter_snapshot=bolsa.snapshot, **kwargs)
+
+
+def test_sincroniza_com_eventos_guardados():
+    bolsa = BolsaReplay()
+    mantenedor = _mantenedor(bolsa)
+    # Eventos anteriores ao snapshot são descartados, posteriores aplicados
+    eventos = [bolsa.evento() for _ in range(5)]
+    for evento in eventos:
+        assert mantenedor.processar(evento)
+    for _ in range(300):
+        assert mantenedor.processar(bolsa.evento())
+
+    assert mantenedor.snapshots == 1 and mantenedor.lacunas == 0
+    assert mantenedor.livro.sincronizado
+    bolsa.conferir(mantenedor.livro)
+    assert mantenedor.livro.melhor_bid == max(bolsa.bids)
+    assert mantenedor.livro.melhor_ask == min(bolsa.asks)
+
+
+def test_lacuna_forca_novo_snapshot():
+    bolsa = BolsaReplay(semente=1)
+    mantenedor = _mantenedor(bolsa)
+    for _ in range(50):
+        mantenedor.processar(bolsa.evento())
+    bolsa.evento()     # perdido no caminho
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        mantenedor.processar(bolsa.evento())
+    assert mantenedor.lacunas == 1 and mantenedor.snapshots == 2
+    for _ in range(50):
+        mantenedor.processar(bolsa.evento())
+    bolsa.conferir(mantenedor.livro)
+
+
+def test_snapshot_anterior_aos_eventos():
+    """Snapshot mais velho que o primeiro evento guardado não pode ser usado"""
+    bolsa = BolsaReplay(semente=2)
+    velho = bolsa.snapshot('BTCUSDT', 1000)
+    bolsa.evento()
+    respostas = [velho]
+
+    def _snapshot(symbol, limit):
+        return respostas.pop(0) if respostas else bolsa.snapshot(symbol, limit)
+
+    mantenedor = MantenedorLivro('BTCUSDT', obter_snapshot=_snapshot, intervalo_snapshot=0)
+    assert not mantenedor.processar(bolsa.evento())
+    assert not mantenedor.livro.sincronizado
+    assert livro_ofertas.obter_livro('BTCUSDT') is None
+    assert mantenedor.processar(bolsa.evento())
+    bolsa.conferir(mantenedor.livro)
+
+
+def test_profundidade_limitada():
+    livro = LivroOfertas('BTCUSDT', profundidade=2)
+    livro.carregar_snapshot({'lastUpdateId': 1, 'bids': [['99', '1'], ['98', '2'], ['97', '3']],
+                             'asks': [['101', '1'], ['102', '2']]})
+    assert livro.densidades() == (3.0, 3.0)
+    assert livro.aplicar({'U': 2, 'u': 2, 'b': [['99.5', '4']], 'a': [['100.5', '5']]})
+    assert livro.como_depth() == {'lastUpdateId': 2, 'bids': [[99.5, 4.0], [99.0, 1.0]],
+                                  'asks': [[100.5, 5.0], [101.0, 1.0]]}
+    assert livro.densidades() == (5.0, 6.0)
+    assert not livro.aplicar({'U': 4, 'u': 4, 'b': [], 'a': []})
+
+
+def test_fluxo_usa_livro_local(monkeypatch):
+    bolsa = BolsaReplay(semente=3)
+    mantenedor = _mantenedor(bolsa)
+    for _ in range(20):
+        mantenedor.processar(bolsa.evento())
+    monkeypatch.setitem(livro_ofertas._mantenedores, 'BTCUSDT', mantenedor)
+    monkeypatch.setattr(livro_ofertas, 'upstream_get', lambda *a, **k: pytest.fail("REST com livro local"))
+
+    fluxo = FluxoAtivo()
+    pelo_livro = fluxo.calcular_pressao_liquidez('BTCUSDT')
+    pelo_depth = fluxo.calcular_pressao_liquidez('BTCUSDT', depth=fluxo.obter_depth('BTCUSDT', limit=1000))
+    assert pelo_livro['ratio'] == pytest.approx(pelo_depth['ratio'])
+    assert pelo_livro['preco_atual'] == (max(bolsa.bids) + min(bolsa.asks)) / 2
+
+
+@pytest.mark.skipif(not livro_ofertas.WEBSOCKETS_DISPONIVEL, reason="websockets não instalado")
+def test_stream_por_websocket_local():
+    """Replay servido por um WebSocket local, com queda e reconexão"""
+    from websockets.sync.server import serve
+
+    bolsa = BolsaReplay(semente=4)
+    lotes = [[bolsa.evento() for _ in range(30)], [bolsa.evento() for _ in range(30)]]
+    terminou = threading.Event()
+
+    def _replay(conexao):
+        lote = lotes.pop(0) if lotes else []
+        for evento in lote:
+            conexao.send(json.dumps(evento))
+        if not lotes:
+            terminou.set()
+            conexao.recv()      # mantém aberta até o cliente fechar
+
+    servidor = serve(_replay, 'localhost', 0)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    url = f"ws://localhost:{servidor.socket.getsockname()[1]}"
+
+    mantenedor = MantenedorLivro(
+        'BTCUSDT', fonte=lambda m: livro_ofertas.stream_depth_binance(m, url=url),
+        obter_snapshot=bolsa.snapshot, intervalo_snapshot=0)
+    with contextlib.redirect_stdout(io.StringIO()), \
+            pytest.MonkeyPatch.context() as mp:
+        mp.setattr(livro_ofertas, 'ESPERA_RECONEXAO', (0,))
+        mantenedor.iniciar()
+        assert terminou.wait(5)
+        for _ in range(100):
+            if mantenedor.eventos >= 60:
+                break
+            threading.Event().wait(0.02)
+        mantenedor.parar()
+    servidor.shutdown()
+
+    assert mantenedor.eventos == 60
+    assert mantenedor.reconexoes >= 1
+    assert mantenedor.snapshots == 2     # um por conexão
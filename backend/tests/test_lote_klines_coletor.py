@@ -0,0 +1,307 @@
+"""
+Teste do lote de klines do coletor (/binance/klines/batch + get_klines_many)
+e do formato binário negociado por Accept (get_klines_colunas)
+"""
+import sys
+import os
+import importlib.util
+import threading
+import time
+
+# Coletor e sne-web são serviços à parte (módulos soltos); carregados por caminho
+RAIZ = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+COLETOR = os.path.join(RAIZ, 'backend-v2', 'services', 'sne-collector')
+sys.path.append(COLETOR)
+
+import pytest
+import requests
+
+
+def _carregar(nome, caminho):
+    spec = importlib.util.spec_from_file_location(nome, caminho)
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    return modulo
+
+
+coletor = _carregar('coletor_app', os.path.join(COLETOR, 'app.py'))
+cliente = _carregar('coletor_cliente', os.path.join(RAIZ, 'backend-v2', 'services', 'sne-web', 'app',
+                                                    'collector_client.py'))
+
+HEADERS = {'Authorization': f'Bearer {coletor.COLLECTOR_TOKEN}'}
+
+
+def _linhas(symbol, n):
+    base = 100.0 if symbol == 'BTCUSDT' else 10.0
+    return [[1_700_000_000_000 + i * 60_000, str(base + i), str(base + i + 1), str(base + i - 1),
+             str(base + i), "1", 1_700_000_059_999 + i * 60_000, "1", 1, "0.5", "0.5", "0"]
+            for i in range(n)]
+
+
+class RedisFalso:
+    def __init__(self):
+        self.dados = {}
+        self.mgets = 0
+
+    def get(self, chave):
+        return self.dados.get(chave)
+
+    def mget(self, chaves):
+        self.mgets += 1
+        return [self.dados.get(c) for c in chaves]
+
+    def psetex(self, chave, ttl_ms, valor):
+        self.dados[chave] = valor.encode()
+
+    def set(self, chave, valor, nx=False, px=None):
+        if nx and chave in self.dados:
+            return False
+        self.dados[chave] = valor
+        return True
+
+    def exists(self, chave):
+        return chave in self.dados
+
+    def delete(self, chave):
+        self.dados.pop(chave, None)
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """Upstream falso: registra chamadas e quantas rodaram ao mesmo tempo"""
+    estado = {'chamadas': [], 'simultaneas': 0, 'pico': 0}
+    trava = threading.Lock()
+
+    def buscar(endpoint, params):
+        with trava:
+            estado['chamadas'].append((params['symbol'], params['interval'], params.get('limit')))
+            estado['simultaneas'] += 1
+            estado['pico'] = max(estado['pico'], estado['simultaneas'])
+        time.sleep(0.05)
+        with trava:
+            estado['simultaneas'] -= 1
+        if params['symbol'] == 'ERRUSDT':
+            return {"error": "Invalid symbol", "status": 400}
+        return {"source": "fresh", "data": _linhas(params['symbol'], int(params.get('limit', 500)))}
+
+    monkeypatch.setattr(coletor, '_buscar_upstream', buscar)
+    monkeypatch.setattr(coletor, 'redis_available', False)
+    monkeypatch.setattr(coletor, 'redis_client', None)
+    return estado
+
+
+def test_lote_em_ordem_com_duplicados_e_erro(upstream):
+    pedidos = [
+        {'symbol': 'btcusdt', 'interval': '1h', 'limit': 3},
+        ['ETHUSDT', '4h', 2],
+        {'symbol': 'ERRUSDT', 'interval': '1h'},
+        {'symbol': 'BTCUSDT', 'interval': '1h', 'limit': '3'},   # mesmo pedido do 1º
+    ]
+    resposta = coletor.app.test_client().post('/binance/klines/batch', json={'requests': pedidos},
+                                              headers=HEADERS)
+    assert resposta.status_code == 200
+    resultados = resposta.get_json()['results']
+
+    assert [(r['symbol'], r['interval']) for r in resultados] == [
+        ('BTCUSDT', '1h'), ('ETHUSDT', '4h'), ('ERRUSDT', '1h'), ('BTCUSDT', '1h')]
+    assert len(resultados[0]['data']) == 3 and resultados[0] == resultados[3]
+    assert len(resultados[1]['data']) == 2
+    assert resultados[2] == {'symbol': 'ERRUSDT', 'interval': '1h', 'error': 'Invalid symbol', 'status': 400}
+
+    # Duplicado busca uma vez; os 3 distintos ao mesmo tempo
+    assert sorted(upstream['chamadas']) == [('BTCUSDT', '1h', '3'), ('ERRUSDT', '1h', None), ('ETHUSDT', '4h', '2')]
+    assert upstream['pico'] == 3
+
+
+def test_lote_responde_cache_sem_upstream(upstream, monkeypatch):
+    redis = RedisFalso()
+    monkeypatch.setattr(coletor, 'redis_available', True)
+    monkeypatch.setattr(coletor, 'redis_client', redis)
+
+    pedidos = [['BTCUSDT', '1h', 3], ['ETHUSDT', '1h', 3]]
+    cliente_http = coletor.app.test_client()
+    cliente_http.post('/binance/klines/batch', json={'requests': pedidos[:1]}, headers=HEADERS)
+    upstream['chamadas'].clear()
+
+    resultados = cliente_http.post('/binance/klines/batch', json={'requests': pedidos},
+                                   headers=HEADERS).get_json()['results']
+    assert [r['source'] for r in resultados] == ['cache', 'fresh']
+    assert upstream['chamadas'] == [('ETHUSDT', '1h', '3')]
+    assert redis.mgets == 2
+
+
+@pytest.mark.parametrize('corpo', [None, {'requests': []}, {'requests': [{'symbol': 'BTCUSDT'}]},
+                                   {'requests': [['BTCUSDT', '1h', 'x']]},
+                                   {'requests': [['BTCUSDT', '1h']] * 101}])
+def test_lote_invalido(upstream, corpo):
+    resposta = coletor.app.test_client().post('/binance/klines/batch', json=corpo, headers=HEADERS)
+    assert resposta.status_code == 400
+    assert upstream['chamadas'] == []
+
+
+def test_get_klines_many(upstream, monkeypatch):
+    cliente_http = coletor.app.test_client()
+
+    def postar(url, json=None, headers=None, timeout=None):
+        assert url == 'http://coletor/binance/klines/batch'
+        resposta = cliente_http.post('/binance/klines/batch', json=json, headers=headers)
+
+        class _Resposta:
+            content = resposta.data
+
+            def raise_for_status(self):
+                assert resposta.status_code == 200
+
+        return _Resposta()
+
+    monkeypatch.setattr(cliente, 'COLLECTOR_URL', 'http://coletor')
+    monkeypatch.setattr(cliente, 'COLLECTOR_TOKEN', coletor.COLLECTOR_TOKEN)
+    monkeypatch.setattr(cliente, 'upstream_post', postar)
+
+    klines = cliente.get_klines_many([('BTCUSDT', '1m', 5), ('ERRUSDT', '1m', 5),
+                                      {'symbol': 'ethusdt', 'interval': '1m', 'limit': 4, 'since': 0}])
+    assert [None if k is None else len(k) for k in klines] == [5, None, 4]
+    assert klines[0].close.tolist() == [100.0, 101.0, 102.0, 103.0, 104.0]
+    assert klines[2].close[0] == 10.0
+    assert cliente.ultima_transferencia()['cache'] is False
+    assert cliente.get_klines_many([]) == []
+
+
+def test_mtf_do_sne_web_num_lote(upstream, monkeypatch):
+    """buscar_dados_mtf do sne-web: todos os timeframes numa requisição ao coletor"""
+    cliente_http = coletor.app.test_client()
+    postagens = []
+
+    def postar(url, json=None, headers=None, timeout=None):
+        postagens.append(json)
+        resposta = cliente_http.post('/binance/klines/batch', json=json, headers=headers)
+
+        class _Resposta:
+            content = resposta.data
+
+            def raise_for_status(self):
+                assert resposta.status_code == 200
+
+        return _Resposta()
+
+    monkeypatch.setattr(cliente, 'COLLECTOR_URL', 'http://coletor')
+    monkeypatch.setattr(cliente, 'COLLECTOR_TOKEN', coletor.COLLECTOR_TOKEN)
+    monkeypatch.setattr(cliente, 'upstream_post', postar)
+    # sne-web importa o cliente como app.collector_client
+    monkeypatch.setitem(sys.modules, 'app.collector_client', cliente)
+    mtf = _carregar('sne_web_multi_timeframe',
+                    os.path.join(RAIZ, 'backend-v2', 'services', 'sne-web', 'multi_timeframe.py'))
+
+    dados = mtf.buscar_dados_mtf('BTCUSDT', ('1m', '5m', '1h'), 5)
+    assert len(postagens) == 1 and len(postagens[0]['requests']) == 3
+    assert list(dados) == ['1m', '5m', '1h']
+    assert list(dados['1h'].columns) == ['close', 'volume'] and len(dados['1h']) == 5
+
+    # Lote fora do ar: volta para uma busca por timeframe
+    def falhar(*args, **kwargs):
+        raise requests.ConnectionError("coletor fora")
+
+    monkeypatch.setattr(cliente, 'upstream_post', falhar)
+    monkeypatch.setattr(mtf, 'buscar_dados_tf', lambda symbol, tf, limit: tf)
+    assert mtf.buscar_dados_mtf('BTCUSDT', ('1m', '5m'), 5) == {'1m': '1m', '5m': '5m'}
+
+
+def test_klines_binario_negociado(upstream, monkeypatch):
+    cliente_http = coletor.app.test_client()
+    url = '/binance/klines?symbol=BTCUSDT&interval=1m&limit=5'
+
+    # Sem Accept (ou preferindo JSON): JSON, como antes
+    assert cliente_http.get(url, headers=HEADERS).get_json()['source'] == 'fresh'
+    assert cliente_http.get(url, headers=dict(HEADERS, Accept='*/*')).mimetype == 'application/json'
+
+    def buscar(url, params=None, headers=None, timeout=None):
+        resposta = cliente_http.get('/binance/klines', query_string=params, headers=headers)
+
+        class _Resposta:
+            content = resposta.data
+
+            def __init__(self):
+                self.headers = resposta.headers
+
+            def raise_for_status(self):
+                if resposta.status_code != 200:
+                    raise requests.HTTPError(resposta.status)
+
+        return _Resposta()
+
+    monkeypatch.setattr(cliente, 'COLLECTOR_URL', 'http://coletor')
+    monkeypatch.setattr(cliente, 'COLLECTOR_TOKEN', coletor.COLLECTOR_TOKEN)
+    monkeypatch.setattr(cliente, 'upstream_get', buscar)
+
+    klines = cliente.get_klines_colunas('BTCUSDT', '1m', 5)
+    assert klines.close.tolist() == [100.0, 101.0, 102.0, 103.0, 104.0]
+    assert klines.trades.dtype.kind == 'i'
+    binario = cliente_http.get(url, headers=dict(HEADERS, Accept=cliente.ACCEPT_KLINES))
+    assert binario.mimetype == 'application/vnd.sne.klines' and binario.headers['X-SNE-Source'] == 'fresh'
+    assert cliente.ultima_transferencia()['bytes'] == len(binario.data)
+
+    # Erros continuam em JSON
+    erro = cliente_http.get('/binance/klines?symbol=ERRUSDT&interval=1m',
+                            headers=dict(HEADERS, Accept=cliente.ACCEPT_KLINES))
+    assert erro.status_code == 400 and erro.get_json() == {'error': 'Invalid symbol'}
+    with pytest.raises(RuntimeError):
+        cliente.get_klines_colunas('ERRUSDT', '1m', 5)
+
+
+def test_prioridade_do_pedido_e_upstream_indisponivel(monkeypatch):
+    import http_upstream
+    buscar_upstream = coletor._buscar_upstream
+    vistas = []
+
+    def buscar(endpoint, params):
+        vistas.append(http_upstream.prioridade_atual())
+        return {"source": "fresh", "data": _linhas(params['symbol'], 2)}
+
+    monkeypatch.setattr(coletor, '_buscar_upstream', buscar)
+    monkeypatch.setattr(coletor, 'redis_available', False)
+    cliente_http = coletor.app.test_client()
+
+    cliente_http.get('/binance/klines?symbol=BTCUSDT&interval=1m&limit=2', headers=HEADERS)
+    cliente_http.post('/binance/klines/batch', json={'requests': [['BTCUSDT', '5m', 2]]},
+                      headers=dict(HEADERS, **{'X-SNE-Priority': 'lote'}))
+    assert vistas == [http_upstream.PRIORIDADE_INTERATIVA, http_upstream.PRIORIDADE_LOTE]
+
+    # Recusa local do agendador (disjuntor/orçamento): 503, não o 500 genérico
+    def recusar(*args, **kwargs):
+        raise http_upstream.UpstreamIndisponivel("api.binance.com: disjuntor aberto")
+
+    monkeypatch.setattr(coletor, 'upstream_get', recusar)
+    assert buscar_upstream('ticker/price', {'symbol': 'BTCUSDT'}) == {
+        "error": "api.binance.com: disjuntor aberto", "status": 503}
+
+
+@pytest.mark.parametrize('status', [451, 503])
+def test_erro_repassado_nao_abre_disjuntor_do_coletor(status, monkeypatch):
+    """451/503 do coletor vêm da Binance (ou do agendador dele): sne-web segue chamando"""
+    import http_upstream
+    if status == 451:
+        erro = {"error": "Location restricted", "status": 451}
+    else:
+        erro = {"error": "api.binance.com: disjuntor aberto", "status": 503}
+    monkeypatch.setattr(coletor, '_buscar_upstream', lambda endpoint, params: erro)
+    monkeypatch.setattr(coletor, 'redis_available', False)
+    cliente_http = coletor.app.test_client()
+
+    agendador = http_upstream.AgendadorHost('coletor:8080', http_upstream.ConfigHost())
+    for _ in range(http_upstream.FALHAS_DISJUNTOR + 1):
+        agendador.entrar(1)
+        resposta = cliente_http.get('/binance/klines?symbol=BTCUSDT&interval=1m', headers=HEADERS)
+        assert resposta.status_code == status
+        agendador.registrar(resposta)
+    assert agendador.estatisticas()['disjuntor'] == 'fechado'
+
+    # 5xx do próprio coletor (sem a marca) continua contando
+    class _Quebrado:
+        status_code = 500
+        headers = {}
+
+    for _ in range(http_upstream.FALHAS_DISJUNTOR):
+        agendador.entrar(1)
+        agendador.registrar(_Quebrado())
+    with pytest.raises(http_upstream.UpstreamIndisponivel):
+        agendador.entrar(1)
@@ -0,0 +1,28 @@
+"""
+Teste das cópias dos módulos do motor nos serviços do backend-v2 (fonte única no backend)
+"""
+import os
+import importlib.util
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+spec = importlib.util.spec_from_file_location(
+    'copiar_modulos_compartilhados', os.path.join(BACKEND, 'scripts', 'copiar_modulos_compartilhados.py'))
+copiar = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(copiar)
+
+
+def test_converter_imports_relativos():
+    codigo = "from .klines import Klines\n    from .http_upstream import upstream_get\nimport numpy as np\n"
+    assert copiar.converter(codigo) == ("from klines import Klines\n    from http_upstream import upstream_get\n"
+                                        "import numpy as np\n")
+
+
+def test_copias_iguais_a_fonte():
+    # Se falhar: python backend/scripts/copiar_modulos_compartilhados.py
+    assert copiar.divergentes() == []
+
+
+def test_perfil_volume_de_professional_indicators_acompanhado():
+    destinos = {os.path.relpath(destino, copiar.SERVICOS) for destino, _ in copiar.copias()}
+    assert {'perfil_volume.py', os.path.join('sne-web', 'perfil_volume.py')} <= destinos
@@ -0,0 +1,85 @@
+"""
+Teste do motor de perfil de volume (rateio proporcional, POC/VAH/VAL, sessões)
+"""
+import sys
+import os
+import time
+
+# Adicionar diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from app.services.motor.perfil_volume import calcular_perfil_volume, perfil_volume_df, perfis_por_sessao
+from app.services.motor.indicadores_avancados import calcular_volume_profile
+
+
+def _candles(n=300, seed=11):
+    rng = np.random.RandomState(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    return pd.DataFrame({
+        'timestamp': pd.date_range('2024-01-01', periods=n, freq='1h'),
+        'high': close + rng.uniform(0.1, 3, n),
+        'low': close - rng.uniform(0.1, 3, n),
+        'close': close,
+        'volume': rng.uniform(1, 50, n),
+    })
+
+
+def _rateio_iterrows(df, bins):
+    """Referência: sobreposição candle × faixa em loop"""
+    bordas = np.linspace(df['low'].min(), df['high'].max(), bins + 1)
+    volumes = np.zeros(bins)
+    for i in range(bins):
+        for _, row in df.iterrows():
+            if row['low'] < bordas[i + 1] and row['high'] > bordas[i]:
+                sobreposicao = min(row['high'], bordas[i + 1]) - max(row['low'], bordas[i])
+                volumes[i] += row['volume'] * sobreposicao / (row['high'] - row['low'])
+    return volumes
+
+
+def test_rateio_igual_a_referencia():
+    df = _candles(120)
+    perfil = calcular_perfil_volume(df['high'], df['low'], df['volume'], bins=25)
+    np.testing.assert_allclose(perfil.volumes, _rateio_iterrows(df, 25), rtol=1e-9)
+    assert np.isclose(perfil.total, df['volume'].sum())
+
+
+def test_poc_e_area_de_valor():
+    """Candle concentrado define o POC; área de valor contém o POC"""
+    df = pd.DataFrame({'high': [10.0, 20.0, 15.2], 'low': [0.0, 10.0, 15.0], 'volume': [10.0, 10.0, 100.0]})
+    perfil = calcular_perfil_volume(df['high'], df['low'], df['volume'], bins=20)
+    assert perfil.bordas[perfil.poc_indice] <= 15.1 <= perfil.bordas[perfil.poc_indice + 1]
+    assert perfil.val <= perfil.poc <= perfil.vah
+    assert perfil.volumes[perfil.area_indices].sum() >= 0.7 * perfil.total
+
+
+def test_candle_sem_amplitude_e_fora_dos_limites():
+    perfil = calcular_perfil_volume([5.0, 50.0], [5.0, 40.0], [7.0, 10.0], bins=10,
+                                    preco_min=0.0, preco_max=10.0)
+    assert perfil.total == 7.0
+    assert perfil.volumes[5] == 7.0
+
+
+def test_janelas_de_sessao():
+    df = _candles(72)
+    dia = perfil_volume_df(df, inicio='2024-01-02', fim='2024-01-03')
+    esperado = calcular_perfil_volume(df['high'][24:48], df['low'][24:48], df['volume'][24:48])
+    assert dia.poc == esperado.poc
+
+    perfis = perfis_por_sessao(df, '1D')
+    assert list(perfis) == list(pd.date_range('2024-01-01', periods=3, freq='1D'))
+    assert perfis[pd.Timestamp('2024-01-02')].poc == dia.poc
+
+
+def test_colunas_em_indicadores_avancados():
+    df = calcular_volume_profile(_candles())
+    assert df['Volume_Profile_VAL'].iloc[-1] <= df['Volume_Profile_POC'].iloc[-1] <= df['Volume_Profile_VAH'].iloc[-1]
+
+
+def test_lookback_grande_em_milissegundos():
+    df = _candles(5000)
+    inicio = time.perf_counter()
+    calcular_perfil_volume(df['high'].values, df['low'].values, df['volume'].values, bins=200)
+    assert time.perf_counter() - inicio < 0.1
@@ -0,0 +1,64 @@
+"""
+Teste do detector de swing points compartilhado pelos módulos de S/R
+"""
+import sys
+import os
+import time
+
+# Adicionar diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from app.services.motor.pontos_swing import detectar_swings
+from app.services.motor.calcular_suportes_resistencias import calcular_suportes_resistencias
+from app.services.motor.niveis_operacionais import NiveisOperacionais
+
+
+def _candles(n=400, seed=5):
+    rng = np.random.RandomState(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    return pd.DataFrame({
+        'high': np.round(close + rng.uniform(0, 2, n), 1),
+        'low': np.round(close - rng.uniform(0, 2, n), 1),
+        'close': close,
+        'volume': rng.uniform(1, 50, n),
+    })
+
+
+def test_igual_ao_loop_com_fatias():
+    """Mesmos índices do loop antigo de calcular_suportes_resistencias"""
+    df, window = _candles(), 20
+    esperado_topos = [i for i in range(window, len(df) - window)
+                      if df['high'].iloc[i] == df['high'].iloc[i-window:i+window].max()]
+    esperado_fundos = [i for i in range(window, len(df) - window)
+                       if df['low'].iloc[i] == df['low'].iloc[i-window:i+window].min()]
+
+    topos, fundos = detectar_swings(df['high'], df['low'], window, window - 1)
+    assert topos[topos < len(df) - window].tolist() == esperado_topos
+    assert fundos[fundos < len(df) - window].tolist() == esperado_fundos
+
+
+def test_igual_ao_rolling_centrado():
+    """Mesmos níveis do loop antigo de NiveisOperacionais.identificar_sr_niveis"""
+    df, lookback = _candles(), 20
+    highs = df['high'].rolling(window=lookback, center=True).max()
+    lows = df['low'].rolling(window=lookback, center=True).min()
+    resistencias = [df['high'].iloc[i] for i in range(lookback, len(df) - lookback) if df['high'].iloc[i] == highs.iloc[i]]
+    suportes = [df['low'].iloc[i] for i in range(lookback, len(df) - lookback) if df['low'].iloc[i] == lows.iloc[i]]
+
+    niveis = NiveisOperacionais().identificar_sr_niveis(df, lookback)
+    assert niveis['resistance'] == sorted(resistencias, reverse=True)[:5]
+    assert niveis['support'] == sorted(suportes)[:5]
+
+
+def test_serie_curta_e_historico_longo():
+    topos, fundos = detectar_swings([1.0, 2.0], [0.5, 1.0], 5)
+    assert len(topos) == 0 and len(fundos) == 0
+
+    df = _candles(5000)
+    inicio = time.perf_counter()
+    resultado = calcular_suportes_resistencias(df)
+    assert time.perf_counter() - inicio < 0.5
+    assert resultado['suportes'] and resultado['resistencias']
@@ -0,0 +1,79 @@
+"""
+Teste da projeção de campos (fields=) da análise completa (sem rede)
+"""
+import sys
+import os
+import io
+import contextlib
+
+# Adicionar diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pytest
+
+from app.services.motor import dados_mercado, motor_renan
+from app.services.motor.candles import Candles
+from app.services.motor.fluxo_ativo import FluxoAtivo
+from app.services.motor.indicadores import calcular_indicadores
+
+
+def _klines(n=200):
+    rng = np.random.RandomState(5)
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    return [[1700000000000 + i * 3600000, c, c + 1, c - 1, c, v, 0, 0, 10, 0, 0, 0]
+            for i, (c, v) in enumerate(zip(close, rng.uniform(1, 9, n)))]
+
+
+@pytest.fixture
+def buscas(monkeypatch):
+    """Fakes das três buscas; devolve a lista de buscas feitas"""
+    feitas = []
+
+    def _coletar(symbol, interval, limit=200):
+        feitas.append('dados')
+        return calcular_indicadores(Candles.de_klines(_klines(limit)).para_dataframe())
+
+    def _buscar_tf(symbol, interval, limit=100):
+        feitas.append(f'mtf:{interval}')
+        df = Candles.de_klines(_klines(limit)).para_dataframe()
+        return df[['close', 'volume']]
+
+    def _depth(self, symbol, limit=5000):
+        feitas.append('depth')
+        return {'bids': [['99', '2']], 'asks': [['101', '1']]}
+
+    monkeypatch.setattr(motor_renan, 'coletar_dados', _coletar)
+    monkeypatch.setattr(dados_mercado, 'buscar_dados_tf', _buscar_tf)
+    monkeypatch.setattr(FluxoAtivo, 'obter_depth', _depth)
+    return feitas
+
+
+def _analisar(**kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return motor_renan.analise_completa('BTCUSDT', '1h', **kwargs)
+
+
+def test_normalizar_campos():
+    assert motor_renan.normalizar_campos(None) is None
+    assert motor_renan.normalizar_campos(' , ') is None
+    assert motor_renan.normalizar_campos('mtf, sintese') == ('mtf', 'sintese')
+    assert motor_renan.normalizar_campos(['symbol', 'zonas']) == ('zonas',)
+    with pytest.raises(ValueError, match="full_analysis"):
+        motor_renan.normalizar_campos('sintese,full_analysis')
+
+
+def test_projecao_pula_estagios_e_buscas(buscas):
+    """contexto + indicadores: sem MTF, sem order book, sem estágios extras"""
+    resultado = _analisar(campos='contexto,indicadores')
+    assert set(resultado) == {'symbol', 'timeframe', 'contexto', 'indicadores'}
+    assert buscas == ['dados']
+
+
+def test_projecao_igual_ao_resultado_completo(buscas):
+    completo = _analisar()
+    assert len(buscas) == 7
+    parcial = _analisar(campos=['niveis_operacionais', 'mtf'])
+    assert set(parcial) == {'symbol', 'timeframe', 'mtf', 'niveis_operacionais'}
+    assert parcial['niveis_operacionais'] == completo['niveis_operacionais']
+    assert parcial['mtf'] == completo['mtf']
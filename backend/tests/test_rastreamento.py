@@ -0,0 +1,83 @@
+"""
+Teste dos spans de rastreamento (Server-Timing / _timings)
+"""
+import sys
+import os
+import time
+
+# Adicionar diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from app.services.motor import dados_mercado, motor_renan
+from app.services.motor.fluxo_ativo import FluxoAtivo
+from app.services.motor.rastreamento import (
+    Rastreador, registrar_transferencia, coletar_transferencias
+)
+
+
+def test_server_timing_formato():
+    rastreador = Rastreador()
+    rastreador.adicionar('busca', 0.0123, cache=False, bytes=2048)
+    rastreador.adicionar('cache', 0.001, cache=True)
+    with rastreador.span('serializacao'):
+        time.sleep(0.01)
+
+    partes = rastreador.server_timing().split(', ')
+    assert partes[0] == 'busca;dur=12.3;desc="cache=miss bytes=2048"'
+    assert partes[1] == 'cache;dur=1.0;desc="cache=hit"'
+    assert partes[2].startswith('serializacao;dur=') and 'desc' not in partes[2]
+
+    tempos = rastreador.to_dict()
+    assert list(tempos) == ['busca', 'cache', 'serializacao']
+    assert tempos['busca'] == {'dur_ms': 12.3, 'cache': False, 'bytes': 2048}
+    assert tempos['serializacao']['dur_ms'] >= 10
+
+
+def test_transferencias_por_bloco():
+    """Fora de coletar_transferencias() o registro é ignorado"""
+    registrar_transferencia(100, cache=False)
+    with coletar_transferencias() as externo:
+        registrar_transferencia(10, cache=True)
+        with coletar_transferencias() as interno:
+            registrar_transferencia(5, cache=False)
+        registrar_transferencia(20, cache=True)
+    assert interno == {'bytes': 5, 'cache': False}
+    assert externo == {'bytes': 30, 'cache': True}
+
+
+def test_span_de_busca_no_prefetch(monkeypatch):
+    def _coletar(symbol, interval, limit=200):
+        registrar_transferencia(1000, cache=True)
+        return pd.DataFrame({'close': [1.0, 2.0]})
+
+    def _buscar_tf(symbol, interval, limit=100):
+        registrar_transferencia(100, cache=False)
+        return pd.DataFrame({'close': [1.0], 'volume': [1.0]})
+
+    def _depth(self, symbol, limit=5000):
+        registrar_transferencia(50)
+        return {'bids': [], 'asks': []}
+
+    monkeypatch.setattr(motor_renan, 'coletar_dados', _coletar)
+    monkeypatch.setattr(dados_mercado, 'buscar_dados_tf', _buscar_tf)
+    monkeypatch.setattr(FluxoAtivo, 'obter_depth', _depth)
+
+    mercado = dados_mercado.prefetch_dados_mercado('BTCUSDT', '1h', timeframes_mtf=('1h', '4h'))
+    assert mercado.transferencias['dados'] == {'bytes': 1000, 'cache': True}
+    assert mercado.transferencias['depth'] == {'bytes': 50, 'cache': None}
+
+    rastreador = Rastreador()
+    span = rastreador.registrar_busca(mercado)
+    assert span.bytes == 1250
+    assert span.cache is False   # parte das requisições foi à origem
+    assert span.duracao == mercado.tempo_total
+
+
+def test_spans_dos_estagios_na_ordem_declarada():
+    rastreador = Rastreador()
+    tempos = {'gestao_risco': 0.002, 'contexto': 0.001}
+    ordem = [e.nome for e in motor_renan.ESTAGIOS_ANALISE]
+    rastreador.registrar_estagios({nome: tempos[nome] for nome in ordem if nome in tempos})
+    assert [s.nome for s in rastreador.spans] == ['contexto', 'gestao_risco']
@@ -0,0 +1,101 @@
+"""
+Teste do codificador JSON do resultado da análise
+"""
+import sys
+import os
+import json
+from datetime import datetime
+
+# Adicionar diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.motor import serializacao
+from app.services.motor.serializacao import codificar, codificar_texto, normalizar
+
+
+def _resultado():
+    return {
+        'symbol': 'BTCUSDT',
+        'score': np.float64(7.25),
+        'contagem': np.int64(3),
+        'pequeno': np.float32(0.5),
+        'flag': np.bool_(True),
+        'vazio': float('nan'),
+        'vazio_np': np.float64('nan'),
+        'niveis': np.array([1.5, np.nan, 3.0]),
+        'tupla': (1, 'a'),
+        'quando': datetime(2024, 1, 2, 3, 4, 5),
+        'ts': pd.Timestamp('2024-01-02 03:00'),
+        'nat': pd.NaT,
+        'serie': pd.Series([1.0, 2.0], index=[10, 20]),
+        'tabela': pd.DataFrame({'a': [1, 2], 'b': [0.5, np.nan]}),
+        'aninhado': {'lista': [np.int32(1), {'x': np.float64(2.0)}], 5: 'chave int'},
+        'objeto': object,
+    }
+
+
+ESPERADO = {
+    'symbol': 'BTCUSDT',
+    'score': 7.25,
+    'contagem': 3,
+    'pequeno': 0.5,
+    'flag': True,
+    'vazio': None,
+    'vazio_np': None,
+    'niveis': [1.5, None, 3.0],
+    'tupla': [1, 'a'],
+    'quando': '2024-01-02T03:04:05',
+    'ts': '2024-01-02T03:00:00',
+    'nat': None,
+    'serie': {'10': 1.0, '20': 2.0},
+    'tabela': [{'a': 1, 'b': 0.5}, {'a': 2, 'b': None}],
+    'aninhado': {'lista': [1, {'x': 2.0}], '5': 'chave int'},
+    'objeto': "<class 'object'>",
+}
+
+
+def test_codificar_uma_passada():
+    assert json.loads(codificar(_resultado())) == ESPERADO
+    assert normalizar(_resultado()) == ESPERADO
+    assert isinstance(codificar_texto({'a': 1}), str)
+
+
+def test_caminho_sem_orjson(monkeypatch):
+    """Sem orjson a saída é a mesma"""
+    monkeypatch.setattr(serializacao, 'ORJSON_DISPONIVEL', False)
+    assert json.loads(codificar(_resultado())) == ESPERADO
+    assert normalizar(_resultado()) == ESPERADO
+
+
+@pytest.mark.skipif(not serializacao.ORJSON_DISPONIVEL, reason="orjson não instalado")
+def test_chaves_numpy_caem_no_caminho_python():
+    """orjson não aceita chaves NumPy; codificar não pode falhar por isso"""
+    assert json.loads(codificar({np.int64(1): 'a', 'b': np.float64(2)})) == {'1': 'a', 'b': 2.0}
+
+
+def test_nao_ascii():
+    assert codificar({'ação': 'é'}).decode('utf-8') == '{"ação":"é"}'
+
+
+def test_rota_analyze_codifica_o_resultado_cru_uma_vez(monkeypatch):
+    """motor_service devolve o resultado cru; a rota codifica e emenda _timings sem decodificar"""
+    from app.api import analyze as rota
+    from app.services import motor_service
+    from app.services.motor import motor_renan
+    from app.services.motor.rastreamento import Rastreador
+
+    resultado = _resultado()
+    monkeypatch.setattr(motor_renan, 'analise_completa', lambda *args, **kwargs: resultado)
+    monkeypatch.setattr(motor_service, 'normalizar', lambda obj: pytest.fail("passada extra"))
+    assert motor_service.analyze('BTCUSDT', '1h', serializar=False) is resultado
+
+    rastreador = Rastreador()
+    with rastreador.span('serializacao'):
+        corpo = codificar_texto(resultado)
+    esperado = json.loads(codificar(dict(resultado, _timings=rastreador.to_dict())))
+    assert json.loads(rota._acrescentar_tempos(corpo, rastreador)) == esperado
+    assert json.loads(rota._acrescentar_tempos('{}', rastreador)) == {'_timings': rastreador.to_dict()}